@@ -12,8 +12,10 @@ def get_admin_handlers():
     ]
 
 import database as db
+from async_db import adb
 import strings as st
 import utils
+import telegram_file_cache
 import input_validator as validator
 
 # Conversation states
@@ -137,6 +139,7 @@ async def received_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Store the image data in context
         context.user_data["image_bytes"] = image_bytes
+        context.user_data["image_file_id"] = photo.file_id
         
         # التحقق إذا كانت البيانات المطلوبة متوفرة
         if "customer_name" not in context.user_data or "phone_number" not in context.user_data:
@@ -212,7 +215,7 @@ async def received_reminder_hours(update: Update, context: ContextTypes.DEFAULT_
             return REMINDER_HOURS
         
         # Add the notification to the database with reminder setting
-        success, result = db.add_notification(
+        success, result = await adb.add_notification(
             context.user_data["customer_name"],
             context.user_data["phone_number"],
             context.user_data["image_bytes"],
@@ -227,9 +230,18 @@ async def received_reminder_hours(update: Update, context: ContextTypes.DEFAULT_
             customer_name = context.user_data["customer_name"]
             phone_number = context.user_data["phone_number"]
             
+            # الصورة موجودة مسبقاً على خوادم تيليجرام، نحفظ معرفها لتجنب رفعها عند العرض
+            image_path = await adb.get_image_path(notification_id)
+            if image_path and context.user_data.get("image_file_id"):
+                telegram_file_cache.remember_file_id(
+                    telegram_file_cache.notification_key(notification_id),
+                    image_path,
+                    context.user_data["image_file_id"]
+                )
+            
             # استدعاء دالة إرسال الرسالة الترحيبية الفورية
             import ultramsg_service
-            welcome_success, welcome_result = ultramsg_service.send_welcome_message(
+            welcome_success, welcome_result = await ultramsg_service.send_welcome_message_async(
                 customer_name, 
                 phone_number, 
                 notification_id
@@ -280,11 +292,12 @@ async def list_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text(st.NOT_AUTHORIZED)
         return
 
-    notifications = db.get_all_notifications()
+    result = await adb.list_notifications(limit=5)
     
-    if not notifications:
+    if not result['items']:
         await update.message.reply_text(st.LIST_NOTIFICATIONS_EMPTY)
         return
+    total = await adb.count_notifications()
     
     # إضافة أزرار البحث
     search_buttons = [
@@ -296,11 +309,14 @@ async def list_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Set up pagination
     page = 1
-    keyboard = utils.create_paginated_keyboard(notifications, page, "admin", extra_buttons=search_buttons)
+    keyboard = utils.create_keyset_keyboard(
+        result['items'], page, "admin", result['has_prev'], result['has_next'], total,
+        extra_buttons=search_buttons
+    )
     
     await update.message.reply_text(
         f"{st.LIST_NOTIFICATIONS_HEADER}\n"
-        f"إجمالي الإشعارات: {len(notifications)}",
+        f"إجمالي الإشعارات: {total}",
         reply_markup=keyboard
     )
 
@@ -330,7 +346,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             return
         
         # Delete all admins
-        if db.delete_all_admins():
+        if await adb.delete_all_admins():
             await query.edit_message_text(st.RESET_ADMINS_SUCCESS)
         else:
             await query.edit_message_text(st.RESET_ADMINS_ERROR)
@@ -368,9 +384,10 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         return
     
     if data[1] == "page":
-        # Handle pagination
-        page = int(data[2])
-        notifications = db.get_all_notifications()
+        # Handle pagination (الصفحة تُحمّل من موضع المؤشر فقط)
+        page, after, before = utils.parse_keyset_page(query.data, "admin")
+        result = await adb.list_notifications(after=after, before=before, limit=5)
+        total = await adb.count_notifications()
         
         # إضافة أزرار البحث
         search_buttons = [
@@ -383,11 +400,14 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
             ]
         ]
         
-        keyboard = utils.create_paginated_keyboard(notifications, page, "admin", extra_buttons=search_buttons)
+        keyboard = utils.create_keyset_keyboard(
+            result['items'], page, "admin", result['has_prev'], result['has_next'], total,
+            extra_buttons=search_buttons
+        )
         
         await query.edit_message_text(
             f"{st.LIST_NOTIFICATIONS_HEADER}\n"
-            f"إجمالي الإشعارات: {len(notifications)}",
+            f"إجمالي الإشعارات: {total}",
             reply_markup=keyboard
         )
     
@@ -396,12 +416,8 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         notification_id = data[2]
         logging.info(f"Viewing notification with ID: {notification_id}")
         
-        # تحميل قائمة الإشعارات
-        notifications = db.get_all_notifications()
-        logging.info(f"Found {len(notifications)} notifications in database")
-        
         # البحث عن الإشعار بالمعرف
-        notification = next((n for n in notifications if n["id"] == notification_id), None)
+        notification = await adb.get_notification(notification_id)
         
         if not notification:
             logging.warning(f"⚠️ Notification not found with ID: {notification_id}")
@@ -432,12 +448,12 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         
         # Get the image
         try:
-            image_data = db.get_image(notification_id)
-            if image_data:
-                logging.info(f"Image found for notification {notification_id}, size: {len(image_data)} bytes")
-                await utils.send_image_with_caption(
-                    update, context, 
-                    photo=image_data, 
+            image_path = await adb.get_image_path(notification_id)
+            if image_path:
+                logging.info(f"Image found for notification {notification_id}: {image_path}")
+                await utils.send_notification_preview(
+                    update, context,
+                    notification_id, image_path,
                     caption=details,
                     reply_markup=InlineKeyboardMarkup(keyboard)
                 )
@@ -484,7 +500,7 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
         # Confirm deletion
         notification_id = data[3]
         
-        if db.delete_notification(notification_id):
+        if await adb.delete_notification(notification_id):
             await query.message.reply_text(st.DELETE_NOTIFICATION_SUCCESS)
             await query.answer("تم الحذف بنجاح")
         else:
@@ -607,7 +623,7 @@ async def list_admins(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(st.NOT_AUTHORIZED)
         return
     
-    admins = db.get_all_admins()
+    admins = await adb.get_all_admins()
     
     if not admins:
         await update.message.reply_text("⚠️ لا يوجد مسؤولين في النظام!")
@@ -677,7 +693,7 @@ async def process_admin_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(st.ADD_ADMIN_ALREADY)
         else:
             # Add user as admin
-            if db.add_admin(user_id):
+            if await adb.add_admin(user_id):
                 await update.message.reply_text(f"{st.ADD_ADMIN_SUCCESS}\nمعرف المستخدم: {user_id}")
             else:
                 await update.message.reply_text(st.ADD_ADMIN_ERROR)
@@ -691,7 +707,7 @@ async def process_admin_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("⚠️ لا يمكن إزالة المسؤول الرئيسي.")
         else:
             # Remove user from admins
-            if db.remove_admin(user_id):
+            if await adb.remove_admin(user_id):
                 await update.message.reply_text(f"{st.REMOVE_ADMIN_SUCCESS}\nمعرف المستخدم: {user_id}")
             else:
                 await update.message.reply_text(st.REMOVE_ADMIN_ERROR)
@@ -717,7 +733,7 @@ async def handle_admin_manage_callback(update: Update, context: ContextTypes.DEF
     
     if action == "list":
         # List admins
-        admins = db.get_all_admins()
+        admins = await adb.get_all_admins()
         
         if not admins:
             await query.edit_message_text("⚠️ لا يوجد مسؤولين في النظام!")
@@ -842,7 +858,7 @@ async def process_edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # تحديث الاسم في قاعدة البيانات
     updates = {"customer_name": new_name}
-    if db.update_notification(notification_id, updates):
+    if await adb.update_notification(notification_id, updates):
         await update.message.reply_text(st.EDIT_NAME_SUCCESS.format(new_name))
     else:
         await update.message.reply_text(st.EDIT_ERROR)
@@ -873,7 +889,7 @@ async def process_edit_phone(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # تحديث رقم الهاتف في قاعدة البيانات
     updates = {"phone_number": cleaned_phone}
-    if db.update_notification(notification_id, updates):
+    if await adb.update_notification(notification_id, updates):
         await update.message.reply_text(st.EDIT_PHONE_SUCCESS.format(cleaned_phone))
     else:
         await update.message.reply_text(st.EDIT_ERROR)
@@ -907,7 +923,7 @@ async def process_edit_image(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return ConversationHandler.END
         
         # حفظ الصورة الجديدة
-        db.save_image(image_bytes, notification_id)
+        await adb.save_image(image_bytes, notification_id)
         
         await update.message.reply_text(st.EDIT_IMAGE_SUCCESS)
     except Exception as e:
@@ -968,7 +984,7 @@ async def handle_template_callback(update: Update, context: ContextTypes.DEFAULT
     
     if action == "view":
         # عرض القالب الحالي
-        template = db.get_message_template()
+        template = await adb.get_message_template()
         await query.message.reply_text(
             st.CURRENT_TEMPLATE.format(template),
             parse_mode="Markdown"
@@ -982,8 +998,8 @@ async def handle_template_callback(update: Update, context: ContextTypes.DEFAULT
     
     elif action == "reset":
         # إعادة ضبط القالب إلى الوضع الافتراضي
-        if db.reset_message_template():
-            template = db.get_message_template()
+        if await adb.reset_message_template():
+            template = await adb.get_message_template()
             await query.message.reply_text(
                 f"{st.TEMPLATE_RESET}\n\n"
                 f"القالب الجديد:\n```\n{template}\n```",
@@ -1006,7 +1022,7 @@ async def handle_welcome_template_callback(update: Update, context: ContextTypes
     
     if action == "view":
         # عرض القالب الحالي
-        template = db.get_welcome_message_template()
+        template = await adb.get_welcome_message_template()
         await query.message.reply_text(
             st.CURRENT_WELCOME_TEMPLATE.format(template),
             parse_mode="Markdown"
@@ -1022,8 +1038,8 @@ async def handle_welcome_template_callback(update: Update, context: ContextTypes
         # إعادة ضبط القالب إلى الوضع الافتراضي
         try:
             import config
-            if db.update_welcome_message_template(config.DEFAULT_WELCOME_TEMPLATE):
-                template = db.get_welcome_message_template()
+            if await adb.update_welcome_message_template(config.DEFAULT_WELCOME_TEMPLATE):
+                template = await adb.get_welcome_message_template()
                 await query.message.reply_text(
                     f"{st.WELCOME_TEMPLATE_RESET}\n\n"
                     f"القالب الجديد:\n```\n{template}\n```",
@@ -1053,7 +1069,7 @@ async def process_template_text(update: Update, context: ContextTypes.DEFAULT_TY
         return AWAITING_TEMPLATE_TEXT
     
     # تحديث القالب
-    if db.update_message_template(template_text):
+    if await adb.update_message_template(template_text):
         await update.message.reply_text(
             f"{st.TEMPLATE_UPDATED}\n\n"
             f"القالب الجديد:\n```\n{template_text}\n```",
@@ -1084,7 +1100,7 @@ async def process_welcome_template_text(update: Update, context: ContextTypes.DE
         return AWAITING_WELCOME_TEMPLATE_TEXT
     
     # تحديث القالب
-    if db.update_welcome_message_template(template_text):
+    if await adb.update_welcome_message_template(template_text):
         await update.message.reply_text(
             f"{st.WELCOME_TEMPLATE_UPDATED}\n\n"
             f"القالب الجديد:\n```\n{template_text}\n```",
@@ -1112,7 +1128,7 @@ async def process_search_by_name(update: Update, context: ContextTypes.DEFAULT_T
         return ConversationHandler.END
     
     # البحث عن الإشعارات بواسطة الاسم
-    results = db.search_notifications_by_name(search_term)
+    results = await adb.search_notifications_by_name(search_term)
     
     # حفظ سجل البحث
     user = update.effective_user
@@ -1169,7 +1185,7 @@ async def process_search_by_phone(update: Update, context: ContextTypes.DEFAULT_
     formatted_phone = utils.format_phone_number(search_term)
     
     # البحث عن الإشعارات بواسطة الرقم
-    results = db.search_notifications_by_phone(formatted_phone)
+    results = await adb.search_notifications_by_phone(formatted_phone)
     
     # حفظ سجل البحث
     user = update.effective_user
@@ -1250,7 +1266,7 @@ async def verification_template_command(update: Update, context: ContextTypes.DE
         return ConversationHandler.END
     
     # Get the current template
-    template = db.get_verification_message_template()
+    template = await adb.get_verification_message_template()
     
     # Create keyboard
     keyboard = [
@@ -1278,7 +1294,7 @@ async def handle_verification_template_callback(update: Update, context: Context
     
     if query.data == "verification_template_view":
         # Show current template
-        template = db.get_verification_message_template()
+        template = await adb.get_verification_message_template()
         await query.edit_message_text(
             st.CURRENT_VERIFICATION_TEMPLATE.format(template),
             parse_mode='Markdown',
@@ -1296,7 +1312,7 @@ async def handle_verification_template_callback(update: Update, context: Context
     elif query.data == "verification_template_reset":
         # Reset to default template
         import config
-        db.update_verification_message_template(config.DEFAULT_VERIFICATION_TEMPLATE)
+        await adb.update_verification_message_template(config.DEFAULT_VERIFICATION_TEMPLATE)
         
         await query.edit_message_text(st.VERIFICATION_TEMPLATE_RESET)
         return ConversationHandler.END
@@ -1308,7 +1324,7 @@ async def process_verification_template_text(update: Update, context: ContextTyp
     new_template = update.message.text
     
     # Update the template
-    success = db.update_verification_message_template(new_template)
+    success = await adb.update_verification_message_template(new_template)
     
     if success:
         await update.message.reply_text(st.VERIFICATION_TEMPLATE_UPDATED)
@@ -1772,12 +1788,7 @@ async def send_verification_message_command(update: Update, context: ContextType
     logging.info(f"✅ معرف الإشعار المستخرج: {notification_id}")
     
     # Get notification details
-    notifications = db.get_all_notifications()
-    notification = None
-    for notif in notifications:
-        if notif.get('id') == notification_id:
-            notification = notif
-            break
+    notification = await adb.get_notification(notification_id)
     
     if not notification:
         await query.edit_message_text("⚠️ لم يتم العثور على الإشعار المطلوب.")
@@ -1789,7 +1800,7 @@ async def send_verification_message_command(update: Update, context: ContextType
     
     # Send verification message
     import ultramsg_service
-    success, result = ultramsg_service.send_verification_message(
+    success, result = await ultramsg_service.send_verification_message_async(
         customer_name,
         phone_number,
         notification_id
@@ -215,10 +215,10 @@ async def handle_live_search_callback(update: Update, context: ContextTypes.DEFA
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         # الحصول على الصورة
-        image_data = db.get_image(notification_id)
+        image_path = db.get_image_path(notification_id)
         
-        if image_data:
-            await utils.send_image_with_caption(update, context, photo=image_data, caption=details)
+        if image_path:
+            await utils.send_notification_image(update, context, notification_id, image_path, caption=details)
             await query.message.reply_text("الإجراءات المتاحة:", reply_markup=reply_markup)
         else:
             await query.message.reply_text(details + "\n\n⚠️ الصورة غير متوفرة!", reply_markup=reply_markup)
@@ -13,15 +13,23 @@ import os
 import json
 import logging
 import random
+import time
 from datetime import datetime, timedelta
 import base64
 
+from ai_context import ConversationContext, AIUsageMetrics, anthropic_request, openai_messages
+from ai_response_cache import ResponseCache, cache_key, context_digest, personality_key
+from config import (
+    AI_CONTEXT_TOKEN_BUDGET, AI_CONTEXT_MAX_TURNS, AI_CONTEXT_SUMMARY_BUDGET, AI_CONTEXT_EVICT_CHUNK,
+    AI_CACHE_TTL, AI_PREDICTION_CACHE_TTL, AI_CACHE_MAX_ENTRIES
+)
+
 # تكوين السجلات
 logger = logging.getLogger(__name__)
 
 # استيراد مكتبات الذكاء الاصطناعي
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     openai_imported = True
     logger.info("تم استيراد مكتبة OpenAI بنجاح")
 except ImportError:
@@ -29,7 +37,7 @@ except ImportError:
     logger.error("فشل استيراد مكتبة OpenAI")
 
 try:
-    from anthropic import Anthropic
+    from anthropic import Anthropic, AsyncAnthropic
     anthropic_imported = True
     logger.info("تم استيراد مكتبة Anthropic بنجاح")
 except ImportError:
@@ -50,41 +58,151 @@ ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"
 
 # التحقق من وجود مفاتيح API وتكوين العملاء
 openai_client = None
+async_openai_client = None
 if OPENAI_API_KEY and openai_imported:
     try:
         openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
         logger.info("تم تكوين OpenAI API")
     except Exception as e:
         logger.error(f"خطأ في تكوين OpenAI API: {str(e)}")
         openai_client = None
+        async_openai_client = None
 else:
     logger.warning("مفتاح OpenAI API غير متوفر أو لم يتم استيراد المكتبة بنجاح")
 
 anthropic_client = None
+async_anthropic_client = None
 if ANTHROPIC_API_KEY and anthropic_imported:
     try:
         anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        async_anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
         logger.info("تم تكوين Anthropic API")
     except Exception as e:
         logger.error(f"خطأ في تكوين Anthropic API: {str(e)}")
         anthropic_client = None
+        async_anthropic_client = None
 else:
     logger.warning("مفتاح Anthropic API غير متوفر أو لم يتم استيراد المكتبة بنجاح")
 
-def get_ai_response(user_message, message_type="chat", image_data=None, delivery_data=None, notification_search=None):
+# موجه النظام الثابت للمحادثة (يبقى أول جزء من كل طلب حتى يُعاد استخدامه من التخزين المؤقت)
+CHAT_SYSTEM_MESSAGE = """
+أنت مساعد ذكي لنظام إدارة الشحنات، متخصص في مساعدة المسوقين والعملاء.
+أجب بشكل موجز ومفيد عن أسئلة المستخدم المتعلقة بالشحنات والتسليم.
+لغتك الرئيسية هي العربية.
+"""
+
+# رموز الإدخال والإخراج وزمن الاستجابة لطلبات نماذج الذكاء الاصطناعي
+usage_metrics = AIUsageMetrics()
+
+_conversation_context = None
+
+def get_conversation_context():
+    """
+    الحصول على باني سياق المحادثات من سجل محادثات المستخدمين (يُنشأ عند أول استخدام)
+    
+    العائد:
+        ConversationContext: باني السياق
+    """
+    global _conversation_context
+    if _conversation_context is None:
+        from ai_utils import get_chat_history_store
+        _conversation_context = ConversationContext(
+            lambda user_id, limit: get_chat_history_store().recent(user_id, limit),
+            lambda user_id: get_chat_history_store().count(user_id),
+            token_budget=AI_CONTEXT_TOKEN_BUDGET,
+            max_turns=AI_CONTEXT_MAX_TURNS,
+            summary_budget=AI_CONTEXT_SUMMARY_BUDGET,
+            evict_chunk=AI_CONTEXT_EVICT_CHUNK
+        )
+    return _conversation_context
+
+def get_ai_usage_stats():
+    """
+    إحصائيات استخدام نماذج الذكاء الاصطناعي منذ بدء التشغيل
+    
+    العائد:
+        dict: عدد الطلبات والرموز (بما فيها المقروءة من التخزين المؤقت) وزمن الاستجابة
+    """
+    return usage_metrics.snapshot()
+
+def _conversation(user_id):
+    """سياق المحادثة السابقة للمستخدم: (الملخص، الأدوار)، أو (None، []) بدون مستخدم"""
+    if user_id is None:
+        return None, []
+    try:
+        return get_conversation_context().build(user_id)
+    except Exception as e:
+        logger.error(f"خطأ في بناء سياق المحادثة: {str(e)}")
+        return None, []
+
+# الأنواع التي تُخزن ردودها مؤقتاً ومدة صلاحية كل نوع
+CACHED_MESSAGE_TYPES = {"chat": AI_CACHE_TTL, "delivery_prediction": AI_PREDICTION_CACHE_TTL}
+
+# بداية نص الرد عند فشل الطلب (لا تُخزن هذه الردود)
+AI_ERROR_PREFIX = "حدث خطأ أثناء معالجة طلبك"
+
+# ردود المحادثة والتنبؤ بالتسليم المخزنة مؤقتاً
+response_cache = ResponseCache(ttl=AI_CACHE_TTL, max_entries=AI_CACHE_MAX_ENTRIES)
+
+def get_ai_cache_stats():
+    """
+    إحصائيات التخزين المؤقت لردود الذكاء الاصطناعي منذ بدء التشغيل
+    
+    العائد:
+        dict: عدد الردود المخزنة والطلبات المخدومة من التخزين المؤقت ونسبتها (hit_rate)
+    """
+    return response_cache.stats()
+
+def get_ai_response(user_message, message_type="chat", image_data=None, delivery_data=None, notification_search=None,
+                    user_id=None, personality=None):
     """
     الحصول على رد ذكي من نماذج الذكاء الاصطناعي
     
+    تُخزن ردود "chat" و"delivery_prediction" مؤقتاً (انظر ai_response_cache.py)، وتنتظر
+    الطلبات المتطابقة المتزامنة نفس الطلب إلى المزود.
+    
     المعلمات:
         user_message (str): رسالة المستخدم
         message_type (str): نوع الرسالة: "chat", "image", "delivery_prediction", "phone_search"
         image_data (str): بيانات الصورة بتنسيق base64 (للتحليل البصري)
         delivery_data (dict): بيانات إضافية للتنبؤ بالتسليم
         notification_search (dict): نتائج البحث عن إشعارات (للبحث برقم الهاتف)
+        user_id (int): معرف المستخدم لإضافة محادثته السابقة إلى سياق رسائل "chat"
+        personality (dict): شخصية البوت النشطة (جزء من مفتاح الرد المخزن)
         
     العائد:
         str: رد الذكاء الاصطناعي
     """
+    conversation = _conversation(user_id) if message_type == "chat" else (None, [])
+    
+    if message_type not in CACHED_MESSAGE_TYPES or not (anthropic_client or openai_client):
+        return _request_ai_response(user_message, message_type, image_data, delivery_data, notification_search,
+                                    conversation)
+    
+    if message_type == "delivery_prediction":
+        # نص الطلب ثابت، فالمفتاح من بيانات الشحنة
+        text = json.dumps(delivery_data or {}, sort_keys=True, ensure_ascii=False, default=str)
+    else:
+        text = user_message
+    key = cache_key(text, message_type, personality_key(personality), context_digest(*conversation))
+    
+    return response_cache.get_or_compute(
+        key,
+        lambda: _request_ai_response(user_message, message_type, image_data, delivery_data, notification_search,
+                                     conversation),
+        ttl=CACHED_MESSAGE_TYPES[message_type],
+        cacheable=lambda response: bool(response) and not response.startswith(AI_ERROR_PREFIX)
+    )
+
+def _request_ai_response(user_message, message_type, image_data, delivery_data, notification_search, conversation):
+    """
+    طلب الرد من المزود المتاح (Anthropic ثم OpenAI) أو الرد الافتراضي عند عدم توفرهما
+    
+    المعلمات:
+        conversation (tuple): (الملخص، الأدوار) للمحادثة السابقة في رسائل "chat"
+        (باقي المعلمات كما في get_ai_response)
+    """
     try:
         # التحقق أولاً من توفر Anthropic API (الخيار المفضل)
         if anthropic_client:
@@ -92,21 +210,18 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
             
             # إنشاء سياق الرسالة حسب نوع الطلب
             if message_type == "chat":
-                # ضبط نظام رسالة للمحادثة
-                system_message = """
-                أنت مساعد ذكي لنظام إدارة الشحنات، متخصص في مساعدة المسوقين والعملاء.
-                أجب بشكل موجز ومفيد عن أسئلة المستخدم المتعلقة بالشحنات والتسليم.
-                لغتك الرئيسية هي العربية.
-                """
+                # موجه النظام الثابت ثم الأدوار السابقة ضمن ميزانية السياق
+                summary, turns = conversation
+                system, messages = anthropic_request(CHAT_SYSTEM_MESSAGE, summary, turns, user_message)
                 
+                started = time.monotonic()
                 response = anthropic_client.messages.create(
                     model=ANTHROPIC_MODEL,
                     max_tokens=1000,
-                    system=system_message,
-                    messages=[
-                        {"role": "user", "content": user_message}
-                    ]
+                    system=system,
+                    messages=messages
                 )
+                usage_metrics.record("anthropic", response.usage, started)
                 
                 return response.content[0].text
                 
@@ -181,12 +296,14 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                     ]}
                 ]
                 
+                started = time.monotonic()
                 response = anthropic_client.messages.create(
                     model=ANTHROPIC_MODEL,
                     max_tokens=1000,
                     system=system_message,
                     messages=messages
                 )
+                usage_metrics.record("anthropic", response.usage, started)
                 
                 return response.content[0].text
                 
@@ -213,6 +330,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                 4. تحليل العوامل المؤثرة في وقت التسليم
                 """
                 
+                started = time.monotonic()
                 response = anthropic_client.messages.create(
                     model=ANTHROPIC_MODEL,
                     max_tokens=1000,
@@ -221,6 +339,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                         {"role": "user", "content": prompt}
                     ]
                 )
+                usage_metrics.record("anthropic", response.usage, started)
                 
                 return response.content[0].text
                 
@@ -229,21 +348,16 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
             logger.info("استخدام OpenAI API للحصول على الرد")
             
             if message_type == "chat":
-                # ضبط نظام رسالة للمحادثة
-                system_message = """
-                أنت مساعد ذكي لنظام إدارة الشحنات، متخصص في مساعدة المسوقين والعملاء.
-                أجب بشكل موجز ومفيد عن أسئلة المستخدم المتعلقة بالشحنات والتسليم.
-                لغتك الرئيسية هي العربية.
-                """
+                # موجه النظام الثابت ثم الأدوار السابقة ضمن ميزانية السياق
+                summary, turns = conversation
                 
+                started = time.monotonic()
                 response = openai_client.chat.completions.create(
                     model=OPENAI_MODEL,
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": user_message}
-                    ],
+                    messages=openai_messages(CHAT_SYSTEM_MESSAGE, summary, turns, user_message),
                     max_tokens=1000
                 )
+                usage_metrics.record("openai", response.usage, started)
                 
                 return response.choices[0].message.content
                 
@@ -259,6 +373,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                 أجب باللغة العربية.
                 """
                 
+                started = time.monotonic()
                 response = openai_client.chat.completions.create(
                     model=OPENAI_MODEL,
                     messages=[
@@ -270,6 +385,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                     ],
                     max_tokens=1000
                 )
+                usage_metrics.record("openai", response.usage, started)
                 
                 return response.choices[0].message.content
                 
@@ -296,6 +412,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                 4. تحليل العوامل المؤثرة في وقت التسليم
                 """
                 
+                started = time.monotonic()
                 response = openai_client.chat.completions.create(
                     model=OPENAI_MODEL,
                     messages=[
@@ -304,6 +421,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                     ],
                     max_tokens=1000
                 )
+                usage_metrics.record("openai", response.usage, started)
                 
                 return response.choices[0].message.content
                 
@@ -331,7 +449,7 @@ def get_ai_response(user_message, message_type="chat", image_data=None, delivery
                 
     except Exception as e:
         logger.error(f"خطأ في الحصول على رد الذكاء الاصطناعي: {str(e)}")
-        return f"حدث خطأ أثناء معالجة طلبك: {str(e)}"
+        return f"{AI_ERROR_PREFIX}: {str(e)}"
         
 
 def process_image(image_file_path, context_info=None):
@@ -380,6 +498,81 @@ def process_image(image_file_path, context_info=None):
         return f"حدث خطأ أثناء تحليل الصورة: {str(e)}"
         
 
+# تعليمات التحليل الموحد: وصف الصورة والحقول المنظمة في استجابة واحدة
+IMAGE_ANALYSIS_SYSTEM_MESSAGE = """
+أنت محلل خبير متخصص في صور الشحنات والطرود والفواتير والإيصالات ضمن نظام لإدارة الشحنات.
+أجب بكائن JSON واحد فقط بدون أي نص قبله أو بعده، بالحقول التالية:
+{
+  "document_type": "نوع الصورة (شحنة، فاتورة، إيصال، صورة منتج، ...)",
+  "customer_name": "اسم العميل أو المستلم أو نص فارغ",
+  "phone": "رقم هاتف العميل كما يظهر أو نص فارغ",
+  "destination": "الوجهة أو المدينة أو نص فارغ",
+  "date": "تاريخ الشحنة أو الفاتورة أو نص فارغ",
+  "value": "قيمة الشحنة أو المبلغ الإجمالي أو نص فارغ",
+  "description": "تحليل مختصر ومهني باللغة العربية لمحتوى الصورة وحالة الشحنة أو تفاصيل الفاتورة"
+}
+لا تخترع بيانات غير ظاهرة في الصورة.
+"""
+
+async def analyze_image_async(image_data, context_info=None):
+    """
+    تحليل صورة بطلب واحد غير متزامن يعيد الحقول المنظمة والوصف معاً.
+    
+    المعلمات:
+        image_data (str): بيانات الصورة بتنسيق base64
+        context_info (str, optional): معلومات سياقية إضافية عن الصورة
+        
+    العائد:
+        tuple: (نجاح، نص استجابة النموذج أو رسالة الخطأ)
+    """
+    user_message = "حلل هذه الصورة واستخرج بياناتها."
+    if context_info:
+        user_message += f" سياق الصورة: {context_info}"
+    
+    try:
+        if async_anthropic_client:
+            started = time.monotonic()
+            response = await async_anthropic_client.messages.create(
+                model=ANTHROPIC_MODEL,
+                max_tokens=1000,
+                system=IMAGE_ANALYSIS_SYSTEM_MESSAGE,
+                messages=[
+                    {"role": "user", "content": [
+                        {"type": "text", "text": user_message},
+                        {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": image_data}}
+                    ]}
+                ]
+            )
+            usage_metrics.record("anthropic", response.usage, started)
+            return True, response.content[0].text
+        
+        elif async_openai_client:
+            started = time.monotonic()
+            response = await async_openai_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": IMAGE_ANALYSIS_SYSTEM_MESSAGE},
+                    {"role": "user", "content": [
+                        {"type": "text", "text": user_message},
+                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}}
+                    ]}
+                ],
+                response_format={"type": "json_object"},
+                max_tokens=1000
+            )
+            usage_metrics.record("openai", response.usage, started)
+            return True, response.choices[0].message.content
+        
+        logger.warning("لا توجد واجهات API للذكاء الاصطناعي متاحة لتحليل الصورة")
+        return False, """
+                عذراً، لا يمكن تحليل الصورة حالياً لعدم توفر خدمات الذكاء الاصطناعي.
+                يرجى التواصل مع مسؤول النظام للتحقق من إعدادات API.
+                """
+    except Exception as e:
+        logger.error(f"خطأ في تحليل الصورة: {str(e)}")
+        return False, f"حدث خطأ أثناء تحليل الصورة: {str(e)}"
+        
+
 def generate_delivery_prediction(notification_data):
     """
     توليد تنبؤ ذكي لوقت تسليم الشحنة بناءً على بيانات الإشعار
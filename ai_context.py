@@ -0,0 +1,222 @@
+"""
+سياق محادثات الذكاء الاصطناعي متعددة الأدوار.
+
+كان كل طلب محادثة يرسل رسالة المستخدم الحالية فقط، فلا يتذكر المساعد ما قيل
+قبلها. يبني هذا الملف سياق المحادثة من سجل المستخدم (انظر chat_history.py):
+آخر الأدوار كاملة ضمن ميزانية محددة من الرموز (tokens)، والأدوار الأقدم التي
+لا تتسع لها الميزانية في ملخص قصير. بذلك يبقى حجم الطلب ثابتاً تقريباً مهما
+طالت المحادثة.
+
+يُرسل موجه النظام الثابت أولاً ثم الملخص ثم الأدوار السابقة بنفس الترتيب في
+كل طلب، ويُعلَّم آخر دور سابق كنقطة تخزين مؤقت (prompt caching) عند Anthropic
+حتى يُعاد استخدام البادئة المشتركة بين الطلبات المتتالية. لكي تبقى هذه البادئة
+متطابقة حرفياً لا تُحذف أقدم الأدوار واحداً واحداً مع كل طلب (فيتغير أول دور
+والملخص في كل مرة)، بل تبدأ النافذة عند رقم دور من مضاعفات evict_chunk وتتقدم
+كتلة كاملة فقط عند تجاوز عدد الأدوار أو الميزانية، ويُبنى الملخص من الأدوار
+التي قبل بداية النافذة فقط. بذلك يتغير السياق مرة كل evict_chunk طلب فقط.
+لا يُخزن المزود بادئة أقصر من حد أدنى (1024 رمزاً في Claude Sonnet)، لذلك لا
+يبدأ التخزين المؤقت إلا عندما تتجاوز المحادثة السابقة هذا الحد.
+يُسجل لكل طلب عدد رموز الإدخال والإخراج والرموز المقروءة من التخزين المؤقت
+وزمن الاستجابة.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+# متوسط تقريبي لعدد الحروف في الرمز الواحد للنصوص العربية والإنجليزية المختلطة
+CHARS_PER_TOKEN = 3
+
+# الحد الأقصى لطول سطر الدور الواحد في الملخص (بالحروف)
+SUMMARY_LINE_CHARS = 120
+
+# عدد أحدث الطلبات المستخدمة في حساب مقاييس زمن الاستجابة
+LATENCY_WINDOW = 200
+
+
+def estimate_tokens(text):
+    """تقدير عدد الرموز في النص (دون مكتبة ترميز خاصة بالمزود)"""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def _shorten(text, limit):
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ConversationContext:
+    """
+    بناء سياق المحادثة من أحدث الأدوار ضمن ميزانية الرموز مع ملخص للأدوار الأقدم
+    """
+
+    def __init__(self, history_loader, history_counter, token_budget=3000, max_turns=20, summary_budget=400,
+                 evict_chunk=10):
+        """
+        Args:
+            history_loader (callable): دالة (معرف المستخدم، العدد) تعيد أحدث المحادثات
+                من الأقدم إلى الأحدث بصيغة سجل المحادثات (message, response, chat_type)
+            history_counter (callable): دالة (معرف المستخدم) تعيد عدد المحادثات المحفوظة
+            token_budget (int): ميزانية رموز الأدوار الكاملة
+            max_turns (int): الحد الأقصى لعدد الأدوار الكاملة
+            summary_budget (int): ميزانية رموز ملخص الأدوار الأقدم
+            evict_chunk (int): عدد الأدوار التي تُنقل من النافذة إلى الملخص دفعة واحدة
+        """
+        self._history_loader = history_loader
+        self._history_counter = history_counter
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summary_budget = summary_budget
+        self.evict_chunk = max(1, evict_chunk)
+
+    def build(self, user_id):
+        """
+        Returns:
+            tuple: (الملخص أو None، قائمة أدوار {"role", "content"} من الأقدم إلى الأحدث)
+        """
+        total = self._history_counter(user_id)
+        chunk = self.evict_chunk
+        # أول دور في النافذة: أصغر مضاعف للكتلة يترك max_turns دوراً على الأكثر
+        start = max(0, -(-(total - self.max_turns) // chunk) * chunk)
+        # الأدوار قبل بداية النافذة مصدر الملخص
+        entries = self._history_loader(user_id, total - start + self.max_turns)
+        offset = total - len(entries)  # رقم أول دور محمّل
+
+        costs = [estimate_tokens(entry.get("message")) + estimate_tokens(entry.get("response")) for entry in entries]
+        used = sum(costs[max(0, start - offset):])
+        # تجاوز الميزانية: تقديم بداية النافذة كتلة كاملة في كل مرة
+        while used > self.token_budget and start < total:
+            used -= sum(costs[max(0, start - offset):max(0, start + chunk - offset)])
+            start += chunk
+
+        turns = []
+        for entry in entries[max(0, start - offset):]:
+            turns.append({"role": "user", "content": entry.get("message") or ""})
+            turns.append({"role": "assistant", "content": entry.get("response") or ""})
+
+        evicted = entries[max(0, start - self.max_turns - offset):max(0, start - offset)]
+        return self._summarize(evicted), turns
+
+    def _summarize(self, entries):
+        """ملخص مختصر للأدوار التي لم تتسع لها الميزانية (أحدثها أولاً حتى نفاد ميزانية الملخص)"""
+        if not entries:
+            return None
+        lines = []
+        used = 0
+        for entry in reversed(entries):
+            line = f"- المستخدم: {_shorten(entry.get('message'), SUMMARY_LINE_CHARS)}" \
+                   f" ← المساعد: {_shorten(entry.get('response'), SUMMARY_LINE_CHARS)}"
+            cost = estimate_tokens(line)
+            if used + cost > self.summary_budget:
+                break
+            used += cost
+            lines.insert(0, line)
+        if not lines:
+            return None
+        return "ملخص الأدوار السابقة في هذه المحادثة:\n" + "\n".join(lines)
+
+
+def anthropic_request(system_prompt, summary, turns, user_message):
+    """
+    معاملات system و messages لطلب Anthropic مع نقاط التخزين المؤقت: نهاية موجه
+    النظام والملخص (ثابتان حتى تتقدم النافذة)، وآخر دور سابق (البادئة المشتركة
+    مع الطلب التالي).
+    """
+    system = [{"type": "text", "text": system_prompt}]
+    if summary:
+        system.append({"type": "text", "text": summary})
+    system[-1]["cache_control"] = {"type": "ephemeral"}
+
+    messages = [dict(turn) for turn in turns]
+    if messages:
+        messages[-1]["content"] = [
+            {"type": "text", "text": messages[-1]["content"], "cache_control": {"type": "ephemeral"}}
+        ]
+    messages.append({"role": "user", "content": user_message})
+    return system, messages
+
+
+def openai_messages(system_prompt, summary, turns, user_message):
+    """
+    رسائل طلب OpenAI: موجه النظام الثابت أولاً (يُخزن مؤقتاً تلقائياً عند تطابق
+    البادئة) ثم الملخص والأدوار السابقة والرسالة الحالية.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": summary})
+    messages.extend(dict(turn) for turn in turns)
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+class AIUsageMetrics:
+    """
+    عدادات استخدام نماذج الذكاء الاصطناعي: الرموز وزمن الاستجابة لكل طلب
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self._latency_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, provider, usage, started):
+        """
+        تسجيل طلب منتهٍ.
+
+        Args:
+            provider (str): "anthropic" أو "openai"
+            usage: كائن usage من استجابة المزود
+            started (float): وقت بداية الطلب (time.monotonic)
+
+        Returns:
+            dict: رموز الطلب وزمنه
+        """
+        latency_ms = (time.monotonic() - started) * 1000
+        if provider == "anthropic":
+            call = {
+                "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+                "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+                "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0
+            }
+        else:
+            details = getattr(usage, "prompt_tokens_details", None)
+            call = {
+                "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "cache_read_tokens": getattr(details, "cached_tokens", 0) or 0,
+                "cache_write_tokens": 0
+            }
+        call["latency_ms"] = round(latency_ms, 1)
+
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += call["input_tokens"]
+            self.output_tokens += call["output_tokens"]
+            self.cache_read_tokens += call["cache_read_tokens"]
+            self.cache_write_tokens += call["cache_write_tokens"]
+            self._latency_ms.append(latency_ms)
+
+        logging.info(
+            f"AI call ({provider}): {call['input_tokens']} in "
+            f"({call['cache_read_tokens']} cached), {call['output_tokens']} out, {call['latency_ms']} ms"
+        )
+        return call
+
+    def snapshot(self):
+        """العدادات الإجمالية مع متوسط زمن الاستجابة والنسبة المئينية 95 لأحدث الطلبات"""
+        with self._lock:
+            latencies = sorted(self._latency_ms)
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "latency_ms_avg": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1)
+                if latencies else 0.0
+            }
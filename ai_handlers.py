@@ -5,6 +5,7 @@
 """
 
 import os
+import asyncio
 import logging
 import uuid
 from datetime import datetime
@@ -18,8 +19,10 @@ from telegram.ext import (
 
 import database as db
 from ai_assistant import (
-    get_ai_response, process_image, generate_delivery_prediction
+    get_ai_response, generate_delivery_prediction
 )
+from image_analysis import analyze_shipment_image
+from async_db import adb
 from ai_utils import (
     is_admin_async, get_notification_by_id_async, search_notifications_by_phone_async,
     get_user_permission_async, save_ai_chat_history, get_ai_chat_history, reset_ai_chat_history
@@ -261,9 +264,11 @@ async def handle_ai_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 parse_mode='Markdown'
             )
             
-            # إزالة المعلومات المستخرجة من سياق المستخدم
+            # إزالة المعلومات المستخرجة من سياق المستخدم وتحرير الصورة المؤقتة
             if 'suggested_notification' in context.user_data:
                 del context.user_data['suggested_notification']
+            if suggested_notification.get('image_owner'):
+                await adb.release_blob(suggested_notification['image_owner'])
             
             logger.info(f"تم إنشاء إشعار جديد بنجاح من البيانات المستخرجة: {notification_id}")
             
@@ -394,8 +399,12 @@ async def handle_chat_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             return AI_CHAT
     
     # إذا لم يتم العثور على رقم هاتف أو فشل البحث، استخدم المحادثة العادية
-    # الحصول على رد من الذكاء الاصطناعي
-    ai_response = get_ai_response(user_message, message_type="chat")
+    # الحصول على رد من الذكاء الاصطناعي مع سياق المحادثة السابقة للمستخدم (في خيط منفصل
+    # حتى لا تتوقف معالجة التحديثات الأخرى، وتشترك الأسئلة المتطابقة المتزامنة في طلب واحد)
+    personality = await adb.get_bot_personality()
+    ai_response = await asyncio.to_thread(
+        get_ai_response, user_message, message_type="chat", user_id=user_id, personality=personality
+    )
     
     # حفظ المحادثة في سجل المحادثات
     await save_ai_chat_history(user_id, user_message, ai_response, chat_type="general")
@@ -432,14 +441,11 @@ async def handle_image_upload(update: Update, context: ContextTypes.DEFAULT_TYPE
     photo = update.message.photo[-1]
     photo_file = await context.bot.get_file(photo.file_id)
     
-    # تنزيل الصورة وحفظها مؤقتاً
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = f"temp_media/ai_analysis_{timestamp}_{uuid.uuid4().hex}.jpg"
-    
-    # التأكد من وجود المجلد
-    os.makedirs("temp_media", exist_ok=True)
-    
-    await photo_file.download_to_drive(file_name)
+    # تنزيل الصورة وحفظها مؤقتاً في مخزن المحتوى (مسار الصورة مطلوب عند إنشاء
+    # الإشعار، والملفات المؤقتة غير المستخدمة تُحذف تلقائياً بعد انتهاء صلاحيتها)
+    image_bytes = bytes(await photo_file.download_as_bytearray())
+    image_owner = f"temp:{uuid.uuid4().hex}"
+    file_name = await adb.store_blob(image_bytes, image_owner)
     
     # الحصول على سياق التحليل من نص الرسالة إذا وجد
     caption = update.message.caption or ""
@@ -461,9 +467,9 @@ async def handle_image_upload(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     try:
-        # محاولة استخدام OCR المحسّن لتحليل صور الشحنات
-        from shipment_ocr import get_suggested_notification_data
-        suggested_data = get_suggested_notification_data(file_name)
+        # تحليل واحد بالذكاء الاصطناعي يعيد بيانات الشحنة والوصف معاً (مع ذاكرة مؤقتة للصور المكررة)
+        result = await analyze_shipment_image(image_bytes, photo.file_unique_id, context_info)
+        suggested_data = result["suggested"]
         
         # تحقق من وجود بيانات مستخرجة من OCR
         if suggested_data and suggested_data.get('customer_name') and suggested_data.get('phone'):
@@ -504,20 +510,17 @@ async def handle_image_upload(update: Update, context: ContextTypes.DEFAULT_TYPE
                 'destination': suggested_data.get('destination', ''),
                 'date': suggested_data.get('date', ''),
                 'value': suggested_data.get('value', ''),
-                'image_path': file_name
+                'image_path': file_name,
+                'image_owner': image_owner
             }
             
-            # استكمال التحليل بمزيد من التفاصيل باستخدام نموذج الرؤية
-            additional_analysis = process_image(file_name, "تحليل تفصيلي لصورة شحنة. وصف الصورة وطبيعة المنتجات فيها.")
-            
-            analysis = ocr_info + "\n" + additional_analysis
+            analysis = ocr_info + "\n" + result["description"]
         else:
-            # استخدام نموذج الرؤية العام في حالة عدم القدرة على استخراج بيانات محددة
-            analysis = process_image(file_name, context_info)
+            # الاكتفاء بوصف الصورة في حالة عدم القدرة على استخراج بيانات محددة
+            analysis = result["description"]
     except Exception as e:
-        logger.error(f"خطأ أثناء تحليل صورة الشحنة باستخدام OCR: {e}")
-        # الرجوع إلى نموذج الرؤية العام في حالة الخطأ
-        analysis = process_image(file_name, context_info)
+        logger.error(f"خطأ أثناء تحليل صورة الشحنة: {e}")
+        analysis = "عذراً، حدث خطأ أثناء تحليل الصورة. يرجى المحاولة مرة أخرى لاحقاً."
     
     # إضافة سجل للتحليل
     user_id = update.effective_user.id
@@ -574,7 +577,7 @@ async def handle_notification_id(update: Update, context: ContextTypes.DEFAULT_T
     
     if notification:
         # توليد التنبؤ بوقت التسليم
-        prediction = generate_delivery_prediction(notification)
+        prediction = await asyncio.to_thread(generate_delivery_prediction, notification)
         
         # إنشاء نص الرد
         reply_text = (
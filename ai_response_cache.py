@@ -0,0 +1,194 @@
+"""
+تخزين ردود الذكاء الاصطناعي مؤقتاً.
+
+كانت كل رسالة محادثة وكل طلب تنبؤ بالتسليم تُرسل إلى نموذج الذكاء الاصطناعي،
+حتى الأسئلة المتكررة ("أين شحنتي؟") والتنبؤات المتكررة لنفس الإشعار. يحفظ
+هذا الملف الردود بمفتاح من النص الموحد (دون تشكيل وعلامات ترقيم وفروق في
+الأحرف) ونوع الرسالة وشخصية البوت وسياق المحادثة السابقة، لمدة محددة ومع حد
+أقصى لعدد الردود (يُحذف الأقدم استخداماً أولاً). الطلبات المتطابقة التي تصل
+أثناء انتظار رد لم يكتمل بعد تنتظر نفس الطلب بدلاً من إرسال طلب جديد.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from name_index import normalize_name
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def normalize_query(text):
+    """
+    توحيد نص الطلب للمقارنة: توحيد الأحرف العربية وإزالة التشكيل وعلامات الترقيم
+    والمسافات الزائدة.
+
+    Args:
+        text (str): نص الطلب
+
+    Returns:
+        str: النص الموحد
+    """
+    return normalize_name(_PUNCTUATION.sub(' ', text or ''))
+
+
+def personality_key(personality):
+    """معرف الشخصية مع بصمة لإعداداتها (يتغير المفتاح عند تعديل الشخصية النشطة)"""
+    if not personality:
+        return "-"
+    settings = json.dumps(
+        [personality.get('mood_type'), personality.get('settings')], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return f"{personality.get('id', 0)}:{hashlib.sha1(settings.encode('utf-8')).hexdigest()[:8]}"
+
+
+def context_digest(summary, turns):
+    """بصمة سياق المحادثة السابقة (فارغة لمحادثة جديدة حتى تُشارك ردودها بين المستخدمين)"""
+    if not summary and not turns:
+        return ""
+    payload = json.dumps([summary, turns], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def cache_key(text, message_type, personality="-", context=""):
+    """
+    مفتاح الرد في التخزين المؤقت.
+
+    Args:
+        text (str): نص الطلب (يُوحَّد قبل حساب المفتاح)
+        message_type (str): نوع الرسالة
+        personality (str): مفتاح الشخصية (انظر personality_key)
+        context (str): بصمة سياق المحادثة (انظر context_digest)
+
+    Returns:
+        str: المفتاح
+    """
+    raw = "\x1f".join((message_type, personality, context, normalize_query(text)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    ردود مخزنة مؤقتاً لمدة محددة مع حذف الأقدم استخداماً ودمج الطلبات المتطابقة الجارية
+    """
+
+    def __init__(self, ttl=600, max_entries=500, clock=time.monotonic):
+        """
+        Args:
+            ttl (float): مدة صلاحية الرد بالثواني
+            max_entries (int): الحد الأقصى لعدد الردود المخزنة
+            clock (callable): مصدر الوقت (time.monotonic)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # المفتاح -> (وقت انتهاء الصلاحية، الرد)
+        self._in_flight = {}  # المفتاح -> Future للطلب الجاري
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """الرد المخزن أو None (دون تعديل العدادات)"""
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, ttl=None):
+        """حفظ رد مع حذف الأقدم استخداماً عند تجاوز الحد الأقصى"""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute, ttl=None, cacheable=None):
+        """
+        الرد المخزن، أو انتظار طلب جارٍ بنفس المفتاح، أو تنفيذ الطلب وحفظ نتيجته.
+
+        Args:
+            key (str): مفتاح الرد (انظر cache_key)
+            compute (callable): دالة بدون معاملات تعيد الرد من المزود
+            ttl (float): مدة صلاحية مختلفة عن الافتراضية
+            cacheable (callable): دالة (الرد) تعيد False للردود التي لا تُحفظ (الأخطاء مثلاً)
+
+        Returns:
+            الرد
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if value is not None and (cacheable is None or cacheable(value)):
+                self._store(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        """حذف جميع الردود المخزنة"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: عدد الردود المخزنة والطلبات الجارية والعدادات، ونسبة الطلبات التي
+                لم تصل إلى المزود (hit_rate)
+        """
+        with self._lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round((self.hits + self.coalesced) / requests, 3) if requests else 0.0
+            }
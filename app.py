@@ -5,18 +5,18 @@
 
 import os
 import logging
-import threading
-import asyncio
 from datetime import datetime
 import json
 from flask import Flask, request, jsonify
 import telegram
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler
 import database as db
+import config
+from webhook_queue import WebhookRunner
 from bot import initialize_bot, start, help_command, handle_photos, handle_keyboard_buttons, admin_help
 from admin_handlers import get_admin_handlers, handle_template_callback, handle_welcome_template_callback
 from admin_handlers import handle_verification_template_callback, handle_admin_callback
-from utils import is_admin
+from utils import is_admin, handle_full_image_callback
 
 # إعداد التسجيل
 logging.basicConfig(
@@ -28,8 +28,11 @@ logger = logging.getLogger(__name__)
 # إنشاء تطبيق Flask
 app = Flask(__name__)
 
-# متغير عام لتخزين تطبيق البوت
-bot_app = None
+# تطبيق البوت على حلقة أحداث دائمة مع طابور التحديثات (انظر webhook_queue.py)
+webhook_runner = WebhookRunner(
+    queue_size=config.WEBHOOK_QUEUE_SIZE,
+    concurrent_updates=config.WEBHOOK_CONCURRENT_UPDATES
+)
 
 # الحصول على توكن البوت من متغيرات البيئة
 TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
@@ -44,8 +47,14 @@ if not WEBHOOK_URL:
 
 async def init_bot():
     """تهيئة البوت وإعداد المعالجات."""
+    db.hold_bot_lock()
     # إنشاء تطبيق البوت
-    application = Application.builder().token(TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(webhook_runner.update_processor)
+        .build()
+    )
     
     # تسجيل المعالجات الأساسية
     application.add_handler(CommandHandler("start", start))
@@ -64,10 +73,11 @@ async def init_bot():
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_keyboard_buttons))
     
     # تسجيل معالجات الاستدعاءات
-    application.add_handler(CallbackQueryHandler(handle_admin_callback, pattern=r"^admin_page_\d+$"))
+    application.add_handler(CallbackQueryHandler(handle_admin_callback, pattern=r"^admin_page_\d+"))
     application.add_handler(CallbackQueryHandler(handle_template_callback, pattern=r"^(view|edit)_template$"))
     application.add_handler(CallbackQueryHandler(handle_welcome_template_callback, pattern=r"^(view|edit)_welcome_template$"))
     application.add_handler(CallbackQueryHandler(handle_verification_template_callback, pattern=r"^(view|edit)_verification_template$"))
+    application.add_handler(CallbackQueryHandler(handle_full_image_callback, pattern=r"^full_image_"))
     
     # تهيئة البوت إضافية (ترحيل من initialize_bot في bot.py)
     initialize_bot()
@@ -79,17 +89,8 @@ async def init_bot():
     
     return application
 
-def run_async_init():
-    """تشغيل تهيئة البوت بشكل غير متزامن."""
-    global bot_app
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    bot_app = loop.run_until_complete(init_bot())
-    logger.info("تم تهيئة تطبيق البوت بنجاح")
-
 # تهيئة البوت عند بدء التطبيق
-init_thread = threading.Thread(target=run_async_init)
-init_thread.start()
+webhook_runner.start(init_bot)
 
 # مسار التحقق من عمل التطبيق
 @app.route('/')
@@ -112,28 +113,34 @@ def health_check():
 @app.route(f'/webhook', methods=['POST'])
 def webhook():
     """استقبال تحديثات webhook من تيليجرام."""
-    global bot_app
-    
-    if not bot_app:
+    if not webhook_runner.ready:
         logger.error("تطبيق البوت غير مهيأ بعد")
         return jsonify({"status": "error", "message": "تطبيق البوت غير مهيأ بعد"}), 503
     
     if request.method == "POST":
         try:
-            update = telegram.Update.de_json(request.get_json(force=True), bot_app.bot)
+            update = telegram.Update.de_json(request.get_json(force=True), webhook_runner.application.bot)
             
             # تسجيل معلومات التحديث للتشخيص
-            logger.info(f"تم استلام تحديث: {update.update_id}")
+            logger.debug(f"تم استلام تحديث: {update.update_id}")
             
-            # معالجة التحديث
-            asyncio.run(bot_app.process_update(update))
+            # وضع التحديث في طابور البوت والرد فوراً (تتم المعالجة على حلقة أحداث البوت)
+            if not webhook_runner.submit(update):
+                # يعيد تيليجرام إرسال التحديث لاحقاً عند عدم نجاح الطلب
+                return jsonify({"status": "error", "message": "طابور التحديثات ممتلئ"}), 503
             return jsonify({"status": "success"}), 200
         except Exception as e:
-            logger.error(f"خطأ أثناء معالجة التحديث: {e}")
+            logger.error(f"خطأ أثناء استقبال التحديث: {e}")
             return jsonify({"status": "error", "message": str(e)}), 500
     else:
         return jsonify({"status": "error", "message": "طريقة غير مدعومة"}), 405
 
+# مقاييس طابور تحديثات webhook
+@app.route('/api/webhook/metrics')
+def webhook_metrics():
+    """عدد التحديثات المنتظرة وقيد المعالجة وزمن معالجة أحدث التحديثات."""
+    return jsonify(webhook_runner.stats())
+
 # نقطة نهاية للـ ping للحفاظ على نشاط التطبيق
 @app.route('/api/ping')
 def api_ping():
@@ -162,7 +169,8 @@ def api_status():
         "timestamp": datetime.now().isoformat(),
         "notifications": notification_count,
         "environment": os.environ.get('ENVIRONMENT', 'development'),
-        "webhook_url": WEBHOOK_URL or "Not set"
+        "webhook_url": WEBHOOK_URL or "Not set",
+        "webhook_queue": webhook_runner.stats()
     }
     
     return jsonify(status_data)
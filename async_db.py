@@ -0,0 +1,170 @@
+"""
+واجهة غير متزامنة للوصول إلى البيانات من معالجات البوت.
+
+دوال database و db_manager متزامنة (جلسات SQLAlchemy وقراءة وكتابة ملفات
+JSON والصور)، واستدعاؤها مباشرة داخل معالج async يوقف حلقة الأحداث لجميع
+المستخدمين حتى ينتهي. تعرض هذه الوحدة نفس الدوال بنفس الأسماء كدوال قابلة
+للانتظار تُنفذ على مجموعة خيوط محدودة:
+
+    from async_db import adb, asql
+
+    notification = await adb.get_notification(notification_id)
+    stats = await asql.get_daily_statistics(7)
+
+كما توفر وضع تشخيص (BLOCKING_DEBUG_MS) يسجل تحذيراً مع مكدس الاستدعاء عندما
+تتوقف حلقة الأحداث لأكثر من المدة المحددة، لتحديد المعالج المسبب مباشرة.
+"""
+import asyncio
+import functools
+import importlib
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+_executor = ThreadPoolExecutor(max_workers=config.DB_THREAD_POOL_SIZE, thread_name_prefix="db-worker")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    تنفيذ دالة متزامنة على مجموعة خيوط قاعدة البيانات وانتظار نتيجتها.
+
+    Args:
+        func (callable): الدالة المتزامنة
+        *args, **kwargs: معاملات الدالة
+
+    Returns:
+        نتيجة الدالة
+    """
+    loop = asyncio.get_running_loop()
+    _ensure_blocking_monitor(loop)
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+class AsyncFacade:
+    """
+    غلاف لوحدة متزامنة يعيد كل دالة فيها كدالة قابلة للانتظار بنفس الاسم.
+    تُستورد الوحدة عند أول استخدام فقط.
+    """
+
+    def __init__(self, module_name):
+        self._module_name = module_name
+        self._module = None
+        self._wrappers = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        wrapper = self._wrappers.get(name)
+        if wrapper is not None:
+            return wrapper
+
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        func = getattr(self._module, name)
+        if not callable(func):
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_blocking(func, *args, **kwargs)
+
+        self._wrappers[name] = wrapper
+        return wrapper
+
+
+# دوال database (مخزن الإشعارات وملفات JSON والصور)
+adb = AsyncFacade("database")
+
+# دوال db_manager (قاعدة بيانات SQL)
+asql = AsyncFacade("db_manager")
+
+
+# ------------------- تشخيص حجز حلقة الأحداث -------------------
+
+class LoopBlockingMonitor:
+    """
+    مراقب يكشف توقف حلقة الأحداث.
+
+    تحدّث الحلقة نبضة دورية، ويفحص خيط منفصل عمر آخر نبضة؛ إذا تجاوز الحد
+    يُسجَّل مكدس خيط الحلقة في تلك اللحظة، أي السطر الذي يحجزها فعلاً.
+    """
+
+    def __init__(self, loop, threshold_ms):
+        self.loop = loop
+        self.threshold = threshold_ms / 1000.0
+        self.interval = max(self.threshold / 4, 0.005)
+        self.stalls = 0
+        self._last_tick = time.monotonic()
+        self._loop_thread_id = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self.loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="LoopBlockingMonitor", daemon=True).start()
+        logging.info(f"Event loop blocking monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stopped.set()
+
+    async def _heartbeat(self):
+        while not self._stopped.is_set():
+            self._last_tick = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported_tick = None
+        while not self._stopped.wait(self.interval):
+            if self.loop.is_closed():
+                return
+            last_tick = self._last_tick
+            blocked_for = time.monotonic() - last_tick
+            # تسجيل كل توقف مرة واحدة فقط
+            if blocked_for > self.threshold + self.interval and last_tick != reported_tick:
+                reported_tick = last_tick
+                self.stalls += 1
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame else "(unavailable)"
+                logging.warning(
+                    f"Event loop blocked for more than {blocked_for * 1000:.0f} ms. "
+                    f"Blocking call stack:\n{stack}"
+                )
+
+
+_monitors = weakref.WeakKeyDictionary()  # الحلقة -> المراقب
+
+
+def start_blocking_monitor(threshold_ms=None):
+    """
+    تشغيل مراقب حجز حلقة الأحداث على الحلقة الحالية (يجب استدعاؤها من داخلها).
+
+    Args:
+        threshold_ms (float): المدة بالمللي ثانية التي يعتبر بعدها المعالج حاجزاً للحلقة
+            (افتراضياً config.BLOCKING_DEBUG_MS)
+
+    Returns:
+        LoopBlockingMonitor: المراقب، أو None إذا كان التشخيص معطلاً
+    """
+    threshold_ms = config.BLOCKING_DEBUG_MS if threshold_ms is None else threshold_ms
+    if not threshold_ms or threshold_ms <= 0:
+        return None
+
+    loop = asyncio.get_running_loop()
+    monitor = _monitors.get(loop)
+    if monitor is None:
+        monitor = LoopBlockingMonitor(loop, threshold_ms)
+        _monitors[loop] = monitor
+        monitor.start()
+    return monitor
+
+
+def _ensure_blocking_monitor(loop):
+    if config.BLOCKING_DEBUG_MS > 0 and loop not in _monitors:
+        start_blocking_monitor()
@@ -0,0 +1,374 @@
+"""
+مخزن ملفات مُعنون بالمحتوى لصور الإشعارات والحملات والشعارات والملفات المؤقتة.
+
+يُحفظ كل محتوى مرة واحدة فقط باسم بصمته (sha256)، ويرتبط به "مالكون" مثل
+image:<معرف الإشعار> أو campaign:<معرف الحملة>. الصورة نفسها المعاد توجيهها أو
+الشعار المعاد رفعه لا يكلف أي مساحة إضافية، ويُحذف الملف عند تحرير آخر مالك له.
+
+تُسجل الارتباطات في سجل إلحاقي (سطر لكل عملية) يُعاد تطبيقه عند التحميل ويُضغط
+عندما يكبر، مثل مخزن الإشعارات. تقوم دالة جمع المهملات بتحرير المالكين المؤقتين
+المنتهية صلاحيتهم وحذف الملفات التي لا يرتبط بها أي مالك.
+
+يفتح البوت وسكريبتات الإدخال وإعادة الفهرسة نفس المخزن من عمليات مختلفة، لذا
+تتم كل كتابة وكل ضغط وكل جمع للمهملات تحت قفل ملف مشترك (refs.jsonl.lock)،
+بعد قراءة ما أضافته العمليات الأخرى إلى السجل. بذلك لا يُعتبر ملف أضافته عملية
+أخرى ملفاً مهملاً، ولا يُسقط الضغط ارتباطات لا تعرفها العملية الحالية.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# بادئة المالكين المؤقتين الذين يُحررون تلقائياً بعد انتهاء صلاحيتهم
+TEMP_OWNER_PREFIX = "temp:"
+
+
+class BlobStore:
+    """
+    مخزن ملفات بالبصمة مع عدّ المراجع لكل ملف
+    """
+
+    def __init__(self, root, log_name="refs.jsonl"):
+        """
+        Args:
+            root (str): مجلد الملفات
+            log_name (str): اسم ملف سجل الارتباطات داخل المجلد
+        """
+        self.root = root
+        self.log_path = os.path.join(root, log_name)
+        self._lock = threading.Lock()
+        self._blobs = {}  # البصمة -> {"ext", "size", "owners": set}
+        self._owners = {}  # المالك -> {"digest", "at"}
+        self._log_file = None
+        self._log_ops = 0
+        self._log_ident = None  # (st_dev, st_ino) لملف السجل المقروء
+        self._log_offset = 0  # عدد البايتات المقروءة أو المكتوبة من السجل
+
+        os.makedirs(root, exist_ok=True)
+        self._lock_file = open(self.log_path + ".lock", 'a')
+        with self._lock, self._file_lock():
+            self._load()
+            if self._log_ops > 2 * len(self._owners) + 100:
+                self._compact()
+        logging.info(f"Blob store loaded {len(self._blobs)} blob(s) for {len(self._owners)} owner(s)")
+
+    # ------------------- السجل -------------------
+
+    def _load(self):
+        """إعادة بناء الارتباطات من السجل كاملاً (تحت قفل الملف)"""
+        self._blobs = {}
+        self._owners = {}
+        self._log_ops, self._log_offset = self._replay(0)
+        self._open_log()
+
+    def _replay(self, offset):
+        """
+        تطبيق عمليات السجل بدءاً من موضع معين.
+
+        Returns:
+            tuple: (عدد العمليات، موضع نهاية آخر سطر مكتمل)
+        """
+        if not os.path.exists(self.log_path):
+            return 0, 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # سطر أخير غير مكتمل بسبب توقف مفاجئ أثناء الكتابة
+        end = data.rfind(b"\n") + 1
+
+        count = 0
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            count += 1
+            if entry["op"] == "ref":
+                self._apply_ref(entry["owner"], entry["digest"], entry["ext"], entry["size"], entry["at"])
+            elif entry["op"] == "unref":
+                self._apply_unref(entry["owner"])
+        return count, offset + end
+
+    def _open_log(self):
+        if self._log_file:
+            self._log_file.close()
+        self._log_file = open(self.log_path, 'ab')
+        self._log_ident = self._stat_log()[0]
+
+    def _stat_log(self):
+        """(المعرف (st_dev, st_ino)، الحجم) لملف السجل، أو (None, 0)"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _compact(self):
+        """إعادة كتابة السجل بالارتباطات الحالية فقط (داخل _writing)"""
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for owner, ref in self._owners.items():
+                blob = self._blobs[ref["digest"]]
+                f.write(json.dumps(self._ref_entry(owner, ref["digest"], blob, ref["at"]), ensure_ascii=False) + "\n")
+        # ملف جديد (معرف مختلف) حتى تعيد العمليات الأخرى تحميل السجل
+        os.replace(tmp_path, self.log_path)
+        self._open_log()
+        self._log_offset = self._stat_log()[1]
+        self._log_ops = len(self._owners)
+
+    # ------------------- التزامن بين العمليات -------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        """قفل ملف مشترك بين العمليات (لا يُستدعى متداخلاً)"""
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        """تطبيق ما كتبته العمليات الأخرى في السجل، أو إعادة التحميل إذا ضغطته"""
+        ident, size = self._stat_log()
+        if ident != self._log_ident:
+            self._load()
+        elif size != self._log_offset:
+            count, self._log_offset = self._replay(self._log_offset)
+            self._log_ops += count
+
+    @contextmanager
+    def _writing(self):
+        """قفل المخزن ثم قفل الملف الحصري، مع تطبيق كتابات العمليات الأخرى أولاً"""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            yield
+
+    def refresh(self):
+        """تطبيق ما كتبته العمليات الأخرى إن وجد (فحص stat واحد إذا لم يتغير شيء)"""
+        with self._lock:
+            if self._stat_log() != (self._log_ident, self._log_offset):
+                with self._file_lock(exclusive=False):
+                    self._catch_up()
+
+    @staticmethod
+    def _ref_entry(owner, digest, blob, at):
+        return {"op": "ref", "owner": owner, "digest": digest, "ext": blob["ext"], "size": blob["size"], "at": at}
+
+    def _append(self, entry):
+        """إلحاق عملية بالسجل (داخل _writing)"""
+        if os.fstat(self._log_file.fileno()).st_size != self._log_offset:
+            # إنهاء سطر غير مكتمل تركه توقف مفاجئ حتى لا يلتصق بالسطر الجديد
+            self._log_file.write(b"\n")
+        self._log_file.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+        self._log_file.flush()
+        self._log_offset = self._log_file.tell()
+        self._log_ops += 1
+
+    def _apply_ref(self, owner, digest, ext, size, at):
+        """ربط المالك بالبصمة، وإرجاع ما حُرر من محتواه السابق (انظر _apply_unref)"""
+        freed = self._apply_unref(owner)
+        blob = self._blobs.setdefault(digest, {"ext": ext, "size": size, "owners": set()})
+        blob["owners"].add(owner)
+        self._owners[owner] = {"digest": digest, "at": at}
+        return freed
+
+    def _apply_unref(self, owner):
+        """إزالة ارتباط المالك، وإرجاع (البصمة، الامتداد) إذا لم يبق للملف أي مالك"""
+        ref = self._owners.pop(owner, None)
+        if ref is None:
+            return None
+        blob = self._blobs.get(ref["digest"])
+        if blob is None:
+            return None
+        blob["owners"].discard(owner)
+        if not blob["owners"]:
+            del self._blobs[ref["digest"]]
+            return ref["digest"], blob["ext"]
+        return None
+
+    # ------------------- المسارات -------------------
+
+    def _path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], digest + ext)
+
+    def _remove_file(self, digest, ext):
+        try:
+            os.remove(self._path(digest, ext))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Error removing blob {digest}: {e}")
+
+    # ------------------- الواجهة -------------------
+
+    def put(self, data, owner, ext=".jpg"):
+        """
+        حفظ محتوى وربطه بمالك (يحل محل أي محتوى سابق لنفس المالك).
+
+        Args:
+            data (bytes): المحتوى
+            owner (str): المالك، مثل image:<معرف الإشعار>
+            ext (str): امتداد الملف إذا كان المحتوى جديداً
+
+        Returns:
+            str: مسار الملف
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._writing():
+            blob = self._blobs.get(digest)
+            if blob is None:
+                blob = {"ext": ext, "size": len(data), "owners": set()}
+            path = self._path(digest, blob["ext"])
+
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+            current = self._owners.get(owner)
+            if current is None or current["digest"] != digest:
+                at = time.time()
+                self._append(self._ref_entry(owner, digest, blob, at))
+                # حذف المحتوى السابق للمالك إذا لم يعد له أي مالك (تحت القفل حتى
+                # لا يُحذف ملف أعاد حفظه خيط آخر في نفس اللحظة)
+                freed = self._apply_ref(owner, digest, blob["ext"], blob["size"], at)
+                if freed:
+                    self._remove_file(*freed)
+            return path
+
+    def path_for(self, owner):
+        """مسار الملف المرتبط بالمالك، أو None (بحث في الذاكرة بعد تطبيق كتابات العمليات الأخرى)"""
+        self.refresh()
+        with self._lock:
+            ref = self._owners.get(owner)
+            if ref is None:
+                return None
+            return self._path(ref["digest"], self._blobs[ref["digest"]]["ext"])
+
+    def describe(self, owner):
+        """
+        معلومات الملف المرتبط بالمالك دون الوصول إلى نظام الملفات.
+
+        Returns:
+            dict: {"path", "digest", "ext", "size", "at"} أو None
+        """
+        self.refresh()
+        with self._lock:
+            ref = self._owners.get(owner)
+            if ref is None:
+                return None
+            blob = self._blobs[ref["digest"]]
+            return {
+                "path": self._path(ref["digest"], blob["ext"]),
+                "digest": ref["digest"],
+                "ext": blob["ext"],
+                "size": blob["size"],
+                "at": ref["at"]
+            }
+
+    def owners(self, prefix=""):
+        """قائمة المالكين الذين تبدأ أسماؤهم بالبادئة المحددة"""
+        self.refresh()
+        with self._lock:
+            return [owner for owner in self._owners if owner.startswith(prefix)]
+
+    def verify(self):
+        """
+        تحرير المالكين المرتبطين بملفات لم تعد موجودة على القرص.
+
+        Returns:
+            int: عدد المالكين المحررين
+        """
+        self.refresh()
+        with self._lock:
+            missing = [
+                owner for owner, ref in self._owners.items()
+                if not os.path.exists(self._path(ref["digest"], self._blobs[ref["digest"]]["ext"]))
+            ]
+        for owner in missing:
+            self.release(owner)
+        if missing:
+            logging.warning(f"Blob store released {len(missing)} owner(s) with missing files")
+        return len(missing)
+
+    def release(self, owner):
+        """
+        تحرير ارتباط مالك وحذف الملف إذا لم يبق له مالك آخر.
+
+        Returns:
+            bool: True إذا كان المالك مرتبطاً بملف
+        """
+        with self._writing():
+            if owner not in self._owners:
+                return False
+            self._append({"op": "unref", "owner": owner})
+            freed = self._apply_unref(owner)
+            if freed:
+                self._remove_file(*freed)
+        return True
+
+    def collect_garbage(self, temp_ttl_seconds):
+        """
+        تحرير المالكين المؤقتين الأقدم من المدة المحددة وحذف الملفات غير المرتبطة
+        بأي مالك (مثل ملفات بقيت بعد توقف مفاجئ).
+
+        Returns:
+            int: عدد الملفات المحذوفة
+        """
+        cutoff = time.time() - temp_ttl_seconds
+        removed = 0
+        # تحت القفل الحصري حتى تكون الارتباطات شاملة لكل العمليات ولا تُضاف
+        # ارتباطات جديدة أثناء البحث عن الملفات المهملة
+        with self._writing():
+            expired = [
+                owner for owner, ref in self._owners.items()
+                if owner.startswith(TEMP_OWNER_PREFIX) and ref["at"] < cutoff
+            ]
+            for owner in expired:
+                self._append({"op": "unref", "owner": owner})
+                freed = self._apply_unref(owner)
+                if freed:
+                    self._remove_file(*freed)
+
+            for directory in os.listdir(self.root):
+                directory_path = os.path.join(self.root, directory)
+                if not os.path.isdir(directory_path):
+                    continue
+                for name in os.listdir(directory_path):
+                    digest = name.split('.', 1)[0]
+                    path = os.path.join(directory_path, name)
+                    referenced = digest in self._blobs and not name.endswith(".tmp")
+                    # تجاهل الملفات الحديثة جداً التي قد تكون قيد الكتابة
+                    if referenced or os.path.getmtime(path) > time.time() - 60:
+                        continue
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError as e:
+                        logging.error(f"Error removing orphan blob {path}: {e}")
+
+            if self._log_ops > 2 * len(self._owners) + 100:
+                self._compact()
+
+        if expired or removed:
+            logging.info(f"Blob garbage collection released {len(expired)} temporary owner(s) and removed {removed} file(s)")
+        return removed
+
+    def stats(self):
+        """إحصائيات المخزن: عدد الملفات والمالكين والحجم والمساحة الموفرة"""
+        self.refresh()
+        with self._lock:
+            stored = sum(blob["size"] for blob in self._blobs.values())
+            referenced = sum(blob["size"] * len(blob["owners"]) for blob in self._blobs.values())
+            return {
+                "blobs": len(self._blobs),
+                "owners": len(self._owners),
+                "bytes": stored,
+                "bytes_saved": referenced - stored
+            }
@@ -36,6 +36,7 @@ from backup_handlers import get_backup_handlers
 from personality_handlers import get_personality_handlers
 from ai_handlers import get_ai_handlers
 from marketing_campaign_handlers import get_marketing_campaign_handlers
+from bulk_ingest_handlers import get_bulk_ingest_handlers
 
 # استيراد نظام قفل المثيل
 from instance_lock import check_single_instance
@@ -57,30 +58,6 @@ from theme_handlers import get_theme_handlers
 from backup_handlers import get_backup_handlers
 from personality_handlers import get_personality_handlers
 from ai_handlers import get_ai_handlers  # إضافة معالجات الذكاء الاصطناعي
-def build_application():
-    application = ApplicationBuilder().token(config.TELEGRAM_BOT_TOKEN).build()
-
-    # قائمة جميع الـ Handlers
-    all_handlers = [
-        get_admin_handlers(),
-        get_search_handlers(),
-        get_stats_handlers(),
-        get_delivery_handlers(),
-        get_search_history_handler(),
-        get_filter_handler(),
-        get_advanced_search_handler(),
-        get_permissions_handlers(),
-        get_theme_handlers(),
-        get_backup_handlers(),
-        get_personality_handlers(),
-        get_ai_handlers(),
-        get_marketing_campaign_handlers(),
-    ]
-
-    for handler in all_handlers:
-        application.add_handlers(handler if isinstance(handler, list) else [handler])
-
-    return application
 
 # Function to create admin keyboard
 def create_admin_keyboard():
@@ -848,6 +825,7 @@ def main():
     if not check_single_instance():
         logging.error("❌ هناك مثيل آخر من البوت قيد التشغيل بالفعل. جاري الخروج...")
         sys.exit(1)
+    db.hold_bot_lock()
     
     # تنظيف ملفات العلامات القديمة
     cleanup_marker_files()
@@ -990,6 +968,7 @@ def main():
     # إضافة معالج مخصص للتعامل مع استدعاءات عرض الإشعارات وإرسال رسائل التحقق وتصفية الإشعارات بأولوية عالية
     from admin_handlers import handle_admin_callback, send_verification_message_command
     from filter_handlers import handle_filter_callback, handle_date_filter_callback, handle_status_filter_callback
+    from utils import handle_full_image_callback
     
     # معالج مخصص لاستدعاءات عرض الإشعارات بأولوية قصوى
     async def direct_view_notification_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1174,6 +1153,12 @@ def main():
         group=-2
     )
     
+    # زر عرض الصورة كاملة أسفل الصور المصغرة للإشعارات
+    application.add_handler(
+        CallbackQueryHandler(handle_full_image_callback, pattern=r'^full_image_'),
+        group=-2
+    )
+    
     # ثانياً: معالج مخصص لإرسال رسائل التحقق في مجموعة -1 (أولوية عالية)
     application.add_handler(
         CallbackQueryHandler(direct_verification_handler, pattern=r'^send_verification_'),
@@ -1526,6 +1511,15 @@ def main():
     except Exception as e:
         logging.error(f"Error loading marketing campaign handlers: {e}")
     
+    # Add bulk ingestion handlers
+    try:
+        for handler in get_bulk_ingest_handlers():
+            # مجموعة منخفضة حتى تصل صور الدفعة إلى معالج المحادثة قبل معالج الصور العام
+            application.add_handler(handler, group=-3)
+        logging.info("Bulk ingestion handlers loaded successfully")
+    except Exception as e:
+        logging.error(f"Error loading bulk ingestion handlers: {e}")
+    
     # Add our own implementation of photo handler for image conversation state
     async def handle_photos(update, context):
         logging.info("Handling photo message...")
@@ -1690,19 +1684,16 @@ def main():
         """Check for notifications that need reminders sent."""
         logging.info("Checking for scheduled reminders...")
         
-        # Get all notifications
-        notifications = db.get_all_notifications()
+        # Get only the notifications whose reminder is due
+        notifications = db.get_due_reminders()
         
         if not notifications:
-            logging.info("No notifications found to check for reminders")
+            logging.info("No reminders needed to be sent at this time")
             return
         
         # Check and send reminders using the sms_service
         sent_count = sms_service.check_and_send_scheduled_reminders(notifications)
         
-        # Force an update to the notifications database to ensure changes are saved
-        db.save_json(db.NOTIFICATIONS_DB, {"notifications": notifications})
-        
         if sent_count > 0:
             logging.info(f"Sent {sent_count} reminder(s)")
             
@@ -1711,11 +1702,23 @@ def main():
         else:
             logging.info("No reminders needed to be sent at this time")
     
+    # Scheduled cleanup of expired temporary files and unreferenced blobs
+    async def collect_blob_garbage(context: ContextTypes.DEFAULT_TYPE):
+        """Release expired temporary images and remove unreferenced blob files."""
+        from async_db import adb
+        try:
+            removed = await adb.collect_blob_garbage()
+            logging.info(f"Blob garbage collection removed {removed} file(s)")
+        except Exception as e:
+            logging.error(f"Error collecting blob garbage: {e}")
+    
     # Schedule the reminder check to run every 1 minute
     job_queue = application.job_queue
     if job_queue:
         job_queue.run_repeating(check_for_reminders, interval=60, first=10)
         logging.info("Scheduled reminder check job every minute")
+        job_queue.run_repeating(collect_blob_garbage, interval=config.BLOB_GC_INTERVAL_HOURS * 3600, first=300)
+        logging.info(f"Scheduled blob garbage collection every {config.BLOB_GC_INTERVAL_HOURS} hour(s)")
     else:
         logging.warning("JobQueue not available - reminder checks will not run automatically")
         logging.warning("You need to install python-telegram-bot with [job-queue] extra, e.g., pip install 'python-telegram-bot[job-queue]'")
@@ -1781,6 +1784,7 @@ def build_application() -> Application:
     تجهيز الـ Application بكل التحضيرات (handlers, jobs, heartbeat_updater، إلخ)
     دون تشغيله، فقط إرجاعه جاهزًا للتشغيل.
     """
+    db.hold_bot_lock()
     application = Application.builder().token(TOKEN).build()
     
     # أضف هنا كل التحضيرات:
@@ -0,0 +1,257 @@
+"""
+الإدخال الجماعي لإشعارات الشحن من صور الفواتير.
+
+تُحلل الصور (ألبوم تيليجرام أو مجلد محلي) بالتوازي ضمن حد أقصى للتحليلات
+المتزامنة، ثم تُضاف جميع الإشعارات الصالحة إلى المخزن في عملية واحدة، وتُرسل
+رسائل الترحيب عبر طابور يوزعها على عدد محدود من العمال ضمن ميزانية الرسائل
+في الثانية. يعيد تقريراً لكل صورة بالبيانات المستخرجة ودرجة الثقة أو سبب الفشل.
+
+الاستخدام من سطر الأوامر:
+    python bulk_ingest.py <مجلد الصور> [--days 1] [--no-welcome]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import config
+import input_validator as validator
+from async_db import adb, run_blocking
+from campaign_dispatcher import RateLimiter
+from image_analysis import analyze_shipment_image
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def load_directory_images(directory, limit=None):
+    """
+    قراءة صور الفواتير من مجلد محلي بترتيب أسماء الملفات.
+
+    Args:
+        directory (str): مسار المجلد
+        limit (int): الحد الأقصى لعدد الصور (افتراضياً config.BULK_MAX_IMAGES)
+
+    Returns:
+        list: قواميس {"label": اسم الملف، "data": بيانات الصورة}
+    """
+    limit = limit or config.BULK_MAX_IMAGES
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    if len(names) > limit:
+        logging.warning(f"Directory {directory} has {len(names)} images, only the first {limit} will be ingested")
+
+    images = []
+    for name in names[:limit]:
+        with open(os.path.join(directory, name), 'rb') as f:
+            images.append({"label": name, "data": f.read()})
+    return images
+
+
+def _confidence(suggested):
+    confidence = suggested.get('confidence', {})
+    return (confidence.get('name', 0) + confidence.get('phone', 0)) / 2
+
+
+async def analyze_images(images, concurrency=None, on_progress=None, fetch=None):
+    """
+    تحليل الصور بالتوازي.
+
+    Args:
+        images (list): قواميس {"label", "data", "file_unique_id" (اختياري)}
+        concurrency (int): الحد الأقصى للتحليلات المتزامنة
+        on_progress (callable): دالة غير متزامنة تُستدعى بالشكل on_progress(done, total)
+        fetch (callable): دالة غير متزامنة fetch(image) تعيد بيانات الصور التي ليس لها "data"
+            (تُحمّل عند تحليلها فقط حتى لا تبقى كل الدفعة في الذاكرة أثناء الجمع)
+
+    Returns:
+        list: نتيجة لكل صورة بنفس الترتيب {"label", "customer_name", "phone", "confidence", "error"}
+    """
+    semaphore = asyncio.Semaphore(concurrency or config.BULK_OCR_CONCURRENCY)
+    total = len(images)
+    done = 0
+
+    async def analyze(image):
+        nonlocal done
+        item = {"label": image["label"], "customer_name": "", "phone": "", "confidence": 0, "error": None}
+        async with semaphore:
+            try:
+                if image.get("data") is None:
+                    image["data"] = await fetch(image)
+                result = await analyze_shipment_image(image["data"], image.get("file_unique_id"))
+                suggested = result["suggested"]
+                item["customer_name"] = suggested.get('customer_name', '')
+                item["phone"] = suggested.get('phone', '')
+                item["confidence"] = _confidence(suggested)
+            except Exception as e:
+                logging.error(f"Error analyzing bulk image {image['label']}: {e}")
+                item["error"] = "تعذر تحليل الصورة"
+
+        done += 1
+        if on_progress:
+            try:
+                await on_progress(done, total)
+            except Exception as e:
+                logging.error(f"Error reporting bulk ingestion progress: {e}")
+        return item
+
+    return await asyncio.gather(*(analyze(image) for image in images))
+
+
+async def send_welcome_messages(notifications, workers=None, messages_per_second=None):
+    """
+    إرسال رسائل الترحيب للإشعارات الجديدة عبر طابور يستهلكه عدد محدود من العمال.
+
+    Args:
+        notifications (list): قواميس {"id", "customer_name", "phone_number"}
+
+    Returns:
+        dict: معرف الإشعار -> (نجاح، نتيجة)
+    """
+    from ultramsg_service import send_welcome_message_async
+
+    workers = workers or config.BULK_WELCOME_WORKERS
+    limiter = RateLimiter(messages_per_second or config.CAMPAIGN_MESSAGES_PER_SECOND)
+    queue = asyncio.Queue()
+    for notification in notifications:
+        queue.put_nowait(notification)
+
+    results = {}
+
+    async def worker():
+        while True:
+            try:
+                notification = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.acquire()
+            try:
+                results[notification["id"]] = await send_welcome_message_async(
+                    notification["customer_name"], notification["phone_number"], notification["id"]
+                )
+            except Exception as e:
+                logging.error(f"Error sending welcome message for {notification['id']}: {e}")
+                results[notification["id"]] = (False, str(e))
+            finally:
+                queue.task_done()
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(notifications)))))
+    return results
+
+
+async def ingest_images(images, reminder_hours=24, send_welcome=True, on_progress=None, fetch=None):
+    """
+    إنشاء إشعارات من مجموعة صور فواتير.
+
+    Args:
+        images (list): قواميس {"label", "data", "file_unique_id" (اختياري)}
+        reminder_hours (float): ساعات التذكير لكل إشعار
+        send_welcome (bool): إرسال رسائل الترحيب للعملاء
+        on_progress (callable): دالة غير متزامنة لتقدم التحليل on_progress(done, total)
+        fetch (callable): دالة تحميل الصور التي ليس لها "data" (انظر analyze_images)
+
+    Returns:
+        dict: {"items": نتيجة كل صورة، "created", "failed", "welcome_sent", "elapsed"}
+    """
+    started = time.monotonic()
+    items = await analyze_images(images, on_progress=on_progress, fetch=fetch)
+
+    entries = []
+    entry_items = []
+    for image, item in zip(images, items):
+        if item["error"]:
+            continue
+        if not item["customer_name"]:
+            item["error"] = "لم يتم العثور على اسم العميل"
+            continue
+        is_valid, phone_number = validator.is_valid_phone(item["phone"])
+        if not item["phone"] or not is_valid:
+            item["error"] = "لم يتم العثور على رقم هاتف صالح"
+            continue
+        item["phone"] = phone_number
+        entries.append({
+            "customer_name": item["customer_name"],
+            "phone_number": phone_number,
+            "image_data": image["data"],
+            "reminder_hours": reminder_hours
+        })
+        entry_items.append(item)
+
+    created = []
+    if entries:
+        results = await adb.add_notifications_bulk(entries)
+        for item, (success, result) in zip(entry_items, results):
+            if success:
+                item["notification_id"] = result
+                created.append({"id": result, "customer_name": item["customer_name"], "phone_number": item["phone"]})
+            else:
+                item["error"] = f"تعذر حفظ الإشعار: {result}"
+
+    welcome_sent = 0
+    if send_welcome and created:
+        welcome_results = await send_welcome_messages(created)
+        for item in entry_items:
+            if "notification_id" in item:
+                item["welcome"] = welcome_results.get(item["notification_id"], (False, None))[0]
+                welcome_sent += item["welcome"]
+
+    report = {
+        "items": items,
+        "created": len(created),
+        "failed": len(items) - len(created),
+        "welcome_sent": welcome_sent,
+        "elapsed": time.monotonic() - started
+    }
+    logging.info(
+        f"Bulk ingestion: {report['created']} created, {report['failed']} failed, "
+        f"{welcome_sent} welcome message(s) sent in {report['elapsed']:.1f}s"
+    )
+    return report
+
+
+def format_report(report, max_items=40):
+    """
+    تنسيق تقرير الإدخال الجماعي كنص.
+
+    Args:
+        report (dict): نتيجة ingest_images
+        max_items (int): الحد الأقصى لعدد الصور المعروضة بالتفصيل
+
+    Returns:
+        str: نص التقرير
+    """
+    lines = [
+        "📦 تقرير الإدخال الجماعي",
+        f"✅ تم إنشاء: {report['created']}",
+        f"❌ فشل: {report['failed']}",
+        f"💬 رسائل الترحيب المرسلة: {report['welcome_sent']}",
+        f"⏱ المدة: {report['elapsed']:.1f} ثانية",
+        ""
+    ]
+    for number, item in enumerate(report["items"][:max_items], 1):
+        if item["error"]:
+            lines.append(f"{number}. ❌ {item['label']}: {item['error']}")
+        else:
+            confidence = item["confidence"]
+            confidence_text = "عالية ✅" if confidence > 0.7 else "متوسطة ⚠️" if confidence > 0.4 else "منخفضة ❌"
+            lines.append(f"{number}. ✅ {item['customer_name']} ({item['phone']}) - الثقة: {confidence_text}")
+    if len(report["items"]) > max_items:
+        lines.append(f"... و{len(report['items']) - max_items} صورة أخرى")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="إنشاء إشعارات شحن من مجلد صور فواتير")
+    parser.add_argument("directory", help="مجلد صور الفواتير")
+    parser.add_argument("--days", type=int, default=1, help="أيام التذكير لكل إشعار (0 لتعطيل التذكير)")
+    parser.add_argument("--no-welcome", action="store_true", help="عدم إرسال رسائل الترحيب")
+    args = parser.parse_args()
+
+    async def run():
+        images = await run_blocking(load_directory_images, args.directory)
+        return await ingest_images(images, reminder_hours=args.days * 24.0, send_welcome=not args.no_welcome)
+
+    print(format_report(asyncio.run(run()), max_items=config.BULK_MAX_IMAGES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+معالجات الإدخال الجماعي للإشعارات من صور الفواتير
+
+/bulk [أيام التذكير] لبدء الجمع، ثم إرسال الصور (ألبوم أو صور متفرقة أو ملفات
+صور)، ثم /done لبدء التحليل وإنشاء الإشعارات في الخلفية.
+"""
+import logging
+import time
+
+from telegram import Update
+from telegram.ext import (
+    ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
+)
+
+import config
+import database as db
+import strings as st
+import telegram_file_cache
+from async_db import adb
+from bulk_ingest import ingest_images, format_report
+
+# حالة المحادثة
+BULK_COLLECTING = 1
+
+
+async def bulk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """بدء جمع صور الفواتير للإدخال الجماعي"""
+    if not db.is_admin(update.effective_user.id):
+        await update.message.reply_text(st.NOT_AUTHORIZED)
+        return ConversationHandler.END
+
+    reminder_days = 1
+    if context.args:
+        try:
+            reminder_days = int(context.args[0])
+        except ValueError:
+            reminder_days = -1
+        if reminder_days < 0 or reminder_days > 30:
+            await update.message.reply_text(st.REMINDER_HOURS_INVALID)
+            return ConversationHandler.END
+
+    context.user_data['bulk_images'] = []
+    context.user_data['bulk_reminder_days'] = reminder_days
+    context.user_data.pop('bulk_last_media_group', None)
+
+    await update.message.reply_text(
+        "📦 وضع الإدخال الجماعي\n\n"
+        f"أرسل صور الفواتير (ألبوم أو صور متفرقة، حتى {config.BULK_MAX_IMAGES} صورة)، "
+        "ثم أرسل /done لبدء إنشاء الإشعارات أو /cancel للإلغاء.\n\n"
+        f"أيام التذكير لكل إشعار: {reminder_days}"
+    )
+    return BULK_COLLECTING
+
+
+async def received_bulk_image(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """استلام صورة فاتورة وإضافتها إلى الدفعة"""
+    message = update.message
+    images = context.user_data.setdefault('bulk_images', [])
+    if len(images) >= config.BULK_MAX_IMAGES:
+        await message.reply_text(f"⚠️ تم الوصول إلى الحد الأقصى ({config.BULK_MAX_IMAGES} صورة). أرسل /done للبدء.")
+        return BULK_COLLECTING
+
+    # نحفظ معرف الملف فقط، وتُحمّل الصورة عند تحليلها بعد /done
+    media = message.photo[-1] if message.photo else message.document
+    images.append({
+        "label": f"صورة {len(images) + 1}",
+        "file_id": media.file_id,
+        "is_photo": bool(message.photo),
+        "file_unique_id": media.file_unique_id
+    })
+
+    # رد واحد لكل ألبوم بدلاً من رد لكل صورة فيه
+    media_group_id = message.media_group_id
+    if media_group_id is None or media_group_id != context.user_data.get('bulk_last_media_group'):
+        context.user_data['bulk_last_media_group'] = media_group_id
+        await message.reply_text("📥 جاري استلام الصور... أرسل المزيد أو /done للبدء.")
+    return BULK_COLLECTING
+
+
+async def bulk_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """بدء إنشاء الإشعارات من الصور المستلمة في الخلفية"""
+    images = context.user_data.pop('bulk_images', [])
+    reminder_days = context.user_data.pop('bulk_reminder_days', 1)
+    context.user_data.pop('bulk_last_media_group', None)
+
+    if not images:
+        await update.message.reply_text("⚠️ لم يتم استلام أي صورة. تم إلغاء الإدخال الجماعي.")
+        return ConversationHandler.END
+
+    status_message = await update.message.reply_text(f"⏳ جاري تحليل {len(images)} صورة...")
+    last_update = 0
+
+    async def on_progress(done, total):
+        nonlocal last_update
+        now = time.monotonic()
+        if done < total and now - last_update < config.CAMPAIGN_PROGRESS_INTERVAL:
+            return
+        last_update = now
+        await status_message.edit_text(f"⏳ تم تحليل {done}/{total} صورة...")
+
+    async def fetch(image):
+        telegram_file = await context.bot.get_file(image["file_id"])
+        return bytes(await telegram_file.download_as_bytearray())
+
+    async def run():
+        try:
+            report = await ingest_images(
+                images, reminder_hours=reminder_days * 24.0, on_progress=on_progress, fetch=fetch
+            )
+
+            # الصور موجودة مسبقاً على خوادم تيليجرام، نحفظ معرفاتها لتجنب رفعها عند العرض
+            for image, item in zip(images, report["items"]):
+                if item.get("notification_id") and image["is_photo"]:
+                    image_path = await adb.get_image_path(item["notification_id"])
+                    if image_path:
+                        telegram_file_cache.remember_file_id(
+                            telegram_file_cache.notification_key(item["notification_id"]),
+                            image_path,
+                            image["file_id"]
+                        )
+
+            await update.message.reply_text(format_report(report))
+        except Exception as e:
+            logging.error(f"Error in bulk ingestion: {e}")
+            import traceback
+            logging.error(traceback.format_exc())
+            await update.message.reply_text(st.GENERAL_ERROR)
+
+    # التشغيل في الخلفية حتى لا يتوقف البوت عن الرد أثناء معالجة الدفعة
+    context.application.create_task(run(), update=update)
+    return ConversationHandler.END
+
+
+async def cancel_bulk(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """إلغاء الإدخال الجماعي"""
+    for key in ('bulk_images', 'bulk_reminder_days', 'bulk_last_media_group'):
+        context.user_data.pop(key, None)
+    await update.message.reply_text("تم إلغاء الإدخال الجماعي.")
+    return ConversationHandler.END
+
+
+def get_bulk_ingest_handlers():
+    """إرجاع معالجات الإدخال الجماعي"""
+    return [
+        ConversationHandler(
+            entry_points=[CommandHandler('bulk', bulk_command)],
+            states={
+                BULK_COLLECTING: [
+                    MessageHandler(filters.PHOTO | filters.Document.IMAGE, received_bulk_image),
+                    CommandHandler('done', bulk_done)
+                ]
+            },
+            fallbacks=[CommandHandler('cancel', cancel_bulk)],
+            name="bulk_ingest"
+        )
+    ]
@@ -0,0 +1,282 @@
+"""
+محرك إرسال الحملات التسويقية.
+
+يوزع رسائل الحملة على مجموعة من العمال (workers) غير المتزامنين ضمن ميزانية
+محددة من الرسائل في الثانية، ويسجل حالة كل مستلم فور إرساله في ملف تقدم
+(append-only) بحيث يمكن استئناف الحملة المتوقفة من حيث توقفت تماماً دون
+إعادة الإرسال لمن استلم الرسالة.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import config
+from ultramsg_service import send_whatsapp_message_async, send_whatsapp_image_async
+
+CAMPAIGNS_DIR = "data/campaigns"
+
+# الحملات التي يجري إرسالها حالياً لمنع التشغيل المزدوج
+_running_campaigns = set()
+
+
+class RateLimiter:
+    """
+    محدد معدل بسيط يوزع الطلبات بفواصل زمنية متساوية
+    """
+
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self._next_slot = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CampaignProgress:
+    """
+    ملف تقدم الحملة: قائمة المستلمين المجمدة عند البدء، وسطر لكل مستلم تمت معالجته
+    """
+
+    def __init__(self, campaign_id, campaigns_dir=CAMPAIGNS_DIR):
+        self.campaign_id = campaign_id
+        self.recipients_path = os.path.join(campaigns_dir, f"{campaign_id}_recipients.json")
+        self.progress_path = os.path.join(campaigns_dir, f"{campaign_id}_progress.jsonl")
+        self.statuses = {}  # معرف المستلم -> "sent" أو "failed"
+        self._file = None
+
+    def exists(self):
+        return os.path.exists(self.recipients_path)
+
+    def load_recipients(self):
+        with open(self.recipients_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_recipients(self, recipients):
+        os.makedirs(os.path.dirname(self.recipients_path), exist_ok=True)
+        tmp_path = self.recipients_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(recipients, f, ensure_ascii=False)
+        os.replace(tmp_path, self.recipients_path)
+
+    def load_statuses(self):
+        """قراءة الحالات المسجلة سابقاً (يتجاهل السطر الأخير غير المكتمل)"""
+        self.statuses = {}
+        if not os.path.exists(self.progress_path):
+            return self.statuses
+        with open(self.progress_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.statuses[entry["id"]] = entry["status"]
+        return self.statuses
+
+    def record(self, recipient_id, status):
+        """تسجيل حالة مستلم فوراً على القرص"""
+        if self._file is None:
+            self._file = open(self.progress_path, 'a', encoding='utf-8')
+        self._file.write(json.dumps({
+            "id": recipient_id,
+            "status": status,
+            "at": datetime.now().isoformat()
+        }, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.statuses[recipient_id] = status
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def counts(self):
+        sent = sum(1 for status in self.statuses.values() if status == "sent")
+        return sent, len(self.statuses) - sent
+
+    def remove(self):
+        """حذف ملفات التقدم بعد اكتمال الحملة"""
+        self.close()
+        for path in (self.recipients_path, self.progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def get_campaign_progress(campaign_id):
+    """
+    الحصول على تقدم حملة غير مكتملة.
+
+    Returns:
+        dict: {"total", "sent", "failed", "pending"} أو None إذا لم تبدأ الحملة
+    """
+    progress = CampaignProgress(campaign_id)
+    if not progress.exists():
+        return None
+    try:
+        total = len(progress.load_recipients())
+        progress.load_statuses()
+        sent, failed = progress.counts()
+        return {"total": total, "sent": sent, "failed": failed, "pending": total - sent - failed}
+    except Exception as e:
+        logging.error(f"Error reading campaign progress {campaign_id}: {e}")
+        return None
+
+
+def build_campaign_message(campaign, customer_name):
+    """تخصيص نص رسالة الحملة لعميل محدد."""
+    message = campaign['message'].replace('{{customer_name}}', customer_name)
+
+    # إضافة تفاصيل إضافية حسب نوع الحملة
+    if campaign['type'] == 'discount':
+        message = message.replace('{{discount}}', str(campaign['discount']))
+    elif campaign['type'] == 'free_product' and '{{min_order}}' in message:
+        message = message.replace('{{min_order}}', str(campaign['min_order']))
+
+    return message
+
+
+def clear_campaign_progress(campaign_id):
+    """
+    حذف ملفات تقدم الحملة. تُستدعى بعد حفظ الحملة كمكتملة في campaigns.json
+    حتى لا يؤدي توقف مفاجئ بين الخطوتين إلى إعادة الإرسال للجميع.
+    """
+    CampaignProgress(campaign_id).remove()
+
+
+def is_campaign_running(campaign_id):
+    return campaign_id in _running_campaigns
+
+
+async def dispatch_campaign(campaign, target_customers, on_progress=None,
+                            workers=None, messages_per_second=None, progress_interval=None):
+    """
+    إرسال الحملة للعملاء المستهدفين أو استئنافها إذا كانت قد بدأت سابقاً.
+
+    عند الاستئناف تُستخدم قائمة المستلمين المجمدة من أول تشغيل ويتم تخطي
+    كل من سُجلت حالته مسبقاً.
+
+    Args:
+        campaign (dict): بيانات الحملة
+        target_customers (list): الإشعارات (العملاء) المستهدفة عند أول تشغيل
+        on_progress (callable): دالة غير متزامنة تُستدعى بالشكل on_progress(done, total, success)
+        workers (int): عدد العمال المتزامنين
+        messages_per_second (float): الحد الأقصى للرسائل في الثانية
+        progress_interval (float): الفترة بالثواني بين تحديثات التقدم
+
+    Returns:
+        dict: {"total", "sent_count", "success_count", "failed_count", "resumed"}
+    """
+    workers = workers or config.CAMPAIGN_WORKERS
+    messages_per_second = messages_per_second or config.CAMPAIGN_MESSAGES_PER_SECOND
+    progress_interval = progress_interval or config.CAMPAIGN_PROGRESS_INTERVAL
+
+    campaign_id = campaign['id']
+    if campaign_id in _running_campaigns:
+        raise RuntimeError(f"Campaign {campaign_id} is already being sent")
+    _running_campaigns.add(campaign_id)
+
+    progress = CampaignProgress(campaign_id)
+    try:
+        resumed = progress.exists()
+        if resumed:
+            recipients = progress.load_recipients()
+            progress.load_statuses()
+            logging.info(f"Resuming campaign {campaign_id}: {len(progress.statuses)}/{len(recipients)} already processed")
+        else:
+            recipients = [
+                {
+                    "id": customer.get('id'),
+                    "customer_name": customer.get('customer_name', 'العميل'),
+                    "phone_number": customer.get('phone_number', '')
+                }
+                for customer in target_customers
+                if customer.get('phone_number')
+            ]
+            progress.save_recipients(recipients)
+
+        # قراءة صورة الحملة مرة واحدة لجميع المستلمين
+        image_data = None
+        image_path = campaign.get('image_path')
+        if campaign.get('has_image', False) and image_path and os.path.exists(image_path):
+            image_data = await asyncio.to_thread(_read_file, image_path)
+
+        total = len(recipients)
+        sent, failed = progress.counts()
+        counters = {"done": sent + failed, "success": sent}
+
+        queue = asyncio.Queue()
+        for recipient in recipients:
+            if recipient["id"] not in progress.statuses:
+                queue.put_nowait(recipient)
+
+        limiter = RateLimiter(messages_per_second)
+
+        async def worker():
+            while True:
+                try:
+                    recipient = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                message = build_campaign_message(campaign, recipient["customer_name"])
+                await limiter.acquire()
+                try:
+                    if image_data:
+                        success, result = await send_whatsapp_image_async(
+                            recipient["phone_number"], image_data, message, before_retry=limiter.acquire
+                        )
+                    else:
+                        success, result = await send_whatsapp_message_async(recipient["phone_number"], message)
+                except Exception as e:
+                    logging.error(f"Error sending campaign message to {recipient['phone_number']}: {e}")
+                    success = False
+
+                progress.record(recipient["id"], "sent" if success else "failed")
+                counters["done"] += 1
+                if success:
+                    counters["success"] += 1
+
+        async def reporter():
+            last_reported = None
+            while True:
+                await asyncio.sleep(progress_interval)
+                snapshot = (counters["done"], counters["success"])
+                if snapshot != last_reported:
+                    last_reported = snapshot
+                    try:
+                        await on_progress(counters["done"], total, counters["success"])
+                    except Exception as e:
+                        logging.warning(f"Error reporting campaign progress: {e}")
+
+        reporter_task = asyncio.create_task(reporter()) if on_progress else None
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(workers, queue.qsize() or 1)))))
+        finally:
+            if reporter_task:
+                reporter_task.cancel()
+            progress.close()
+
+        return {
+            "total": total,
+            "sent_count": counters["done"],
+            "success_count": counters["success"],
+            "failed_count": counters["done"] - counters["success"],
+            "resumed": resumed
+        }
+    finally:
+        _running_campaigns.discard(campaign_id)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
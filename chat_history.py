@@ -0,0 +1,255 @@
+"""
+سجلات محادثات الذكاء الاصطناعي.
+
+كان كل رد من الذكاء الاصطناعي يحمّل ملف سجل المستخدم بالكامل ويعيد كتابته،
+وكانت قراءة آخر المحادثات وإحصائيات الاستخدام تقرأ جميع الملفات. يُحفظ السجل
+الآن في ملف إلحاقي لكل مستخدم (سطر JSON لكل محادثة): الإضافة كتابة سطر واحد،
+وقراءة آخر المحادثات تقرأ نهاية الملف فقط. عندما يتجاوز السجل ضعف الحد
+المسموح يُعاد كتابته بآخر المحادثات فقط. تُحفظ عدادات الاستخدام في ملف صغير
+يُحدّث مع كل محادثة بدلاً من حسابها من جميع السجلات، وتُطرح منه المحادثات
+المحذوفة عند إعادة الكتابة أو حذف سجل مستخدم حتى يطابق ما هو محفوظ فعلاً.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+# حجم الكتلة المقروءة من نهاية الملف عند قراءة آخر المحادثات
+TAIL_BLOCK_SIZE = 8192
+
+# أقل فترة بين عمليات حفظ ملف العدادات بالثواني
+COUNTERS_SAVE_INTERVAL = 5
+
+
+def _read_tail(path, count):
+    """آخر count سطر من الملف دون قراءة بدايته"""
+    if count <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return data.splitlines()[-count:]
+
+
+class ChatHistoryStore:
+    """
+    سجلات إلحاقية لمحادثات كل مستخدم مع حد أقصى للمحادثات المحفوظة
+    """
+
+    def __init__(self, root, max_entries=200):
+        """
+        Args:
+            root (str): مجلد السجلات
+            max_entries (int): عدد المحادثات المحفوظة لكل مستخدم
+        """
+        self.root = root
+        self.max_entries = max_entries
+        self.counters_path = os.path.join(root, "counters.json")
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        self._dirty = False
+
+        os.makedirs(root, exist_ok=True)
+        self._counters = self._load_counters()
+        atexit.register(self.flush)
+
+    # ------------------- العدادات -------------------
+
+    def _load_counters(self):
+        if os.path.exists(self.counters_path):
+            try:
+                with open(self.counters_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except ValueError:
+                logging.warning("AI chat history counters are corrupt, rebuilding")
+        return self._rebuild_counters()
+
+    def _rebuild_counters(self):
+        """حساب العدادات من السجلات الموجودة (مرة واحدة عند غياب ملف العدادات)"""
+        counters = {"users": {}, "total_messages": 0, "chat_types": {}}
+        for name in os.listdir(self.root):
+            user_id, extension = os.path.splitext(name)
+            if extension not in (".jsonl", ".json") or name == os.path.basename(self.counters_path):
+                continue
+            entries = self._read_all(user_id)
+            if not entries:
+                continue
+            counters["users"][user_id] = len(entries)
+            counters["total_messages"] += len(entries)
+            for entry in entries:
+                chat_type = entry.get("chat_type", "general")
+                counters["chat_types"][chat_type] = counters["chat_types"].get(chat_type, 0) + 1
+        self._counters = counters
+        self._save_counters()
+        logging.info(f"AI chat history counters rebuilt for {len(counters['users'])} user(s)")
+        return counters
+
+    def _save_counters(self):
+        tmp_path = self.counters_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._counters, f, ensure_ascii=False)
+        os.replace(tmp_path, self.counters_path)
+        self._saved_at = time.monotonic()
+        self._dirty = False
+
+    def _uncount(self, entries):
+        """طرح محادثات محذوفة من عدد الرسائل وأنواع المحادثات"""
+        chat_types = self._counters["chat_types"]
+        for entry in entries:
+            chat_type = entry.get("chat_type", "general")
+            remaining = chat_types.get(chat_type, 0) - 1
+            if remaining > 0:
+                chat_types[chat_type] = remaining
+            else:
+                chat_types.pop(chat_type, None)
+        self._counters["total_messages"] = max(0, self._counters["total_messages"] - len(entries))
+
+    def _counters_changed(self):
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= COUNTERS_SAVE_INTERVAL:
+            self._save_counters()
+
+    def flush(self):
+        """حفظ العدادات المعدلة (تُستدعى أيضاً عند إيقاف البرنامج)"""
+        with self._lock:
+            if self._dirty:
+                self._save_counters()
+
+    # ------------------- الملفات -------------------
+
+    def _path(self, user_id):
+        return os.path.join(self.root, f"{user_id}.jsonl")
+
+    def _legacy_path(self, user_id):
+        return os.path.join(self.root, f"{user_id}.json")
+
+    def _read_all(self, user_id):
+        """جميع محادثات المستخدم (للتحويل وإعادة البناء فقط)"""
+        entries = []
+        legacy_path = self._legacy_path(user_id)
+        if os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except ValueError:
+                entries = []
+        path = self._path(user_id)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        return entries
+
+    def _rewrite(self, user_id, entries):
+        path = self._path(user_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
+    def _migrate_legacy(self, user_id):
+        """تحويل سجل المستخدم من ملف JSON القديم إلى سجل إلحاقي"""
+        legacy_path = self._legacy_path(user_id)
+        if not os.path.exists(legacy_path):
+            return
+        entries = self._read_all(user_id)
+        if len(entries) > self.max_entries:
+            self._uncount(entries[:-self.max_entries])
+            entries = entries[-self.max_entries:]
+        self._rewrite(user_id, entries)
+        os.remove(legacy_path)
+        self._counters["users"][str(user_id)] = len(entries)
+        self._counters_changed()
+
+    # ------------------- الواجهة -------------------
+
+    def append(self, user_id, entry):
+        """
+        إضافة محادثة إلى سجل المستخدم (كتابة سطر واحد).
+
+        Args:
+            user_id: معرف المستخدم
+            entry (dict): المحادثة (timestamp, chat_type, message, response)
+        """
+        key = str(user_id)
+        with self._lock:
+            self._migrate_legacy(user_id)
+            with open(self._path(user_id), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            count = self._counters["users"].get(key, 0) + 1
+            self._counters["total_messages"] += 1
+            chat_type = entry.get("chat_type", "general")
+            self._counters["chat_types"][chat_type] = self._counters["chat_types"].get(chat_type, 0) + 1
+            if count > 2 * self.max_entries:
+                # إبقاء آخر المحادثات فقط (تكلفة موزعة على max_entries إضافة)
+                entries = self._read_all(user_id)
+                self._uncount(entries[:-self.max_entries])
+                entries = entries[-self.max_entries:]
+                self._rewrite(user_id, entries)
+                count = len(entries)
+            self._counters["users"][key] = count
+            self._counters_changed()
+
+    def _tail(self, user_id, limit):
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        for line in _read_tail(path, limit):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # سطر غير مكتمل بسبب توقف مفاجئ أثناء الكتابة
+                continue
+        return entries
+
+    def recent(self, user_id, limit=10):
+        """آخر المحادثات من الأقدم إلى الأحدث (قراءة نهاية الملف فقط)"""
+        with self._lock:
+            self._migrate_legacy(user_id)
+            return self._tail(user_id, limit)
+
+    def count(self, user_id):
+        """عدد المحادثات المحفوظة للمستخدم (من العدادات دون قراءة السجل)"""
+        with self._lock:
+            self._migrate_legacy(user_id)
+            return self._counters["users"].get(str(user_id), 0)
+
+    def reset(self, user_id):
+        """حذف سجل محادثات المستخدم"""
+        with self._lock:
+            self._uncount(self._read_all(user_id))
+            for path in (self._path(user_id), self._legacy_path(user_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._counters["users"].pop(str(user_id), None)
+            self._counters_changed()
+
+    def stats(self):
+        """
+        إحصائيات الاستخدام من العدادات.
+
+        Returns:
+            dict: {"total_users", "total_conversations", "total_messages", "chat_types"}
+        """
+        with self._lock:
+            users = len(self._counters["users"])
+            return {
+                "total_users": users,
+                "total_conversations": users,
+                "total_messages": self._counters["total_messages"],
+                "chat_types": dict(self._counters["chat_types"])
+            }
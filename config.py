@@ -23,14 +23,59 @@ ULTRAMSG_TOKEN = os.getenv("ULTRAMSG_TOKEN", "")
 
 # Data storage paths
 NOTIFICATIONS_DB = "data/notifications.json"
+NOTIFICATIONS_LOG = "data/notifications.log"  # سجل الإلحاق لمخزن الإشعارات
 ADMINS_DB = "data/admins.json"
 SETTINGS_DB = "data/settings.json"
 PERMISSIONS_DB = "data/user_permissions.json"
+AI_CHAT_HISTORY_DIR = "data/ai_chat_history"  # سجلات محادثات الذكاء الاصطناعي (انظر chat_history.py)
 THEME_SETTINGS_DB = "data/theme_settings.json"
 MESSAGE_TEMPLATE_FILE = "data/message_template.txt"
 WELCOME_MESSAGE_TEMPLATE_FILE = "data/welcome_message_template.txt"
 VERIFICATION_MESSAGE_TEMPLATE_FILE = "data/verification_message_template.txt"
 
+# إعدادات إرسال الحملات التسويقية
+CAMPAIGN_WORKERS = int(os.getenv("CAMPAIGN_WORKERS", "5"))  # عدد العمال المتزامنين
+CAMPAIGN_MESSAGES_PER_SECOND = float(os.getenv("CAMPAIGN_MESSAGES_PER_SECOND", "5"))  # ميزانية الرسائل في الثانية
+CAMPAIGN_PROGRESS_INTERVAL = float(os.getenv("CAMPAIGN_PROGRESS_INTERVAL", "3"))  # الفترة بين تحديثات رسالة التقدم
+
+# مدة صلاحية ذاكرة المسؤولين والصلاحيات بالثواني
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+
+# مدة صلاحية مجاميع الإحصائيات في الذاكرة بالثواني قبل إعادة تحميلها (انظر stats_rollup.py)
+STATS_ROLLUP_TTL = float(os.getenv("STATS_ROLLUP_TTL", "60"))
+# الفترة بين عمليات كتابة عدادات الإحصائيات المجمعة بالثواني (انظر stats_buffer.py)
+STATS_FLUSH_INTERVAL = float(os.getenv("STATS_FLUSH_INTERVAL", "5"))
+
+# مدة صلاحية سجلات البحث المحفوظة في الذاكرة لكل مستخدم بالثواني (انظر search_history_functions.py)
+SEARCH_HISTORY_CACHE_TTL = float(os.getenv("SEARCH_HISTORY_CACHE_TTL", "60"))
+
+# عدد محادثات الذكاء الاصطناعي المحفوظة لكل مستخدم (انظر chat_history.py)
+AI_CHAT_HISTORY_MAX_ENTRIES = int(os.getenv("AI_CHAT_HISTORY_MAX_ENTRIES", "200"))
+
+# سياق محادثات الذكاء الاصطناعي متعددة الأدوار بالرموز التقريبية (انظر ai_context.py)
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "3000"))  # ميزانية الأدوار السابقة الكاملة
+AI_CONTEXT_MAX_TURNS = int(os.getenv("AI_CONTEXT_MAX_TURNS", "20"))  # عدد الأدوار المقروءة من سجل المحادثة
+AI_CONTEXT_SUMMARY_BUDGET = int(os.getenv("AI_CONTEXT_SUMMARY_BUDGET", "400"))  # ميزانية ملخص الأدوار الأقدم
+AI_CONTEXT_EVICT_CHUNK = int(os.getenv("AI_CONTEXT_EVICT_CHUNK", "10"))  # عدد الأدوار المنقولة إلى الملخص دفعة واحدة
+
+# التخزين المؤقت لردود الذكاء الاصطناعي (انظر ai_response_cache.py)
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", "600"))  # مدة صلاحية ردود المحادثة بالثواني
+AI_PREDICTION_CACHE_TTL = int(os.getenv("AI_PREDICTION_CACHE_TTL", "3600"))  # مدة صلاحية التنبؤ بالتسليم لنفس الإشعار بالثواني
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "500"))  # الحد الأقصى لعدد الردود المخزنة
+
+# الوصول غير المتزامن للبيانات من المعالجات (انظر async_db.py)
+DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", "8"))  # عدد خيوط تنفيذ استدعاءات قاعدة البيانات
+BLOCKING_DEBUG_MS = float(os.getenv("BLOCKING_DEBUG_MS", "0"))  # تسجيل أي توقف لحلقة الأحداث أطول من هذه المدة (0 للتعطيل)
+
+# استقبال تحديثات webhook عبر طابور البوت (انظر webhook_queue.py)
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))  # الحد الأقصى للتحديثات المنتظرة قبل رفض الجديدة
+WEBHOOK_CONCURRENT_UPDATES = int(os.getenv("WEBHOOK_CONCURRENT_UPDATES", "8"))  # عدد التحديثات التي تُعالج في نفس الوقت
+
+# الإدخال الجماعي للإشعارات من صور الفواتير (انظر bulk_ingest.py)
+BULK_OCR_CONCURRENCY = int(os.getenv("BULK_OCR_CONCURRENCY", "4"))  # عدد الصور التي تُحلل في نفس الوقت
+BULK_WELCOME_WORKERS = int(os.getenv("BULK_WELCOME_WORKERS", "3"))  # عدد عمال إرسال رسائل الترحيب
+BULK_MAX_IMAGES = int(os.getenv("BULK_MAX_IMAGES", "200"))  # الحد الأقصى للصور في دفعة واحدة
+
 # User permission types
 PERMISSION_SEARCH_BY_NAME = "search_by_name"
 PERMISSION_TYPES = [PERMISSION_SEARCH_BY_NAME]
@@ -51,6 +96,19 @@ DEFAULT_THEME = {
 # Image directory
 IMAGES_DIR = "data/images"
 
+# مخزن الملفات المعنون بالمحتوى (انظر blob_store.py)
+BLOBS_DIR = "data/blobs"
+BLOB_TEMP_TTL_HOURS = float(os.getenv("BLOB_TEMP_TTL_HOURS", "24"))  # مدة الاحتفاظ بالملفات المؤقتة (صور تحليل الذكاء الاصطناعي)
+BLOB_GC_INTERVAL_HOURS = float(os.getenv("BLOB_GC_INTERVAL_HOURS", "6"))  # الفترة بين عمليات جمع المهملات
+BOT_LOCK_FILE = "data/bot.lock"  # قفل يحمله البوت أثناء تشغيله حتى ترفض سكريبتات الصيانة العمل (انظر database.py)
+
+# معالجة صور الإشعارات قبل حفظها (انظر image_pipeline.py)
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))  # أقصى عرض أو ارتفاع بالبكسل
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "82"))  # جودة الضغط (1-95)
+IMAGE_STORE_FORMAT = os.getenv("IMAGE_STORE_FORMAT", "JPEG").upper()  # JPEG أو WEBP
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320"))  # أقصى بُعد للصورة المصغرة (تُعرض في واجهات عرض الإشعارات)
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))  # عدد العمليات لمعالجة الصور
+
 # القالب الافتراضي للرسالة النصية (للتذكير)
 DEFAULT_SMS_TEMPLATE = "مرحباً {{customer_name}}،\n\nهذا تذكير بأن لديك شحنة جاهزة للاستلام.\n\nمع تحيات NatureCare."
 
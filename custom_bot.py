@@ -1525,19 +1525,16 @@ def main():
         """Check for notifications that need reminders sent."""
         logging.info("Checking for scheduled reminders...")
         
-        # Get all notifications
-        notifications = db.get_all_notifications()
+        # Get only the notifications whose reminder is due
+        notifications = db.get_due_reminders()
         
         if not notifications:
-            logging.info("No notifications found to check for reminders")
+            logging.info("No reminders needed to be sent at this time")
             return
         
         # Check and send reminders using the sms_service
         sent_count = sms_service.check_and_send_scheduled_reminders(notifications)
         
-        # Force an update to the notifications database to ensure changes are saved
-        db.save_json(db.NOTIFICATIONS_DB, {"notifications": notifications})
-        
         if sent_count > 0:
             logging.info(f"Sent {sent_count} reminder(s)")
             
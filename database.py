@@ -2,12 +2,23 @@ import json
 import os
 import uuid
 import base64
+import fcntl
 from datetime import datetime
 import logging
 import sqlite3
+import threading
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
-from config import NOTIFICATIONS_DB, ADMINS_DB, IMAGES_DIR, MESSAGE_TEMPLATE_FILE, DEFAULT_SMS_TEMPLATE
+from config import NOTIFICATIONS_DB, NOTIFICATIONS_LOG, ADMINS_DB, PERMISSIONS_DB, AUTH_CACHE_TTL, IMAGES_DIR, BLOBS_DIR, BLOB_TEMP_TTL_HOURS, BOT_LOCK_FILE, MESSAGE_TEMPLATE_FILE, DEFAULT_SMS_TEMPLATE
+from notification_store import NotificationStore
+from reminder_queue import ReminderQueue
+from phone_index import PhoneIndex
+from name_index import NameIndex
+from notification_order import NotificationOrder
+from blob_store import BlobStore
+import telegram_file_cache
+import image_pipeline
 
 # استخدام URI قاعدة البيانات من المتغيرات البيئية
 DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -36,6 +47,107 @@ def get_db_session():
         logging.error(f"Error getting database session: {e}")
         return None
 
+_notification_store = None
+
+def get_notification_store():
+    """
+    الحصول على مخزن الإشعارات المفهرس (يتم إنشاؤه عند أول استخدام)
+    
+    Returns:
+        NotificationStore: مخزن الإشعارات
+    """
+    global _notification_store
+    if _notification_store is None:
+        _notification_store = NotificationStore(NOTIFICATIONS_DB, NOTIFICATIONS_LOG)
+    return _notification_store
+
+_reminder_queue = None
+
+def get_reminder_queue():
+    """
+    الحصول على طابور التذكيرات المرتب زمنياً (يُبنى من المخزن عند أول استخدام)
+    
+    Returns:
+        ReminderQueue: طابور التذكيرات
+    """
+    global _reminder_queue
+    if _reminder_queue is None:
+        _reminder_queue = ReminderQueue(get_notification_store())
+    return _reminder_queue
+
+_phone_index = None
+
+def get_phone_index():
+    """
+    الحصول على فهرس أرقام الهواتف الموحدة (يُبنى من المخزن عند أول استخدام)
+    
+    Returns:
+        PhoneIndex: فهرس أرقام الهواتف
+    """
+    global _phone_index
+    if _phone_index is None:
+        _phone_index = PhoneIndex(get_notification_store())
+    return _phone_index
+
+_name_index = None
+
+def get_name_index():
+    """
+    الحصول على فهرس أسماء العملاء (يُبنى من المخزن عند أول استخدام)
+    
+    Returns:
+        NameIndex: فهرس الأسماء
+    """
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex(get_notification_store())
+    return _name_index
+
+_notification_order = None
+
+def get_notification_order():
+    """
+    الحصول على فهرس ترتيب الإشعارات حسب وقت الإنشاء (يُبنى من المخزن عند أول استخدام)
+    
+    Returns:
+        NotificationOrder: فهرس الترتيب
+    """
+    global _notification_order
+    if _notification_order is None:
+        _notification_order = NotificationOrder(get_notification_store())
+    return _notification_order
+
+_blob_store = None
+
+# صيغة الصورة لكل امتداد في مخزن المحتوى
+IMAGE_FORMATS = {extension: image_format for image_format, extension in image_pipeline.FORMAT_EXTENSIONS.items()}
+IMAGE_FORMATS[".png"] = "PNG"
+
+def get_blob_store():
+    """
+    الحصول على مخزن الملفات المعنون بالمحتوى (يتم إنشاؤه عند أول استخدام)
+    
+    Returns:
+        BlobStore: مخزن الملفات
+    """
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(BLOBS_DIR)
+    return _blob_store
+
+def get_due_reminders():
+    """
+    الحصول على الإشعارات التي حان وقت إرسال تذكيرها فقط.
+    
+    Returns:
+        list: قائمة بالإشعارات المستحقة
+    """
+    try:
+        return get_reminder_queue().pop_due()
+    except Exception as e:
+        logging.error(f"Error getting due reminders: {e}")
+        return []
+
 def load_json(file_path, default=None):
     """Load JSON data from file, creating it with default value if it doesn't exist."""
     if default is None:
@@ -65,67 +177,240 @@ def save_json(file_path, data):
         logging.error(f"Error saving JSON to {file_path}: {e}")
         return False
 
+def record_event(stat_type, count=1):
+    """
+    تسجيل حدث في الإحصائيات اليومية والساعية (تُجمع الزيادات في الذاكرة
+    وتُكتب دورياً، انظر db_manager.increment_statistics).
+    
+    Args:
+        stat_type (str): نوع الحدث، مثل notifications_created أو messages_sent
+        count (int): عدد الأحداث
+    """
+    if count <= 0:
+        return
+    try:
+        import db_manager
+        db_manager.increment_statistics(stat_type, count)
+    except Exception as e:
+        logging.error(f"Error recording {stat_type} statistic: {e}")
+
+def store_blob(data, owner, extension=".jpg"):
+    """
+    حفظ ملف في مخزن المحتوى وربطه بمالك (المحتوى المكرر لا يُحفظ مرتين).
+    
+    Args:
+        data (bytes): محتوى الملف
+        owner (str): المالك، مثل campaign:<معرف الحملة> أو temp:<معرف عشوائي>
+        extension (str): امتداد الملف
+    
+    Returns:
+        str: مسار الملف
+    """
+    return get_blob_store().put(bytes(data), owner, extension)
+
+def release_blob(owner, legacy_path=None):
+    """
+    تحرير ملف مالك من مخزن المحتوى. إذا لم يكن المالك في المخزن (ملف محفوظ
+    قبل استخدام المخزن) يُحذف الملف القديم legacy_path إن وجد.
+    """
+    try:
+        if get_blob_store().release(owner):
+            return True
+        if legacy_path and os.path.exists(legacy_path) \
+                and not os.path.abspath(legacy_path).startswith(os.path.abspath(BLOBS_DIR)):
+            os.remove(legacy_path)
+            return True
+    except Exception as e:
+        logging.error(f"Error releasing blob {owner}: {e}")
+    return False
+
+def collect_blob_garbage():
+    """
+    جمع المهملات: تحرير الملفات المؤقتة المنتهية صلاحيتها وحذف الملفات غير
+    المرتبطة، مع حذف ملفات temp_media القديمة المحفوظة قبل استخدام المخزن.
+    
+    Returns:
+        int: عدد الملفات المحذوفة
+    """
+    ttl_seconds = BLOB_TEMP_TTL_HOURS * 3600
+    removed = get_blob_store().collect_garbage(ttl_seconds)
+    
+    legacy_dir = "temp_media"
+    if os.path.isdir(legacy_dir):
+        cutoff = time.time() - ttl_seconds
+        for name in os.listdir(legacy_dir):
+            path = os.path.join(legacy_dir, name)
+            if name.startswith("ai_analysis_") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
 def save_image(image_data, notification_id):
-    """Save image data to filesystem."""
+    """
+    Save image data after normalizing orientation, capping its resolution and
+    recompressing it, together with a small thumbnail for the notification
+    views. Identical images are stored once in the content-addressed blob store.
+    """
     try:
-        # Create a unique filename for the image
-        file_path = os.path.join(IMAGES_DIR, f"{notification_id}.jpg")
+        image_data, extension, thumbnail_data = image_pipeline.prepare_image(image_data)
         
-        # Make sure directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        file_path = store_blob(image_data, f"image:{notification_id}", extension)
         
-        # Save the image
-        with open(file_path, 'wb') as f:
-            f.write(image_data)
+        if thumbnail_data:
+            store_blob(thumbnail_data, f"thumb:{notification_id}")
+        else:
+            release_blob(f"thumb:{notification_id}")
         
         return file_path
     except Exception as e:
         logging.error(f"Error saving image: {e}")
         return None
 
+def get_thumbnail_path(notification_id):
+    """
+    الحصول على مسار الصورة المصغرة للإشعار (لواجهات عرض الإشعارات).
+    
+    Returns:
+        str: مسار الصورة المصغرة، أو None إذا لم تكن موجودة (إشعارات قديمة)
+    """
+    return get_blob_store().path_for(f"thumb:{notification_id}")
+
+def get_image_path(notification_id):
+    """
+    Get the path to the image for a notification from the blob store manifest,
+    falling back to the fixed legacy paths for images saved before it existed.
+    Never lists the images directory.
+    """
+    blob_path = get_blob_store().path_for(f"image:{notification_id}")
+    if blob_path:
+        return blob_path
+    
+    # صور محفوظة قبل استخدام مخزن المحتوى (تُنقل إليه بواسطة reindex_images.py)
+    for extension in image_pipeline.FORMAT_EXTENSIONS.values():
+        file_path = os.path.join(IMAGES_DIR, f"{notification_id}{extension}")
+        if os.path.exists(file_path):
+            return file_path
+    
+    logging.debug(f"No image stored for notification: {notification_id}")
+    return None
+
+def get_image_info(notification_id):
+    """
+    الحصول على معلومات صورة الإشعار من فهرس مخزن المحتوى.
+    
+    Args:
+        notification_id (str): معرف الإشعار
+    
+    Returns:
+        dict: {"path", "format", "size"} أو None إذا لم تكن الصورة مفهرسة
+    """
+    info = get_blob_store().describe(f"image:{notification_id}")
+    if info is None:
+        return None
+    return {
+        "path": info["path"],
+        "format": IMAGE_FORMATS.get(info["ext"], info["ext"].lstrip(".").upper()),
+        "size": info["size"]
+    }
+
 def get_image(notification_id):
     """Get image data from filesystem."""
     try:
-        # زيادة التسجيل للتشخيص
-        logging.info(f"Attempting to get image for notification ID: {notification_id}")
-        
-        # بناء مسار الملف
-        file_path = os.path.join(IMAGES_DIR, f"{notification_id}.jpg")
-        logging.info(f"Generated image path: {file_path}")
-        
-        # التحقق من وجود الملف
-        if not os.path.exists(file_path):
-            logging.warning(f"Image file does not exist: {file_path}")
-            
-            # محاولة إيجاد أي ملفات صورة مرتبطة بهذا الإشعار
-            dir_path = os.path.dirname(file_path)
-            if os.path.exists(dir_path):
-                related_files = [f for f in os.listdir(dir_path) if notification_id in f]
-                if related_files:
-                    logging.info(f"Found related image files: {related_files}")
-                    # استخدام أول ملف مرتبط إذا وجد
-                    alt_file_path = os.path.join(dir_path, related_files[0])
-                    logging.info(f"Trying alternative image file: {alt_file_path}")
-                    with open(alt_file_path, 'rb') as f:
-                        return f.read()
-                else:
-                    logging.warning(f"No related image files found in {dir_path}")
-            else:
-                logging.warning(f"Directory does not exist: {dir_path}")
-            
+        file_path = get_image_path(notification_id)
+        if not file_path:
             return None
         
-        # قراءة الملف إذا وجد
         with open(file_path, 'rb') as f:
-            data = f.read()
-            logging.info(f"Successfully read image file, size: {len(data)} bytes")
-            return data
+            return f.read()
     except Exception as e:
         logging.error(f"Error getting image: {e}")
         import traceback
         logging.error(traceback.format_exc())
         return None
 
+def _legacy_image_owner(name):
+    """
+    اسم المالك في مخزن المحتوى لملف صورة قديم، أو None إذا لم يكن صورة.
+    
+    Returns:
+        tuple: (المالك، الامتداد)
+    """
+    stem, extension = os.path.splitext(name)
+    extension = extension.lower()
+    if extension == ".jpeg":
+        extension = ".jpg"
+    if extension not in IMAGE_FORMATS:
+        return None, None
+    if stem.startswith("company_logo_"):
+        return f"logo:{stem[len('company_logo_'):]}", extension
+    return f"image:{stem}", extension
+
+_bot_lock_file = None
+
+def hold_bot_lock():
+    """
+    تسجيل العملية الحالية كعملية بوت عاملة: قفل مشترك على BOT_LOCK_FILE يبقى حتى
+    انتهاء العملية. ينتظر انتهاء أي سكريبت صيانة يحمل القفل الحصري (انظر reindex_images).
+    """
+    global _bot_lock_file
+    if _bot_lock_file is None:
+        os.makedirs(os.path.dirname(BOT_LOCK_FILE), exist_ok=True)
+        _bot_lock_file = open(BOT_LOCK_FILE, 'a')
+        fcntl.flock(_bot_lock_file, fcntl.LOCK_SH)
+
+def reindex_images():
+    """
+    إعادة بناء فهرس الصور: تحرير الارتباطات بملفات مفقودة، ونقل الصور القديمة
+    من مجلد الصور إلى مخزن المحتوى، وتحديث مسارات صور الإشعارات، وحذف الملفات
+    غير المرتبطة. عملية لمرة واحدة (انظر reindex_images.py).
+    
+    ترفض العمل أثناء تشغيل البوت، وتمنع البوت من البدء حتى تنتهي.
+    
+    Returns:
+        dict: {"dropped", "imported", "updated", "missing", "removed"}
+    
+    Raises:
+        RuntimeError: إذا كان البوت قيد التشغيل
+    """
+    os.makedirs(os.path.dirname(BOT_LOCK_FILE), exist_ok=True)
+    with open(BOT_LOCK_FILE, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError("البوت قيد التشغيل، يجب إيقافه قبل إعادة فهرسة الصور")
+        return _reindex_images()
+
+def _reindex_images():
+    blob_store = get_blob_store()
+    report = {"dropped": blob_store.verify(), "imported": 0, "updated": 0, "missing": 0, "removed": 0}
+    
+    if os.path.isdir(IMAGES_DIR):
+        for name in sorted(os.listdir(IMAGES_DIR)):
+            path = os.path.join(IMAGES_DIR, name)
+            owner, extension = _legacy_image_owner(name)
+            if owner is None or not os.path.isfile(path):
+                continue
+            if blob_store.path_for(owner) is None:
+                with open(path, 'rb') as f:
+                    blob_store.put(f.read(), owner, extension)
+                report["imported"] += 1
+            # حذف الأصل فقط بعد التأكد من أن الملف محفوظ ومسجل في سجل المخزن
+            blob_path = blob_store.path_for(owner)
+            if blob_path and os.path.exists(blob_path):
+                os.remove(path)
+    
+    for notification in get_all_notifications():
+        image_path = blob_store.path_for(f"image:{notification['id']}")
+        if image_path is None:
+            report["missing"] += 1
+        elif notification.get("image_path") != image_path:
+            update_notification(notification["id"], {"image_path": image_path})
+            report["updated"] += 1
+    
+    report["removed"] = collect_blob_garbage()
+    logging.info(f"Image reindex: {report}")
+    return report
+
 def add_notification(customer_name, phone_number, image_data, reminder_hours=24):
     """
     Add a new shipping notification to the database.
@@ -140,8 +425,6 @@ def add_notification(customer_name, phone_number, image_data, reminder_hours=24)
         tuple: (success, notification_id or error message)
     """
     try:
-        notifications = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        
         # Generate a unique ID for the notification
         notification_id = str(uuid.uuid4())
         
@@ -162,70 +445,97 @@ def add_notification(customer_name, phone_number, image_data, reminder_hours=24)
             "reminder_sent": False  # Flag to track if reminder has been sent
         }
         
-        notifications["notifications"].append(notification)
-        
-        # Save updated notifications
-        if save_json(NOTIFICATIONS_DB, notifications):
-            return True, notification_id
-        else:
-            return False, "Failed to save notification data"
+        # Append the notification to the store log
+        get_notification_store().put(notification)
+        record_event('notifications_created')
+        return True, notification_id
     
     except Exception as e:
         logging.error(f"Error adding notification: {e}")
         return False, str(e)
 
+def add_notifications_bulk(entries):
+    """
+    إضافة عدة إشعارات دفعة واحدة (للإدخال الجماعي من صور الفواتير).
+    تُحفظ الصور أولاً ثم تُضاف جميع الإشعارات إلى المخزن في عملية واحدة؛
+    إذا فشلت الإضافة تُحذف الصور المحفوظة ولا يُضاف أي إشعار.
+
+    Args:
+        entries (list): قواميس تحتوي على customer_name, phone_number, image_data,
+            reminder_hours (اختياري، افتراضياً 24)
+
+    Returns:
+        list: (نجاح, معرف الإشعار أو رسالة الخطأ) لكل عنصر بنفس الترتيب
+    """
+    results = []
+    notifications = []
+    created_at = datetime.now().isoformat()
+
+    for entry in entries:
+        notification_id = str(uuid.uuid4())
+        image_path = save_image(entry["image_data"], notification_id)
+        if not image_path:
+            results.append((False, "Failed to save image"))
+            continue
+
+        notifications.append({
+            "id": notification_id,
+            "customer_name": entry["customer_name"],
+            "phone_number": entry["phone_number"],
+            "image_path": image_path,
+            "created_at": created_at,
+            "reminder_hours": entry.get("reminder_hours", 24),
+            "reminder_sent": False
+        })
+        results.append((True, notification_id))
+
+    try:
+        get_notification_store().put_many(notifications)
+    except Exception as e:
+        logging.error(f"Error adding notifications in bulk: {e}")
+        for notification in notifications:
+            release_blob(f"image:{notification['id']}")
+            release_blob(f"thumb:{notification['id']}")
+        return [(False, str(e))] * len(entries)
+
+    logging.info(f"Added {len(notifications)} notification(s) in bulk")
+    record_event('notifications_created', len(notifications))
+    return results
+
 def search_notifications_by_name(customer_name):
-    """Search for notifications by customer name."""
+    """
+    Search for notifications by customer name.
+    
+    يتجاهل البحث التشكيل والفروق بين أشكال الألف والهمزة والتاء المربوطة والياء،
+    وتُرتب النتائج من الأقرب (تطابق تام ثم بداية الاسم ثم بداية كلمة).
+    """
     try:
-        notifications = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        
+        store = get_notification_store()
         results = []
-        search_term = customer_name.lower()
-        
-        for notification in notifications["notifications"]:
-            if search_term in notification["customer_name"].lower():
+        for notification_id in get_name_index().search(customer_name):
+            notification = store.get(notification_id)
+            if notification is not None:
                 results.append(notification)
-        
         return results
     except Exception as e:
         logging.error(f"Error searching notifications by name: {e}")
         return []
 
 def search_notifications_by_phone(phone_number):
-    """Search for notifications by phone number."""
+    """
+    Search for notifications by phone number.
+    
+    يقبل الرقم بأي صيغة (محلية أو دولية، مع مسافات أو رموز) أو آخر أرقامه فقط.
+    """
     try:
-        import input_validator as validator
-        notifications = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        
+        store = get_notification_store()
         results = []
+        for notification_id in get_phone_index().search(phone_number):
+            notification = store.get(notification_id)
+            if notification is not None:
+                results.append(notification)
         
-        # Remove spaces, dashes, etc. for more flexible matching
-        search_digits = ''.join(filter(str.isdigit, phone_number))
-        
-        # Handle multiple formats in search
-        search_patterns = [
-            search_digits,  # Original digits only
-        ]
-        
-        # If starts with 0, add version with 963 prefix replacing the 0
-        if search_digits.startswith('0'):
-            search_patterns.append('963' + search_digits[1:])
-        
-        # If starts with 963, add version with 0 prefix replacing the 963
-        if search_digits.startswith('963'):
-            search_patterns.append('0' + search_digits[3:])
-            
-        logging.info(f"البحث عن رقم الهاتف باستخدام الأنماط: {search_patterns}")
-        
-        for notification in notifications["notifications"]:
-            notification_digits = ''.join(filter(str.isdigit, notification["phone_number"]))
-            
-            # Check if any search pattern matches
-            for pattern in search_patterns:
-                if pattern in notification_digits or notification_digits in pattern:
-                    results.append(notification)
-                    break  # Avoid duplicates
-        
+        results.sort(key=lambda notification: notification.get("created_at", ""))
         return results
     except Exception as e:
         logging.error(f"Error searching notifications by phone: {e}")
@@ -234,12 +544,39 @@ def search_notifications_by_phone(phone_number):
 def get_all_notifications():
     """Get all notifications."""
     try:
-        data = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        return data["notifications"]
+        return get_notification_store().all()
     except Exception as e:
         logging.error(f"Error getting all notifications: {e}")
         return []
 
+def list_notifications(after=None, before=None, limit=5, filters=None):
+    """
+    صفحة من الإشعارات من الأحدث إلى الأقدم دون تحميل جميع الإشعارات.
+    
+    Args:
+        after (str): معرف آخر إشعار في الصفحة السابقة (للانتقال إلى الصفحة التالية)
+        before (str): معرف أول إشعار في الصفحة الحالية (للعودة إلى الصفحة السابقة)
+        limit (int): عدد الإشعارات في الصفحة
+        filters (dict): مرشحات القائمة: created_from، delivered، reminder_sent،
+            archived، customer_name
+    
+    Returns:
+        dict: {'items': الإشعارات، 'has_next': وجود صفحة تالية، 'has_prev': وجود صفحة سابقة}
+    """
+    try:
+        return get_notification_order().page(after=after, before=before, limit=limit, filters=filters)
+    except Exception as e:
+        logging.error(f"Error listing notifications: {e}")
+        return {'items': [], 'has_next': False, 'has_prev': False}
+
+def count_notifications(filters=None):
+    """عدد الإشعارات المطابقة للمرشحات (انظر list_notifications)"""
+    try:
+        return get_notification_order().count(filters)
+    except Exception as e:
+        logging.error(f"Error counting notifications: {e}")
+        return 0
+
 def get_notification(notification_id):
     """
     استرجاع إشعار محدد بواسطة المعرف.
@@ -251,12 +588,9 @@ def get_notification(notification_id):
         dict: بيانات الإشعار إذا وجد، None خلاف ذلك
     """
     try:
-        data = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        notifications = data["notifications"]
-        
-        for notification in notifications:
-            if notification["id"] == notification_id:
-                return notification
+        notification = get_notification_store().get(notification_id)
+        if notification is not None:
+            return notification
                 
         logging.warning(f"لم يتم العثور على إشعار بالمعرف: {notification_id}")
         return None
@@ -267,36 +601,108 @@ def get_notification(notification_id):
 def delete_notification(notification_id):
     """Delete a notification by its ID."""
     try:
-        notifications = load_json(NOTIFICATIONS_DB, {"notifications": []})
+        deleted = get_notification_store().delete(notification_id)
         
-        # Find the notification to delete
-        for i, notification in enumerate(notifications["notifications"]):
-            if notification["id"] == notification_id:
-                # Remove the notification from the list
-                deleted = notifications["notifications"].pop(i)
-                
-                # Delete the image file if it exists
-                image_path = deleted.get("image_path")
-                if image_path and os.path.exists(image_path):
-                    os.remove(image_path)
-                
-                # Save the updated notifications
-                if save_json(NOTIFICATIONS_DB, notifications):
-                    return True
-                else:
-                    return False
+        # If the notification wasn't found
+        if deleted is None:
+            return False
         
-        # If we got here, the notification wasn't found
-        return False
+        # Delete the image file if it exists
+        release_blob(f"image:{notification_id}", legacy_path=deleted.get("image_path"))
+        release_blob(f"thumb:{notification_id}")
+        release_blob(f"image:{notification_id}_proof")
+        telegram_file_cache.forget(telegram_file_cache.notification_key(notification_id))
+        telegram_file_cache.forget(telegram_file_cache.thumbnail_key(notification_id))
+        
+        return True
     except Exception as e:
         logging.error(f"Error deleting notification: {e}")
         return False
 
+# ------------------- Authorization Cache -------------------
+
+class _AuthCache:
+    """
+    ذاكرة مؤقتة قصيرة العمر لبيانات المسؤولين والصلاحيات.
+    
+    يتم التحقق من المسؤولين والصلاحيات مع كل رسالة واردة، لذلك تُحمّل ملفات
+    JSON مرة واحدة كل فترة (ttl) وتُفرّغ الذاكرة فوراً عند أي تعديل عبر
+    دوال هذه الوحدة. التعديلات الخارجية على الملفات تظهر بعد انتهاء المدة.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._values = {}  # الاسم -> (وقت الانتهاء، القيمة)
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get(self, name, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        
+        value = loader()
+        with self._lock:
+            # تجاهل القيمة إذا تم تفريغ الذاكرة أثناء التحميل
+            if generation == self._generation:
+                self._values[name] = (now + self.ttl, value)
+        return value
+    
+    def invalidate(self):
+        with self._lock:
+            self._values.clear()
+            self._generation += 1
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._values)
+            }
+
+_auth_cache = _AuthCache(AUTH_CACHE_TTL)
+
+def _load_admins_index():
+    admins = load_json(ADMINS_DB, {"admins": [], "main_admin": None})
+    return {
+        "admins": frozenset(str(admin_id) for admin_id in admins.get("admins", [])),
+        "main_admin": admins.get("main_admin")
+    }
+
+def _load_permissions_index():
+    permissions_data = load_json(PERMISSIONS_DB, {"users": {}})
+    return {
+        user_id: tuple(user_data.get("permissions", []))
+        for user_id, user_data in permissions_data.get("users", {}).items()
+    }
+
+def invalidate_auth_cache():
+    """تفريغ ذاكرة المسؤولين والصلاحيات (بعد تعديل الملفات مباشرة أو استعادة نسخة احتياطية)."""
+    _auth_cache.invalidate()
+
+def get_auth_cache_stats():
+    """
+    الحصول على إحصائيات ذاكرة المسؤولين والصلاحيات.
+    
+    Returns:
+        dict: {"hits", "misses", "hit_rate", "entries"}
+    """
+    return _auth_cache.stats()
+
 def is_admin(user_id):
     """Check if a user is an admin."""
     try:
-        admins = load_json(ADMINS_DB, {"admins": [], "main_admin": None})
-        return str(user_id) in admins["admins"]
+        return str(user_id) in _auth_cache.get("admins", _load_admins_index)["admins"]
     except Exception as e:
         logging.error(f"Error checking admin status: {e}")
         return False
@@ -304,8 +710,7 @@ def is_admin(user_id):
 def is_main_admin(user_id):
     """Check if a user is the main admin."""
     try:
-        admins = load_json(ADMINS_DB, {"admins": [], "main_admin": None})
-        return str(user_id) == admins.get("main_admin")
+        return str(user_id) == _auth_cache.get("admins", _load_admins_index)["main_admin"]
     except Exception as e:
         logging.error(f"Error checking main admin status: {e}")
         return False
@@ -327,8 +732,10 @@ def set_main_admin_if_none(user_id):
             # Also add to regular admins list if not already there
             if user_id not in admins["admins"]:
                 admins["admins"].append(user_id)
-                
-            return save_json(ADMINS_DB, admins)
+            
+            saved = save_json(ADMINS_DB, admins)
+            _auth_cache.invalidate()
+            return saved
         
         return False  # There's already a main admin
     except Exception as e:
@@ -345,7 +752,9 @@ def add_admin(user_id):
         
         if user_id not in admins["admins"]:
             admins["admins"].append(user_id)
-            return save_json(ADMINS_DB, admins)
+            saved = save_json(ADMINS_DB, admins)
+            _auth_cache.invalidate()
+            return saved
         
         return True  # Already an admin
     except Exception as e:
@@ -366,7 +775,9 @@ def remove_admin(user_id):
         
         if user_id in admins["admins"]:
             admins["admins"].remove(user_id)
-            return save_json(ADMINS_DB, admins)
+            saved = save_json(ADMINS_DB, admins)
+            _auth_cache.invalidate()
+            return saved
         
         return True  # Not an admin anyway
     except Exception as e:
@@ -427,6 +838,7 @@ def delete_all_admins():
         # Create an empty admins json
         empty_admins = {"admins": [], "main_admin": None}
         success = save_json(ADMINS_DB, empty_admins)
+        _auth_cache.invalidate()
         logging.info(f"All admins deleted. Success: {success}")
         return success
     except Exception as e:
@@ -445,17 +857,8 @@ def update_notification(notification_id, updates):
         bool: True if successful, False otherwise
     """
     try:
-        notifications = load_json(NOTIFICATIONS_DB, {"notifications": []})
-        
-        # Find the notification to update
-        for notification in notifications["notifications"]:
-            if notification["id"] == notification_id:
-                # Update fields
-                for key, value in updates.items():
-                    notification[key] = value
-                
-                # Save updated notifications
-                return save_json(NOTIFICATIONS_DB, notifications)
+        if get_notification_store().update(notification_id, updates) is not None:
+            return True
         
         # If we got here, the notification wasn't found
         logging.warning(f"Notification {notification_id} not found for update")
@@ -480,7 +883,10 @@ def mark_reminder_sent(notification_id):
         "reminder_sent_at": datetime.now().isoformat()
     }
     
-    return update_notification(notification_id, updates)
+    if not update_notification(notification_id, updates):
+        return False
+    record_event('notifications_reminded')
+    return True
 
 def get_message_template():
     """
@@ -670,18 +1076,9 @@ def has_permission(user_id, permission_type):
         return True
         
     try:
-        import config
-        # تحميل بيانات الصلاحيات
-        permissions_data = load_json(config.PERMISSIONS_DB, {"users": {}})
-        
         # التحقق مما إذا كان المستخدم موجوداً ويملك الصلاحية
-        str_user_id = str(user_id)  # تحويل معرف المستخدم إلى نص للاستخدام كمفتاح
-        
-        if str_user_id in permissions_data["users"]:
-            user_permissions = permissions_data["users"][str_user_id]
-            return permission_type in user_permissions.get("permissions", [])
-            
-        return False
+        permissions = _auth_cache.get("permissions", _load_permissions_index)
+        return permission_type in permissions.get(str(user_id), ())
     except Exception as e:
         logging.error(f"Error checking permission for user {user_id}: {e}")
         return False
@@ -755,7 +1152,9 @@ def add_permission_to_user(user_id, username, first_name, permission_type):
             permissions_data["users"][str_user_id]["permissions"].append(permission_type)
             
         # حفظ البيانات
-        return save_json(config.PERMISSIONS_DB, permissions_data)
+        saved = save_json(config.PERMISSIONS_DB, permissions_data)
+        _auth_cache.invalidate()
+        return saved
     except Exception as e:
         logging.error(f"Error adding permission to user {user_id}: {e}")
         return False
@@ -793,7 +1192,9 @@ def remove_permission_from_user(user_id, permission_type):
                 del permissions_data["users"][str_user_id]
             
         # حفظ البيانات
-        return save_json(config.PERMISSIONS_DB, permissions_data)
+        saved = save_json(config.PERMISSIONS_DB, permissions_data)
+        _auth_cache.invalidate()
+        return saved
     except Exception as e:
         logging.error(f"Error removing permission from user {user_id}: {e}")
         return False
@@ -809,18 +1210,8 @@ def get_user_permissions(user_id):
         list: قائمة بالصلاحيات التي يملكها المستخدم
     """
     try:
-        import config
-        # تحميل بيانات الصلاحيات
-        permissions_data = load_json(config.PERMISSIONS_DB, {"users": {}})
-        
-        # تحويل معرف المستخدم إلى نص للاستخدام كمفتاح
-        str_user_id = str(user_id)
-        
-        # التحقق مما إذا كان المستخدم موجوداً
-        if str_user_id in permissions_data["users"]:
-            return permissions_data["users"][str_user_id].get("permissions", [])
-            
-        return []
+        permissions = _auth_cache.get("permissions", _load_permissions_index)
+        return list(permissions.get(str(user_id), ()))
     except Exception as e:
         logging.error(f"Error getting permissions for user {user_id}: {e}")
         return []
@@ -904,18 +1295,17 @@ def update_company_logo(logo_data):
         # إنشاء معرف فريد للشعار
         logo_id = str(uuid.uuid4())
         
-        # حفظ الشعار في ملف
-        logo_path = os.path.join(IMAGES_DIR, f"company_logo_{logo_id}.png")
+        # حفظ الشعار في مخزن المحتوى (إعادة رفع نفس الشعار لا تكلف مساحة إضافية)
+        store_blob(logo_data, f"logo:{logo_id}", ".png")
         
-        # التأكد من وجود المجلد
-        os.makedirs(os.path.dirname(logo_path), exist_ok=True)
-        
-        # حفظ الصورة
-        with open(logo_path, 'wb') as f:
-            f.write(logo_data)
-        
-        # تحديث إعدادات السمة بمعرف الشعار الجديد
+        # تحديث إعدادات السمة بمعرف الشعار الجديد وتحرير الشعار السابق
+        previous_logo_id = get_theme_settings().get("company_logo")
         update_theme_settings({"company_logo": logo_id})
+        if previous_logo_id:
+            release_blob(
+                f"logo:{previous_logo_id}",
+                legacy_path=os.path.join(IMAGES_DIR, f"company_logo_{previous_logo_id}.png")
+            )
         
         return True, logo_id
     except Exception as e:
@@ -940,8 +1330,8 @@ def get_company_logo():
         # استرجاع معرف الشعار
         logo_id = theme_settings["company_logo"]
         
-        # تحديد مسار ملف الشعار
-        logo_path = os.path.join(IMAGES_DIR, f"company_logo_{logo_id}.png")
+        # تحديد مسار ملف الشعار (أو مساره القديم قبل استخدام مخزن المحتوى)
+        logo_path = get_blob_store().path_for(f"logo:{logo_id}") or os.path.join(IMAGES_DIR, f"company_logo_{logo_id}.png")
         
         # التحقق من وجود الملف
         if not os.path.exists(logo_path):
@@ -1011,7 +1401,9 @@ def restore_backup(backup_name):
     try:
         import auto_backup
         backup_path = f"backup/{backup_name}"
-        return auto_backup.restore_backup(backup_path)
+        result = auto_backup.restore_backup(backup_path)
+        _auth_cache.invalidate()
+        return result
     except ImportError:
         import logging
         logging.error("لم يتم العثور على وحدة النسخ الاحتياطي")
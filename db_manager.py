@@ -6,10 +6,15 @@ import logging
 import json
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional, Union, Tuple
-from sqlalchemy import create_engine, func, desc
+from sqlalchemy import create_engine, func, desc, or_, and_, inspect, text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.sql.expression import extract
-from models import Base, Notification, Admin, Statistic, SearchHistory
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Base, Notification, Admin, Statistic, HourlyStatistic, SearchHistory
+from phone_index import phone_search_keys
+from name_index import normalize_name, match_rank
+from stats_rollup import StatisticsRollup, STAT_FIELDS, HOURLY_STAT_FIELDS, DAY_NAMES, sql_weekday
+from stats_buffer import CounterBuffer
+import config
 
 # استخدام URI قاعدة البيانات من المتغيرات البيئية
 DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -216,27 +221,7 @@ def get_delivered_notifications(include_archived: bool = False) -> List[Dict[str
         if not include_archived:
             query = query.filter(Notification.is_archived == False)
             
-        notifications = query.all()
-        
-        result = []
-        for notification in notifications:
-            notification_dict = notification.to_dict()
-            
-            # إضافة معلومات المستخدم الذي أكد التسليم إذا كان متاحاً
-            if notification.delivery_confirmed_by:
-                admin = db.query(Admin).filter(Admin.user_id == notification.delivery_confirmed_by).first()
-                if admin:
-                    notification_dict['confirmed_by_username'] = admin.username
-            
-            # إضافة معلومات المستخدم الذي قام بالأرشفة إذا كان متاحاً
-            if notification.archived_by:
-                admin = db.query(Admin).filter(Admin.user_id == notification.archived_by).first()
-                if admin:
-                    notification_dict['archived_by_username'] = admin.username
-                    
-            result.append(notification_dict)
-            
-        return result
+        return _add_admin_usernames(db, query.all())
     except Exception as e:
         logging.error(f"خطأ أثناء استرجاع الإشعارات المسلمة: {e}")
         return []
@@ -259,18 +244,10 @@ def add_notification(customer_name: str, phone_number: str, notification_id: str
         )
         
         db.add(notification)
+        db.commit()
         
         # تحديث الإحصائيات
-        today = date.today()
-        stats = db.query(Statistic).filter(Statistic.date == today).first()
-        
-        if stats:
-            stats.notifications_created += 1
-        else:
-            stats = Statistic(date=today, notifications_created=1)
-            db.add(stats)
-            
-        db.commit()
+        increment_statistics('notifications_created')
         return True, notification_id
     except Exception as e:
         db.rollback()
@@ -302,6 +279,171 @@ def update_notification(notification_id: str, updates: Dict[str, Any]) -> bool:
     finally:
         db.close()
 
+def _apply_notification_filters(query, filters: Optional[Dict[str, Any]]):
+    """
+    تطبيق مرشحات قائمة الإشعارات على الاستعلام
+    
+    المرشحات المدعومة: created_from (تاريخ أو نص ISO)، delivered، reminder_sent،
+    archived (قيم منطقية)، customer_name (تطابق تام)
+    """
+    filters = filters or {}
+    if filters.get('created_from'):
+        created_from = filters['created_from']
+        if isinstance(created_from, str):
+            created_from = datetime.fromisoformat(created_from)
+        query = query.filter(Notification.created_at >= created_from)
+    if 'delivered' in filters:
+        query = query.filter(Notification.is_delivered == bool(filters['delivered']))
+    if 'reminder_sent' in filters:
+        query = query.filter(Notification.reminder_sent == bool(filters['reminder_sent']))
+    if 'archived' in filters:
+        query = query.filter(Notification.is_archived == bool(filters['archived']))
+    if filters.get('customer_name'):
+        query = query.filter(Notification.customer_name == filters['customer_name'])
+    return query
+
+def _add_admin_usernames(db, notifications: List[Notification]) -> List[Dict[str, Any]]:
+    """تحويل الإشعارات إلى قواميس مع أسماء مؤكدي التسليم والمؤرشفين (استعلام واحد للمسؤولين)"""
+    user_ids = {n.delivery_confirmed_by for n in notifications if n.delivery_confirmed_by}
+    user_ids |= {n.archived_by for n in notifications if n.archived_by}
+    usernames = {}
+    if user_ids:
+        usernames = dict(db.query(Admin.user_id, Admin.username).filter(Admin.user_id.in_(user_ids)).all())
+    
+    result = []
+    for notification in notifications:
+        notification_dict = notification.to_dict()
+        if notification.delivery_confirmed_by in usernames:
+            notification_dict['confirmed_by_username'] = usernames[notification.delivery_confirmed_by]
+        if notification.archived_by in usernames:
+            notification_dict['archived_by_username'] = usernames[notification.archived_by]
+        result.append(notification_dict)
+    return result
+
+def list_notifications(after: Optional[str] = None, before: Optional[str] = None, limit: int = 5,
+                       filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    صفحة من الإشعارات مرتبة من الأحدث إلى الأقدم باستخدام مؤشر (keyset) بدلاً
+    من تحميل جميع الإشعارات: استعلام واحد على فهرس (created_at, id) لكل صفحة.
+    
+    Args:
+        after: معرف آخر إشعار في الصفحة السابقة (للانتقال إلى الصفحة التالية)
+        before: معرف أول إشعار في الصفحة الحالية (للعودة إلى الصفحة السابقة)
+        limit: عدد الإشعارات في الصفحة
+        filters: مرشحات القائمة (انظر _apply_notification_filters)
+    
+    Returns:
+        dict: {'items': الإشعارات، 'has_next': وجود صفحة تالية، 'has_prev': وجود صفحة سابقة}
+    """
+    db = SessionLocal()
+    try:
+        query = _apply_notification_filters(db.query(Notification), filters)
+        
+        cursor_id = after or before
+        if cursor_id:
+            cursor_created_at = db.query(Notification.created_at).filter(
+                Notification.id == cursor_id
+            ).scalar_subquery()
+            if after:
+                query = query.filter(or_(
+                    Notification.created_at < cursor_created_at,
+                    and_(Notification.created_at == cursor_created_at, Notification.id < cursor_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    Notification.created_at > cursor_created_at,
+                    and_(Notification.created_at == cursor_created_at, Notification.id > cursor_id)
+                ))
+        
+        if before:
+            query = query.order_by(Notification.created_at, Notification.id)
+        else:
+            query = query.order_by(desc(Notification.created_at), desc(Notification.id))
+        
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if before:
+            rows.reverse()
+        
+        return {
+            'items': _add_admin_usernames(db, rows),
+            'has_next': has_more if not before else True,
+            'has_prev': has_more if before else bool(after)
+        }
+    except Exception as e:
+        logging.error(f"Error listing notifications: {e}")
+        return {'items': [], 'has_next': False, 'has_prev': False}
+    finally:
+        db.close()
+
+def count_notifications(filters: Optional[Dict[str, Any]] = None) -> int:
+    """
+    عدد الإشعارات المطابقة للمرشحات (انظر list_notifications)
+    """
+    db = SessionLocal()
+    try:
+        query = _apply_notification_filters(db.query(func.count(Notification.id)), filters)
+        return query.scalar() or 0
+    except Exception as e:
+        logging.error(f"Error counting notifications: {e}")
+        return 0
+    finally:
+        db.close()
+
+def count_active_reminders() -> int:
+    """
+    عدد الإشعارات التي لم يُرسل لها تذكير بعد والتذكير فيها غير معطل
+    (reminder_hours الفارغة تعني القيمة الافتراضية 24 ساعة)
+    """
+    db = SessionLocal()
+    try:
+        return db.query(func.count(Notification.id)).filter(
+            or_(Notification.reminder_sent == False, Notification.reminder_sent.is_(None)),
+            or_(Notification.reminder_hours > 0, Notification.reminder_hours.is_(None))
+        ).scalar() or 0
+    except Exception as e:
+        logging.error(f"Error counting active reminders: {e}")
+        return 0
+    finally:
+        db.close()
+
+def get_notification(notification_id: str) -> Optional[Dict[str, Any]]:
+    """
+    الحصول على إشعار واحد بالمعرف
+    """
+    db = SessionLocal()
+    try:
+        notification = db.query(Notification).filter(Notification.id == notification_id).first()
+        if notification is None:
+            return None
+        return _add_admin_usernames(db, [notification])[0]
+    except Exception as e:
+        logging.error(f"Error fetching notification {notification_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_delivered_customers(archived: bool = False) -> List[Tuple[str, int]]:
+    """
+    أسماء الزبائن الذين لديهم شحنات مستلمة مع عدد شحنات كل منهم (استعلام تجميع واحد)
+    
+    Args:
+        archived: الشحنات المؤرشفة بدلاً من غير المؤرشفة
+    """
+    db = SessionLocal()
+    try:
+        rows = _apply_notification_filters(
+            db.query(Notification.customer_name, func.count(Notification.id)),
+            {'delivered': True, 'archived': archived}
+        ).group_by(Notification.customer_name).order_by(Notification.customer_name).all()
+        return [(name, count) for name, count in rows]
+    except Exception as e:
+        logging.error(f"Error fetching delivered customers: {e}")
+        return []
+    finally:
+        db.close()
+
 def get_all_notifications() -> List[Dict[str, Any]]:
     """
     الحصول على جميع الإشعارات من قاعدة البيانات
@@ -318,12 +460,21 @@ def get_all_notifications() -> List[Dict[str, Any]]:
 
 def search_notifications_by_name(name: str) -> List[Dict[str, Any]]:
     """
-    البحث عن الإشعارات باسم العميل
+    البحث عن الإشعارات باسم العميل (مع تجاهل التشكيل والفروق بين أشكال الحروف العربية)
     """
+    normalized = normalize_name(name)
+    if not normalized:
+        return []
+    
     db = SessionLocal()
     try:
-        name_search = f"%{name}%"
-        notifications = db.query(Notification).filter(Notification.customer_name.ilike(name_search)).all()
+        # البحث في العمود الموحد (يخدمه فهرس pg_trgm في PostgreSQL، انظر upgrade_database.py)
+        notifications = db.query(Notification).filter(
+            Notification.customer_name_normalized.contains(normalized, autoescape=True)
+        ).all()
+        
+        # الترتيب من الأقرب: تطابق تام ثم بداية الاسم ثم بداية كلمة
+        notifications.sort(key=lambda n: (match_rank(n.customer_name_normalized, normalized), len(n.customer_name_normalized)))
         return [n.to_dict() for n in notifications]
     except Exception as e:
         logging.error(f"Error searching notifications by name: {e}")
@@ -337,53 +488,33 @@ def search_notifications_by_phone(phone: str) -> List[Dict[str, Any]]:
     هذه الوظيفة تسمح بالبحث المرن عن أرقام الهواتف بغض النظر عن تنسيقها
     (مع أو بدون رمز الدولة، مع أو بدون علامة +)
     """
-    from sqlalchemy import or_
-    import re
-    
-    # التنظيف والتحضير الأولي للرقم
-    # إزالة أي أحرف ليست أرقام
-    cleaned_phone = ''.join(c for c in phone if c.isdigit())
-    
-    # إذا كان الرقم يبدأ بصفر، نقوم بإنشاء نسخة إضافية محتملة مع رمز البلد
-    variants = [cleaned_phone]
+    from sqlalchemy import or_, and_
     
-    # إزالة رمز البلد إذا كان موجوداً للبحث عن الرقم بدون رمز البلد أيضاً
-    if cleaned_phone.startswith('963'):
-        # الرقم بدون رمز البلد (لكن مع الصفر الأول)
-        without_country_code = '0' + cleaned_phone[3:]
-        variants.append(without_country_code)
-    
-    # إذا كان الرقم يبدأ بصفر، نقوم بإضافة نسخة مع رمز البلد
-    elif cleaned_phone.startswith('0'):
-        # الرقم مع رمز البلد (وبدون الصفر الأول)
-        with_country_code = '963' + cleaned_phone[1:]
-        variants.append(with_country_code)
+    # الرقم الموحد يطابق الرقم الكامل بأي صيغة، والأرقام كما أُدخلت تطابق آخر أرقام الهاتف
+    search_keys = phone_search_keys(phone)
+    if not search_keys:
+        return []
     
-    # إذا لم يبدأ الرقم بـ 963 أو 0، نفترض أنه رقم بدون رمز البلد وبدون 0
-    # نضيف نسخًا مع رمز البلد ومع الصفر الأول
-    else:
-        with_country_code = '963' + cleaned_phone
-        with_zero = '0' + cleaned_phone
-        variants.append(with_country_code)
-        variants.append(with_zero)
+    logging.info(f"Searching for phone keys: {search_keys}")
     
-    logging.info(f"Searching for phone variants: {variants}")
+    # كل مفتاح هو لاحقة للرقم الموحد، أي بادئة للعمود المقلوب، فيُبحث عنه
+    # كنطاق يخدمه الفهرس مباشرة (":" هو الحرف التالي لـ "9")
+    filters = []
+    for key in search_keys:
+        reversed_key = key[::-1]
+        filters.append(and_(Notification.phone_reversed >= reversed_key,
+                            Notification.phone_reversed < reversed_key + ":"))
     
     db = SessionLocal()
     try:
-        # بناء استعلام بحث مرن يبحث عن أي من المتغيرات الممكنة
-        filters = []
-        for variant in variants:
-            filters.append(Notification.phone_number.ilike(f"%{variant}%"))
-        
-        # البحث باستخدام OR بين كل المتغيرات
+        # البحث باستخدام OR بين المفاتيح (كل شرط يستخدم الفهرس)
         notifications = db.query(Notification).filter(or_(*filters)).all()
         
         # تسجيل نتائج البحث
         if notifications:
-            logging.info(f"Found {len(notifications)} notifications for phone variants")
+            logging.info(f"Found {len(notifications)} notifications for phone")
         else:
-            logging.info(f"No notifications found for phone variants")
+            logging.info(f"No notifications found for phone")
             
         return [n.to_dict() for n in notifications]
     except Exception as e:
@@ -642,25 +773,7 @@ def get_archived_notifications() -> List[Dict[str, Any]]:
             Notification.is_delivered == True
         ).all()
         
-        result = []
-        for notification in notifications:
-            notification_dict = notification.to_dict()
-            
-            # إضافة معلومات المستخدم الذي أكد التسليم إذا كان متاحاً
-            if notification.delivery_confirmed_by:
-                admin = db.query(Admin).filter(Admin.user_id == notification.delivery_confirmed_by).first()
-                if admin:
-                    notification_dict['confirmed_by_username'] = admin.username
-            
-            # إضافة معلومات المستخدم الذي قام بالأرشفة إذا كان متاحاً
-            if notification.archived_by:
-                admin = db.query(Admin).filter(Admin.user_id == notification.archived_by).first()
-                if admin:
-                    notification_dict['archived_by_username'] = admin.username
-                    
-            result.append(notification_dict)
-            
-        return result
+        return _add_admin_usernames(db, notifications)
     except Exception as e:
         logging.error(f"خطأ أثناء استرجاع الإشعارات المؤرشفة: {e}")
         return []
@@ -668,39 +781,198 @@ def get_archived_notifications() -> List[Dict[str, Any]]:
         if db:
             db.close()
 
-def increment_statistics(stat_type: str, count: int = 1) -> bool:
+def _load_statistics_rollup():
+    """
+    تحميل بيانات مجاميع الإحصائيات: صفوف الإحصائيات اليومية ومجاميع الأحداث
+    لكل (يوم أسبوع، ساعة) من جدول الإحصائيات الساعية (168 صفاً على الأكثر)
     """
-    زيادة إحصائية معينة
+    # كتابة الزيادات المجمعة أولاً حتى لا تختفي من المجاميع بعد إعادة التحميل
+    flush_statistics()
     
-    Args:
-        stat_type: نوع الإحصائية (notifications_created, notifications_reminded, 
-                  messages_sent, images_processed, ocr_success, ocr_failure)
-        count: عدد الزيادة (افتراضياً 1)
+    db = SessionLocal()
+    try:
+        rows = [
+            (stat.date, {field: getattr(stat, field, 0) or 0 for field in STAT_FIELDS})
+            for stat in db.query(Statistic).all()
+            if stat.date
+        ]
+        
+        cells = db.query(
+            HourlyStatistic.weekday,
+            HourlyStatistic.hour,
+            *[func.sum(getattr(HourlyStatistic, field)).label(field) for field in HOURLY_STAT_FIELDS]
+        ).group_by(HourlyStatistic.weekday, HourlyStatistic.hour).all()
+        
+        return rows, {
+            (row.weekday, row.hour): {field: getattr(row, field) or 0 for field in HOURLY_STAT_FIELDS}
+            for row in cells
+        }
+    finally:
+        db.close()
+
+_statistics_rollup = None
+
+def get_statistics_rollup() -> StatisticsRollup:
+    """
+    الحصول على مجاميع الإحصائيات المحفوظة في الذاكرة (يتم إنشاؤها عند أول استخدام)
+    """
+    global _statistics_rollup
+    if _statistics_rollup is None:
+        _statistics_rollup = StatisticsRollup(_load_statistics_rollup, ttl=config.STATS_ROLLUP_TTL)
+    return _statistics_rollup
+
+def _increment_columns(model, increments: Dict[str, int]) -> Dict[Any, Any]:
+    """قيم التحديث col = col + n لعدة أعمدة"""
+    return {
+        getattr(model, stat_type): func.coalesce(getattr(model, stat_type), 0) + count
+        for stat_type, count in increments.items()
+    }
+
+# دوال INSERT ... ON CONFLICT DO UPDATE حسب نوع قاعدة البيانات
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# هل يوجد الفهرس الفريد على تاريخ الإحصائيات؟ (انظر ensure_statistics_date_unique)
+_statistics_date_unique = False
+
+def ensure_statistics_date_unique() -> bool:
+    """
+    التأكد من وجود الفهرس الفريد على تاريخ الإحصائيات الذي تعتمد عليه عبارة upsert
+    (لا تضيفه create_all إلى جدول موجود): دمج صفوف الأيام المكررة في أقدم صف ثم
+    إنشاء الفهرس. حتى ينجح ذلك تُكتب العدادات اليومية بتحديث صف واحد بالمعرف.
+    
+    Returns:
+        bool: True إذا كان الفهرس موجوداً
     """
+    global _statistics_date_unique
+    inspector = inspect(engine)
+    if any(constraint['column_names'] == ['date'] for constraint in inspector.get_unique_constraints('statistics')) \
+            or any(index['unique'] and index['column_names'] == ['date'] for index in inspector.get_indexes('statistics')):
+        _statistics_date_unique = True
+        return True
+    
+    fields = [column.name for column in Statistic.__table__.columns if column.name not in ('id', 'date')]
     db = SessionLocal()
     try:
-        today = date.today()
-        stats = db.query(Statistic).filter(Statistic.date == today).first()
-        
-        if not stats:
-            stats = Statistic(date=today)
-            db.add(stats)
-        
-        if hasattr(stats, stat_type):
-            current_value = getattr(stats, stat_type)
-            # التعامل مع حالة القيمة الفارغة (None)
-            if current_value is None:
-                current_value = 0
-            setattr(stats, stat_type, current_value + count)
-            
+        duplicates = db.query(Statistic.date).filter(Statistic.date.isnot(None)) \
+            .group_by(Statistic.date).having(func.count(Statistic.id) > 1).all()
+        for (day,) in duplicates:
+            rows = db.query(Statistic).filter(Statistic.date == day).order_by(Statistic.id).all()
+            for field in fields:
+                setattr(rows[0], field, sum(getattr(row, field) or 0 for row in rows))
+            for row in rows[1:]:
+                db.delete(row)
+        db.flush()
+        db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_statistics_date ON statistics (date)"))
         db.commit()
-        return True
+        if duplicates:
+            logging.info(f"Merged duplicate statistics rows for {len(duplicates)} day(s)")
+        _statistics_date_unique = True
     except Exception as e:
         db.rollback()
-        logging.error(f"Error incrementing statistics: {e}")
-        return False
+        logging.error(f"Error creating the unique index on statistics.date: {e}")
     finally:
         db.close()
+    return _statistics_date_unique
+
+def _upsert_increments(db, model, keys: Dict[str, Any], increments: Dict[str, int], extra: Dict[str, Any] = None) -> None:
+    """
+    إضافة الزيادات إلى الصف الوحيد المطابق للمفتاح الفريد (keys)، أو إنشاؤه إذا لم
+    يكن موجوداً، في عبارة واحدة (لا تنشئ عمليتان متزامنتان صفين لنفس المفتاح)
+    """
+    insert = _UPSERT_INSERTS.get(engine.dialect.name)
+    if model is Statistic and not _statistics_date_unique:
+        insert = None
+    if insert is not None:
+        statement = insert(model).values(**keys, **(extra or {}), **increments)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                stat_type: func.coalesce(getattr(model, stat_type), 0) + getattr(statement.excluded, stat_type)
+                for stat_type in increments
+            }
+        )
+        db.execute(statement)
+        return
+    
+    # قواعد بيانات أخرى أو جدول بدون الفهرس الفريد: تحديث صف واحد بالمعرف
+    row_id = db.query(model.id).filter_by(**keys).order_by(model.id).limit(1).scalar()
+    if row_id is None:
+        db.add(model(**keys, **(extra or {}), **increments))
+    else:
+        db.query(model).filter(model.id == row_id).update(
+            _increment_columns(model, increments), synchronize_session=False
+        )
+
+def _write_statistics(counts: Dict[Tuple[date, int, str], int]) -> None:
+    """
+    كتابة زيادات العدادات المجمعة: عبارة upsert واحدة (col = col + n) لكل يوم
+    ولكل ساعة (يعتمد على القيد الفريد على التاريخ، انظر ensure_statistics_date_unique)
+    """
+    by_day = {}
+    by_hour = {}
+    for (day, hour, stat_type), count in counts.items():
+        day_increments = by_day.setdefault(day, {})
+        day_increments[stat_type] = day_increments.get(stat_type, 0) + count
+        if stat_type in HOURLY_STAT_FIELDS:
+            by_hour.setdefault((day, hour), {})[stat_type] = count
+    
+    db = SessionLocal()
+    try:
+        for day, increments in by_day.items():
+            _upsert_increments(db, Statistic, {"date": day}, increments)
+        
+        for (day, hour), increments in by_hour.items():
+            _upsert_increments(
+                db, HourlyStatistic, {"date": day, "hour": hour}, increments, extra={"weekday": sql_weekday(day)}
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+_statistics_buffer = None
+
+def get_statistics_buffer() -> CounterBuffer:
+    """
+    الحصول على المخزن المؤقت لعدادات الإحصائيات (يتم إنشاؤه عند أول استخدام)
+    """
+    global _statistics_buffer
+    if _statistics_buffer is None:
+        _statistics_buffer = CounterBuffer(_write_statistics, interval=config.STATS_FLUSH_INTERVAL)
+    return _statistics_buffer
+
+def flush_statistics() -> int:
+    """
+    كتابة زيادات الإحصائيات المجمعة في قاعدة البيانات فوراً
+    
+    Returns:
+        int: عدد العدادات المكتوبة
+    """
+    if _statistics_buffer is None:
+        return 0
+    return _statistics_buffer.flush()
+
+def increment_statistics(stat_type: str, count: int = 1) -> bool:
+    """
+    زيادة إحصائية معينة. تُجمع الزيادات في الذاكرة وتُكتب في قاعدة البيانات
+    كل config.STATS_FLUSH_INTERVAL ثانية وعند إيقاف البرنامج.
+    
+    Args:
+        stat_type: نوع الإحصائية (notifications_created, notifications_reminded, 
+                  messages_sent, images_processed, ocr_success, ocr_failure,
+                  deliveries_confirmed, search_queries)
+        count: عدد الزيادة (افتراضياً 1)
+    """
+    if stat_type not in STAT_FIELDS:
+        logging.warning(f"Unknown statistic type: {stat_type}")
+        return False
+    
+    now = datetime.now()
+    get_statistics_buffer().add((now.date(), now.hour, stat_type), count)
+    get_statistics_rollup().record(stat_type, count, now)
+    return True
 
 def get_daily_statistics(days: int = 7) -> List[Dict[str, Any]]:
     """
@@ -709,32 +981,8 @@ def get_daily_statistics(days: int = 7) -> List[Dict[str, Any]]:
     Args:
         days: عدد الأيام
     """
-    db = None
     try:
-        db = SessionLocal()
-        # تأكد من أن days قيمة إيجابية
-        days = max(1, days)
-        
-        # لنحصل على الإحصائيات موجودة بالفعل
-        stats = db.query(Statistic).order_by(desc(Statistic.date)).limit(days).all()
-        
-        # بيانات القاموس
-        result = []
-        for stat in stats:
-            try:
-                result.append(stat.to_dict())
-            except Exception as dict_error:
-                logging.error(f"Error converting statistic to dict: {dict_error}")
-                # إضافة قاموس بأقل المعلومات الضرورية
-                result.append({
-                    'date': stat.date if hasattr(stat, 'date') else datetime.now().date(),
-                    'notifications_created': 0,
-                    'notifications_reminded': 0,
-                    'messages_sent': 0,
-                    'images_processed': 0
-                })
-                
-        return result
+        return get_statistics_rollup().daily(days)
     except Exception as e:
         logging.error(f"Error getting daily statistics: {e}")
         # إذا كان هناك خطأ، أعد قائمة مع إحصائيات فارغة ليوم واحد
@@ -745,257 +993,84 @@ def get_daily_statistics(days: int = 7) -> List[Dict[str, Any]]:
             'messages_sent': 0,
             'images_processed': 0
         }]
-    finally:
-        if db:
-            try:
-                db.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database connection: {close_error}")
+
+def _summary_fields(values: Dict[str, int]) -> Dict[str, int]:
+    """الحقول المعروضة في ملخصات الإحصائيات"""
+    return {
+        'notifications_created': values.get('notifications_created', 0),
+        'notifications_reminded': values.get('notifications_reminded', 0),
+        'messages_sent': values.get('messages_sent', 0),
+        'images_processed': values.get('images_processed', 0),
+        'ocr_success': values.get('ocr_success', 0),
+        'ocr_failure': values.get('ocr_failure', 0)
+    }
 
 def get_monthly_statistics() -> Dict[str, Any]:
     """
     الحصول على إحصائيات الشهر الحالي
     """
-    db = SessionLocal()
+    current_month = datetime.now().month
+    current_year = datetime.now().year
     try:
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        
-        # استعلام لمجموع إحصائيات الشهر الحالي
-        result = db.query(
-            func.sum(Statistic.notifications_created).label('notifications_created'),
-            func.sum(Statistic.notifications_reminded).label('notifications_reminded'),
-            func.sum(Statistic.messages_sent).label('messages_sent'),
-            func.sum(Statistic.images_processed).label('images_processed'),
-            func.sum(Statistic.ocr_success).label('ocr_success'),
-            func.sum(Statistic.ocr_failure).label('ocr_failure')
-        ).filter(
-            extract('month', Statistic.date) == current_month,
-            extract('year', Statistic.date) == current_year
-        ).first()
-        
-        if result:
-            return {
-                'month': current_month,
-                'year': current_year,
-                'notifications_created': result.notifications_created or 0,
-                'notifications_reminded': result.notifications_reminded or 0,
-                'messages_sent': result.messages_sent or 0,
-                'images_processed': result.images_processed or 0,
-                'ocr_success': result.ocr_success or 0,
-                'ocr_failure': result.ocr_failure or 0
-            }
-        
         return {
             'month': current_month,
             'year': current_year,
-            'notifications_created': 0,
-            'notifications_reminded': 0,
-            'messages_sent': 0,
-            'images_processed': 0,
-            'ocr_success': 0,
-            'ocr_failure': 0
+            **_summary_fields(get_statistics_rollup().month(current_year, current_month))
         }
     except Exception as e:
         logging.error(f"Error getting monthly statistics: {e}")
         return {
-            'month': datetime.now().month,
-            'year': datetime.now().year,
+            'month': current_month,
+            'year': current_year,
             'error': str(e)
         }
-    finally:
-        db.close()
 
 def get_total_statistics() -> Dict[str, Any]:
     """
     الحصول على إجمالي الإحصائيات
     """
-    db = None
     try:
-        db = SessionLocal()
-        # استعلام لمجموع جميع الإحصائيات
-        result = db.query(
-            func.sum(Statistic.notifications_created).label('notifications_created'),
-            func.sum(Statistic.notifications_reminded).label('notifications_reminded'),
-            func.sum(Statistic.messages_sent).label('messages_sent'),
-            func.sum(Statistic.images_processed).label('images_processed'),
-            func.sum(Statistic.ocr_success).label('ocr_success'),
-            func.sum(Statistic.ocr_failure).label('ocr_failure')
-        ).first()
-        
-        if result:
-            return {
-                'notifications_created': result.notifications_created or 0,
-                'notifications_reminded': result.notifications_reminded or 0,
-                'messages_sent': result.messages_sent or 0,
-                'images_processed': result.images_processed or 0,
-                'ocr_success': result.ocr_success or 0,
-                'ocr_failure': result.ocr_failure or 0
-            }
-        
-        return {
-            'notifications_created': 0,
-            'notifications_reminded': 0,
-            'messages_sent': 0,
-            'images_processed': 0,
-            'ocr_success': 0,
-            'ocr_failure': 0
-        }
+        return _summary_fields(get_statistics_rollup().total())
     except Exception as e:
         logging.error(f"Error getting total statistics: {e}")
         # عند حدوث خطأ، نعيد إحصائيات فارغة مع وجود مفتاح خاص للخطأ
-        return {
-            'notifications_created': 0,
-            'notifications_reminded': 0,
-            'messages_sent': 0,
-            'images_processed': 0,
-            'ocr_success': 0,
-            'ocr_failure': 0,
-            'error': str(e)
-        }
-    finally:
-        if db:
-            try:
-                db.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database connection: {close_error}")
+        return {**_summary_fields({}), 'error': str(e)}
 
 def get_weekly_statistics() -> Dict[str, Any]:
     """
-    الحصول على إحصائيات الأسبوع الحالي
+    الحصول على إحصائيات الأسبوع الحالي (الأيام السبعة الماضية واليوم الحالي)
     """
-    db = None
     try:
-        db = SessionLocal()
-        # الحصول على الأيام السبعة الماضية
-        today = date.today()
-        week_ago = today - timedelta(days=7)
-        
-        # استعلام لمجموع إحصائيات الأسبوع الحالي
-        result = db.query(
-            func.sum(Statistic.notifications_created).label('notifications_created'),
-            func.sum(Statistic.notifications_reminded).label('notifications_reminded'),
-            func.sum(Statistic.messages_sent).label('messages_sent'),
-            func.sum(Statistic.images_processed).label('images_processed'),
-            func.sum(Statistic.ocr_success).label('ocr_success'),
-            func.sum(Statistic.ocr_failure).label('ocr_failure')
-        ).filter(
-            Statistic.date >= week_ago,
-            Statistic.date <= today
-        ).first()
-        
-        if result:
-            return {
-                'period': 'weekly',
-                'notifications_created': result.notifications_created or 0,
-                'notifications_reminded': result.notifications_reminded or 0,
-                'messages_sent': result.messages_sent or 0,
-                'images_processed': result.images_processed or 0,
-                'ocr_success': result.ocr_success or 0,
-                'ocr_failure': result.ocr_failure or 0
-            }
-        
-        return {
-            'period': 'weekly',
-            'notifications_created': 0,
-            'notifications_reminded': 0,
-            'messages_sent': 0,
-            'images_processed': 0,
-            'ocr_success': 0,
-            'ocr_failure': 0
-        }
+        return {'period': 'weekly', **_summary_fields(get_statistics_rollup().last_week())}
     except Exception as e:
         logging.error(f"Error getting weekly statistics: {e}")
         # عند حدوث خطأ، نعيد إحصائيات فارغة مع رسالة الخطأ
-        return {
-            'period': 'weekly',
-            'notifications_created': 0,
-            'notifications_reminded': 0,
-            'messages_sent': 0,
-            'images_processed': 0,
-            'ocr_success': 0,
-            'ocr_failure': 0,
-            'error': str(e)
-        }
-    finally:
-        if db:
-            try:
-                db.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database connection: {close_error}")
+        return {'period': 'weekly', **_summary_fields({}), 'error': str(e)}
+
+def _success_rates(values: Dict[str, int]) -> Dict[str, float]:
+    """حساب معدلات نجاح الرسائل والتذكيرات من مجاميع فترة"""
+    created = values.get('notifications_created', 0)
+    message_rate = 0
+    reminder_rate = 0
+    if created > 0:
+        message_rate = (values.get('messages_sent', 0) / created) * 100
+        reminder_rate = (values.get('notifications_reminded', 0) / created) * 100
+    return {
+        'message_success_rate': round(message_rate, 2),
+        'reminder_success_rate': round(reminder_rate, 2)
+    }
 
 def get_success_rates() -> Dict[str, Any]:
     """
     الحصول على معدلات نجاح إرسال الرسائل والتذكيرات
     """
-    db = None
     try:
-        db = SessionLocal()
-        # اليومي
-        today = date.today()
-        daily_stats = db.query(Statistic).filter(Statistic.date == today).first()
-        
-        # الأسبوعي
-        week_ago = today - timedelta(days=7)
-        weekly_result = db.query(
-            func.sum(Statistic.notifications_created).label('notifications_created'),
-            func.sum(Statistic.notifications_reminded).label('notifications_reminded'),
-            func.sum(Statistic.messages_sent).label('messages_sent')
-        ).filter(
-            Statistic.date >= week_ago,
-            Statistic.date <= today
-        ).first()
-        
-        # الشهري
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        monthly_result = db.query(
-            func.sum(Statistic.notifications_created).label('notifications_created'),
-            func.sum(Statistic.notifications_reminded).label('notifications_reminded'),
-            func.sum(Statistic.messages_sent).label('messages_sent')
-        ).filter(
-            extract('month', Statistic.date) == current_month,
-            extract('year', Statistic.date) == current_year
-        ).first()
-        
-        # حساب معدلات النجاح
-        daily_message_rate = 0
-        daily_reminder_rate = 0
-        if daily_stats:
-            if daily_stats.notifications_created > 0:
-                daily_message_rate = (daily_stats.messages_sent / daily_stats.notifications_created) * 100
-            if daily_stats.notifications_reminded > 0 and daily_stats.notifications_created > 0:
-                daily_reminder_rate = (daily_stats.notifications_reminded / daily_stats.notifications_created) * 100
-        
-        weekly_message_rate = 0
-        weekly_reminder_rate = 0
-        if weekly_result and weekly_result.notifications_created:
-            if weekly_result.notifications_created > 0:
-                weekly_message_rate = (weekly_result.messages_sent / weekly_result.notifications_created) * 100
-            if weekly_result.notifications_reminded > 0 and weekly_result.notifications_created > 0:
-                weekly_reminder_rate = (weekly_result.notifications_reminded / weekly_result.notifications_created) * 100
-        
-        monthly_message_rate = 0
-        monthly_reminder_rate = 0
-        if monthly_result and monthly_result.notifications_created:
-            if monthly_result.notifications_created > 0:
-                monthly_message_rate = (monthly_result.messages_sent / monthly_result.notifications_created) * 100
-            if monthly_result.notifications_reminded > 0 and monthly_result.notifications_created > 0:
-                monthly_reminder_rate = (monthly_result.notifications_reminded / monthly_result.notifications_created) * 100
-        
+        rollup = get_statistics_rollup()
+        now = datetime.now()
         return {
-            'daily': {
-                'message_success_rate': round(daily_message_rate, 2),
-                'reminder_success_rate': round(daily_reminder_rate, 2)
-            },
-            'weekly': {
-                'message_success_rate': round(weekly_message_rate, 2),
-                'reminder_success_rate': round(weekly_reminder_rate, 2)
-            },
-            'monthly': {
-                'message_success_rate': round(monthly_message_rate, 2),
-                'reminder_success_rate': round(monthly_reminder_rate, 2)
-            }
+            'daily': _success_rates(rollup.day(now.date())),
+            'weekly': _success_rates(rollup.last_week()),
+            'monthly': _success_rates(rollup.month(now.year, now.month))
         }
     except Exception as e:
         logging.error(f"Error getting success rates: {e}")
@@ -1006,69 +1081,18 @@ def get_success_rates() -> Dict[str, Any]:
             'monthly': {'message_success_rate': 0, 'reminder_success_rate': 0},
             'error': str(e)
         }
-    finally:
-        if db:
-            try:
-                db.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database connection: {close_error}")
 
 def get_peak_usage_times() -> Dict[str, Any]:
     """
-    الحصول على أوقات الذروة في استخدام البوت
-    
-    ملاحظة: هذه الدالة محاكاة بسيطة. للتنفيذ الحقيقي، يجب إضافة عمود 'hour' إلى جدول الإحصائيات 
-    وحساب الإحصائيات على مستوى الساعة.
+    الحصول على أوقات الذروة في استخدام البوت (حسب أوقات إنشاء الإشعارات في
+    جدول الإحصائيات الساعية)
     """
-    db = None
     try:
-        db = SessionLocal()
-        # نحتاج إلى استخدام بيانات وقت إنشاء الإشعارات لتحليل أوقات الذروة
-        # هذه مجرد شيفرة تمثيلية وتحتاج إلى تحسين في الإنتاج الفعلي
-        
-        # الحصول على توزيع الإشعارات حسب اليوم
-        day_distribution = db.query(
-            extract('dow', Notification.created_at).label('day_of_week'),
-            func.count().label('count')
-        ).group_by('day_of_week').order_by('day_of_week').all()
-        
-        # تحويل النتائج إلى قاموس
-        day_data = {}
-        for day in day_distribution:
-            day_name = ['الأحد', 'الإثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت'][int(day.day_of_week)]
-            day_data[day_name] = day.count
-        
-        # الحصول على توزيع الإشعارات حسب الساعة
-        hour_distribution = db.query(
-            extract('hour', Notification.created_at).label('hour'),
-            func.count().label('count')
-        ).group_by('hour').order_by('hour').all()
-        
-        # تحويل النتائج إلى قاموس
-        hour_data = {}
-        for hour in hour_distribution:
-            hour_data[f"{int(hour.hour)}:00"] = hour.count
+        hour_data, day_data = get_statistics_rollup().distributions()
         
         # تحديد وقت الذروة (الساعة والأيام الأكثر نشاطًا)
-        peak_hour = None
-        peak_hour_count = 0
-        for hour, count in hour_data.items():
-            if count > peak_hour_count:
-                peak_hour = hour
-                peak_hour_count = count
-        
-        peak_day = None
-        peak_day_count = 0
-        for day, count in day_data.items():
-            if count > peak_day_count:
-                peak_day = day
-                peak_day_count = count
-        
-        # في حالة عدم وجود بيانات
-        if not peak_hour:
-            peak_hour = "غير متوفر"
-        if not peak_day:
-            peak_day = "غير متوفر"
+        peak_hour = max(hour_data, key=hour_data.get) if hour_data else "غير متوفر"
+        peak_day = max(day_data, key=day_data.get) if day_data else "غير متوفر"
         
         return {
             'peak_hour': peak_hour,
@@ -1086,12 +1110,44 @@ def get_peak_usage_times() -> Dict[str, Any]:
             'daily_distribution': {},
             'error': str(e)
         }
+
+def get_hourly_statistics(days: int = 1) -> List[Dict[str, Any]]:
+    """
+    الحصول على إحصائيات الأحداث لكل ساعة في الأيام الأخيرة (24 × days صفاً على الأكثر)
+    
+    Args:
+        days: عدد الأيام بما فيها اليوم الحالي
+    """
+    flush_statistics()
+    db = SessionLocal()
+    try:
+        start = date.today() - timedelta(days=max(1, days) - 1)
+        rows = db.query(HourlyStatistic).filter(HourlyStatistic.date >= start).order_by(
+            HourlyStatistic.date, HourlyStatistic.hour
+        ).all()
+        return [row.to_dict() for row in rows]
+    except Exception as e:
+        logging.error(f"Error getting hourly statistics: {e}")
+        return []
     finally:
-        if db:
-            try:
-                db.close()
-            except Exception as close_error:
-                logging.error(f"Error closing database connection: {close_error}")
+        db.close()
+
+def get_usage_heatmap(stat_type: str = 'notifications_created') -> Dict[str, Any]:
+    """
+    الحصول على خريطة الاستخدام حسب يوم الأسبوع والساعة
+    
+    Args:
+        stat_type: نوع الحدث (notifications_created, notifications_reminded,
+                  messages_sent, search_queries)
+    
+    Returns:
+        dict: {'days': أسماء الأيام، 'grid': 7 قوائم في كل منها 24 عدداً}
+    """
+    try:
+        return {'days': DAY_NAMES, 'grid': get_statistics_rollup().heatmap(stat_type)}
+    except Exception as e:
+        logging.error(f"Error getting usage heatmap: {e}")
+        return {'days': DAY_NAMES, 'grid': [[0] * 24 for _ in range(7)], 'error': str(e)}
 
 def get_aggregated_statistics() -> Dict[str, Any]:
     """
@@ -1221,6 +1277,12 @@ def create_test_statistics():
             except Exception as close_error:
                 logging.error(f"خطأ أثناء إغلاق اتصال قاعدة البيانات: {close_error}")
 
+# التأكد من الفهرس الفريد على تاريخ الإحصائيات قبل أول كتابة للعدادات
+try:
+    ensure_statistics_date_unique()
+except Exception as e:
+    logging.error(f"Error checking statistics indexes: {e}")
+
 # محاولة نقل البيانات من JSON إلى SQL عند استيراد الوحدة
 try:
     migrate_json_to_db()
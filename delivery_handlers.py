@@ -2,7 +2,6 @@
 وحدة معالجة تأكيد استلام الطلبات
 """
 import logging
-import os
 from datetime import datetime
 from typing import Dict, Any
 
@@ -12,10 +11,9 @@ from telegram.ext import (
     filters, CallbackQueryHandler
 )
 
-import db_manager
+from async_db import adb, asql
 import strings
 import utils
-from database import save_image
 
 # حالات المحادثة لتأكيد الاستلام
 (
@@ -66,6 +64,9 @@ DELIVERY_CANCEL = "delivery_cancel"
 DELIVERY_LIST = "delivery_list"
 DELIVERY_BACK = "delivery_back"
 
+# عدد الشحنات في كل صفحة من قوائم الشحنات المستلمة والمؤرشفة
+DELIVERED_PAGE_SIZE = 10
+
 async def confirm_delivery_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """بدء عملية تأكيد استلام الشحنة"""
     user_id = update.effective_user.id
@@ -144,7 +145,7 @@ async def customer_name_handler(update: Update, context: ContextTypes.DEFAULT_TY
     context.user_data["confirm_delivery"]["customer_name"] = customer_name
     
     # البحث عن الإشعارات بالاسم
-    notifications = db_manager.search_notifications_by_name(customer_name)
+    notifications = await asql.search_notifications_by_name(customer_name)
     
     # معالجة نتائج البحث
     return await handle_search_results(update, context, notifications, customer_name)
@@ -167,7 +168,7 @@ async def phone_number_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     formatted_phone = utils.format_phone_number(phone_number)
     
     # البحث عن الإشعارات برقم الهاتف
-    notifications = db_manager.search_notifications_by_phone(formatted_phone)
+    notifications = await asql.search_notifications_by_phone(formatted_phone)
     
     # معالجة نتائج البحث
     return await handle_search_results(update, context, notifications, formatted_phone)
@@ -263,12 +264,9 @@ async def show_notification_details(update: Update, context: ContextTypes.DEFAUL
     if notification.get("has_image", False):
         try:
             # محاولة استرجاع الصورة
-            image_path = f"data/images/{notification_id}.jpg"
-            if os.path.exists(image_path):
-                await update.message.reply_photo(
-                    photo=open(image_path, "rb"),
-                    caption=details
-                )
+            image_path = await adb.get_image_path(notification_id)
+            if image_path:
+                await utils.send_notification_preview(update, context, notification_id, image_path, caption=details)
             else:
                 # إرسال النص فقط إذا لم تكن الصورة متوفرة
                 await update.message.reply_text(details)
@@ -304,8 +302,7 @@ async def notification_selected_handler(update: Update, context: ContextTypes.DE
         context.user_data["confirm_delivery"]["notification_id"] = notification_id
         
         # البحث عن الإشعار في قاعدة البيانات
-        notifications = db_manager.get_all_notifications()
-        notification = next((n for n in notifications if n["id"] == notification_id), None)
+        notification = await asql.get_notification(notification_id)
         
         if notification:
             try:
@@ -385,10 +382,10 @@ async def proof_image_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         
         # حفظ صورة دليل التسليم
         proof_image_id = f"{notification_id}_proof"
-        save_image(image_bytes, proof_image_id)
+        await adb.save_image(image_bytes, proof_image_id)
         
         # تحديث قاعدة البيانات
-        db_manager.add_delivery_proof_image(notification_id, True)
+        await asql.add_delivery_proof_image(notification_id, True)
         
         # حفظ معلومات الصورة في السياق
         context.user_data["confirm_delivery"]["has_proof_image"] = True
@@ -434,8 +431,7 @@ async def notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["confirm_delivery"]["notes"] = notes
     
     # عرض ملخص التأكيد للموافقة النهائية
-    notification = db_manager.get_all_notifications()
-    notification = next((n for n in notification if n["id"] == notification_id), None)
+    notification = await asql.get_notification(notification_id)
     
     if notification:
         summary = strings.DELIVERY_CONFIRMATION_SUMMARY.format(
@@ -500,7 +496,7 @@ async def confirm_delivery_final_handler(update: Update, context: ContextTypes.D
             notes = context.user_data["confirm_delivery"].get("notes", "")
         
         # تحديث حالة الإشعار إلى "تم التسليم"
-        success = db_manager.mark_as_delivered(notification_id, user_id, notes)
+        success = await asql.mark_as_delivered(notification_id, user_id, notes)
         
         if success:
             # إشعار المستخدم بنجاح العملية
@@ -570,11 +566,10 @@ async def notify_admins_about_delivery(context: ContextTypes.DEFAULT_TYPE, notif
     """إرسال إشعار للمسؤولين الآخرين حول تأكيد التسليم"""
     try:
         # الحصول على معلومات المسؤولين
-        admins = db_manager.get_all_admins()
+        admins = await asql.get_all_admins()
         
         # الحصول على معلومات الإشعار
-        notifications = db_manager.get_all_notifications()
-        notification = next((n for n in notifications if n["id"] == notification_id), None)
+        notification = await asql.get_notification(notification_id)
         
         if notification and admins:
             # اسم المستخدم الذي أكد التسليم
@@ -602,45 +597,44 @@ async def notify_admins_about_delivery(context: ContextTypes.DEFAULT_TYPE, notif
     except Exception as e:
         logging.error(f"خطأ في إشعار المسؤولين عن تأكيد التسليم: {e}")
 
+def _more_button(items, has_next, callback_prefix):
+    """زر تحميل الصفحة التالية بدءاً من بعد آخر شحنة معروضة، أو None"""
+    if not has_next or not items:
+        return None
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("⬇️ عرض المزيد", callback_data=f"{callback_prefix}:{items[-1]['id']}")
+    ]])
+
 async def list_delivered_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """عرض قائمة الشحنات المؤكدة الاستلام"""
     user_id = update.effective_user.id
-    is_admin = db_manager.is_admin(user_id)
+    is_admin = await asql.is_admin(user_id)
     
-    # التعامل مع الاستدعاء من زر العودة (callback query)
+    # التعامل مع الاستدعاء من زر العودة أو زر عرض المزيد (callback query)
+    after = None
     if update.callback_query:
         query = update.callback_query
         await query.answer()
         message_method = query.message.reply_text
+        if query.data.startswith("delivered_page:"):
+            after = query.data.split(":", 1)[1]
     else:
         message_method = update.message.reply_text
     
-    # الحصول على قائمة الإشعارات المسلمة
-    delivered = db_manager.get_delivered_notifications()
-    
-    if not delivered:
-        # لا توجد إشعارات مسلمة
-        await message_method(strings.NO_DELIVERED_NOTIFICATIONS)
-        return
-    
-    # للمسؤولين: عرض قائمة مرتبة حسب أسماء الزبائن
-    if is_admin:
-        # فرز الإشعارات حسب أسماء العملاء
-        delivered.sort(key=lambda x: x["customer_name"])
+    # للمسؤولين: عرض قائمة الزبائن مع عدد الشحنات المستلمة لكل منهم (استعلام تجميع واحد)
+    if is_admin and after is None:
+        customers = await asql.get_delivered_customers()
         
-        # تجميع الإشعارات حسب اسم العميل
-        customer_groups = {}
-        for notification in delivered:
-            customer_name = notification["customer_name"]
-            if customer_name not in customer_groups:
-                customer_groups[customer_name] = []
-            customer_groups[customer_name].append(notification)
+        if not customers:
+            # لا توجد إشعارات مسلمة
+            await message_method(strings.NO_DELIVERED_NOTIFICATIONS)
+            return
         
         # إنشاء قائمة أزرار لكل زبون
         keyboard = []
-        for customer_name, notifications in customer_groups.items():
+        for customer_name, count in customers:
             # إضافة زر لكل زبون مع عدد الشحنات المستلمة له
-            button_text = f"📦 {customer_name} ({len(notifications)} شحنة)"
+            button_text = f"📦 {customer_name} ({count} شحنة)"
             callback_data = f"delivered_customer:{customer_name}"
             keyboard.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
         
@@ -649,59 +643,88 @@ async def list_delivered_notifications(update: Update, context: ContextTypes.DEF
         
         # إرسال ملخص إجمالي مع أزرار الزبائن
         reply_markup = InlineKeyboardMarkup(keyboard)
-        summary_text = "📋 قائمة الزبائن الذين لديهم شحنات مستلمة ({} شحنة):\n\nاضغط على اسم الزبون لعرض تفاصيل وصور إثباتات الاستلام الخاصة به:".format(len(delivered))
+        summary_text = "📋 قائمة الزبائن الذين لديهم شحنات مستلمة ({} شحنة):\n\nاضغط على اسم الزبون لعرض تفاصيل وصور إثباتات الاستلام الخاصة به:".format(
+            sum(count for _, count in customers)
+        )
         
         await message_method(summary_text, reply_markup=reply_markup)
+        return
     
-    # للمستخدمين العاديين: عرض القائمة العادية
-    else:
-        # إنشاء نص القائمة
-        list_text = strings.DELIVERED_NOTIFICATIONS_HEADER.format(count=len(delivered))
+    # للمستخدمين العاديين: عرض القائمة العادية صفحة بصفحة
+    delivered_filters = {'delivered': True, 'archived': False}
+    page = await asql.list_notifications(after=after, limit=DELIVERED_PAGE_SIZE, filters=delivered_filters)
+    
+    if not page['items']:
+        # لا توجد إشعارات مسلمة
+        await message_method(strings.NO_DELIVERED_NOTIFICATIONS)
+        return
+    
+    # إنشاء نص القائمة
+    list_text = ""
+    if after is None:
+        list_text = strings.DELIVERED_NOTIFICATIONS_HEADER.format(
+            count=await asql.count_notifications(delivered_filters)
+        )
+    
+    start_index = context.user_data.get("delivered_page_index", 0) + 1 if after else 1
+    for i, notification in enumerate(page['items'], start_index):
+        customer_name = notification["customer_name"]
+        phone_number = notification["phone_number"]
         
-        for i, notification in enumerate(delivered, 1):
-            customer_name = notification["customer_name"]
-            phone_number = notification["phone_number"]
-            
-            delivered_at = "غير معروف"
-            if notification.get("delivery_confirmed_at"):
-                delivered_at = datetime.fromisoformat(notification["delivery_confirmed_at"]).strftime("%Y-%m-%d %H:%M")
-            
-            confirmed_by = notification.get("confirmed_by_username", "غير معروف")
-            
-            list_text += strings.DELIVERED_NOTIFICATION_ITEM.format(
-                index=i,
-                customer_name=customer_name,
-                phone_number=phone_number,
-                delivered_at=delivered_at,
-                confirmed_by=confirmed_by
-            )
+        delivered_at = "غير معروف"
+        if notification.get("delivery_confirmed_at"):
+            delivered_at = datetime.fromisoformat(notification["delivery_confirmed_at"]).strftime("%Y-%m-%d %H:%M")
         
-        # إرسال القائمة
-        await update.message.reply_text(list_text)
+        confirmed_by = notification.get("confirmed_by_username", "غير معروف")
+        
+        list_text += strings.DELIVERED_NOTIFICATION_ITEM.format(
+            index=i,
+            customer_name=customer_name,
+            phone_number=phone_number,
+            delivered_at=delivered_at,
+            confirmed_by=confirmed_by
+        )
+    context.user_data["delivered_page_index"] = start_index + len(page['items']) - 1
+    
+    # إرسال القائمة
+    await message_method(list_text, reply_markup=_more_button(page['items'], page['has_next'], "delivered_page"))
 
 async def handle_delivered_customer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """التعامل مع اختيار زبون معين من قائمة الزبائن الذين لديهم إشعارات مستلمة"""
     query = update.callback_query
     await query.answer()
 
-    # الحصول على اسم الزبون من callback_data
-    customer_name = query.data.split(":")[1]
-    
-    # الحصول على جميع إشعارات هذا الزبون المستلمة
-    delivered = db_manager.get_delivered_notifications()
+    # الحصول على اسم الزبون من callback_data، أو من آخر شحنة معروضة عند طلب المزيد
+    after = None
+    if query.data.startswith("delivered_customer_more:"):
+        after = query.data.split(":", 1)[1]
+        cursor_notification = await asql.get_notification(after)
+        if not cursor_notification:
+            await query.message.reply_text("⚠️ لم يتم العثور على الإشعار المطلوب.")
+            return
+        customer_name = cursor_notification["customer_name"]
+    else:
+        customer_name = query.data.split(":", 1)[1]
     
-    # فلترة الإشعارات حسب اسم الزبون
-    customer_notifications = [n for n in delivered if n["customer_name"] == customer_name]
+    # الحصول على صفحة من إشعارات هذا الزبون المستلمة
+    customer_filters = {'delivered': True, 'archived': False, 'customer_name': customer_name}
+    page = await asql.list_notifications(after=after, limit=DELIVERED_PAGE_SIZE, filters=customer_filters)
+    customer_notifications = page['items']
     
     if not customer_notifications:
         await query.message.reply_text(f"لم يتم العثور على إشعارات مستلمة للزبون {customer_name}.")
         return
     
     # إرسال رسالة تفاصيل المجموعة
-    await query.message.reply_text(f"🔹 تفاصيل طلبات {customer_name} المستلمة ({len(customer_notifications)} شحنة):")
+    if after is None:
+        total = await asql.count_notifications(customer_filters)
+        await query.message.reply_text(f"🔹 تفاصيل طلبات {customer_name} المستلمة ({total} شحنة):")
+        context.user_data["delivered_customer_index"] = 0
+    start_index = context.user_data.get("delivered_customer_index", 0) + 1
+    context.user_data["delivered_customer_index"] = start_index + len(customer_notifications) - 1
     
     # إرسال تفاصيل كل إشعار مع زر الأرشفة
-    for i, notification in enumerate(customer_notifications, 1):
+    for i, notification in enumerate(customer_notifications, start_index):
         notification_id = notification["id"]
         phone_number = notification["phone_number"]
         delivered_at = "غير معروف"
@@ -722,8 +745,8 @@ async def handle_delivered_customer(update: Update, context: ContextTypes.DEFAUL
         reply_markup = InlineKeyboardMarkup([[archive_button]])
         
         # إرسال صورة إثبات الاستلام إذا وجدت
-        proof_image_path = f"data/images/{notification_id}_proof.jpg"
-        if os.path.exists(proof_image_path):
+        proof_image_path = await adb.get_image_path(f"{notification_id}_proof")
+        if proof_image_path:
             try:
                 await query.message.reply_photo(
                     photo=open(proof_image_path, "rb"),
@@ -744,11 +767,16 @@ async def handle_delivered_customer(update: Update, context: ContextTypes.DEFAUL
                 reply_markup=reply_markup
             )
     
-    # إضافة زر العودة إلى القائمة الرئيسية
-    back_button = InlineKeyboardButton("🔙 العودة للقائمة الرئيسية", callback_data="back_to_delivered_list")
+    # إضافة زر عرض المزيد وزر العودة إلى القائمة الرئيسية
+    keyboard = []
+    if page['has_next']:
+        keyboard.append([InlineKeyboardButton(
+            "⬇️ عرض المزيد", callback_data=f"delivered_customer_more:{customer_notifications[-1]['id']}"
+        )])
+    keyboard.append([InlineKeyboardButton("🔙 العودة للقائمة الرئيسية", callback_data="back_to_delivered_list")])
     await query.message.reply_text(
         "استخدم الأزرار أعلاه لأرشفة الإشعارات بعد التحقق منها.",
-        reply_markup=InlineKeyboardMarkup([[back_button]])
+        reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
 async def handle_archive_notification(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -761,7 +789,7 @@ async def handle_archive_notification(update: Update, context: ContextTypes.DEFA
     user_id = update.effective_user.id
     
     # أرشفة الإشعار
-    success = db_manager.archive_notification(notification_id, user_id)
+    success = await asql.archive_notification(notification_id, user_id)
     
     if success:
         # تحديث رسالة الزر ليظهر أنه تمت الأرشفة
@@ -775,74 +803,75 @@ async def handle_archive_notification(update: Update, context: ContextTypes.DEFA
         await query.message.reply_text("❌ حدث خطأ أثناء أرشفة الإشعار. يرجى المحاولة مرة أخرى.")
 
 async def handle_show_archived(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """عرض الإشعارات المؤرشفة"""
+    """عرض الإشعارات المؤرشفة (صفحة بصفحة من الأحدث إلى الأقدم)"""
     query = update.callback_query
     await query.answer()
     
-    # الحصول على الإشعارات المؤرشفة
-    archived = db_manager.get_archived_notifications()
+    after = query.data.split(":", 1)[1] if ":" in query.data else None
+    archived_filters = {'delivered': True, 'archived': True}
+    
+    # الحصول على صفحة من الإشعارات المؤرشفة
+    page = await asql.list_notifications(after=after, limit=DELIVERED_PAGE_SIZE, filters=archived_filters)
     
-    if not archived:
+    if not page['items']:
         await query.message.reply_text("لا توجد إشعارات مؤرشفة.")
         return
     
-    # تجميع الإشعارات حسب اسم العميل
-    customer_groups = {}
-    for notification in archived:
-        customer_name = notification["customer_name"]
-        if customer_name not in customer_groups:
-            customer_groups[customer_name] = []
-        customer_groups[customer_name].append(notification)
-    
-    # إرسال ملخص إجمالي
-    summary_text = f"🗄️ قائمة الشحنات المؤرشفة ({len(archived)} شحنة):\n\n"
-    for customer_name, notifications in customer_groups.items():
-        summary_text += f"🔹 {customer_name} ({len(notifications)} شحنة)\n"
-    
-    # إنشاء أزرار للعودة
-    back_button = InlineKeyboardButton("🔙 العودة للقائمة الرئيسية", callback_data="back_to_delivered_list")
+    if after is None:
+        # إرسال ملخص إجمالي بعدد الشحنات المؤرشفة لكل زبون (استعلام تجميع واحد)
+        customers = await asql.get_delivered_customers(archived=True)
+        summary_text = f"🗄️ قائمة الشحنات المؤرشفة ({sum(count for _, count in customers)} شحنة):\n\n"
+        for customer_name, count in customers:
+            summary_text += f"🔹 {customer_name} ({count} شحنة)\n"
+        
+        # إنشاء أزرار للعودة
+        back_button = InlineKeyboardButton("🔙 العودة للقائمة الرئيسية", callback_data="back_to_delivered_list")
+        
+        await query.message.reply_text(
+            summary_text,
+            reply_markup=InlineKeyboardMarkup([[back_button]])
+        )
+        context.user_data["archived_page_index"] = 0
     
-    await query.message.reply_text(
-        summary_text,
-        reply_markup=InlineKeyboardMarkup([[back_button]])
-    )
+    # إرسال تفاصيل شحنات الصفحة
+    start_index = context.user_data.get("archived_page_index", 0) + 1
+    context.user_data["archived_page_index"] = start_index + len(page['items']) - 1
+    for i, notification in enumerate(page['items'], start_index):
+        customer_name = notification["customer_name"]
+        notification_id = notification["id"]
+        phone_number = notification["phone_number"]
+        delivered_at = "غير معروف"
+        if notification.get("delivery_confirmed_at"):
+            delivered_at = datetime.fromisoformat(notification["delivery_confirmed_at"]).strftime("%Y-%m-%d %H:%M")
+        
+        archived_at = "غير معروف"
+        if notification.get("archived_at"):
+            archived_at = datetime.fromisoformat(notification["archived_at"]).strftime("%Y-%m-%d %H:%M")
+        
+        confirmed_by = notification.get("confirmed_by_username", "غير معروف")
+        archived_by = notification.get("archived_by_username", "غير معروف")
+        
+        detail_text = f"{i}. هاتف: {phone_number}\n"
+        detail_text += f"⏱ تاريخ الاستلام: {delivered_at}\n"
+        detail_text += f"👤 بواسطة: {confirmed_by}\n"
+        detail_text += f"📂 تاريخ الأرشفة: {archived_at}\n"
+        detail_text += f"👤 تمت الأرشفة بواسطة: {archived_by}"
+        
+        # إنشاء زر إلغاء الأرشفة
+        unarchive_button = InlineKeyboardButton(
+            "↩️ إلغاء الأرشفة", 
+            callback_data=f"unarchive_notification:{notification_id}"
+        )
+        reply_markup = InlineKeyboardMarkup([[unarchive_button]])
+        
+        await query.message.reply_text(
+            f"🗄️ {customer_name}\n{detail_text}",
+            reply_markup=reply_markup
+        )
     
-    # إرسال تفاصيل كل مجموعة
-    for customer_name, notifications in customer_groups.items():
-        # إرسال رسالة تفاصيل المجموعة
-        await query.message.reply_text(f"🗄️ تفاصيل طلبات {customer_name} المؤرشفة ({len(notifications)} شحنة):")
-        
-        for i, notification in enumerate(notifications, 1):
-            notification_id = notification["id"]
-            phone_number = notification["phone_number"]
-            delivered_at = "غير معروف"
-            if notification.get("delivery_confirmed_at"):
-                delivered_at = datetime.fromisoformat(notification["delivery_confirmed_at"]).strftime("%Y-%m-%d %H:%M")
-            
-            archived_at = "غير معروف"
-            if notification.get("archived_at"):
-                archived_at = datetime.fromisoformat(notification["archived_at"]).strftime("%Y-%m-%d %H:%M")
-            
-            confirmed_by = notification.get("confirmed_by_username", "غير معروف")
-            archived_by = notification.get("archived_by_username", "غير معروف")
-            
-            detail_text = f"{i}. هاتف: {phone_number}\n"
-            detail_text += f"⏱ تاريخ الاستلام: {delivered_at}\n"
-            detail_text += f"👤 بواسطة: {confirmed_by}\n"
-            detail_text += f"📂 تاريخ الأرشفة: {archived_at}\n"
-            detail_text += f"👤 تمت الأرشفة بواسطة: {archived_by}"
-            
-            # إنشاء زر إلغاء الأرشفة
-            unarchive_button = InlineKeyboardButton(
-                "↩️ إلغاء الأرشفة", 
-                callback_data=f"unarchive_notification:{notification_id}"
-            )
-            reply_markup = InlineKeyboardMarkup([[unarchive_button]])
-            
-            await query.message.reply_text(
-                f"🗄️ {customer_name}\n{detail_text}",
-                reply_markup=reply_markup
-            )
+    more = _more_button(page['items'], page['has_next'], "show_archived_deliveries")
+    if more:
+        await query.message.reply_text("لعرض الشحنات المؤرشفة الأقدم:", reply_markup=more)
 
 async def handle_unarchive_notification(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """التعامل مع طلب إلغاء أرشفة إشعار"""
@@ -853,7 +882,7 @@ async def handle_unarchive_notification(update: Update, context: ContextTypes.DE
     notification_id = query.data.split(":")[1]
     
     # إلغاء أرشفة الإشعار
-    success = db_manager.unarchive_notification(notification_id)
+    success = await asql.unarchive_notification(notification_id)
     
     if success:
         # تحديث رسالة الزر ليظهر أنه تم إلغاء الأرشفة
@@ -925,9 +954,9 @@ def get_delivery_handlers():
         delivery_conv_handler,
         CommandHandler("delivered", list_delivered_notifications),
         MessageHandler(filters.Regex(f"^{strings.LIST_DELIVERED_BUTTON}$"), list_delivered_notifications),
-        CallbackQueryHandler(handle_delivered_customer, pattern="^delivered_customer:"),
-        CallbackQueryHandler(handle_show_archived, pattern="^show_archived_deliveries$"),
+        CallbackQueryHandler(handle_delivered_customer, pattern="^delivered_customer(_more)?:"),
+        CallbackQueryHandler(handle_show_archived, pattern="^show_archived_deliveries(:|$)"),
         CallbackQueryHandler(handle_archive_notification, pattern="^archive_notification:"),
         CallbackQueryHandler(handle_unarchive_notification, pattern="^unarchive_notification:"),
-        CallbackQueryHandler(list_delivered_notifications, pattern="^back_to_delivered_list$")
+        CallbackQueryHandler(list_delivered_notifications, pattern="^(back_to_delivered_list$|delivered_page:)")
     ]
\ No newline at end of file
@@ -10,6 +10,7 @@ from telegram.ext import (
 )
 
 import database as db
+from async_db import adb
 import strings as st
 import utils
 
@@ -134,48 +135,32 @@ async def handle_date_filter_callback(update: Update, context: ContextTypes.DEFA
     
     callback_data = query.data
     
-    # الحصول على جميع الإشعارات
-    all_notifications = db.get_all_notifications()
-    
-    # تصفية الإشعارات بناءً على التاريخ المحدد
+    # مرشح التاريخ (تُحمّل النتائج صفحة بصفحة في display_notifications_page)
     today = datetime.now()
-    filtered_notifications = []
+    filter_spec = {}
     filter_name = ""
     
     if callback_data == "date_today":
         # الإشعارات التي تم إنشاؤها اليوم
         today_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        filtered_notifications = [
-            n for n in all_notifications 
-            if datetime.fromisoformat(n['created_at']) >= today_start
-        ]
+        filter_spec = {'created_from': today_start.isoformat()}
         filter_name = st.FILTER_TODAY
         
     elif callback_data == "date_week":
         # الإشعارات التي تم إنشاؤها هذا الأسبوع
         week_start = today - timedelta(days=today.weekday())
         week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        filtered_notifications = [
-            n for n in all_notifications 
-            if datetime.fromisoformat(n['created_at']) >= week_start
-        ]
+        filter_spec = {'created_from': week_start.isoformat()}
         filter_name = st.FILTER_THIS_WEEK
         
     elif callback_data == "date_month":
         # الإشعارات التي تم إنشاؤها هذا الشهر
         month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        filtered_notifications = [
-            n for n in all_notifications 
-            if datetime.fromisoformat(n['created_at']) >= month_start
-        ]
+        filter_spec = {'created_from': month_start.isoformat()}
         filter_name = st.FILTER_THIS_MONTH
         
     elif callback_data == "date_all":
         # كل الإشعارات
-        filtered_notifications = all_notifications
         filter_name = st.FILTER_ALL_TIME
         
     elif callback_data == "filter_back":
@@ -184,7 +169,7 @@ async def handle_date_filter_callback(update: Update, context: ContextTypes.DEFA
         return SHOW_FILTER_MENU
     
     # عرض نتائج التصفية
-    await show_filter_results(update, context, filtered_notifications, filter_name)
+    await show_filter_results(update, context, filter_spec, filter_name)
     return SHOW_RESULTS
 
 async def handle_status_filter_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -194,40 +179,27 @@ async def handle_status_filter_callback(update: Update, context: ContextTypes.DE
     
     callback_data = query.data
     
-    # الحصول على جميع الإشعارات
-    all_notifications = db.get_all_notifications()
-    
-    # تصفية الإشعارات بناءً على الحالة المحددة
-    filtered_notifications = []
+    # مرشح الحالة
+    filter_spec = {}
     filter_name = ""
     
     if callback_data == "status_delivered":
         # الإشعارات التي تم تسليمها
-        filtered_notifications = [
-            n for n in all_notifications 
-            if n.get('delivered', False)
-        ]
+        filter_spec = {'delivered': True}
         filter_name = st.FILTER_DELIVERED
         
     elif callback_data == "status_pending":
         # الإشعارات التي لم يتم تسليمها بعد
-        filtered_notifications = [
-            n for n in all_notifications 
-            if not n.get('delivered', False)
-        ]
+        filter_spec = {'delivered': False}
         filter_name = st.FILTER_NOT_DELIVERED
         
     elif callback_data == "status_reminder":
         # الإشعارات التي تم إرسال تذكير لها
-        filtered_notifications = [
-            n for n in all_notifications 
-            if n.get('reminder_sent', False)
-        ]
+        filter_spec = {'reminder_sent': True}
         filter_name = st.FILTER_REMINDER_SENT
         
     elif callback_data == "status_all":
         # كل الإشعارات
-        filtered_notifications = all_notifications
         filter_name = st.FILTER_ALL_STATUS
         
     elif callback_data == "filter_back":
@@ -236,13 +208,15 @@ async def handle_status_filter_callback(update: Update, context: ContextTypes.DE
         return SHOW_FILTER_MENU
     
     # عرض نتائج التصفية
-    await show_filter_results(update, context, filtered_notifications, filter_name)
+    await show_filter_results(update, context, filter_spec, filter_name)
     return SHOW_RESULTS
 
-async def show_filter_results(update: Update, context: ContextTypes.DEFAULT_TYPE, filtered_notifications, filter_name):
+async def show_filter_results(update: Update, context: ContextTypes.DEFAULT_TYPE, filter_spec, filter_name):
     """عرض نتائج التصفية."""
     
-    if not filtered_notifications:
+    total = await adb.count_notifications(filter_spec)
+    
+    if not total:
         # التحقق إذا كان الاستدعاء من callback_query أو رسالة نصية
         if update.callback_query:
             await update.callback_query.edit_message_text(
@@ -260,49 +234,52 @@ async def show_filter_results(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
         return
     
-    # ترتيب الإشعارات حسب تاريخ الإنشاء (الأحدث أولاً)
-    filtered_notifications.sort(
-        key=lambda x: datetime.fromisoformat(x['created_at']), 
-        reverse=True
-    )
-    
-    # تخزين النتائج في سياق المستخدم لاستخدامها في التنقل
-    context.user_data['filtered_notifications'] = filtered_notifications
+    # تخزين المرشح وموضع الصفحة فقط في سياق المستخدم (وليس النتائج نفسها)
+    context.user_data['filter_spec'] = filter_spec
+    context.user_data['filter_total'] = total
     context.user_data['current_page'] = 0
     context.user_data['filter_name'] = filter_name
+    context.user_data['page_cursor'] = {}
     
-    # عرض الصفحة الأولى من النتائج
+    # عرض الصفحة الأولى من النتائج (الأحدث أولاً)
     await display_notifications_page(update, context)
 
 async def display_notifications_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """عرض صفحة من الإشعارات المصفاة."""
     
-    # استعادة البيانات من سياق المستخدم
-    filtered_notifications = context.user_data.get('filtered_notifications', [])
-    current_page = context.user_data.get('current_page', 0)
+    # استعادة المرشح وموضع الصفحة من سياق المستخدم
+    filter_spec = context.user_data.get('filter_spec', {})
+    total = context.user_data.get('filter_total', 0)
+    current_page = max(0, context.user_data.get('current_page', 0))
     filter_name = context.user_data.get('filter_name', "")
-    
-    # التأكد من أن current_page ضمن النطاق الصحيح
-    if current_page < 0:
-        current_page = 0
+    page_cursor = context.user_data.get('page_cursor', {})
     
     # حساب العدد الإجمالي للصفحات (5 إشعارات في الصفحة)
     page_size = 5
-    total_pages = (len(filtered_notifications) + page_size - 1) // page_size
-    
-    if current_page >= total_pages:
-        current_page = total_pages - 1
+    total_pages = max(1, (total + page_size - 1) // page_size)
+    
+    # تحميل الصفحة الحالية فقط بدءاً من مؤشر الصفحة المجاورة
+    if current_page == 0:
+        page_cursor = {}
+    result = await adb.list_notifications(
+        after=page_cursor.get('after'), before=page_cursor.get('before'),
+        limit=page_size, filters=filter_spec
+    )
+    page_notifications = result['items']
+    if not page_notifications and current_page > 0:
+        # الصفحة لم تعد موجودة (حُذفت إشعارات)، العودة إلى الصفحة الأولى
+        current_page = 0
+        result = await adb.list_notifications(limit=page_size, filters=filter_spec)
+        page_notifications = result['items']
     
-    # تحديث الصفحة الحالية في سياق المستخدم
+    # تحديث الصفحة الحالية ومؤشرات الصفحات المجاورة في سياق المستخدم
     context.user_data['current_page'] = current_page
-    
-    # استخراج الإشعارات للصفحة الحالية
+    context.user_data['page_first_id'] = page_notifications[0]['id'] if page_notifications else None
+    context.user_data['page_last_id'] = page_notifications[-1]['id'] if page_notifications else None
     start_idx = current_page * page_size
-    end_idx = min(start_idx + page_size, len(filtered_notifications))
-    page_notifications = filtered_notifications[start_idx:end_idx]
     
     # بناء نص الرسالة
-    header = st.FILTER_RESULTS_HEADER.format(count=len(filtered_notifications))
+    header = st.FILTER_RESULTS_HEADER.format(count=total)
     header += st.FILTER_APPLIED.format(filter_name=filter_name) + "\n\n"
     
     notifications_text = ""
@@ -326,15 +303,23 @@ async def display_notifications_page(update: Update, context: ContextTypes.DEFAU
     # بناء لوحة المفاتيح
     keyboard = []
     
+    # أزرار عرض الإشعارات (صورة مصغرة مع التفاصيل) بنفس ترقيم القائمة
+    view_buttons = [
+        InlineKeyboardButton(f"🖼️ {i}", callback_data=f"results_view_{notification['id']}")
+        for i, notification in enumerate(page_notifications, start=start_idx + 1)
+    ]
+    if view_buttons:
+        keyboard.append(view_buttons)
+    
     # أزرار التنقل بين الصفحات
     navigation_buttons = []
     
-    if current_page > 0:
+    if current_page > 0 and result['has_prev']:
         navigation_buttons.append(
             InlineKeyboardButton("◀️ السابق", callback_data="results_prev")
         )
     
-    if current_page < total_pages - 1:
+    if result['has_next']:
         navigation_buttons.append(
             InlineKeyboardButton("▶️ التالي", callback_data="results_next")
         )
@@ -410,17 +395,35 @@ async def handle_results_callback(update: Update, context: ContextTypes.DEFAULT_
     callback_data = query.data
     
     if callback_data == "results_next":
-        # الانتقال إلى الصفحة التالية
-        context.user_data['current_page'] += 1
+        # الانتقال إلى الصفحة التالية (بعد آخر إشعار معروض)
+        context.user_data['current_page'] = context.user_data.get('current_page', 0) + 1
+        context.user_data['page_cursor'] = {'after': context.user_data.get('page_last_id')}
         await display_notifications_page(update, context)
         return SHOW_RESULTS
     
     elif callback_data == "results_prev":
-        # الانتقال إلى الصفحة السابقة
-        context.user_data['current_page'] -= 1
+        # الانتقال إلى الصفحة السابقة (قبل أول إشعار معروض)
+        context.user_data['current_page'] = context.user_data.get('current_page', 0) - 1
+        context.user_data['page_cursor'] = {'before': context.user_data.get('page_first_id')}
         await display_notifications_page(update, context)
         return SHOW_RESULTS
     
+    elif callback_data.startswith("results_view_"):
+        # عرض الإشعار برسالة منفصلة مع إبقاء قائمة النتائج كما هي
+        notification_id = callback_data[len("results_view_"):]
+        notification = await adb.get_notification(notification_id)
+        if not notification:
+            await query.message.reply_text(st.NOTIFICATION_NOT_FOUND)
+            return SHOW_RESULTS
+        
+        details = utils.format_notification_details(notification)
+        image_path = await adb.get_image_path(notification_id)
+        if image_path:
+            await utils.send_notification_preview(update, context, notification_id, image_path, caption=details)
+        else:
+            await query.message.reply_text(details + "\n\n" + st.IMAGE_NOT_FOUND)
+        return SHOW_RESULTS
+    
     elif callback_data == "results_new_filter":
         # بدء تصفية جديدة
         await show_filter_menu(update, context)
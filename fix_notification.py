@@ -2,9 +2,7 @@
 """
 سكريبت لإصلاح حالة الإشعار المحدد
 """
-import json
 import logging
-from datetime import datetime
 
 # إعداد التسجيل
 logging.basicConfig(
@@ -12,42 +10,26 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# مسار ملف الإشعارات
-NOTIFICATIONS_DB = "data/notifications.json"
+import database as db
 
 def fix_notification(notification_id):
     """
     إصلاح حالة إشعار محدد
     """
     try:
-        # قراءة ملف الإشعارات
-        with open(NOTIFICATIONS_DB, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        found = False
-        # البحث عن الإشعار المحدد
-        for notification in data['notifications']:
-            if notification['id'] == notification_id:
-                found = True
-                # تحديث حالة الإشعار
-                notification['reminder_sent'] = True
-                notification['reminder_sent_at'] = datetime.now().isoformat()
-                print(f"✅ تم تحديث حالة الإشعار: {notification_id}")
-                print(f"معلومات الإشعار:")
-                print(f"- اسم العميل: {notification['customer_name']}")
-                print(f"- رقم الهاتف: {notification['phone_number']}")
-                print(f"- وقت الإنشاء: {notification['created_at']}")
-                print(f"- حالة الإرسال: {notification['reminder_sent']}")
-                print(f"- وقت الإرسال: {notification['reminder_sent_at']}")
-                break
-        
-        if not found:
+        # تحديث حالة الإشعار عبر مخزن الإشعارات
+        if not db.mark_reminder_sent(notification_id):
             print(f"⚠️ لم يتم العثور على الإشعار: {notification_id}")
             return False
         
-        # حفظ التغييرات
-        with open(NOTIFICATIONS_DB, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        notification = db.get_notification(notification_id)
+        print(f"✅ تم تحديث حالة الإشعار: {notification_id}")
+        print(f"معلومات الإشعار:")
+        print(f"- اسم العميل: {notification['customer_name']}")
+        print(f"- رقم الهاتف: {notification['phone_number']}")
+        print(f"- وقت الإنشاء: {notification['created_at']}")
+        print(f"- حالة الإرسال: {notification['reminder_sent']}")
+        print(f"- وقت الإرسال: {notification['reminder_sent_at']}")
         
         return True
         
@@ -8,9 +8,9 @@ import multiprocessing
 
 # Server settings
 bind = "0.0.0.0:5000"  # This will be forwarded to port 80 externally
-workers = 1  # عامل واحد فقط لتقليل استهلاك الموارد
-threads = 2
-worker_class = "sync"
+workers = 1  # عامل واحد فقط: يعمل البوت على حلقة أحداث دائمة داخل العامل (انظر webhook_queue.py)
+threads = 4  # طلبات webhook تُرد فوراً بعد وضع التحديث في الطابور
+worker_class = "gthread"
 worker_connections = 1000
 timeout = 30  # ضبط وقت الانتظار لمنع المهل الطويلة
 keepalive = 5
@@ -92,6 +92,11 @@ def post_fork(server, worker):
 
 def worker_exit(server, worker):
     print(f"⚠️ خروج العامل: {worker.pid}")
+    # معالجة التحديثات المقبولة في الطابور قبل خروج العامل (إعادة التشغيل بعد max_requests أو reload)
+    import sys
+    app_module = sys.modules.get("app")
+    if app_module is not None and hasattr(app_module, "webhook_runner"):
+        app_module.webhook_runner.stop(timeout=graceful_timeout)
 
 def worker_abort(worker):
     print(f"❌ فشل العامل: {worker.pid}")
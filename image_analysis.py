@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+خط تحليل صور الشحنات بالذكاء الاصطناعي.
+
+تُرسل الصورة إلى النموذج مرة واحدة فقط للحصول على الحقول المنظمة (اسم العميل،
+الهاتف، الوجهة...) والوصف معاً، بطلب غير متزامن لا يحجز حلقة الأحداث.
+تُخزن النتيجة في ذاكرة مؤقتة مفتاحها بصمة محتوى الصورة (sha256) ومعرف
+تيليجرام الثابت للملف (file_unique_id)، فتُعاد نتيجة الصور المكررة أو
+المعاد توجيهها فوراً دون طلب جديد.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from ai_assistant import analyze_image_async
+from phone_index import canonical_phone
+from shipment_ocr import build_suggested_data, extract_data_from_text
+
+# تكوين السجلات
+logger = logging.getLogger(__name__)
+
+# الحد الأقصى لعدد نتائج التحليل المحفوظة في الذاكرة
+ANALYSIS_CACHE_SIZE = 256
+
+
+class ImageAnalysisCache:
+    """
+    ذاكرة LRU لنتائج تحليل الصور مفتاحها (بصمة المحتوى، السياق)،
+    مع ربط file_unique_id ببصمة المحتوى.
+    """
+
+    def __init__(self, max_entries=ANALYSIS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (البصمة، السياق) -> النتيجة
+        self._file_ids = {}  # file_unique_id -> البصمة
+        self._lock = threading.Lock()
+
+    def content_hash_for(self, file_unique_id):
+        with self._lock:
+            return self._file_ids.get(file_unique_id)
+
+    def get(self, content_hash, context_info=None):
+        key = (content_hash, context_info or "")
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, content_hash, context_info, result, file_unique_id=None):
+        key = (content_hash, context_info or "")
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if file_unique_id:
+                self._file_ids[file_unique_id] = content_hash
+            while len(self._entries) > self.max_entries:
+                (evicted_hash, _), _ = self._entries.popitem(last=False)
+                if not any(entry_hash == evicted_hash for entry_hash, _ in self._entries):
+                    self._file_ids = {fid: h for fid, h in self._file_ids.items() if h != evicted_hash}
+
+    def remember_file_id(self, file_unique_id, content_hash):
+        if file_unique_id:
+            with self._lock:
+                self._file_ids[file_unique_id] = content_hash
+
+
+analysis_cache = ImageAnalysisCache()
+
+
+def _parse_model_response(text):
+    """
+    تحويل استجابة النموذج إلى (البيانات المستخرجة بالمفاتيح العربية، الوصف).
+    إذا لم تكن الاستجابة JSON صالحاً تُستخرج البيانات من النص بالتعبيرات المنتظمة.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            fields = json.loads(match.group(0))
+        except ValueError:
+            fields = None
+        if isinstance(fields, dict):
+            extracted = {}
+            field_keys = {
+                'customer_name': 'اسم_الزبون',
+                'destination': 'الوجهة',
+                'date': 'تاريخ_الشحنة',
+                'value': 'قيمة_الشحنة',
+            }
+            for field, key in field_keys.items():
+                value = str(fields.get(field) or '').strip()
+                if value:
+                    extracted[key] = value
+
+            phone = canonical_phone(str(fields.get('phone') or ''))
+            if phone:
+                extracted['رقم_الهاتف'] = '+' + phone
+
+            description = str(fields.get('description') or '').strip()
+            document_type = str(fields.get('document_type') or '').strip()
+            if document_type:
+                description = f"*نوع الصورة*: {document_type}\n\n{description}"
+            extracted['النص_الكامل'] = description
+            return extracted, description
+
+    logger.warning("استجابة تحليل الصورة ليست JSON، استخراج البيانات من النص")
+    try:
+        return extract_data_from_text(text), text
+    except Exception as e:
+        logger.error(f"خطأ أثناء استخراج البيانات من استجابة تحليل الصورة: {e}")
+        return {}, text
+
+
+async def analyze_shipment_image(image_bytes, file_unique_id=None, context_info=None):
+    """
+    تحليل صورة شحنة بطلب واحد للنموذج مع استخدام الذاكرة المؤقتة.
+
+    Args:
+        image_bytes (bytes): بيانات الصورة
+        file_unique_id (str): معرف تيليجرام الثابت للملف (اختياري)
+        context_info (str): سياق التحليل (نص الرسالة المرفق مثلاً)
+
+    Returns:
+        dict: {"description": نص التحليل، "suggested": بيانات الإشعار المقترحة،
+               "cached": هل النتيجة من الذاكرة المؤقتة}
+    """
+    # الصور المعاد توجيهها تحمل نفس file_unique_id فلا حاجة لحساب البصمة
+    content_hash = file_unique_id and analysis_cache.content_hash_for(file_unique_id)
+    if not content_hash:
+        content_hash = hashlib.sha256(image_bytes).hexdigest()
+    cached = analysis_cache.get(content_hash, context_info)
+    if cached is not None:
+        analysis_cache.remember_file_id(file_unique_id, content_hash)
+        logger.info(f"نتيجة تحليل الصورة من الذاكرة المؤقتة: {content_hash[:12]}")
+        return dict(cached, cached=True)
+
+    success, response_text = await analyze_image_async(
+        base64.b64encode(image_bytes).decode('utf-8'), context_info
+    )
+    if not success:
+        # لا تُحفظ الأخطاء حتى يُعاد المحاولة في المرة القادمة
+        return {"description": response_text, "suggested": {}, "cached": False}
+
+    extracted, description = _parse_model_response(response_text)
+    result = {"description": description, "suggested": build_suggested_data(extracted)}
+    analysis_cache.put(content_hash, context_info, result, file_unique_id)
+    return dict(result, cached=False)
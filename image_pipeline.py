@@ -0,0 +1,118 @@
+"""
+معالجة صور الإشعارات قبل حفظها.
+
+صور تيليجرام تُحفظ وتُنسخ احتياطياً وتُرفع إلى واتساب عدة مرات، لذلك تُجهز
+مرة واحدة عند الحفظ: تصحيح الاتجاه حسب بيانات EXIF، وتصغير الأبعاد إلى حد
+أقصى، وإعادة الضغط (JPEG أو WebP)، مع إنشاء صورة مصغرة صغيرة تُعرض في واجهات عرض
+الإشعارات بدلاً من الصورة كاملة.
+تُنفذ المعالجة في مجموعة عمليات منفصلة حتى لا تستهلك حلقة الأحداث أو خيوط
+قاعدة البيانات وقت المعالج، وعند أي خطأ تُحفظ الصورة الأصلية كما هي.
+تُنشأ العمليات بطريقة forkserver وليس fork، لأن المجموعة تُنشأ من داخل خيوط
+قاعدة البيانات، ونسخ عملية متعددة الخيوط قد ينسخ أقفالاً محجوزة فتتجمد العملية الجديدة.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+import config
+
+# امتداد الملف لكل صيغة حفظ
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+EXIF_ORIENTATION = 0x0112
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.IMAGE_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def _encode(image, image_format, quality):
+    output = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(output, "WEBP", quality=quality, method=4)
+    else:
+        image.save(output, "JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def process_image_data(image_data, max_dimension, quality, image_format, thumbnail_size):
+    """
+    تجهيز صورة للحفظ (تُنفذ داخل عملية منفصلة).
+
+    Returns:
+        tuple: (بيانات الصورة، امتداد الملف، بيانات الصورة المصغرة JPEG)
+    """
+    with Image.open(io.BytesIO(image_data)) as source:
+        source_format = source.format
+        rotated = source.getexif().get(EXIF_ORIENTATION, 1) != 1
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        resized = max(image.size) > max_dimension
+        if resized:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        optimized = _encode(image, image_format, quality)
+
+        # الاحتفاظ بالأصل إذا لم يتغير شيء ولم تُوفر إعادة الضغط أي مساحة
+        if not resized and not rotated and source_format == image_format and len(optimized) >= len(image_data):
+            optimized = bytes(image_data)
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumbnail_data = _encode(thumbnail, "JPEG", 75)
+
+    return optimized, FORMAT_EXTENSIONS[image_format], thumbnail_data
+
+
+def _arguments():
+    image_format = config.IMAGE_STORE_FORMAT if config.IMAGE_STORE_FORMAT in FORMAT_EXTENSIONS else "JPEG"
+    return config.IMAGE_MAX_DIMENSION, config.IMAGE_QUALITY, image_format, config.THUMBNAIL_SIZE
+
+
+def prepare_image(image_data):
+    """
+    تجهيز صورة للحفظ في مجموعة العمليات وانتظار النتيجة (للاستدعاء من الكود المتزامن).
+
+    Args:
+        image_data (bytes): بيانات الصورة الأصلية
+
+    Returns:
+        tuple: (بيانات الصورة، امتداد الملف، بيانات الصورة المصغرة أو None)
+    """
+    try:
+        try:
+            result = _get_pool().submit(process_image_data, bytes(image_data), *_arguments()).result()
+        except BrokenProcessPool:
+            _reset_pool()
+            result = _get_pool().submit(process_image_data, bytes(image_data), *_arguments()).result()
+        logging.info(f"Image prepared: {len(image_data)} -> {len(result[0])} bytes")
+        return result
+    except Exception as e:
+        logging.warning(f"Could not optimize image, storing original bytes: {e}")
+        return bytes(image_data), ".jpg", None
+
@@ -31,10 +31,9 @@ def main():
     print(f"📋 العدد الإجمالي للإشعارات: {len(notifications)}")
     
     # استخدام UltraMsg للتحقق وإرسال التذكيرات
-    sent_count = ultramsg_service.check_and_send_scheduled_reminders(notifications)
-    
-    # حفظ التحديثات في قاعدة البيانات
-    db.save_json(db.NOTIFICATIONS_DB, {"notifications": notifications})
+    # إرسال التذكيرات المستحقة فقط من طابور التذكيرات
+    # (يتم حفظ حالة كل تذكير مرسل في المخزن عبر db.mark_reminder_sent)
+    sent_count = ultramsg_service.check_and_send_scheduled_reminders(db.get_due_reminders())
     
     if sent_count > 0:
         print(f"✅ تم إرسال {sent_count} تذكير(ات)")
@@ -16,10 +16,11 @@ from telegram.ext import (
 )
 
 import database as db
+from async_db import adb
 import strings as st
 import config
 import utils
-from ultramsg_service import send_whatsapp_message, send_whatsapp_image
+from campaign_dispatcher import dispatch_campaign, get_campaign_progress, clear_campaign_progress, is_campaign_running
 
 # حالات المحادثة
 CAMPAIGN_NAME = 1
@@ -596,16 +597,12 @@ async def received_campaign_image(update: Update, context: ContextTypes.DEFAULT_
         photo = update.message.photo[-1]
         file = await context.bot.get_file(photo.file_id)
         
-        # تحديد مسار الصورة وتنزيلها
+        # تنزيل الصورة وحفظها في مخزن المحتوى (صورة إشعار أو حملة سابقة لا تُحفظ مرتين)
         campaign_id = context.user_data['current_campaign']['id']
-        campaign_images_dir = "data/campaigns/images"
-        os.makedirs(campaign_images_dir, exist_ok=True)
-        image_path = f"{campaign_images_dir}/{campaign_id}.jpg"
+        image_data = await file.download_as_bytearray()
+        image_path = await adb.store_blob(image_data, f"campaign:{campaign_id}")
         logging.info(f"حفظ صورة الحملة في المسار: {image_path}")
         
-        # تنزيل الصورة
-        await file.download_to_drive(image_path)
-        
         # تخزين معلومات الصورة
         context.user_data['current_campaign']['has_image'] = True
         context.user_data['current_campaign']['image_path'] = image_path
@@ -774,12 +771,8 @@ async def handle_campaign_confirmation(update: Update, context: ContextTypes.DEF
         if 'current_campaign' in context.user_data:
             # إذا كان هناك صورة تم تحميلها، يمكن حذفها
             if context.user_data['current_campaign'].get('has_image', False):
-                image_path = context.user_data['current_campaign']['image_path']
-                try:
-                    if os.path.exists(image_path):
-                        os.remove(image_path)
-                except Exception as e:
-                    logging.error(f"Error removing temporary campaign image: {e}")
+                current_campaign = context.user_data['current_campaign']
+                await adb.release_blob(f"campaign:{current_campaign['id']}", current_campaign['image_path'])
             
             # مسح بيانات الحملة
             del context.user_data['current_campaign']
@@ -908,10 +901,20 @@ async def view_campaign_details(update: Update, context: ContextTypes.DEFAULT_TY
 {campaign['message']}
 """
     
+    # عرض تقدم الإرسال إذا توقفت الحملة قبل اكتمالها
+    progress = get_campaign_progress(campaign['id']) if campaign['status'] == 'active' else None
+    if progress:
+        details += (
+            f"\n⏸️ *إرسال غير مكتمل:* {progress['sent'] + progress['failed']} من {progress['total']}"
+            f" | ✅ ناجح: {progress['sent']} | ⏳ متبقي: {progress['pending']}\n"
+        )
+    
     # إعداد أزرار العمليات المتاحة
     keyboard = []
     
-    if campaign['status'] == 'active':
+    if progress:
+        keyboard.append([InlineKeyboardButton("▶️ استئناف الإرسال", callback_data=f"campaign_confirm_send_{campaign['id']}")])
+    elif campaign['status'] == 'active':
         keyboard.append([InlineKeyboardButton("🚀 إرسال الحملة", callback_data=f"campaign_send_{campaign['id']}")])
     
     keyboard.extend([
@@ -990,132 +993,124 @@ async def confirm_send_campaign(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return
     
-    # جلب جميع الإشعارات (العملاء)
-    notifications = db.get_all_notifications()
-    
-    if not notifications:
+    if is_campaign_running(campaign_id):
         await status_message.edit_text(
-            "⚠️ لا يوجد عملاء في قاعدة البيانات لإرسال الحملة إليهم.",
+            "⏳ يجري إرسال هذه الحملة حالياً.",
             reply_markup=InlineKeyboardMarkup([
                 [InlineKeyboardButton("🏠 العودة", callback_data="campaign_back_main")]
             ])
         )
         return
     
-    # تصفية العملاء حسب الجمهور المستهدف
-    target_customers = []
     current_time = datetime.now()
     
-    if campaign['target'] == 'all':
-        target_customers = notifications
-    elif campaign['target'] == 'new':
-        # اعتبار العملاء الجدد خلال الشهر الأخير
-        for customer in notifications:
-            created_at = customer.get('created_at')
-            if created_at:
-                try:
-                    created_date = datetime.fromisoformat(created_at)
-                    days_diff = (current_time - created_date).days
-                    if days_diff <= 30:  # عملاء الشهر الأخير
-                        target_customers.append(customer)
-                except (ValueError, TypeError):
-                    pass
-    elif campaign['target'] == 'returning':
-        # اعتبار العملاء العائدين أقدم من شهر
-        for customer in notifications:
-            created_at = customer.get('created_at')
-            if created_at:
-                try:
-                    created_date = datetime.fromisoformat(created_at)
-                    days_diff = (current_time - created_date).days
-                    if days_diff > 30:  # أقدم من شهر
-                        target_customers.append(customer)
-                except (ValueError, TypeError):
-                    pass
-    
-    # تحديد العدد الأقصى للعملاء إذا تم تعيينه
-    if campaign['max_customers'] > 0 and len(target_customers) > campaign['max_customers']:
-        target_customers = target_customers[:campaign['max_customers']]
-    
-    if not target_customers:
+    # عند الاستئناف يستخدم المحرك قائمة المستلمين المحفوظة من أول تشغيل
+    resuming = get_campaign_progress(campaign_id) is not None
+    target_customers = []
+    
+    if not resuming:
+        # جلب جميع الإشعارات (العملاء)
+        notifications = db.get_all_notifications()
+    
+        if not notifications:
+            await status_message.edit_text(
+                "⚠️ لا يوجد عملاء في قاعدة البيانات لإرسال الحملة إليهم.",
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("🏠 العودة", callback_data="campaign_back_main")]
+                ])
+            )
+            return
+    
+        # تصفية العملاء حسب الجمهور المستهدف
+        if campaign['target'] == 'all':
+            target_customers = notifications
+        elif campaign['target'] == 'new':
+            # اعتبار العملاء الجدد خلال الشهر الأخير
+            for customer in notifications:
+                created_at = customer.get('created_at')
+                if created_at:
+                    try:
+                        created_date = datetime.fromisoformat(created_at)
+                        days_diff = (current_time - created_date).days
+                        if days_diff <= 30:  # عملاء الشهر الأخير
+                            target_customers.append(customer)
+                    except (ValueError, TypeError):
+                        pass
+        elif campaign['target'] == 'returning':
+            # اعتبار العملاء العائدين أقدم من شهر
+            for customer in notifications:
+                created_at = customer.get('created_at')
+                if created_at:
+                    try:
+                        created_date = datetime.fromisoformat(created_at)
+                        days_diff = (current_time - created_date).days
+                        if days_diff > 30:  # أقدم من شهر
+                            target_customers.append(customer)
+                    except (ValueError, TypeError):
+                        pass
+    
+        # تحديد العدد الأقصى للعملاء إذا تم تعيينه
+        if campaign['max_customers'] > 0 and len(target_customers) > campaign['max_customers']:
+            target_customers = target_customers[:campaign['max_customers']]
+    
+        if not target_customers:
+            await status_message.edit_text(
+                "⚠️ لا يوجد عملاء يطابقون معايير الاستهداف في هذه الحملة.",
+                reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("🏠 العودة", callback_data="campaign_back_main")]
+                ])
+            )
+            return
+    
+    # تسجيل بدء الإرسال قبل أول رسالة حتى يظهر خيار الاستئناف بعد أي توقف
+    campaign['sending_started_at'] = campaign.get('sending_started_at') or current_time.isoformat()
+    campaigns_data['campaigns'][campaign_index] = campaign
+    save_campaigns(campaigns_data)
+    
+    async def report_progress(done, total, success):
+        await status_message.edit_text(
+            f"🔄 جاري إرسال الحملة...\n"
+            f"تم إرسال {done} من أصل {total} رسالة.\n"
+            f"✅ ناجح: {success}"
+        )
+    
+    # بدء عملية الإرسال عبر محرك الحملات
+    try:
+        result = await dispatch_campaign(campaign, target_customers, on_progress=report_progress)
+    except Exception as e:
+        logging.error(f"Error dispatching campaign {campaign_id}: {e}")
+        import traceback
+        logging.error(traceback.format_exc())
         await status_message.edit_text(
-            "⚠️ لا يوجد عملاء يطابقون معايير الاستهداف في هذه الحملة.",
+            "⚠️ توقف إرسال الحملة بسبب خطأ. تم حفظ التقدم ويمكنك استئناف الإرسال لاحقاً.",
             reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("▶️ استئناف الإرسال", callback_data=f"campaign_confirm_send_{campaign_id}")],
                 [InlineKeyboardButton("🏠 العودة", callback_data="campaign_back_main")]
             ])
         )
         return
     
-    # جلب صورة الحملة إذا كانت موجودة
-    image_path = None
-    if campaign.get('has_image', False) and os.path.exists(campaign['image_path']):
-        image_path = campaign['image_path']
-    
-    # بدء عملية الإرسال
-    sent_count = 0
-    success_count = 0
+    total_targets = result['total']
+    sent_count = result['sent_count']
+    success_count = result['success_count']
     
-    for customer in target_customers:
-        customer_name = customer.get('customer_name', 'العميل')
-        phone_number = customer.get('phone_number', '')
-        
-        if not phone_number:
-            continue
-        
-        # تخصيص الرسالة
-        message = campaign['message']
-        message = message.replace('{{customer_name}}', customer_name)
-        
-        # إضافة تفاصيل إضافية حسب نوع الحملة
-        if campaign['type'] == 'discount':
-            message = message.replace('{{discount}}', str(campaign['discount']))
-        elif campaign['type'] == 'free_product' and '{{min_order}}' in message:
-            message = message.replace('{{min_order}}', str(campaign['min_order']))
-        
-        # إرسال الرسالة عبر واتساب
-        try:
-            result = False
-            
-            if image_path:
-                # إرسال رسالة مع صورة
-                try:
-                    # قراءة ملف الصورة
-                    with open(image_path, "rb") as f:
-                        image_data = f.read()
-                    # إرسال صورة مع رسالة
-                    success, result = send_whatsapp_image(phone_number, image_data, message)
-                except Exception as img_error:
-                    logging.error(f"Error sending image: {img_error}")
-                    success, result = send_whatsapp_message(phone_number, message)
-            else:
-                # إرسال رسالة نصية فقط
-                # إرسال رسالة نصية فقط
-                success, result = send_whatsapp_message(phone_number, message)
-            
-            sent_count += 1
-            if result:
-                success_count += 1
-            
-            # تحديث الرسالة كل 5 عملاء
-            if sent_count % 5 == 0:
-                await status_message.edit_text(
-                    f"🔄 جاري إرسال الحملة...\n"
-                    f"تم إرسال {sent_count} من أصل {len(target_customers)} رسالة.\n"
-                    f"✅ ناجح: {success_count}"
-                )
-        
-        except Exception as e:
-            logging.error(f"Error sending campaign message to {phone_number}: {e}")
-            continue
+    # إعادة تحميل الحملات لتجنب الكتابة فوق تغييرات حدثت أثناء الإرسال
+    campaigns_data = load_campaigns()
+    for i, c in enumerate(campaigns_data['campaigns']):
+        if c['id'] == campaign_id:
+            campaign = c
+            campaign_index = i
+            break
     
     # تحديث حالة الحملة وإحصائياتها
     campaign['status'] = 'completed'
     campaign['sent_count'] = sent_count
     campaign['success_count'] = success_count
-    campaign['completed_at'] = current_time.isoformat()
+    campaign['completed_at'] = datetime.now().isoformat()
     
     campaigns_data['campaigns'][campaign_index] = campaign
-    save_campaigns(campaigns_data)
+    if save_campaigns(campaigns_data):
+        clear_campaign_progress(campaign_id)
     
     # إرسال تقرير الإكمال
     success_rate = 0 if sent_count == 0 else (success_count / sent_count) * 100
@@ -1123,7 +1118,7 @@ async def confirm_send_campaign(update: Update, context: ContextTypes.DEFAULT_TY
     await status_message.edit_text(
         f"✅ *تم اكتمال إرسال الحملة*\n\n"
         f"📊 *إحصائيات الإرسال:*\n"
-        f"• إجمالي العملاء المستهدفين: {len(target_customers)}\n"
+        f"• إجمالي العملاء المستهدفين: {total_targets}\n"
         f"• تم إرسال: {sent_count} رسالة\n"
         f"• ناجح: {success_count} رسالة\n"
         f"• نسبة النجاح: {success_rate:.1f}%\n\n"
@@ -1162,11 +1157,10 @@ async def confirm_delete_campaign(update: Update, context: ContextTypes.DEFAULT_
         if campaign['id'] == campaign_id:
             # حذف الصورة إذا كانت موجودة
             if campaign.get('has_image', False) and 'image_path' in campaign:
-                try:
-                    if os.path.exists(campaign['image_path']):
-                        os.remove(campaign['image_path'])
-                except Exception as e:
-                    logging.error(f"Error removing campaign image: {e}")
+                db.release_blob(f"campaign:{campaign_id}", campaign['image_path'])
+            
+            # حذف ملفات تقدم الإرسال إن وجدت
+            clear_campaign_progress(campaign_id)
             
             # حذف الحملة من القائمة
             del campaigns_data['campaigns'][i]
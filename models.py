@@ -2,10 +2,12 @@
 نماذج قاعدة البيانات للبوت
 """
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Float, Date, ForeignKey, BigInteger, JSON, Text
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Float, Date, ForeignKey, BigInteger, JSON, Text, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from phone_index import canonical_phone
+from name_index import normalize_name
 
 Base = declarative_base()
 
@@ -14,10 +16,18 @@ class Notification(Base):
     نموذج بيانات إشعار الشحن
     """
     __tablename__ = 'notifications'
+    # فهرس ترتيب القوائم المقسمة إلى صفحات (من الأحدث إلى الأقدم)
+    __table_args__ = (Index('ix_notifications_created_at_id', 'created_at', 'id'),)
     
     id = Column(String(40), primary_key=True)
     customer_name = Column(String(100), nullable=False)
+    # الاسم الموحد للبحث (بدون تشكيل ومع توحيد الحروف)، يُحسب تلقائياً عند تعيين customer_name
+    customer_name_normalized = Column(String(100), index=True)
     phone_number = Column(String(20), nullable=False)
+    # الرقم الموحد (رمز البلد + الرقم) ومقلوبه، يُحسبان تلقائياً عند تعيين phone_number.
+    # المقلوب يسمح بالبحث بآخر أرقام الهاتف كنطاق على فهرس عادي
+    phone_canonical = Column(String(20), index=True)
+    phone_reversed = Column(String(20), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     reminder_hours = Column(Float, default=24)
     reminder_sent = Column(Boolean, default=False)
@@ -32,6 +42,17 @@ class Notification(Base):
     archived_at = Column(DateTime, nullable=True)  # تاريخ الأرشفة
     archived_by = Column(BigInteger, nullable=True)  # معرف المستخدم الذي قام بالأرشفة
     
+    @validates('customer_name')
+    def _index_customer_name(self, key, customer_name):
+        self.customer_name_normalized = normalize_name(customer_name)
+        return customer_name
+    
+    @validates('phone_number')
+    def _index_phone_number(self, key, phone_number):
+        self.phone_canonical = canonical_phone(phone_number)
+        self.phone_reversed = self.phone_canonical[::-1]
+        return phone_number
+    
     def __repr__(self):
         return f"<Notification(id={self.id}, customer={self.customer_name}, phone={self.phone_number}, delivered={self.is_delivered})>"
     
@@ -112,6 +133,7 @@ class Statistic(Base):
     نموذج بيانات الإحصائيات
     """
     __tablename__ = 'statistics'
+    __table_args__ = (UniqueConstraint('date', name='uq_statistics_date'),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     date = Column(Date, default=func.current_date())
@@ -163,6 +185,42 @@ class Statistic(Base):
             }
 
 
+class HourlyStatistic(Base):
+    """
+    نموذج بيانات إحصائيات الأحداث لكل ساعة
+    يُستخدم لتحليل أوقات الذروة (7 أيام × 24 ساعة) دون الحاجة إلى دوال
+    استخراج التاريخ الخاصة بقاعدة بيانات معينة
+    """
+    __tablename__ = 'hourly_statistics'
+    __table_args__ = (UniqueConstraint('date', 'hour', name='uq_hourly_statistics_date_hour'),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    date = Column(Date, nullable=False, index=True)
+    hour = Column(Integer, nullable=False)  # 0-23
+    weekday = Column(Integer, nullable=False)  # 0 = الأحد ... 6 = السبت
+    notifications_created = Column(Integer, default=0)
+    notifications_reminded = Column(Integer, default=0)
+    messages_sent = Column(Integer, default=0)
+    search_queries = Column(Integer, default=0)
+    
+    def __repr__(self):
+        return f"<HourlyStatistic(date={self.date}, hour={self.hour})>"
+    
+    def to_dict(self):
+        """
+        تحويل النموذج إلى قاموس
+        """
+        return {
+            'date': self.date.isoformat() if self.date else None,
+            'hour': self.hour,
+            'weekday': self.weekday,
+            'notifications_created': self.notifications_created or 0,
+            'notifications_reminded': self.notifications_reminded or 0,
+            'messages_sent': self.messages_sent or 0,
+            'search_queries': self.search_queries or 0
+        }
+
+
 class BotPersonality(Base):
     """
     نموذج بيانات شخصية البوت
@@ -0,0 +1,196 @@
+"""
+فهرس البحث بأسماء العملاء.
+
+تُوحَّد الأسماء العربية مرة واحدة عند الإضافة (إزالة التشكيل والتطويل، وتوحيد
+أشكال الألف والهمزة والتاء المربوطة والألف المقصورة)، ثم تُفهرس مقاطعها
+الثلاثية (trigrams). يبحث الاستعلام في تقاطع قوائم مقاطعه فقط بدلاً من المرور
+على جميع الإشعارات، وتُرتب النتائج حسب قرب المطابقة.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+
+# طول المقطع المفهرس
+NGRAM_SIZE = 3
+
+# أقل نسبة مقاطع مشتركة لقبول نتيجة تقريبية عند غياب المطابقة الحرفية
+FUZZY_THRESHOLD = 0.5
+
+# التشكيل وعلامة المد والتطويل
+_DIACRITICS = re.compile('[\u064B-\u0652\u0670\u0640]')
+
+_ARABIC_FOLDING = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+})
+
+
+def normalize_name(name):
+    """
+    توحيد الاسم للبحث: إزالة التشكيل، توحيد الحروف المتشابهة، أحرف صغيرة
+    ومسافات مفردة.
+
+    Args:
+        name (str): الاسم
+
+    Returns:
+        str: الاسم الموحد
+    """
+    if not name:
+        return ""
+    name = _DIACRITICS.sub('', name).translate(_ARABIC_FOLDING).lower()
+    return ' '.join(name.split())
+
+
+def name_ngrams(normalized_name):
+    """مقاطع الاسم الموحد (كل كلمة مع مسافة في بدايتها لتمييز بدايات الكلمات)"""
+    grams = set()
+    for word in normalized_name.split():
+        padded = ' ' + word
+        for start in range(max(1, len(padded) - NGRAM_SIZE + 1)):
+            grams.add(padded[start:start + NGRAM_SIZE])
+    return grams
+
+
+def _query_ngrams(normalized_query):
+    """مقاطع الاستعلام التي يجب أن توجد في أي اسم يحتويه كنص جزئي"""
+    grams = set()
+    for word in normalized_query.split():
+        for start in range(len(word) - NGRAM_SIZE + 1):
+            grams.add(word[start:start + NGRAM_SIZE])
+    return grams
+
+
+def match_rank(normalized_name, normalized_query):
+    """
+    ترتيب المطابقة (الأصغر أفضل): 0 تطابق تام، 1 بداية الاسم، 2 بداية كلمة،
+    3 نص جزئي، أو None إذا لم يحتوِ الاسم على الاستعلام.
+    """
+    if normalized_name == normalized_query:
+        return 0
+    if normalized_name.startswith(normalized_query):
+        return 1
+    if (' ' + normalized_query) in normalized_name:
+        return 2
+    if normalized_query in normalized_name:
+        return 3
+    return None
+
+
+class NameIndex:
+    """
+    فهرس مقاطع ثلاثية للأسماء الموحدة مربوط بمخزن الإشعارات
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store (NotificationStore): مخزن الإشعارات
+        """
+        self.store = store
+        self._lock = threading.Lock()
+        self._names = {}  # المعرف -> الاسم الموحد
+        self._by_ngram = {}  # المقطع -> مجموعة المعرفات
+
+        store.add_listener(self._on_store_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """إعادة بناء الفهرس بالكامل من مخزن الإشعارات"""
+        with self._lock:
+            self._names = {}
+            self._by_ngram = {}
+            for notification in self.store.snapshot():
+                self._add(notification['id'], notification.get('customer_name', ''))
+
+        logging.info(f"Name index rebuilt with {len(self._names)} name(s)")
+
+    def _add(self, notification_id, customer_name):
+        normalized = normalize_name(customer_name)
+        self._names[notification_id] = normalized
+        for gram in name_ngrams(normalized):
+            self._by_ngram.setdefault(gram, set()).add(notification_id)
+
+    def _remove(self, notification_id):
+        normalized = self._names.pop(notification_id, None)
+        if normalized is None:
+            return
+        for gram in name_ngrams(normalized):
+            ids = self._by_ngram.get(gram)
+            if ids is not None:
+                ids.discard(notification_id)
+                if not ids:
+                    del self._by_ngram[gram]
+
+    def _on_store_change(self, op, notification_id, record):
+        if op == "reload":
+            self.rebuild()
+            return
+
+        with self._lock:
+            if op == "put":
+                if self._names.get(notification_id) == normalize_name(record.get('customer_name', '')):
+                    return
+                self._remove(notification_id)
+                self._add(notification_id, record.get('customer_name', ''))
+            elif op == "delete":
+                self._remove(notification_id)
+
+    def search(self, customer_name, fuzzy=True):
+        """
+        البحث عن الإشعارات التي يحتوي اسم عميلها على النص المعطى.
+
+        إذا لم توجد مطابقة حرفية وكان fuzzy مفعلاً، تُعاد الأسماء التي تشترك
+        مع الاستعلام في نسبة كافية من المقاطع (لتجاوز الأخطاء الإملائية البسيطة).
+
+        Returns:
+            list: معرفات الإشعارات مرتبة من الأقرب للأبعد
+        """
+        query = normalize_name(customer_name)
+        if not query:
+            return []
+        self.store.refresh()
+
+        grams = _query_ngrams(query)
+        with self._lock:
+            if grams:
+                postings = sorted((self._by_ngram.get(gram, set()) for gram in grams), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+            else:
+                # استعلام أقصر من المقطع: المرور على الأسماء الموحدة المحفوظة
+                candidates = self._names.keys()
+
+            ranked = []
+            for notification_id in candidates:
+                name = self._names[notification_id]
+                rank = match_rank(name, query)
+                if rank is not None:
+                    ranked.append((rank, len(name), notification_id))
+
+            if not ranked and fuzzy and grams:
+                ranked = self._fuzzy_candidates(query)
+
+        ranked.sort()
+        return [notification_id for _, _, notification_id in ranked]
+
+    def _fuzzy_candidates(self, query):
+        """الأسماء المشابهة حسب نسبة المقاطع المشتركة (يجب استدعاؤها تحت القفل)"""
+        grams = name_ngrams(query)
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._by_ngram.get(gram, ()))
+
+        ranked = []
+        for notification_id, shared in overlap.items():
+            name = self._names[notification_id]
+            similarity = shared / len(grams | name_ngrams(name))
+            if similarity >= FUZZY_THRESHOLD:
+                ranked.append((4 - similarity, len(name), notification_id))
+        return ranked
+
+    def __len__(self):
+        with self._lock:
+            return len(self._names)
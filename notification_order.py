@@ -0,0 +1,164 @@
+"""
+فهرس ترتيب الإشعارات حسب وقت الإنشاء.
+
+قوائم الإشعارات في لوحة المسؤول ونتائج التصفية كانت تحمّل جميع الإشعارات
+وترتبها ثم تقتطع صفحة منها في كل ضغطة زر. يحتفظ هذا الفهرس بقائمة مرتبة من
+(وقت الإنشاء، المعرف) تُحدّث مع كل تغيير في المخزن، وتُقرأ الصفحات بمؤشر
+(معرف آخر إشعار معروض) بدلاً من رقم الصفحة: تبدأ القراءة من موضع المؤشر
+وتتوقف بعد عدد الإشعارات المطلوب.
+"""
+import bisect
+import logging
+import threading
+
+
+def _sort_key(notification_id, record):
+    return (record.get('created_at') or '', notification_id)
+
+
+def matches_filters(record, filters):
+    """
+    مطابقة إشعار لمرشحات القائمة.
+
+    المرشحات المدعومة: created_from (نص ISO)، delivered، reminder_sent،
+    archived (قيم منطقية)، customer_name (تطابق تام)
+    """
+    if filters.get('created_from') and (record.get('created_at') or '') < filters['created_from']:
+        return False
+    for key in ('delivered', 'reminder_sent', 'archived'):
+        if key in filters and bool(record.get(key, False)) != bool(filters[key]):
+            return False
+    if filters.get('customer_name') and record.get('customer_name') != filters['customer_name']:
+        return False
+    return True
+
+
+class NotificationOrder:
+    """
+    قائمة معرفات الإشعارات مرتبة حسب وقت الإنشاء ومربوطة بمخزن الإشعارات
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store (NotificationStore): مخزن الإشعارات
+        """
+        self.store = store
+        self._lock = threading.Lock()
+        self._keys = []  # (وقت الإنشاء، المعرف) تصاعدياً
+        self._by_id = {}  # المعرف -> مفتاح الترتيب
+
+        store.add_listener(self._on_store_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """إعادة بناء الفهرس بالكامل من مخزن الإشعارات"""
+        with self._lock:
+            self._by_id = {
+                notification['id']: _sort_key(notification['id'], notification)
+                for notification in self.store.snapshot()
+            }
+            self._keys = sorted(self._by_id.values())
+
+        logging.info(f"Notification order index rebuilt with {len(self._keys)} notification(s)")
+
+    def _remove(self, notification_id):
+        key = self._by_id.pop(notification_id, None)
+        if key is None:
+            return
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def _on_store_change(self, op, notification_id, record):
+        if op == "reload":
+            self.rebuild()
+            return
+
+        with self._lock:
+            if op == "put":
+                key = _sort_key(notification_id, record)
+                if self._by_id.get(notification_id) == key:
+                    return
+                self._remove(notification_id)
+                self._by_id[notification_id] = key
+                bisect.insort(self._keys, key)
+            elif op == "delete":
+                self._remove(notification_id)
+
+    def _walk(self, cursor=None, descending=True):
+        """
+        المعرفات بعد مفتاح المؤشر (أو من طرف القائمة) بالترتيب المطلوب، واحداً
+        تلو الآخر دون نسخ القائمة. يُؤخذ القفل لكل خطوة فقط ويُحدد الموضع التالي
+        ببحث ثنائي من آخر مفتاح، حتى لا يُحتفظ بالقفل أثناء قراءة السجلات من المخزن
+        (الذي يستدعي مستمع الفهرس تحت قفله).
+        """
+        key = cursor
+        while True:
+            with self._lock:
+                if descending:
+                    position = bisect.bisect_left(self._keys, key) - 1 if key is not None else len(self._keys) - 1
+                    if position < 0:
+                        return
+                else:
+                    position = bisect.bisect_right(self._keys, key) if key is not None else 0
+                    if position >= len(self._keys):
+                        return
+                key = self._keys[position]
+            yield key[1]
+
+    def page(self, after=None, before=None, limit=5, filters=None):
+        """
+        صفحة من الإشعارات من الأحدث إلى الأقدم.
+
+        Args:
+            after (str): معرف آخر إشعار في الصفحة السابقة
+            before (str): معرف أول إشعار في الصفحة الحالية (للعودة إلى الصفحة السابقة)
+            limit (int): عدد الإشعارات في الصفحة
+            filters (dict): مرشحات القائمة (انظر matches_filters)
+
+        Returns:
+            dict: {'items', 'has_next', 'has_prev'}
+        """
+        filters = filters or {}
+        self.store.refresh()
+        cursor_id = after or before
+        with self._lock:
+            cursor = self._by_id.get(cursor_id) if cursor_id else None
+        # للعودة إلى الصفحة السابقة: القراءة من الأقدم إلى الأحدث بدءاً من بعد المؤشر
+        candidates = self._walk(cursor, descending=not (before and cursor is not None))
+
+        created_from = filters.get('created_from')
+        items = []
+        for notification_id in candidates:
+            record = self.store.get(notification_id)
+            if record is None:
+                continue
+            if created_from and not before and (record.get('created_at') or '') < created_from:
+                # الترتيب تنازلي، فلا توجد إشعارات أحدث من تاريخ البداية بعد هذه النقطة
+                break
+            if matches_filters(record, filters):
+                items.append(record)
+                if len(items) > limit:
+                    break
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        if before and cursor is not None:
+            items.reverse()
+            return {'items': items, 'has_next': True, 'has_prev': has_more}
+        return {'items': items, 'has_next': has_more, 'has_prev': cursor is not None}
+
+    def count(self, filters=None):
+        """عدد الإشعارات المطابقة للمرشحات"""
+        filters = filters or {}
+        self.store.refresh()
+        created_from = filters.get('created_from')
+        start_key = (created_from, '') if created_from else None
+        if set(filters) <= {'created_from'}:
+            with self._lock:
+                return len(self._keys) - (bisect.bisect_left(self._keys, start_key) if start_key else 0)
+        return sum(
+            1 for notification_id in self._walk(start_key, descending=False)
+            if (record := self.store.get(notification_id)) is not None and matches_filters(record, filters)
+        )
@@ -0,0 +1,423 @@
+"""
+محرك تخزين مضمّن لإشعارات الشحن.
+
+يحتفظ المحرك بفهرس في الذاكرة مفتاحه معرف الإشعار، ويسجل كل عملية كتابة
+كسطر JSON مُلحق بملف سجل (append-only log)، ثم يقوم خيط في الخلفية بضغط
+السجل إلى ملف اللقطة data/notifications.json بنفس التنسيق القديم
+{"notifications": [...]} عندما يبلغ عدد العمليات فيه حد الضغط.
+
+بذلك تصبح قراءة أو كتابة إشعار واحد بتكلفة ثابتة مهما كبر حجم البيانات،
+بدلاً من تحليل الملف كاملاً وإعادة كتابته في كل عملية.
+
+قد تفتح عدة عمليات نفس المخزن (البوت وسكريبتات الإدخال والإصلاح). تتم كل
+كتابة وكل ضغط تحت قفل ملف مشترك بين العمليات (notifications.log.lock)، وقبلها
+تقرأ العملية ما أضافته العمليات الأخرى إلى نهاية السجل، ويُعاد التحميل بالكامل
+إذا ضغطت عملية أخرى السجل. القراءات تتحقق من حجم السجل فقط (stat) وتطبق
+العمليات الجديدة عند تغيره.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+# عدد العمليات في السجل التي تستدعي الضغط
+COMPACT_THRESHOLD = 500
+
+# الفترة بالثواني بين فحوصات الضغط في الخلفية
+COMPACT_INTERVAL = 60
+
+
+class NotificationStore:
+    """
+    مخزن إشعارات مفهرس بالمعرف مع سجل إلحاق وضغط في الخلفية
+    """
+
+    def __init__(self, snapshot_path, log_path=None,
+                 compact_threshold=COMPACT_THRESHOLD, compact_interval=COMPACT_INTERVAL):
+        """
+        تهيئة المخزن وتحميل البيانات من اللقطة والسجل
+
+        Args:
+            snapshot_path (str): مسار ملف اللقطة (notifications.json)
+            log_path (str): مسار ملف السجل (افتراضياً بجانب اللقطة بامتداد .log)
+            compact_threshold (int): عدد العمليات في السجل قبل الضغط
+            compact_interval (float): الفترة بين فحوصات الضغط بالثواني
+        """
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or os.path.splitext(snapshot_path)[0] + ".log"
+        self.compact_threshold = compact_threshold
+        self.compact_interval = compact_interval
+
+        self._records = {}  # قاموس مرتب حسب ترتيب الإدخال: المعرف -> السجل
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._log_file = None
+        self._log_ops = 0
+        self._log_ident = None  # (st_dev, st_ino) لملف السجل المقروء
+        self._log_offset = 0  # عدد البايتات المقروءة أو المكتوبة من السجل
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._listeners = []
+
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self._lock_file = open(self.log_path + ".lock", 'a')
+        with self._file_lock(exclusive=False):
+            self._load()
+
+        self._thread = threading.Thread(target=self._compactor_loop, name="NotificationStoreCompactor", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ------------------- التحميل -------------------
+
+    def _load(self):
+        """تحميل اللقطة ثم إعادة تطبيق السجلات المتبقية بعدها"""
+        records = {}
+
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for record in data.get("notifications", []):
+                    if "id" in record:
+                        records[record["id"]] = record
+            except Exception as e:
+                logging.error(f"Error loading notifications snapshot {self.snapshot_path}: {e}")
+
+        replayed, self._log_offset = self._replay_log(self.log_path, records)
+
+        with self._lock:
+            self._records = records
+            self._log_ops = replayed
+            self._open_log()
+
+        logging.info(f"Notification store loaded {len(records)} notification(s), replayed {replayed} log op(s)")
+
+    def _stat_log(self):
+        """(المعرف (st_dev, st_ino)، الحجم) لملف السجل الحالي، أو (None, 0)"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _replay_log(self, path, records, offset=0, changes=None):
+        """
+        إعادة تطبيق عمليات ملف سجل على القاموس المعطى بدءاً من موضع معين.
+
+        Args:
+            changes (list): قائمة تُضاف إليها التغييرات (op, id, record) لإبلاغ المستمعين
+
+        Returns:
+            tuple: (عدد العمليات، موضع نهاية آخر سطر مكتمل)
+        """
+        if not os.path.exists(path):
+            return 0, 0
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # سطر أخير غير مكتمل: إما توقف مفاجئ أو عملية أخرى تكتبه الآن
+        end = data.rfind(b"\n") + 1
+
+        count = 0
+        for line_no, line in enumerate(data[:end].splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping corrupt line {line_no} in {path}")
+                continue
+
+            op = entry.get("op")
+            if op == "put":
+                puts = [entry["record"]]
+            elif op == "batch":
+                puts = entry["records"]
+            elif op == "delete":
+                puts = []
+                record = records.pop(entry["id"], None)
+                if changes is not None and record is not None:
+                    changes.append(("delete", entry["id"], record))
+            else:
+                continue
+            for record in puts:
+                records[record["id"]] = record
+                if changes is not None:
+                    changes.append(("put", record["id"], record))
+            count += 1
+        return count, offset + end
+
+    def _open_log(self):
+        if self._log_file:
+            self._log_file.close()
+        self._log_file = open(self.log_path, 'ab')
+        self._log_ident = self._stat_log()[0]
+
+    def reload(self):
+        """إعادة تحميل المخزن من القرص (مثلاً بعد استعادة نسخة احتياطية)"""
+        with self._lock, self._file_lock(exclusive=False):
+            self._load()
+            self._notify("reload", None, None)
+
+    # ------------------- التزامن بين العمليات -------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        """قفل ملف مشترك بين العمليات (لا يُستدعى متداخلاً)"""
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _log_changed(self):
+        """هل كتبت عملية أخرى في السجل أو ضغطته منذ آخر قراءة؟"""
+        ident, size = self._stat_log()
+        return ident != self._log_ident or size != self._log_offset
+
+    def _catch_up(self):
+        """
+        تطبيق ما كتبته العمليات الأخرى (يجب استدعاؤها تحت القفلين): العمليات
+        الجديدة في نهاية السجل، أو إعادة التحميل إذا استُبدل السجل بعد الضغط
+        """
+        ident, size = self._stat_log()
+        if ident == self._log_ident and size == self._log_offset:
+            return
+        if ident != self._log_ident:
+            self._load()
+            self._notify("reload", None, None)
+            return
+
+        changes = []
+        count, self._log_offset = self._replay_log(self.log_path, self._records, self._log_offset, changes)
+        self._log_ops += count
+        for op, notification_id, record in changes:
+            self._notify(op, notification_id, record)
+
+    def refresh(self):
+        """تطبيق ما كتبته العمليات الأخرى إن وجد (فحص stat واحد إذا لم يتغير شيء)"""
+        with self._lock:
+            if self._log_changed():
+                with self._file_lock(exclusive=False):
+                    self._catch_up()
+
+    # ------------------- المستمعون -------------------
+
+    def add_listener(self, callback):
+        """
+        تسجيل دالة تُستدعى بعد كل عملية كتابة بالشكل callback(op, notification_id, record)
+        حيث op إحدى القيم "put" أو "delete" أو "reload".
+        تُستدعى الدالة تحت قفل المخزن، لذا يجب أن تكون سريعة ولا تعدّل السجل.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, op, notification_id, record):
+        for callback in self._listeners:
+            try:
+                callback(op, notification_id, record)
+            except Exception as e:
+                logging.error(f"Error in notification store listener: {e}")
+
+    # ------------------- الكتابة -------------------
+
+    @contextmanager
+    def _writing(self):
+        """قفل الكتابة: قفل المخزن ثم قفل الملف، مع تطبيق كتابات العمليات الأخرى أولاً"""
+        with self._lock, self._file_lock():
+            self._catch_up()
+            yield
+
+    def _append(self, entry):
+        """إلحاق عملية بالسجل (يجب استدعاؤها داخل _writing)"""
+        if os.fstat(self._log_file.fileno()).st_size != self._log_offset:
+            # إنهاء سطر غير مكتمل تركه توقف مفاجئ حتى لا يلتصق بالسطر الجديد
+            self._log_file.write(b"\n")
+        self._log_file.write((json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8'))
+        self._log_file.flush()
+        self._log_offset = self._log_file.tell()
+        self._log_ops += 1
+        if self._log_ops >= self.compact_threshold:
+            self._wakeup.set()
+
+    def put(self, record):
+        """
+        إضافة إشعار أو استبداله بالكامل
+
+        Args:
+            record (dict): بيانات الإشعار (يجب أن تحتوي على id)
+        """
+        record = dict(record)
+        with self._writing():
+            self._append({"op": "put", "record": record})
+            self._records[record["id"]] = record
+            self._notify("put", record["id"], record)
+
+    def put_many(self, records):
+        """
+        إضافة عدة إشعارات دفعة واحدة في سطر سجل واحد، فإما أن تُحفظ كلها أو لا
+        يُحفظ أي منها إذا توقف البرنامج أثناء الكتابة
+
+        Args:
+            records (list): بيانات الإشعارات (يجب أن يحتوي كل منها على id)
+        """
+        records = [dict(record) for record in records]
+        if not records:
+            return
+        with self._writing():
+            self._append({"op": "batch", "records": records})
+            for record in records:
+                self._records[record["id"]] = record
+                self._notify("put", record["id"], record)
+
+    def update(self, notification_id, updates):
+        """
+        تحديث حقول إشعار موجود
+
+        Returns:
+            dict: الإشعار بعد التحديث، أو None إذا لم يكن موجوداً
+        """
+        with self._writing():
+            current = self._records.get(notification_id)
+            if current is None:
+                return None
+            record = dict(current)
+            record.update(updates)
+            self._append({"op": "put", "record": record})
+            self._records[notification_id] = record
+            self._notify("put", notification_id, record)
+            return dict(record)
+
+    def delete(self, notification_id):
+        """
+        حذف إشعار
+
+        Returns:
+            dict: الإشعار المحذوف، أو None إذا لم يكن موجوداً
+        """
+        with self._writing():
+            if notification_id not in self._records:
+                return None
+            self._append({"op": "delete", "id": notification_id})
+            record = self._records.pop(notification_id)
+            self._notify("delete", notification_id, record)
+            return record
+
+    # ------------------- القراءة -------------------
+
+    def get(self, notification_id):
+        """الحصول على نسخة من إشعار بالمعرف، أو None"""
+        self.refresh()
+        with self._lock:
+            record = self._records.get(notification_id)
+            return dict(record) if record is not None else None
+
+    def all(self):
+        """الحصول على نسخ من جميع الإشعارات بترتيب الإضافة"""
+        self.refresh()
+        with self._lock:
+            return [dict(record) for record in self._records.values()]
+
+    def find(self, predicate):
+        """الحصول على نسخ من الإشعارات التي تحقق الشرط المعطى"""
+        self.refresh()
+        with self._lock:
+            return [dict(record) for record in self._records.values() if predicate(record)]
+
+    def snapshot(self):
+        """
+        الحصول على قائمة بالسجلات نفسها (بدون نسخ) لبناء الفهارس المشتقة.
+        السجلات لا تُعدّل في مكانها أبداً، لذا يمكن قراءتها بأمان خارج القفل.
+        """
+        self.refresh()
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self):
+        self.refresh()
+        with self._lock:
+            return len(self._records)
+
+    def __contains__(self, notification_id):
+        self.refresh()
+        with self._lock:
+            return notification_id in self._records
+
+    # ------------------- الضغط -------------------
+
+    def compact(self):
+        """
+        كتابة لقطة كاملة وحذف العمليات المضمنة فيها من السجل.
+
+        تُنسخ قائمة الإشعارات تحت القفلين بعد تطبيق كتابات العمليات الأخرى، ثم
+        تُكتب اللقطة خارجهما حتى لا تتوقف القراءات والكتابات أثناء الكتابة. بعدها
+        يُؤخذ القفلان مجدداً لاستبدال السجل بملف جديد يحتوي فقط على العمليات التي
+        أُضيفت أثناء الكتابة. الملف الجديد (لا يُفرّغ السجل في مكانه) يُعلم العمليات
+        الأخرى أنه ضُغط فتعيد التحميل. إذا ضغطت عملية أخرى السجل في هذه الأثناء
+        تُلغى هذه اللقطة.
+        """
+        with self._compact_lock:
+            with self._writing():
+                if self._log_ops == 0 and os.path.exists(self.snapshot_path):
+                    return False
+                snapshot = list(self._records.values())
+                log_ident = self._log_ident
+                log_offset = self._log_offset
+                log_ops = self._log_ops
+
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"notifications": snapshot}, f, ensure_ascii=False)
+
+            with self._writing():
+                if self._log_ident != log_ident:
+                    os.remove(tmp_path)
+                    return False
+                os.replace(tmp_path, self.snapshot_path)
+
+                # توقف البرنامج هنا آمن: إعادة تطبيق السجل على اللقطة الجديدة لا تغير شيئاً
+                with open(self.log_path, 'rb') as f:
+                    f.seek(log_offset)
+                    tail = f.read(self._log_offset - log_offset)
+                with open(self.log_path + ".tmp", 'wb') as f:
+                    f.write(tail)
+                os.replace(self.log_path + ".tmp", self.log_path)
+                self._open_log()
+                self._log_offset = len(tail)
+                self._log_ops -= log_ops
+
+        logging.info(f"Notification store compacted {len(snapshot)} notification(s)")
+        return True
+
+    def _compactor_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.compact_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                if self._log_ops >= self.compact_threshold:
+                    self.compact()
+            except Exception as e:
+                logging.error(f"Error compacting notification store: {e}")
+
+    def close(self):
+        """إيقاف خيط الضغط وكتابة لقطة نهائية"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        try:
+            self.compact()
+        except Exception as e:
+            logging.error(f"Error compacting notification store on close: {e}")
+        with self._lock:
+            if self._log_file:
+                self._log_file.close()
+                self._log_file = None
+            self._lock_file.close()
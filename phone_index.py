@@ -0,0 +1,159 @@
+"""
+فهرس أرقام الهواتف الموحدة.
+
+يُحوَّل كل رقم هاتف مرة واحدة عند الإضافة إلى صيغة موحدة (رمز البلد + الرقم
+بدون علامة +) بنفس قواعد utils.format_phone_number، ويُفهرس الرقم الموحد مع
+جميع لواحقه (آخر 4 أرقام فأكثر). بذلك يصبح البحث برقم كامل بأي صيغة، أو
+بآخر أرقامه، عملية بحث في قاموس بدلاً من المرور على جميع الإشعارات.
+"""
+import logging
+import threading
+
+# أقصر لاحقة تُفهرس للبحث الجزئي برقم الهاتف
+MIN_SUFFIX_LENGTH = 4
+
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
+
+def phone_digits(phone):
+    """استخراج أرقام الهاتف فقط (مع تحويل الأرقام العربية إلى لاتينية)"""
+    if not phone:
+        return ""
+    return ''.join(c for c in phone if c.isdigit() or '٠' <= c <= '٩').translate(_ARABIC_DIGITS)
+
+
+def canonical_phone(phone):
+    """
+    تحويل رقم هاتف بأي صيغة إلى الصيغة الموحدة (رمز البلد + الرقم، بدون +).
+    يدعم الأرقام السورية والتركية.
+
+    Args:
+        phone (str): رقم الهاتف
+
+    Returns:
+        str: الرقم الموحد مثل 963947312248، أو نص فارغ
+    """
+    cleaned_phone = phone_digits(phone)
+    if not cleaned_phone:
+        return ""
+
+    # التحقق إذا كان الرقم تركياً: رمز البلد 90، أو رقم محمول محلي يبدأ بـ 05 أو 5
+    is_turkish = (
+        cleaned_phone.startswith('90') or cleaned_phone.startswith('0090')
+        or (cleaned_phone.startswith('05') and 10 <= len(cleaned_phone) <= 11)
+        or (cleaned_phone.startswith('5') and 9 <= len(cleaned_phone) <= 10)
+    )
+
+    if is_turkish:
+        if cleaned_phone.startswith('0090'):
+            return '90' + cleaned_phone[4:]
+        if cleaned_phone.startswith('90'):
+            return cleaned_phone
+        if cleaned_phone.startswith('05'):
+            return '90' + cleaned_phone[1:]
+        return '90' + cleaned_phone
+
+    # الرقم السوري (أو غيره)
+    if cleaned_phone.startswith('0'):
+        return '963' + cleaned_phone[1:]
+    if cleaned_phone.startswith('963'):
+        # معالجة خطأ شائع مثل 9639xxxxxxx مع الاحتفاظ بالأرقام الكاملة التي تحتوي 9 بعد رمز البلد
+        if len(cleaned_phone) > 4 and cleaned_phone[3] == '9' and len(cleaned_phone) < 12:
+            return '963' + cleaned_phone[4:]
+        return cleaned_phone
+    return '963' + cleaned_phone
+
+
+def phone_search_keys(phone):
+    """
+    مفاتيح البحث في الفهرس لرقم مُدخل: الرقم الموحد، والأرقام كما أُدخلت
+    للبحث بلاحقة الرقم (مثل آخر 6 أرقام).
+    """
+    keys = []
+    canonical = canonical_phone(phone)
+    if canonical:
+        keys.append(canonical)
+    digits = phone_digits(phone)
+    if len(digits) >= MIN_SUFFIX_LENGTH and digits not in keys:
+        keys.append(digits)
+    return keys
+
+
+class PhoneIndex:
+    """
+    فهرس لواحق الأرقام الموحدة مربوط بمخزن الإشعارات
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store (NotificationStore): مخزن الإشعارات
+        """
+        self.store = store
+        self._lock = threading.Lock()
+        self._by_suffix = {}  # لاحقة الرقم الموحد -> مجموعة المعرفات
+        self._canonical = {}  # المعرف -> الرقم الموحد المفهرس
+
+        store.add_listener(self._on_store_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """إعادة بناء الفهرس بالكامل من مخزن الإشعارات"""
+        with self._lock:
+            self._by_suffix = {}
+            self._canonical = {}
+            for notification in self.store.snapshot():
+                self._add(notification['id'], notification.get('phone_number', ''))
+
+        logging.info(f"Phone index rebuilt with {len(self._canonical)} number(s)")
+
+    def _add(self, notification_id, phone_number):
+        canonical = canonical_phone(phone_number)
+        if not canonical:
+            return
+        self._canonical[notification_id] = canonical
+        for start in range(len(canonical) - MIN_SUFFIX_LENGTH + 1):
+            self._by_suffix.setdefault(canonical[start:], set()).add(notification_id)
+
+    def _remove(self, notification_id):
+        canonical = self._canonical.pop(notification_id, None)
+        if canonical is None:
+            return
+        for start in range(len(canonical) - MIN_SUFFIX_LENGTH + 1):
+            ids = self._by_suffix.get(canonical[start:])
+            if ids is not None:
+                ids.discard(notification_id)
+                if not ids:
+                    del self._by_suffix[canonical[start:]]
+
+    def _on_store_change(self, op, notification_id, record):
+        if op == "reload":
+            self.rebuild()
+            return
+
+        with self._lock:
+            if op == "put":
+                if self._canonical.get(notification_id) == canonical_phone(record.get('phone_number', '')):
+                    return
+                self._remove(notification_id)
+                self._add(notification_id, record.get('phone_number', ''))
+            elif op == "delete":
+                self._remove(notification_id)
+
+    def search(self, phone_number):
+        """
+        البحث عن معرفات الإشعارات المطابقة لرقم كامل بأي صيغة أو لآخر أرقامه.
+
+        Returns:
+            set: معرفات الإشعارات المطابقة
+        """
+        self.store.refresh()
+        ids = set()
+        with self._lock:
+            for key in phone_search_keys(phone_number):
+                ids.update(self._by_suffix.get(key, ()))
+        return ids
+
+    def __len__(self):
+        with self._lock:
+            return len(self._canonical)
@@ -0,0 +1,37 @@
+"""
+سكريبت لمرة واحدة لإعادة بناء فهرس الصور ونقل الصور القديمة إلى مخزن المحتوى
+
+بعد تشغيله لا يحتاج البحث عن صورة أي إشعار إلى الوصول لمجلد الصور.
+يجب إيقاف البوت قبل تشغيله (يرفض العمل أثناء تشغيل البوت).
+"""
+import logging
+import sys
+
+import database as db
+
+# إعداد تسجيل الأحداث
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """الدالة الرئيسية لإعادة فهرسة الصور"""
+    try:
+        report = db.reindex_images()
+    except Exception as e:
+        logger.error(f"فشلت إعادة فهرسة الصور: {e}")
+        sys.exit(1)
+    
+    logger.info(f"تم نقل {report['imported']} صورة قديمة إلى مخزن المحتوى")
+    logger.info(f"تم تحديث مسار الصورة لـ {report['updated']} إشعار")
+    logger.info(f"تم تحرير {report['dropped']} ارتباط بملفات مفقودة وحذف {report['removed']} ملف غير مرتبط")
+    if report['missing']:
+        logger.warning(f"{report['missing']} إشعار بدون صورة مخزنة")
+    
+    stats = db.get_blob_store().stats()
+    logger.info(f"مخزن المحتوى: {stats['blobs']} ملف، {stats['owners']} ارتباط، {stats['bytes']} بايت")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+طابور التذكيرات المرتب زمنياً.
+
+يحتفظ الطابور بكومة (heap) مفتاحها وقت استحقاق التذكير
+(created_at + reminder_hours)، بحيث لا يلمس فحص التذكيرات الدوري سوى
+الإشعارات المستحقة فعلاً بدلاً من المرور على جميع الإشعارات كل دقيقة.
+
+يُعاد بناء الجدول من مخزن الإشعارات عند بدء التشغيل، ويبقى متزامناً معه
+عبر مستمع المخزن عند الإضافة والتحديث والحذف.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+
+def get_due_time(notification):
+    """
+    حساب وقت استحقاق التذكير لإشعار.
+
+    Args:
+        notification (dict): بيانات الإشعار
+
+    Returns:
+        datetime: وقت الاستحقاق، أو None إذا كان التذكير معطلاً أو مرسلاً
+    """
+    if notification.get('reminder_sent', False):
+        return None
+
+    # الإشعارات التي لا تحدد مدة التذكير تستخدم المدة الافتراضية، والصفر يعني تعطيله
+    reminder_hours = notification.get('reminder_hours')
+    if reminder_hours is None:
+        reminder_hours = 24
+    if reminder_hours <= 0:
+        return None
+
+    try:
+        created_at = datetime.fromisoformat(notification['created_at'])
+    except (KeyError, TypeError, ValueError):
+        logging.warning(f"Invalid created_at for notification {notification.get('id')}")
+        return None
+
+    return created_at + timedelta(hours=reminder_hours)
+
+
+class ReminderQueue:
+    """
+    كومة تذكيرات مرتبة حسب وقت الاستحقاق ومربوطة بمخزن الإشعارات
+    """
+
+    def __init__(self, store):
+        """
+        Args:
+            store (NotificationStore): مخزن الإشعارات
+        """
+        self.store = store
+        self._lock = threading.Lock()
+        self._heap = []  # عناصر بالشكل (وقت الاستحقاق، المعرف)
+        self._scheduled = {}  # المعرف -> وقت الاستحقاق الحالي
+
+        store.add_listener(self._on_store_change)
+        self.rebuild()
+
+    def rebuild(self):
+        """إعادة بناء الجدول بالكامل من مخزن الإشعارات"""
+        scheduled = {}
+        for notification in self.store.snapshot():
+            due_time = get_due_time(notification)
+            if due_time is not None:
+                scheduled[notification['id']] = due_time
+
+        heap = [(due_time, notification_id) for notification_id, due_time in scheduled.items()]
+        heapq.heapify(heap)
+
+        with self._lock:
+            self._heap = heap
+            self._scheduled = scheduled
+
+        logging.info(f"Reminder queue rebuilt with {len(scheduled)} pending reminder(s)")
+
+    def _on_store_change(self, op, notification_id, record):
+        if op == "reload":
+            self.rebuild()
+            return
+
+        due_time = get_due_time(record) if op == "put" else None
+
+        with self._lock:
+            if due_time is None:
+                # العنصر القديم في الكومة سيتم تجاهله عند سحبه
+                self._scheduled.pop(notification_id, None)
+            elif self._scheduled.get(notification_id) != due_time:
+                self._scheduled[notification_id] = due_time
+                heapq.heappush(self._heap, (due_time, notification_id))
+
+    def pop_due(self, now=None):
+        """
+        الحصول على الإشعارات التي حان وقت تذكيرها.
+
+        تبقى هذه الإشعارات مجدولة حتى يتم تعليمها كمرسلة عبر
+        db.mark_reminder_sent، لذلك يعاد إرسال التذكيرات الفاشلة في الفحص التالي.
+
+        Args:
+            now (datetime): الوقت الحالي (افتراضياً datetime.now())
+
+        Returns:
+            list: قائمة بالإشعارات المستحقة
+        """
+        if now is None:
+            now = datetime.now()
+        self.store.refresh()
+
+        due_ids = []
+        seen = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_time, notification_id = heapq.heappop(self._heap)
+                # تجاهل العناصر القديمة بعد تحديث وقت التذكير أو إرساله أو الحذف
+                if self._scheduled.get(notification_id) != due_time or notification_id in seen:
+                    continue
+                seen.add(notification_id)
+                due_ids.append(notification_id)
+
+            for notification_id in due_ids:
+                heapq.heappush(self._heap, (self._scheduled[notification_id], notification_id))
+
+        due = []
+        for notification_id in due_ids:
+            notification = self.store.get(notification_id)
+            if notification is not None:
+                due.append(notification)
+        return due
+
+    def next_due_time(self):
+        """الحصول على أقرب وقت استحقاق مجدول، أو None"""
+        with self._lock:
+            while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._scheduled)
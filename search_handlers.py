@@ -6,6 +6,7 @@ from telegram.ext import (
 )
 
 import database as db
+from async_db import adb
 import strings as st
 import utils
 import input_validator as validator
@@ -125,7 +126,7 @@ async def process_name_search(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # No additional validation needed - accept any non-empty string
     try:
-        results = db.search_notifications_by_name(query)
+        results = await adb.search_notifications_by_name(query)
         await display_search_results(update, context, results, query)
     except Exception as e:
         logging.error(f"Error in name search: {e}")
@@ -151,7 +152,7 @@ async def process_phone_search(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         # استخدام رقم الهاتف المنسق (مع رمز البلد) للبحث في قاعدة البيانات
-        results = db.search_notifications_by_phone(formatted_phone)
+        results = await adb.search_notifications_by_phone(formatted_phone)
         await display_search_results(update, context, results, formatted_phone)
     except Exception as e:
         logging.error(f"Error in phone search: {e}")
@@ -256,9 +257,9 @@ async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_T
             return
             
         if is_name_search:
-            results = db.search_notifications_by_name(search_query)
+            results = await adb.search_notifications_by_name(search_query)
         else:
-            results = db.search_notifications_by_phone(search_query)
+            results = await adb.search_notifications_by_phone(search_query)
         
         keyboard = utils.create_paginated_keyboard(results, page, "search")
         
@@ -271,9 +272,7 @@ async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_T
         # View notification details
         notification_id = data[2]
         
-        # الحصول على كل الإشعارات ثم البحث عن الإشعار بالمعرف مباشرة
-        all_notifications = db.get_all_notifications()
-        notification = next((n for n in all_notifications if n["id"] == notification_id), None)
+        notification = await adb.get_notification(notification_id)
         
         if not notification:
             logging.error(f"لم يتم العثور على الإشعار بالمعرف {notification_id}")
@@ -284,10 +283,10 @@ async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_T
         details = utils.format_notification_details(notification)
         
         # Get the image
-        image_data = db.get_image(notification_id)
+        image_path = await adb.get_image_path(notification_id)
         
-        if image_data:
-            await utils.send_image_with_caption(update, context, photo=image_data, caption=details)
+        if image_path:
+            await utils.send_notification_image(update, context, notification_id, image_path, caption=details)
         else:
             await query.message.reply_text(details + "\n\n⚠️ الصورة غير متوفرة!")
 
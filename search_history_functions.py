@@ -2,9 +2,57 @@
 وظائف مساعدة للتعامل مع سجلات البحث
 """
 import logging
+import threading
+import time
 from typing import List, Dict, Any, Optional
 from models import SearchHistory, Notification
 from db_manager import SessionLocal, increment_statistics
+from config import SEARCH_HISTORY_CACHE_TTL
+
+# ذاكرة سجلات البحث لكل مستخدم: معرف المستخدم -> (وقت الانتهاء، الحد، السجلات)
+_history_cache = {}
+_history_cache_lock = threading.Lock()
+
+def _invalidate_user_history(user_id: int):
+    """تفريغ سجلات البحث المحفوظة في الذاكرة للمستخدم (بعد إضافة سجل أو حذفه)"""
+    with _history_cache_lock:
+        _history_cache.pop(user_id, None)
+
+def _copy_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [dict(record, notifications=[dict(n) for n in record['notifications']]) for record in records]
+
+def _notification_summaries(db, notification_ids) -> Dict[str, Dict[str, Any]]:
+    """
+    ملخصات الإشعارات المطلوبة باستعلام واحد (IN) بدلاً من استعلام لكل معرف
+    
+    Returns:
+        Dict[str, Dict[str, Any]]: المعرف -> الملخص (الإشعارات المحذوفة غير موجودة)
+    """
+    notification_ids = set(notification_ids)
+    if not notification_ids:
+        return {}
+    rows = db.query(
+        Notification.id, Notification.customer_name, Notification.phone_number,
+        Notification.is_delivered, Notification.has_image
+    ).filter(Notification.id.in_(notification_ids)).all()
+    return {
+        row.id: {
+            'id': row.id,
+            'customer_name': row.customer_name,
+            'phone_number': row.phone_number,
+            'is_delivered': row.is_delivered,
+            'has_image': row.has_image
+        }
+        for row in rows
+    }
+
+def _attach_notifications(record: SearchHistory, summaries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """تحويل سجل البحث إلى قاموس مع ملخصات إشعاراته بترتيب نتائج البحث"""
+    result = record.to_dict()
+    result['notifications'] = [
+        summaries[notif_id] for notif_id in (record.notification_ids or []) if notif_id in summaries
+    ]
+    return result
 
 def add_search_record(user_id: int, username: str, search_term: str, search_type: str, 
                      results: List[Dict[str, Any]]) -> bool:
@@ -84,6 +132,7 @@ def add_search_record(user_id: int, username: str, search_term: str, search_type
         
         # الحفظ في قاعدة البيانات
         db.commit()
+        _invalidate_user_history(user_id)
         
         # استخدام المعرف المؤقت بدلاً من الوصول إلى السجل بعد الحفظ
         logging.info(f"تم إضافة سجل بحث جديد للمستخدم {user_id} بنجاح، معرف السجل: {record_id}")
@@ -116,63 +165,30 @@ def get_user_search_history(user_id: int, limit: int = 10) -> List[Dict[str, Any
     Returns:
         List[Dict[str, Any]]: قائمة بسجلات البحث
     """
+    now = time.monotonic()
+    with _history_cache_lock:
+        entry = _history_cache.get(user_id)
+        if entry is not None and entry[0] > now and entry[1] >= limit:
+            return _copy_records(entry[2][:limit])
+    
     db = SessionLocal()
     try:
-        logging.info(f"جاري البحث عن سجلات البحث للمستخدم {user_id}...")
-        
-        # التحقق من وجود سجلات للمستخدم
-        count = db.query(SearchHistory).filter(SearchHistory.user_id == user_id).count()
-        logging.info(f"عدد سجلات البحث الموجودة للمستخدم {user_id}: {count}")
-        
-        if count == 0:
-            logging.warning(f"لا توجد سجلات بحث للمستخدم {user_id}")
-            return []
-            
         records = db.query(SearchHistory)\
             .filter(SearchHistory.user_id == user_id)\
             .order_by(SearchHistory.created_at.desc())\
             .limit(limit)\
             .all()
         
-        logging.info(f"تم العثور على {len(records)} سجل بحث للمستخدم {user_id}")
-            
-        results = []
+        # جلب إشعارات جميع السجلات باستعلام واحد
+        summaries = _notification_summaries(
+            db, [notif_id for record in records for notif_id in (record.notification_ids or [])]
+        )
+        results = [_attach_notifications(record, summaries) for record in records]
+        logging.debug(f"تم العثور على {len(results)} سجل بحث للمستخدم {user_id}")
         
-        for i, record in enumerate(records):
-            result = record.to_dict()
-            
-            logging.info(f"معالجة سجل البحث #{i+1}: {record.id} - المصطلح: {record.search_term}, "
-                         f"النوع: {record.search_type}, معرفات الإشعارات: {record.notification_ids}")
-            
-            # إضافة معلومات الإشعارات لكل سجل
-            if record.notification_ids and len(record.notification_ids) > 0:
-                notifications = []
-                
-                for notif_id in record.notification_ids:
-                    try:
-                        notification = db.query(Notification).filter(Notification.id == notif_id).first()
-                        if notification:
-                            notifications.append({
-                                'id': notification.id,
-                                'customer_name': notification.customer_name,
-                                'phone_number': notification.phone_number,
-                                'is_delivered': notification.is_delivered,
-                                'has_image': notification.has_image
-                            })
-                        else:
-                            logging.warning(f"لم يتم العثور على الإشعار بالمعرف: {notif_id}")
-                    except Exception as notif_error:
-                        logging.error(f"خطأ في استرجاع الإشعار {notif_id}: {notif_error}")
-                
-                logging.info(f"تم العثور على {len(notifications)} إشعار مرتبط بسجل البحث {record.id}")
-                result['notifications'] = notifications
-            else:
-                logging.warning(f"سجل البحث {record.id} لا يحتوي على معرفات إشعارات")
-                result['notifications'] = []
-                
-            results.append(result)
-            
-        return results
+        with _history_cache_lock:
+            _history_cache[user_id] = (now + SEARCH_HISTORY_CACHE_TTL, limit, results)
+        return _copy_records(results)
     except Exception as e:
         logging.error(f"خطأ أثناء استرجاع سجلات البحث: {e}")
         import traceback
@@ -198,24 +214,7 @@ def get_search_record_by_id(record_id: int) -> Optional[Dict[str, Any]]:
         if not record:
             return None
             
-        result = record.to_dict()
-        
-        # إضافة معلومات الإشعارات
-        if record.notification_ids:
-            notifications = []
-            for notif_id in record.notification_ids:
-                notification = db.query(Notification).filter(Notification.id == notif_id).first()
-                if notification:
-                    notifications.append({
-                        'id': notification.id,
-                        'customer_name': notification.customer_name,
-                        'phone_number': notification.phone_number,
-                        'is_delivered': notification.is_delivered,
-                        'has_image': notification.has_image
-                    })
-            result['notifications'] = notifications
-            
-        return result
+        return _attach_notifications(record, _notification_summaries(db, record.notification_ids or []))
     except Exception as e:
         logging.error(f"خطأ أثناء استرجاع سجل البحث: {e}")
         return None
@@ -244,6 +243,7 @@ def delete_search_record(record_id: int, user_id: int) -> bool:
             
         db.delete(record)
         db.commit()
+        _invalidate_user_history(user_id)
         
         logging.info(f"تم حذف سجل البحث {record_id}")
         return True
@@ -18,6 +18,8 @@ from PIL import Image
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+from phone_index import canonical_phone
+
 # تأكد من استخدام مكتبات الذكاء الاصطناعي المناسبة
 try:
     from ai_assistant import process_image
@@ -53,9 +55,118 @@ def extract_shipment_data_from_image(image_path: str) -> Dict[str, Any]:
         return {"error": f"حدث خطأ أثناء معالجة الصورة: {str(e)}"}
 
 
+# ------------------- محرك استخراج البيانات من النص -------------------
+#
+# تُمسح النص مرة واحدة بتعبير منتظم مُجمّع مسبقاً يقسمه إلى رموز (تسميات الحقول،
+# أرقام الهواتف، التواريخ، المبالغ، العملات، المدن، أرقام المراجع)، ثم تُملأ جميع
+# الحقول من قائمة الرموز. لكل حقل أولوية: القيمة التي تلي تسمية صريحة تتقدم على
+# القيم المستنتجة من شكل الرمز فقط.
+
+# تسميات الحقول: النص -> (الحقل، الأولوية). الأولوية الأصغر أقوى.
+_FIELD_LABELS = {
+    'اسم_الزبون': {
+        'المرسل إليه': 0, 'المرسل اليه': 0, 'اسم العميل': 0, 'اسم المستلم': 0, 'المستلم': 0,
+        'العميل': 0, 'الزبون': 0, 'اسم الزبون': 0,
+        'اسم': 1, 'name': 1, 'الاسم': 2, 'مستلم': 3, 'recipient': 3,
+    },
+    'رقم_الهاتف': {
+        'رقم الهاتف': 0, 'رقم الجوال': 0, 'هاتف': 0, 'الهاتف': 0, 'جوال': 0, 'موبايل': 0,
+        'تلفون': 0, 'phone': 0, 'mobile': 0, 'tel': 0,
+    },
+    'تاريخ_الشحنة': {
+        'تاريخ الطباعة': 0, 'تاريخ وقت الطباعة': 0, 'التاريخ': 0, 'تاريخ الإرسال': 0,
+        'تاريخ': 0, 'date': 0,
+    },
+    'الوجهة': {
+        'الوجهة': 0, 'المدينة': 0, 'منطقة التسليم': 0, 'وجهة': 0, 'مدينة': 0,
+        'destination': 0, 'city': 0, 'إلى': 1, 'الى': 1, 'to': 1, 'مصدر': 3,
+    },
+    'نوع_العبوة': {'نوع العبوة': 0, 'نوع': 1},
+    'أجور_الشحن': {
+        'أجور الشحن': 0, 'أجر الشحن': 0, 'أجور التنزيل': 0, 'أجر التنزيل': 0,
+        'الشحن': 1, 'التنزيل': 1,
+    },
+    'أجور_التوصيل': {
+        'أجور التوصيل': 0, 'أجر التوصيل': 0, 'أجور التحميل': 0, 'أجر التحميل': 0,
+        'التوصيل': 1, 'التحميل': 1,
+    },
+    'قيمة_الشحنة': {
+        'المجموع': 0, 'قيمة البضاعة': 0, 'المبلغ': 0, 'السعر': 0, 'التكلفة': 0,
+        'قيمة الشحنة': 0, 'القيمة': 0, 'قيمة': 0, 'amount': 0, 'value': 0, 'total': 0, 'price': 0,
+    },
+    'رقم_الفاتورة': {'رقم الفاتورة': 0, 'رقم الشحنة': 0, 'رقم الدفع': 0},
+    'نوع_الفاتورة': {'شركة': 0},
+}
+
+_LABELS = {
+    label.lower(): (field, rank)
+    for field, labels in _FIELD_LABELS.items()
+    for label, rank in labels.items()
+}
+
+# الحقول التي قيمتها نص (بقية السطر بعد التسمية) وحدود طولها
+_TEXT_FIELDS = {
+    'اسم_الزبون': (3, 50),
+    'الوجهة': (2, 20),
+    'نوع_العبوة': (1, 50),
+    'نوع_الفاتورة': (2, 50),
+}
+
+# أنواع الرموز المقبولة قيمةً لكل حقل رقمي
+_VALUE_KINDS = {
+    'رقم_الهاتف': ('phone',),
+    'تاريخ_الشحنة': ('date',),
+    'أجور_الشحن': ('amount',),
+    'أجور_التوصيل': ('amount',),
+    'قيمة_الشحنة': ('amount', 'phone'),
+    'رقم_الفاتورة': ('ref', 'amount', 'phone'),
+}
+
+_CITIES = (
+    'دمشق', 'حلب', 'حمص', 'حماة', 'اللاذقية', 'طرطوس', 'الرقة', 'دير الزور',
+    'الحسكة', 'السويداء', 'درعا', 'إدلب', 'القامشلي',
+)
+
+_CURRENCIES = ('ل.س', 'ليرة', 'دولار', 'يورو', 'TL', 'SYP', 'USD', 'EUR', '₺', '$', '€')
+
+
+def _alternation(words):
+    # الأطول أولاً حتى تتقدم "اسم العميل" على "اسم"
+    return '|'.join(re.escape(word).replace(r'\ ', r'\s+') for word in sorted(words, key=len, reverse=True))
+
+
+_TOKEN_RE = re.compile(
+    r"(?P<date>(?<!\d)(?:\d{4}[/\-.]\d{1,2}[/\-.]\d{1,2}|\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4})"
+    r"(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?(?!\d))"
+    r"|(?P<phone>(?<![\d,.])(?:\+|00)?\d(?:[ \-]?\d){8,13}(?![\d,.]))"
+    r"|(?P<ref>(?-i:(?<!\w)(?=[A-Z0-9]*[A-Z])(?=[A-Z0-9]*\d)[A-Z0-9]{8,}(?!\w)))"
+    r"|(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:[.,]\d+)?)"
+    rf"|(?P<currency>(?<!\w)(?:{_alternation(_CURRENCIES)}))"
+    rf"|(?P<city>(?<!\w)(?:{_alternation(_CITIES)})(?!\w))"
+    rf"|(?P<label>(?<!\w)(?:{_alternation(_LABELS)})(?!\w))",
+    re.IGNORECASE,
+)
+
+# نهاية القيمة النصية: سطر جديد أو فاصلة أو شرطة أو نقطتان
+_TEXT_VALUE_END = re.compile(r"[\n\r,،:\-–—]")
+
+_NON_AMOUNT_CHARS = re.compile(r"[^\d.,]")
+
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+
+
+def _normalize_phone(phone: str) -> str:
+    canonical = canonical_phone(phone)
+    return '+' + canonical if canonical else ''
+
+
+def _same_line(text: str, start: int, end: int) -> bool:
+    return text.find('\n', start, end) == -1
+
+
 def extract_data_from_text(text: str) -> Dict[str, Any]:
     """
-    استخراج البيانات من النص المستخرج من OCR باستخدام تعبيرات منتظمة متقدمة
+    استخراج البيانات من النص المستخرج من OCR بمسح واحد للنص
     
     Args:
         text: النص المستخرج من الصورة
@@ -63,204 +174,108 @@ def extract_data_from_text(text: str) -> Dict[str, Any]:
     Returns:
         قاموس يحتوي على البيانات المستخرجة
     """
-    data = {}
-    
-    # استبدال بعض الرموز للتسهيل في البحث
-    text = text.replace(":", " : ").replace("-", " - ").replace("،", ", ")
-    
-    # سجل النص المستخرج للتشخيص
-    logger.info(f"النص المستخرج من الصورة: {text}")
-    
-    # البحث عن وصف الفاتورة
-    invoice_type_match = re.search(r"شركة\s+(.+?)\s+للخدمات", text)
-    if invoice_type_match:
-        data['نوع_الفاتورة'] = invoice_type_match.group(1).strip()
-        logger.info(f"تم العثور على نوع الفاتورة: {data['نوع_الفاتورة']}")
-    
-    # البحث عن رقم الفاتورة
-    invoice_number_match = re.search(r"(?:رقم\s+الفاتورة|رقم\s+الشحنة|رقم\s+الدفع)?\s*:?\s*([A-Z0-9]{8,})", text)
-    if invoice_number_match:
-        data['رقم_الفاتورة'] = invoice_number_match.group(1).strip()
-        logger.info(f"تم العثور على رقم الفاتورة: {data['رقم_الفاتورة']}")
-    
-    # اسم الزبون - استخدام أنماط متعددة للعثور على اسم العميل
-    name_patterns = [
-        r"(?:المرسل إليه|المرسل اليه|اسم العميل|اسم المستلم|المستلم|العميل|الزبون|اسم الزبون)\s*[:\-–—]?\s*([^\n\d]{3,50}?)(?:\s*[-–]\s*|\n|,|$)",
-        r"(?:اسم|name)[:\s]\s*([^\n\d]{3,50}?)(?:\n|,|$)",
-        r"(?:الاسم)[:\s]\s*([^\n\d]{3,50}?)(?:\n|,|$)",
-        r"(?:مستلم|recipient)[:\s]\s*([^\n\d]{3,50}?)(?:\n|,|$)",
-        # أنماط مخصصة للمثال المحدد (ابرار ديبر القزق)
-        r"(?:المستلم)[:\s]*\s*([ا-ي\s]{5,50}?)(?:\n|,|$)",
-        # نمط خاص بفاتورة الشحن الجديدة
-        r"اسم\s+العميل.+?(?::|:).+?([ا-ي\s]{3,50})"
-    ]
-    
-    for pattern in name_patterns:
-        name_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if name_match:
-            name = name_match.group(1).strip()
-            # تنظيف الاسم من أي كلمات غير مرغوبة
-            name = re.sub(r'^\s*[:-]\s*', '', name)  # إزالة الرموز في البداية
-            if len(name) >= 3 and len(name) <= 50:  # تحقق إضافي من طول الاسم
-                data['اسم_الزبون'] = name
-                logger.info(f"تم العثور على اسم الزبون: {name}")
-                break
-    
-    # رقم الهاتف - بحث أكثر شمولاً لأرقام الهواتف السورية والتركية
-    phone_patterns = [
-        r"(?:رقم|هاتف|جوال|موبايل|تلفون|phone|mobile|tel)[:\s]\s*(\+?(?:90|963)?[\s\-]?[0-9]\d[\s\-]?\d{7,10})",
-        r"\+?(?:90|963)[\s\-]?[0-9]\d[\s\-]?\d{7,10}",  # أرقام بالكود الدولي
-        r"(?:0)[0-9][\s\-]?\d{8}",  # أرقام محلية سورية وتركية
-        r"0\d{9,11}",  # رقم مكون من 10-12 أرقام يبدأ بصفر
-        r"\d{4}[\s\-]?\d{7}",  # نمط أرقام إضافي
-        # نمط خاص لأرقام الهواتف في الفاتورة الجديدة
-        r"هاتف\s*:?\s*0\d{9,11}"
-    ]
-    
-    # البحث في النص كامل عن أرقام الهواتف
+    scan_text = text.translate(_ARABIC_DIGITS)
+    tokens = [(match.lastgroup, match.group(), match.start(), match.end())
+              for match in _TOKEN_RE.finditer(scan_text)]
+    token_count = len(tokens)
+
+    # الحقل -> (الأولوية، الموضع، القيمة)
+    best = {}
+    consumed = set()  # رموز استُخدمت كقيمة لتسمية صريحة
+    labelled_phones = []
+    phones = []
+
+    def offer(field, rank, position, value):
+        if value and (field not in best or (rank, position) < best[field][:2]):
+            best[field] = (rank, position, value)
+
+    for index, (kind, value, start, end) in enumerate(tokens):
+        if kind == 'label':
+            field, rank = _LABELS[' '.join(value.lower().split())]
+            next_start = tokens[index + 1][2] if index + 1 < token_count else len(scan_text)
+
+            if field == 'الوجهة' and index + 1 < token_count and tokens[index + 1][0] == 'city' \
+                    and _same_line(scan_text, end, next_start):
+                offer(field, rank, start, tokens[index + 1][1])
+                continue
+
+            if field in _TEXT_FIELDS:
+                segment = scan_text[end:next_start].lstrip(' \t:-–—')
+                stop = _TEXT_VALUE_END.search(segment)
+                if stop:
+                    segment = segment[:stop.start()]
+                if field == 'نوع_الفاتورة':
+                    if 'للخدمات' not in segment:
+                        continue
+                    segment = segment.split('للخدمات')[0]
+                segment = ' '.join(segment.split())
+                min_length, max_length = _TEXT_FIELDS[field]
+                if min_length <= len(segment) <= max_length:
+                    offer(field, rank, start, segment)
+                continue
+
+            # حقل رقمي: أول رمز من النوع المناسب على نفس السطر بعد التسمية (مع تجاوز رمز العملة)
+            for value_index in range(index + 1, min(index + 3, token_count)):
+                value_kind, value_text, value_start, _ = tokens[value_index]
+                if not _same_line(scan_text, end, value_start):
+                    break
+                if value_kind in _VALUE_KINDS[field]:
+                    consumed.add(value_index)
+                    if field == 'رقم_الهاتف':
+                        labelled_phones.append(_normalize_phone(value_text))
+                    elif field in ('أجور_الشحن', 'أجور_التوصيل', 'قيمة_الشحنة'):
+                        offer(field, rank, start, _NON_AMOUNT_CHARS.sub('', value_text))
+                    else:
+                        offer(field, rank, start, value_text.strip())
+                    break
+                if value_kind != 'currency':
+                    break
+
+        elif kind == 'city':
+            offer('الوجهة', 2, start, value)
+
+        elif index in consumed:
+            continue
+
+        elif kind == 'phone':
+            phones.append(_normalize_phone(value))
+
+        elif kind == 'date':
+            offer('تاريخ_الشحنة', 1, start, value.strip())
+
+        elif kind == 'ref':
+            offer('رقم_الفاتورة', 1, start, value)
+
+        elif kind == 'amount':
+            # مبلغ بجانب رمز عملة على نفس السطر، وإلا أي عدد من 3 أرقام فأكثر
+            beside_currency = any(
+                0 <= neighbour < token_count and tokens[neighbour][0] == 'currency'
+                and _same_line(scan_text, min(end, tokens[neighbour][2]), max(start, tokens[neighbour][3]))
+                for neighbour in (index - 1, index + 1)
+            )
+            amount = _NON_AMOUNT_CHARS.sub('', value)
+            if beside_currency:
+                offer('قيمة_الشحنة', 1, start, amount)
+            elif sum(c.isdigit() for c in amount) >= 3:
+                offer('قيمة_الشحنة', 2, start, amount)
+
+    data = {field: value for field, (_, _, value) in best.items()}
+
+    # اختيار الرقم الأول (المسبوق بتسمية أولاً) وحفظ باقي الأرقام
     all_phones = []
-    for pattern in phone_patterns:
-        for phone_match in re.finditer(pattern, text, re.IGNORECASE):
-            if ":" in pattern:
-                phone = phone_match.group(1)
-            else:
-                if phone_match.group(0).startswith("هاتف"):
-                    # استخراج الرقم من النص الذي يبدأ بكلمة هاتف
-                    phone_text = phone_match.group(0)
-                    phone = re.search(r"0\d{9,11}", phone_text).group(0)
-                else:
-                    phone = phone_match.group(0)
-            
-            phone = re.sub(r'[^\d+]', '', phone)  # تنظيف الرقم من أي حروف غير الأرقام والعلامة +
-            
-            # تأكد من إضافة كود الدولة إذا لم يكن موجودًا
-            if phone.startswith('09'):
-                phone = '+963' + phone[1:]
-            elif phone.startswith('05'):
-                phone = '+90' + phone[1:]
-            elif phone.startswith('01'):
-                phone = '+963' + phone[1:]
-            
+    for phone in labelled_phones + phones:
+        if phone and phone not in all_phones:
             all_phones.append(phone)
-    
-    # اختيار أول رقم هاتف تم العثور عليه
     if all_phones:
         data['رقم_الهاتف'] = all_phones[0]
-        logger.info(f"تم العثور على رقم الهاتف: {data['رقم_الهاتف']}")
-        
-        # تخزين كافة أرقام الهواتف التي تم العثور عليها
         if len(all_phones) > 1:
             data['أرقام_هواتف_إضافية'] = all_phones[1:]
-            logger.info(f"أرقام هواتف إضافية: {data['أرقام_هواتف_إضافية']}")
-    
-    # التاريخ - بحث عن مجموعة متنوعة من صيغ التاريخ
-    date_patterns = [
-        r"(?:تاريخ الطباعة|التاريخ|تاريخ الإرسال|تاريخ|date)[:\s]\s*(\d{1,4}[\/\-.]\d{1,2}[\/\-.]\d{1,4})",
-        r"(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})",  # نمط تاريخ عام
-        r"(\d{4}[\/\-.]\d{1,2}[\/\-.]\d{1,2})",  # نمط تاريخ معكوس (السنة أولاً)
-        # نمط مخصص للبحث عن تاريخ مثل المثال (2025-04-22)
-        r"(20\d{2}[\-\/]\d{1,2}[\-\/]\d{1,2})",
-        # نمط للبحث عن تاريخ مع وقت الطباعة
-        r"تاريخ\s+وقت\s+الطباعة\s*:?\s*(20\d{2}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})"
-    ]
-    
-    for pattern in date_patterns:
-        date_match = re.search(pattern, text)
-        if date_match:
-            date_str = date_match.group(1) if ":" in pattern else date_match.group(0)
-            data['تاريخ_الشحنة'] = date_str.strip()
-            logger.info(f"تم العثور على تاريخ الشحنة: {data['تاريخ_الشحنة']}")
-            break
-    
-    # الوجهة - بحث عن الوجهة أو المدينة
-    destination_patterns = [
-        r"(?:الوجهة|المدينة|منطقة التسليم|وجهة|مدينة|destination|city)[:\s]\s*([^\n\d]{2,20}?)(?:\n|,|$)",
-        r"(?:إلى|الى|to)[:\s]\s*([^\n\d]{2,20}?)(?:\n|,|$)",
-        # أنماط إضافية للوجهات السورية المشهورة
-        r"\b(دمشق|حلب|حمص|حماة|اللاذقية|طرطوس|الرقة|دير الزور|الحسكة|السويداء|درعا|إدلب|القامشلي)\b",
-        # نمط خاص للوجهة في فاتورة الشحن الجديدة
-        r"مصدر\s*:?\s*([^\n\d]{2,20})"
-    ]
-    
-    for pattern in destination_patterns:
-        destination_match = re.search(pattern, text, re.IGNORECASE)
-        if destination_match:
-            if ":" in pattern:
-                destination = destination_match.group(1).strip()
-            else:
-                destination = destination_match.group(0).strip()
-            destination = re.sub(r'^\s*[:-]\s*', '', destination)  # إزالة الرموز في البداية
-            data['الوجهة'] = destination
-            logger.info(f"تم العثور على الوجهة: {data['الوجهة']}")
-            break
-    
-    # البحث عن نوع العبوة
-    package_type_patterns = [
-        r"نوع\s+العبوة\s*:?\s*([^\n\r:]+)",
-        r"نوع\s*:?\s*([^\n\r:]+)"
-    ]
-    
-    for pattern in package_type_patterns:
-        package_type_match = re.search(pattern, text)
-        if package_type_match:
-            data['نوع_العبوة'] = package_type_match.group(1).strip()
-            logger.info(f"تم العثور على نوع العبوة: {data['نوع_العبوة']}")
-            break
-    
-    # البحث عن أجور الشحن والتوصيل
-    shipping_cost_patterns = [
-        r"(?:أجور|أجر)\s+(?:الشحن|التنزيل)\s*:?\s*(\d[\d,.]+)",
-        r"(?:الشحن|التنزيل)\s*:?\s*(\d[\d,.]+)"
-    ]
-    
-    delivery_cost_patterns = [
-        r"(?:أجور|أجر)\s+(?:التوصيل|التحميل)\s*:?\s*(\d[\d,.]+)",
-        r"(?:التوصيل|التحميل)\s*:?\s*(\d[\d,.]+)"
-    ]
-    
-    for pattern in shipping_cost_patterns:
-        shipping_cost_match = re.search(pattern, text)
-        if shipping_cost_match:
-            data['أجور_الشحن'] = shipping_cost_match.group(1).strip()
-            logger.info(f"تم العثور على أجور الشحن: {data['أجور_الشحن']}")
-            break
-    
-    for pattern in delivery_cost_patterns:
-        delivery_cost_match = re.search(pattern, text)
-        if delivery_cost_match:
-            data['أجور_التوصيل'] = delivery_cost_match.group(1).strip()
-            logger.info(f"تم العثور على أجور التوصيل: {data['أجور_التوصيل']}")
-            break
-    
-    # قيمة الشحنة - بحث عن المبلغ أو قيمة الشحنة
-    value_patterns = [
-        r"(?:المجموع|قيمة البضاعة|المبلغ|السعر|التكلفة|قيمة الشحنة|القيمة|قيمة|amount|value|total|price)[:\s]\s*([\d.,]+)(?:\s*(?:ل\.س|ليرة|دولار|يورو|TL|SYP|USD|EUR|₺|\$|€)?)",
-        r"(?:ل\.س|ليرة|دولار|يورو|TL|SYP|USD|EUR|₺|\$|€)\s*([\d.,]+)",  # عملة قبل الرقم
-        # أنماط متخصصة لقيم الشحن السورية
-        r"(\d{3,6}(?:[.,]\d{3})*)(?:\s*(?:ل\.س|ليرة))?",  # مثل 690,000 أو 690000
-        r"(\d{3,6})[,\s](\d{3})(?:\s*(?:ل\.س|ليرة))?",  # مثل 690,000 أو 690 000
-        # نمط خاص لقيمة الشحنة في فاتورة الشحن الجديدة
-        r"المجموع\s*:?\s*(\d[\d,.]+)"
-    ]
-    
-    for pattern in value_patterns:
-        value_match = re.search(pattern, text, re.IGNORECASE)
-        if value_match:
-            if ',' in pattern and value_match.lastindex == 2:
-                # إذا كان النمط يتضمن مجموعتين (الآلاف والوحدات)
-                value = value_match.group(1) + value_match.group(2)
-            else:
-                value = value_match.group(1) if ":" in pattern else value_match.group(0)
-            
-            # تنظيف القيمة
-            value = re.sub(r'[^\d.,]', '', value)  # الاحتفاظ بالأرقام والفواصل فقط
-            data['قيمة_الشحنة'] = value
-            logger.info(f"تم العثور على قيمة الشحنة: {data['قيمة_الشحنة']}")
-            break
-    
+
+    logger.debug(f"البيانات المستخرجة من النص: {data}")
+
     # إضافة النص الكامل للمرجعية
     data['النص_الكامل'] = text
-    
+
     return data
 
 
@@ -327,6 +342,19 @@ def get_suggested_notification_data(image_path: str) -> Dict[str, Any]:
     # استخراج البيانات من الصورة
     extracted_data = extract_shipment_data_from_image(image_path)
     
+    return build_suggested_data(extracted_data)
+
+
+def build_suggested_data(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    تحويل البيانات المستخرجة (بالمفاتيح العربية) إلى بيانات الإشعار المقترحة مع درجات الثقة
+    
+    Args:
+        extracted_data: البيانات المستخرجة من الصورة
+    
+    Returns:
+        قاموس يحتوي على البيانات المقترحة للإشعار
+    """
     # التحقق من البيانات المستخرجة
     verified_data = verify_extracted_data(extracted_data)
     
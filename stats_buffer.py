@@ -0,0 +1,78 @@
+"""
+مخزن مؤقت لعدادات الإحصائيات.
+
+كل زيادة لعداد إحصائي (بحث، رسالة، صورة...) كانت معاملة قراءة وتعديل وحفظ
+منفصلة على صف اليوم نفسه. يجمع هذا المخزن الزيادات في الذاكرة حسب المفتاح
+(مثل التاريخ والساعة ونوع الإحصائية) ويكتبها دفعة واحدة كل فترة محددة وعند
+إيقاف البرنامج.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+
+class CounterBuffer:
+    """
+    عدادات في الذاكرة تُكتب دورياً عبر دالة الكتابة المحددة
+    """
+
+    def __init__(self, writer, interval=5):
+        """
+        Args:
+            writer (callable): دالة تستقبل {مفتاح العداد: الزيادة} وتكتبها
+            interval (float): الفترة بين عمليات الكتابة بالثواني
+        """
+        self._writer = writer
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._stopped = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    def add(self, key, count=1):
+        """إضافة زيادة إلى العداد (دون الوصول إلى قاعدة البيانات)"""
+        with self._lock:
+            self._counts[key] += count
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stats-buffer", daemon=True)
+                self._thread.start()
+
+    def pending(self):
+        """الزيادات التي لم تُكتب بعد"""
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        """
+        كتابة الزيادات المجمعة. عند فشل الكتابة تُعاد إلى المخزن لمحاولة لاحقة.
+
+        Returns:
+            int: عدد العدادات المكتوبة
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts = dict(self._counts)
+                self._counts.clear()
+            if not counts:
+                return 0
+            try:
+                self._writer(counts)
+            except Exception as e:
+                logging.error(f"Error flushing statistics counters: {e}")
+                with self._lock:
+                    for key, count in counts.items():
+                        self._counts[key] += count
+                return 0
+            return len(counts)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """إيقاف الكتابة الدورية وكتابة ما تبقى"""
+        self._stopped.set()
+        self.flush()
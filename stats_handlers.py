@@ -6,7 +6,7 @@ from typing import Dict, List, Any
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, ConversationHandler
 
-import db_manager
+from async_db import asql
 import strings
 
 # حالات المحادثة
@@ -16,7 +16,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     عرض قائمة خيارات الإحصائيات للمشرفين
     """
-    if not db_manager.is_admin(update.effective_user.id):
+    if not await asql.is_admin(update.effective_user.id):
         await update.message.reply_text("عذرًا، أنت لست مسؤولاً مصرحًا له. هذا الأمر للمسؤولين فقط.")
         return
 
@@ -194,7 +194,7 @@ async def get_daily_stats_text() -> str:
     """
     try:
         logging.info("جلب إحصائيات اليوم...")
-        daily_stats = db_manager.get_daily_statistics(1)
+        daily_stats = await asql.get_daily_statistics(1)
         logging.info(f"تم استلام {len(daily_stats)} من الإحصائيات اليومية: {daily_stats}")
         
         if not daily_stats or len(daily_stats) == 0:
@@ -239,7 +239,7 @@ async def get_weekly_stats_text() -> str:
     """
     try:
         logging.info("جلب إحصائيات الأسبوع...")
-        weekly_stats = db_manager.get_weekly_statistics()
+        weekly_stats = await asql.get_weekly_statistics()
         logging.info(f"تم استلام إحصائيات الأسبوع: {weekly_stats}")
         
         # تأكد من أن القيم موجودة، وإذا كانت غير موجودة، استخدم 0
@@ -280,7 +280,7 @@ async def get_monthly_stats_text() -> str:
     """
     try:
         logging.info("جلب إحصائيات الشهر...")
-        monthly_stats = db_manager.get_monthly_statistics()
+        monthly_stats = await asql.get_monthly_statistics()
         logging.info(f"تم استلام إحصائيات الشهر: {monthly_stats}")
         
         # أسماء الأشهر بالعربية
@@ -330,12 +330,11 @@ async def get_total_stats_text() -> str:
     """
     try:
         logging.info("جلب الإحصائيات الإجمالية...")
-        total_stats = db_manager.get_total_statistics()
+        total_stats = await asql.get_total_statistics()
         logging.info(f"تم استلام الإحصائيات الإجمالية: {total_stats}")
         
         # حساب عدد الإشعارات النشطة (غير المرسل لها تذكير بعد)
-        all_notifications = db_manager.get_all_notifications()
-        active_notifications = len([n for n in all_notifications if not n.get('reminder_sent', False) and n.get('reminder_hours', 0) > 0])
+        active_notifications = await asql.count_active_reminders()
         
         # تأكد من أن القيم موجودة، وإذا كانت غير موجودة، استخدم 0
         notifications_created = total_stats.get('notifications_created', 0) or 0 
@@ -372,7 +371,7 @@ async def get_success_rates_text() -> str:
     """
     try:
         logging.info("جلب معدلات نجاح الإرسال...")
-        success_rates = db_manager.get_success_rates()
+        success_rates = await asql.get_success_rates()
         logging.info(f"تم استلام معدلات نجاح الإرسال: {success_rates}")
         
         daily = success_rates.get('daily', {})
@@ -410,7 +409,7 @@ async def get_peak_times_text() -> str:
     """
     جلب نص أوقات الذروة
     """
-    peak_times = db_manager.get_peak_usage_times()
+    peak_times = await asql.get_peak_usage_times()
     
     peak_hour = peak_times.get('peak_hour', 'غير متوفر')
     peak_day = peak_times.get('peak_day', 'غير متوفر')
@@ -448,7 +447,7 @@ async def get_comprehensive_report_text() -> str:
     """
     جلب نص التقرير الشامل
     """
-    stats = db_manager.get_aggregated_statistics()
+    stats = await asql.get_aggregated_statistics()
     
     if 'error' in stats:
         return f"حدث خطأ أثناء جلب التقرير الشامل: {stats['error']}"
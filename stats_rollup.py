@@ -0,0 +1,190 @@
+"""
+تجميعات الإحصائيات المحفوظة في الذاكرة.
+
+تقارير الإحصائيات (اليومية والأسبوعية والشهرية والإجمالية ومعدلات النجاح
+وأوقات الذروة) كانت تنفذ عدة استعلامات SUM و GROUP BY لكل طلب. يحتفظ هذا
+الكائن بمجاميع لكل يوم ولكل شهر وللإجمالي ولكل خانة (يوم الأسبوع، الساعة)
+من جدول الإحصائيات الساعية (168 خانة على الأكثر)، تُحمّل من قاعدة البيانات مرة واحدة ثم تُحدّث مع كل حدث. يُعاد التحميل
+بعد انتهاء مدة صلاحية قصيرة حتى تظهر الأحداث المسجلة من عمليات أخرى (مثل
+لوحة المعلومات).
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# أعمدة جدول الإحصائيات اليومية
+STAT_FIELDS = (
+    'notifications_created', 'notifications_reminded', 'messages_sent', 'images_processed',
+    'ocr_success', 'ocr_failure', 'deliveries_confirmed', 'search_queries'
+)
+
+# الأحداث المسجلة أيضاً في جدول الإحصائيات الساعية
+HOURLY_STAT_FIELDS = ('notifications_created', 'notifications_reminded', 'messages_sent', 'search_queries')
+
+# أسماء أيام الأسبوع بترتيب dow في SQL (الأحد = 0)
+DAY_NAMES = ['الأحد', 'الإثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت']
+
+
+def _empty_bucket():
+    return dict.fromkeys(STAT_FIELDS, 0)
+
+
+def sql_weekday(day):
+    """رقم يوم الأسبوع بترتيب dow في SQL (الأحد = 0)"""
+    return (day.weekday() + 1) % 7
+
+
+class StatisticsRollup:
+    """
+    مجاميع الإحصائيات حسب اليوم والشهر ويوم الأسبوع والساعة
+    """
+
+    def __init__(self, loader, ttl=60):
+        """
+        Args:
+            loader (callable): دالة تعيد (صفوف يومية [(التاريخ، قاموس القيم)]،
+                خانات ساعية {(dow، الساعة): قاموس القيم})
+            ttl (float): مدة صلاحية المجاميع بالثواني قبل إعادة تحميلها
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._daily = {}
+        self._monthly = {}
+        self._total = _empty_bucket()
+        self._cells = {}
+
+    # ------------------- التحميل -------------------
+
+    def _reload(self):
+        rows, cells = self._loader()
+        self._daily = {}
+        self._monthly = {}
+        self._total = _empty_bucket()
+        for day, values in rows:
+            self._add(day, values)
+        self._cells = {
+            cell: {field: values.get(field, 0) or 0 for field in HOURLY_STAT_FIELDS}
+            for cell, values in cells.items()
+        }
+        self._loaded_at = time.monotonic()
+        logging.debug(f"Statistics rollup loaded {len(self._daily)} day(s)")
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._reload()
+
+    def invalidate(self):
+        """إجبار إعادة التحميل عند القراءة التالية"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _add(self, day, values):
+        for bucket in (
+            self._daily.setdefault(day, _empty_bucket()),
+            self._monthly.setdefault((day.year, day.month), _empty_bucket()),
+            self._total
+        ):
+            for field, count in values.items():
+                if field in bucket:
+                    bucket[field] += count or 0
+
+    # ------------------- التحديث -------------------
+
+    def record(self, stat_type, count=1, when=None):
+        """
+        تسجيل حدث في المجاميع (بعد حفظه في قاعدة البيانات).
+
+        Args:
+            stat_type (str): نوع الإحصائية (أحد STAT_FIELDS)
+            count (int): عدد الزيادة
+            when (datetime): وقت الحدث (افتراضياً الآن)
+        """
+        if stat_type not in STAT_FIELDS:
+            return
+        when = when or datetime.now()
+        with self._lock:
+            if self._loaded_at is None:
+                # لم تُحمّل المجاميع بعد، وستتضمن الحدث عند تحميلها
+                return
+            self._add(when.date(), {stat_type: count})
+            if stat_type in HOURLY_STAT_FIELDS:
+                cell = self._cells.setdefault(
+                    (sql_weekday(when), when.hour), dict.fromkeys(HOURLY_STAT_FIELDS, 0)
+                )
+                cell[stat_type] += count
+
+    # ------------------- القراءة -------------------
+
+    def daily(self, days):
+        """أحدث الأيام المسجلة (من الأحدث إلى الأقدم)"""
+        with self._lock:
+            self._ensure_fresh()
+            latest = sorted(self._daily, reverse=True)[:max(1, days)]
+            return [dict(self._daily[day], date=day.isoformat()) for day in latest]
+
+    def day(self, day):
+        """مجاميع يوم محدد"""
+        with self._lock:
+            self._ensure_fresh()
+            return dict(self._daily.get(day, _empty_bucket()))
+
+    def range(self, start, end):
+        """مجموع الأيام من start إلى end (شاملة)"""
+        with self._lock:
+            self._ensure_fresh()
+            result = _empty_bucket()
+            day = start
+            while day <= end:
+                for field, count in self._daily.get(day, {}).items():
+                    result[field] += count
+                day += timedelta(days=1)
+            return result
+
+    def last_week(self):
+        """مجموع الأيام السبعة الماضية واليوم الحالي"""
+        today = date.today()
+        return self.range(today - timedelta(days=7), today)
+
+    def month(self, year, month):
+        """مجاميع شهر محدد"""
+        with self._lock:
+            self._ensure_fresh()
+            return dict(self._monthly.get((year, month), _empty_bucket()))
+
+    def total(self):
+        """المجاميع الإجمالية"""
+        with self._lock:
+            self._ensure_fresh()
+            return dict(self._total)
+
+    def heatmap(self, stat_type='notifications_created'):
+        """
+        خريطة الأحداث حسب يوم الأسبوع والساعة.
+
+        Returns:
+            list: 7 قوائم (الأحد أولاً) في كل منها 24 عدداً
+        """
+        with self._lock:
+            self._ensure_fresh()
+            grid = [[0] * 24 for _ in range(7)]
+            for (weekday, hour), values in self._cells.items():
+                grid[weekday][hour] += values.get(stat_type, 0)
+            return grid
+
+    def distributions(self, stat_type='notifications_created'):
+        """
+        توزيع الأحداث حسب الساعة ويوم الأسبوع.
+
+        Returns:
+            tuple: ({"H:00": العدد}، {اسم اليوم: العدد})
+        """
+        grid = self.heatmap(stat_type)
+        hours = {f"{hour}:00": sum(row[hour] for row in grid) for hour in range(24)}
+        weekdays = {DAY_NAMES[weekday]: sum(grid[weekday]) for weekday in range(7)}
+        return (
+            {hour: count for hour, count in hours.items() if count},
+            {day: count for day, count in weekdays.items() if count}
+        )
@@ -264,6 +264,7 @@ DELIVERED_NOTIFICATION_ITEM = """
 # Errors and administrative messages
 IMAGE_NOT_FOUND = "لم يتم العثور على صورة الإشعار."
 ERROR_SENDING_IMAGE = "تعذر إرسال صورة الإشعار."
+FULL_IMAGE_BUTTON = "🔍 عرض الصورة كاملة"
 ERROR_SAVING_IMAGE = "حدث خطأ أثناء حفظ الصورة."
 TRY_AGAIN_LATER = "الرجاء المحاولة مرة أخرى لاحقًا."
 OPERATION_CANCELLED = "تم إلغاء العملية بنجاح."
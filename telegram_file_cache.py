@@ -0,0 +1,152 @@
+"""
+ذاكرة تخزين مؤقت لمعرفات ملفات تيليجرام (file_id).
+
+بعد أول رفع لصورة إشعار أو لصورتها المصغرة، يعيد تيليجرام معرفاً (file_id)
+يمكن استخدامه لإعادة إرسال نفس الصورة دون رفع بياناتها مرة أخرى.
+تحفظ هذه الوحدة المعرفات مع بصمة الملف (الحجم ووقت التعديل)، وتتجاهل المعرف
+تلقائياً إذا تغير الملف على القرص.
+
+يُسجل كل تغيير كسطر JSON مُلحق بملف data/telegram_file_cache.log بدلاً من
+إعادة كتابة الملف كاملاً، ويُعاد كتابة السجل بالمعرفات الحالية فقط عندما
+تكثر فيه الأسطر القديمة.
+"""
+import json
+import logging
+import os
+import threading
+
+CACHE_FILE = "data/telegram_file_cache.log"
+
+# الملف القديم (قاموس JSON كامل)، يُحوّل إلى السجل عند أول تحميل
+LEGACY_CACHE_FILE = "data/telegram_file_cache.json"
+
+# أقل عدد من الأسطر قبل التفكير في إعادة كتابة السجل
+COMPACT_MIN_LINES = 200
+
+_lock = threading.Lock()
+_entries = None
+_log_lines = 0
+
+
+def _fingerprint(path):
+    """بصمة رخيصة للملف بدون قراءته: (الحجم، وقت التعديل بالنانوثانية)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _load():
+    global _entries, _log_lines
+    if _entries is not None:
+        return _entries
+
+    _entries = {}
+    _log_lines = 0
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # سطر غير مكتمل بسبب توقف مفاجئ أثناء الكتابة
+                    continue
+                _log_lines += 1
+                if op.get("file_id"):
+                    _entries[op["key"]] = {"file_id": op["file_id"], "fingerprint": op.get("fingerprint")}
+                else:
+                    _entries.pop(op.get("key"), None)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.error(f"Error loading Telegram file cache: {e}")
+
+    if os.path.exists(LEGACY_CACHE_FILE):
+        try:
+            with open(LEGACY_CACHE_FILE, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            for key, entry in legacy.items():
+                _entries.setdefault(key, entry)
+            _compact()
+            os.remove(LEGACY_CACHE_FILE)
+        except Exception as e:
+            logging.error(f"Error migrating Telegram file cache: {e}")
+    return _entries
+
+
+def _append(op):
+    """إضافة تغيير واحد إلى السجل، مع إعادة كتابته إذا زادت الأسطر القديمة"""
+    global _log_lines
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        _log_lines += 1
+        if _log_lines > max(COMPACT_MIN_LINES, 2 * len(_entries)):
+            _compact()
+    except Exception as e:
+        logging.error(f"Error saving Telegram file cache: {e}")
+
+
+def _compact():
+    """إعادة كتابة السجل بالمعرفات الحالية فقط"""
+    global _log_lines
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp_path = CACHE_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for key, entry in _entries.items():
+            f.write(json.dumps({"key": key, **entry}, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, CACHE_FILE)
+    _log_lines = len(_entries)
+
+
+def notification_key(notification_id):
+    return f"notification:{notification_id}"
+
+
+def thumbnail_key(notification_id):
+    return f"thumbnail:{notification_id}"
+
+
+def get_file_id(key, path):
+    """
+    الحصول على file_id المخزن لمفتاح إذا كان الملف لم يتغير منذ رفعه.
+
+    Args:
+        key (str): مفتاح الصورة (مثل notification:<id>)
+        path (str): مسار الملف على القرص
+
+    Returns:
+        str: معرف الملف في تيليجرام، أو None
+    """
+    with _lock:
+        entry = _load().get(key)
+        if not entry:
+            return None
+        if entry.get("fingerprint") != _fingerprint(path):
+            # تغير الملف أو حُذف، المعرف القديم لم يعد صالحاً
+            del _entries[key]
+            _append({"key": key})
+            return None
+        return entry.get("file_id")
+
+
+def remember_file_id(key, path, file_id):
+    """تخزين file_id لصورة مع بصمة الملف الحالية."""
+    fingerprint = _fingerprint(path)
+    if not file_id or fingerprint is None:
+        return
+    with _lock:
+        entry = {"file_id": file_id, "fingerprint": fingerprint}
+        if _load().get(key) == entry:
+            return
+        _entries[key] = entry
+        _append({"key": key, **entry})
+
+
+def forget(key):
+    """حذف مفتاح من الذاكرة المؤقتة (مثلاً عند حذف الإشعار أو رفض تيليجرام للمعرف)."""
+    with _lock:
+        if _load().pop(key, None) is not None:
+            _append({"key": key})
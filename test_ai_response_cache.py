@@ -0,0 +1,222 @@
+"""
+اختبار التخزين المؤقت لردود الذكاء الاصطناعي بمزود محلي بديل (بدون اتصال بالشبكة)
+
+الاستخدام:
+    python test_ai_response_cache.py    # تقرير نسبة الطلبات المخدومة من التخزين المؤقت
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import ai_assistant
+from ai_response_cache import ResponseCache, cache_key, normalize_query
+
+# أسئلة متكررة بصيغ مختلفة كما يكتبها المستخدمون
+FAQ_QUESTIONS = [
+    "أين شحنتي؟",
+    "اين شحنتي",
+    "  أين   شحنتي ?? ",
+    "متى يصل الطلب؟",
+    "متى يصل الطلب",
+    "Where is my shipment?",
+    "where is my shipment",
+]
+
+
+class StubProvider:
+    """
+    مزود محلي بديل لنموذج الذكاء الاصطناعي: يعد الطلبات ويرد بنص ثابت بعد تأخير اختياري
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def answer(self, text):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"رد على: {normalize_query(text)}"
+
+    # واجهة anthropic_client.messages.create
+    @property
+    def messages(self):
+        return self
+
+    def create(self, **kwargs):
+        content = kwargs["messages"][-1]["content"]
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.answer(content))],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5)
+        )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_questions_share_response():
+    """
+    الصيغ المختلفة لنفس السؤال تُخدم من رد واحد
+    """
+    cache = ResponseCache(ttl=60, max_entries=10)
+    provider = StubProvider()
+    for question in FAQ_QUESTIONS:
+        key = cache_key(question, "chat")
+        cache.get_or_compute(key, lambda: provider.answer(question))
+
+    assert provider.calls == 3
+    stats = cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 3
+    assert stats["hit_rate"] == round(4 / 7, 3)
+
+
+def test_key_depends_on_type_personality_and_context():
+    assert cache_key("أين شحنتي؟", "chat") != cache_key("أين شحنتي؟", "delivery_prediction")
+    assert cache_key("أين شحنتي؟", "chat", "1:aaaa") != cache_key("أين شحنتي؟", "chat", "2:bbbb")
+    assert cache_key("أين شحنتي؟", "chat", context="abc") != cache_key("أين شحنتي؟", "chat")
+
+
+def test_concurrent_identical_requests_share_one_call():
+    """
+    الطلبات المتطابقة المتزامنة تنتظر طلباً واحداً إلى المزود
+    """
+    cache = ResponseCache(ttl=60, max_entries=10)
+    provider = StubProvider(delay=0.2)
+    key = cache_key("أين شحنتي؟", "chat")
+    results = []
+
+    def ask():
+        results.append(cache.get_or_compute(key, lambda: provider.answer("أين شحنتي؟")))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert len(set(results)) == 1 and len(results) == 8
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, max_entries=10, clock=clock)
+    provider = StubProvider()
+    key = cache_key("متى يصل الطلب؟", "chat")
+
+    cache.get_or_compute(key, lambda: provider.answer("متى يصل الطلب؟"))
+    clock.now = 9
+    cache.get_or_compute(key, lambda: provider.answer("متى يصل الطلب؟"))
+    assert provider.calls == 1
+
+    clock.now = 10
+    cache.get_or_compute(key, lambda: provider.answer("متى يصل الطلب؟"))
+    assert provider.calls == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # "b" أصبح الأقدم استخداماً
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_errors_are_not_cached():
+    cache = ResponseCache(ttl=60, max_entries=10)
+    key = cache_key("أين شحنتي؟", "chat")
+    cacheable = lambda response: not response.startswith("حدث خطأ")
+
+    cache.get_or_compute(key, lambda: "حدث خطأ أثناء معالجة طلبك: timeout", cacheable=cacheable)
+    assert cache.get(key) is None
+
+    try:
+        cache.get_or_compute(key, lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    assert cache.stats()["in_flight"] == 0
+    assert cache.get_or_compute(key, lambda: "شحنتك في الطريق", cacheable=cacheable) == "شحنتك في الطريق"
+
+
+def _use_stub_provider(monkeypatch, provider):
+    monkeypatch.setattr(ai_assistant, "anthropic_client", provider)
+    monkeypatch.setattr(ai_assistant, "openai_client", None)
+    monkeypatch.setattr(ai_assistant, "response_cache", ResponseCache(ttl=60, max_entries=10))
+
+
+def test_get_ai_response_uses_cache(monkeypatch):
+    """
+    رسائل المحادثة عبر get_ai_response تُخدم من التخزين المؤقت مع فصل الشخصيات
+    """
+    provider = StubProvider()
+    _use_stub_provider(monkeypatch, provider)
+    personality = {"id": 1, "mood_type": "متوازن", "settings": {"formality": 5}}
+
+    first = ai_assistant.get_ai_response("أين شحنتي؟", message_type="chat", personality=personality)
+    second = ai_assistant.get_ai_response("اين شحنتي", message_type="chat", personality=personality)
+    assert first == second and provider.calls == 1
+
+    changed = dict(personality, settings={"formality": 9})
+    ai_assistant.get_ai_response("أين شحنتي؟", message_type="chat", personality=changed)
+    assert provider.calls == 2
+
+    # أنواع الرسائل الأخرى لا تُخزن
+    ai_assistant.get_ai_response("صورة", message_type="image", image_data="")
+    ai_assistant.get_ai_response("صورة", message_type="image", image_data="")
+    assert provider.calls == 4
+    assert ai_assistant.get_ai_cache_stats()["hits"] == 1
+
+
+def test_repeated_delivery_prediction(monkeypatch):
+    """
+    التنبؤ المتكرر لنفس الإشعار يُرسل إلى المزود مرة واحدة
+    """
+    provider = StubProvider()
+    _use_stub_provider(monkeypatch, provider)
+    notification = {"customer_name": "أحمد", "phone_number": "+963947312248", "created_at": "2024-05-01"}
+
+    first = ai_assistant.generate_delivery_prediction(notification)
+    second = ai_assistant.generate_delivery_prediction(dict(notification))
+    assert first == second and provider.calls == 1
+
+    ai_assistant.generate_delivery_prediction(dict(notification, customer_name="محمد"))
+    assert provider.calls == 2
+
+
+def main():
+    cache = ResponseCache(ttl=60, max_entries=100)
+    provider = StubProvider(delay=0.01)
+    started = time.perf_counter()
+    for _ in range(20):
+        for question in FAQ_QUESTIONS:
+            cache.get_or_compute(cache_key(question, "chat"), lambda: provider.answer(question))
+    elapsed = time.perf_counter() - started
+
+    stats = cache.stats()
+    print("=" * 50)
+    print("تقرير التخزين المؤقت لردود الذكاء الاصطناعي")
+    print("=" * 50)
+    print(f"الطلبات: {stats['hits'] + stats['misses'] + stats['coalesced']}، طلبات المزود: {provider.calls}")
+    print(f"نسبة الطلبات المخدومة من التخزين المؤقت: {stats['hit_rate']:.1%}")
+    print(f"الزمن الكلي: {elapsed * 1000:.0f} ملي ثانية")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+اختبار مشاركة مخزن الملفات بين عمليتين (البوت وسكريبت إعادة الفهرسة مثلاً)
+"""
+import os
+import time
+
+from blob_store import BlobStore
+
+
+def _age(path, seconds=3600):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_garbage_collection_keeps_other_process_blobs(tmp_path):
+    """
+    جمع المهملات والضغط في أحد المخزنين لا يحذفان ملفات وارتباطات أضافها الآخر
+    """
+    root = str(tmp_path / "blobs")
+    bot_store = BlobStore(root)
+    cli_store = BlobStore(root)
+
+    cli_path = cli_store.put(b"invoice", "image:cli-1")
+    bot_path = bot_store.put(b"logo", "logo:1")
+    _age(cli_path)
+    _age(bot_path)
+
+    # ارتباطات كثيرة تُحرر حتى يتجاوز السجل حد الضغط
+    for number in range(120):
+        bot_store.put(f"temp {number}".encode(), f"temp:{number}")
+    assert bot_store.collect_garbage(temp_ttl_seconds=-1) == 0
+
+    assert os.path.exists(cli_path) and os.path.exists(bot_path)
+    assert bot_store.path_for("image:cli-1") == cli_path
+    assert sorted(cli_store.owners()) == ["image:cli-1", "logo:1"]
+
+    cli_store.release("image:cli-1")
+    assert bot_store.path_for("image:cli-1") is None
+    assert not os.path.exists(cli_path)
+
+    reopened = BlobStore(root)
+    assert reopened.owners() == ["logo:1"]
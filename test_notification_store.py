@@ -0,0 +1,37 @@
+"""
+اختبار مشاركة سجل الإشعارات بين عمليتين (البوت وأداة سطر الأوامر مثلاً)
+"""
+from notification_store import NotificationStore
+
+
+def test_compaction_keeps_other_process_records(tmp_path):
+    """
+    ضغط السجل في أحد المخزنين لا يحذف سجلات المخزن الآخر، وكل مخزن يرى إضافات الآخر
+    """
+    path = str(tmp_path / "notifications.json")
+    bot_store = NotificationStore(path)
+    cli_store = NotificationStore(path)
+    try:
+        bot_store.put({"id": "bot-1", "customer_name": "أحمد"})
+        cli_store.put({"id": "cli-1", "customer_name": "محمد"})
+        cli_store.compact()
+
+        bot_store.put({"id": "bot-2", "customer_name": "علي"})
+        bot_store.compact()
+        cli_store.put({"id": "cli-2", "customer_name": "سامر"})
+
+        expected = {"bot-1", "bot-2", "cli-1", "cli-2"}
+        assert {r["id"] for r in bot_store.all()} == expected
+        assert {r["id"] for r in cli_store.all()} == expected
+
+        cli_store.delete("bot-1")
+        assert bot_store.get("bot-1") is None
+    finally:
+        bot_store.close()
+        cli_store.close()
+
+    reopened = NotificationStore(path)
+    try:
+        assert {r["id"] for r in reopened.all()} == {"bot-2", "cli-1", "cli-2"}
+    finally:
+        reopened.close()
@@ -0,0 +1,247 @@
+"""
+مجموعة نصوص فواتير شحن لقياس دقة وسرعة استخراج البيانات في shipment_ocr
+
+الاستخدام:
+    python test_ocr_extraction.py                  # تقرير الدقة والسرعة على المجموعة المرفقة
+    python test_ocr_extraction.py archive.jsonl    # قياس السرعة على نصوص فواتير مؤرشفة (حقل "text" في كل سطر)
+"""
+import json
+import sys
+import time
+
+from shipment_ocr import extract_data_from_text
+
+# نصوص فواتير كما يعيدها نموذج الرؤية، مع القيم المتوقعة لكل حقل
+CORPUS = [
+    {
+        "text": (
+            "شركة الفؤاد للخدمات اللوجستية\n"
+            "رقم الفاتورة: INV20250422A\n"
+            "المستلم: ابرار ديبر القزق\n"
+            "هاتف: 0947312248\n"
+            "الوجهة: حلب\n"
+            "تاريخ الإرسال: 2025-04-22\n"
+            "نوع العبوة: كرتون\n"
+            "أجور الشحن: 25,000\n"
+            "أجور التوصيل: 10,000\n"
+            "المجموع: 690,000 ل.س"
+        ),
+        "expected": {
+            "نوع_الفاتورة": "الفؤاد",
+            "رقم_الفاتورة": "INV20250422A",
+            "اسم_الزبون": "ابرار ديبر القزق",
+            "رقم_الهاتف": "+963947312248",
+            "الوجهة": "حلب",
+            "تاريخ_الشحنة": "2025-04-22",
+            "نوع_العبوة": "كرتون",
+            "أجور_الشحن": "25,000",
+            "أجور_التوصيل": "10,000",
+            "قيمة_الشحنة": "690,000",
+        },
+    },
+    {
+        "text": (
+            "اسم العميل: محمد سعيد الأحمد\n"
+            "رقم الجوال: +963 933 456 789\n"
+            "المدينة: دمشق\n"
+            "التاريخ: 15/03/2025\n"
+            "قيمة الشحنة: 1,250,000 ليرة"
+        ),
+        "expected": {
+            "اسم_الزبون": "محمد سعيد الأحمد",
+            "رقم_الهاتف": "+963933456789",
+            "الوجهة": "دمشق",
+            "تاريخ_الشحنة": "15/03/2025",
+            "قيمة_الشحنة": "1,250,000",
+        },
+    },
+    {
+        "text": (
+            "الزبون - أحمد خليل\n"
+            "موبايل: 0535 123 45 67\n"
+            "إلى: اسطنبول\n"
+            "2025/01/09\n"
+            "المبلغ: 350 دولار"
+        ),
+        "expected": {
+            "اسم_الزبون": "أحمد خليل",
+            "رقم_الهاتف": "+905351234567",
+            "الوجهة": "اسطنبول",
+            "تاريخ_الشحنة": "2025/01/09",
+            "قيمة_الشحنة": "350",
+        },
+    },
+    {
+        "text": (
+            "فاتورة شحن\n"
+            "المرسل إليه: فاطمة يوسف\n"
+            "0991234567 - 0944556677\n"
+            "وجهة الشحنة حمص\n"
+            "٢٠٢٥-٠٢-١١\n"
+            "SYP 480000"
+        ),
+        "expected": {
+            "اسم_الزبون": "فاطمة يوسف",
+            "رقم_الهاتف": "+963991234567",
+            "أرقام_هواتف_إضافية": ["+963944556677"],
+            "الوجهة": "حمص",
+            "تاريخ_الشحنة": "2025-02-11",
+            "قيمة_الشحنة": "480000",
+        },
+    },
+    {
+        "text": (
+            "Recipient: Omar Haddad\n"
+            "Phone: 00905321112233\n"
+            "City: Gaziantep\n"
+            "Date: 2025-05-30\n"
+            "Total: 1500 TL"
+        ),
+        "expected": {
+            "اسم_الزبون": "Omar Haddad",
+            "رقم_الهاتف": "+905321112233",
+            "الوجهة": "Gaziantep",
+            "تاريخ_الشحنة": "2025-05-30",
+            "قيمة_الشحنة": "1500",
+        },
+    },
+    {
+        "text": (
+            "تاريخ وقت الطباعة: 2025-04-22 14:30:00\n"
+            "رقم الشحنة: 88412093\n"
+            "اسم المستلم: رنا العلي\n"
+            "الهاتف: 0-947-312-248\n"
+            "منطقة التسليم: اللاذقية\n"
+            "أجر التنزيل: 5000\n"
+            "قيمة البضاعة: 200,000"
+        ),
+        "expected": {
+            "تاريخ_الشحنة": "2025-04-22 14:30:00",
+            "رقم_الفاتورة": "88412093",
+            "اسم_الزبون": "رنا العلي",
+            "رقم_الهاتف": "+963947312248",
+            "الوجهة": "اللاذقية",
+            "أجور_الشحن": "5000",
+            "قيمة_الشحنة": "200,000",
+        },
+    },
+    {
+        "text": (
+            "العميل: سامر نجار، طرطوس\n"
+            "تلفون 0955 111 222\n"
+            "السعر: 75,500"
+        ),
+        "expected": {
+            "اسم_الزبون": "سامر نجار",
+            "رقم_الهاتف": "+963955111222",
+            "الوجهة": "طرطوس",
+            "قيمة_الشحنة": "75,500",
+        },
+    },
+    {
+        "text": (
+            "صورة لصندوق كرتوني مغلق بشريط لاصق.\n"
+            "لا تظهر بيانات واضحة للمستلم."
+        ),
+        "expected": {},
+    },
+    {
+        "text": (
+            "الاسم: ليلى حسن\n"
+            "هاتف: 963944000111\n"
+            "الوجهة: دير الزور\n"
+            "المبلغ: ٤٥٠٠٠"
+        ),
+        "expected": {
+            "اسم_الزبون": "ليلى حسن",
+            "رقم_الهاتف": "+963944000111",
+            "الوجهة": "دير الزور",
+            "قيمة_الشحنة": "45000",
+        },
+    },
+    {
+        "text": (
+            "شركة النور للخدمات\n"
+            "اسم الزبون: خالد عمر الحسن\n"
+            "رقم الهاتف: 0933 222 111\n"
+            "أجور التوصيل: 3,000\n"
+            "التكلفة: 98,000 ل.س"
+        ),
+        "expected": {
+            "نوع_الفاتورة": "النور",
+            "اسم_الزبون": "خالد عمر الحسن",
+            "رقم_الهاتف": "+963933222111",
+            "أجور_التوصيل": "3,000",
+            "قيمة_الشحنة": "98,000",
+        },
+    },
+]
+
+
+def score_corpus(corpus=CORPUS):
+    """
+    مقارنة نتائج الاستخراج بالقيم المتوقعة
+
+    Returns:
+        tuple: (عدد الحقول الصحيحة، عدد الحقول المتوقعة، قائمة الأخطاء)
+    """
+    correct = 0
+    total = 0
+    errors = []
+    for number, sample in enumerate(corpus, 1):
+        data = extract_data_from_text(sample["text"])
+        for field, expected in sample["expected"].items():
+            total += 1
+            if data.get(field) == expected:
+                correct += 1
+            else:
+                errors.append((number, field, expected, data.get(field)))
+    return correct, total, errors
+
+
+def test_ocr_extraction():
+    """
+    التحقق من استخراج جميع الحقول المتوقعة من نصوص المجموعة
+    """
+    correct, total, errors = score_corpus()
+    for number, field, expected, actual in errors:
+        print(f"فاتورة {number} | {field}: المتوقع {expected!r} الناتج {actual!r}")
+    assert not errors, f"{len(errors)} حقل غير صحيح من {total}"
+
+
+def benchmark(texts, rounds=200):
+    """
+    قياس عدد النصوص المعالجة في الثانية
+
+    Returns:
+        float: النصوص في الثانية
+    """
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            extract_data_from_text(text)
+    elapsed = time.perf_counter() - started
+    return len(texts) * rounds / elapsed
+
+
+def main():
+    texts = [sample["text"] for sample in CORPUS]
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as archive:
+            texts = [json.loads(line)["text"] for line in archive if line.strip()]
+
+    print("=" * 50)
+    print("تقرير استخراج بيانات فواتير الشحن")
+    print("=" * 50)
+
+    correct, total, errors = score_corpus()
+    print(f"الدقة على المجموعة المرفقة: {correct}/{total} حقل ({correct / total:.1%})")
+    for number, field, expected, actual in errors:
+        print(f"  فاتورة {number} | {field}: المتوقع {expected!r} الناتج {actual!r}")
+
+    rounds = max(1, 2000 // len(texts))
+    print(f"السرعة: {benchmark(texts, rounds):,.0f} نص/ثانية على {len(texts)} نص")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+اختبار فحص التذكيرات المجدولة: التذكير المرسل يُحفظ في المخزن ولا يُرسل مرة أخرى
+"""
+from datetime import datetime, timedelta
+
+import database as db
+import sms_service
+from notification_store import NotificationStore
+from reminder_queue import ReminderQueue, get_due_time
+
+
+def test_sent_reminder_is_not_sent_again(tmp_path, monkeypatch):
+    """
+    الفحص الثاني بعد إرسال التذكير لا يجد تذكيرات مستحقة ولا يرسل شيئاً
+    """
+    store = NotificationStore(str(tmp_path / "notifications.json"))
+    monkeypatch.setattr(db, "_notification_store", store)
+    monkeypatch.setattr(db, "_reminder_queue", ReminderQueue(store))
+    monkeypatch.setattr(db, "record_event", lambda *args, **kwargs: None)
+
+    sent = []
+    monkeypatch.setattr(
+        sms_service, "send_reminder",
+        lambda customer_name, phone_number, notification_id: (sent.append(notification_id) or True, "SM1")
+    )
+
+    store.put({
+        "id": "n-1",
+        "customer_name": "أحمد",
+        "phone_number": "+963947312248",
+        "created_at": (datetime.now() - timedelta(hours=2)).isoformat(),
+        "reminder_hours": 1,
+        "reminder_sent": False
+    })
+
+    try:
+        assert sms_service.check_and_send_scheduled_reminders(db.get_due_reminders()) == 1
+        assert store.get("n-1")["reminder_sent"] is True
+
+        assert db.get_due_reminders() == []
+        assert sms_service.check_and_send_scheduled_reminders(db.get_due_reminders()) == 0
+        assert sent == ["n-1"]
+    finally:
+        store.close()
+
+
+def test_missing_reminder_hours_uses_default():
+    """
+    الإشعار بلا reminder_hours يُذكَّر بعد 24 ساعة، والصفر الصريح يعطل التذكير
+    """
+    created_at = datetime(2024, 1, 1, 12, 0)
+    notification = {"id": "n-1", "created_at": created_at.isoformat()}
+
+    assert get_due_time(notification) == created_at + timedelta(hours=24)
+    assert get_due_time(dict(notification, reminder_hours=0)) is None
@@ -30,10 +30,8 @@ def main():
     # الحصول على آخر إشعار لإرسال صورته
     notifications = []
     try:
-        import json
         import database as db
-        notifications_data = db.load_json(db.NOTIFICATIONS_DB, {"notifications": []})
-        notifications = notifications_data.get("notifications", [])
+        notifications = db.get_all_notifications()
     except Exception as e:
         print(f"⚠️ خطأ في قراءة الإشعارات: {e}")
     
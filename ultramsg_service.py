@@ -1,20 +1,37 @@
 """
 ملف لإدارة إرسال رسائل WhatsApp بواسطة خدمة UltraMsg.com
 """
+import asyncio
 import json
 import logging
 import os
+import threading
 import time
 import base64
-import requests
+import hashlib
+import httpx
+from collections import OrderedDict
 from io import BytesIO
-from database import get_message_template, get_image, get_verification_message_template
+from database import get_message_template, get_image, get_verification_message_template, record_event
 
 # بيانات الاتصال بـ UltraMsg
 ULTRAMSG_INSTANCE_ID = os.environ.get("ULTRAMSG_INSTANCE_ID", "")
 ULTRAMSG_TOKEN = os.environ.get("ULTRAMSG_TOKEN", "")
 ULTRAMSG_API_URL = f"https://api.ultramsg.com/{ULTRAMSG_INSTANCE_ID}"
 
+# إعدادات محرك الإرسال
+ULTRAMSG_TIMEOUT = float(os.environ.get("ULTRAMSG_TIMEOUT", "30"))  # مهلة كل طلب بالثواني
+ULTRAMSG_CONNECT_TIMEOUT = float(os.environ.get("ULTRAMSG_CONNECT_TIMEOUT", "10"))
+ULTRAMSG_MAX_CONCURRENCY = int(os.environ.get("ULTRAMSG_MAX_CONCURRENCY", "10"))  # الحد الأقصى للطلبات المتزامنة
+
+# ذاكرة الوسائط المرفوعة إلى UltraMsg
+MEDIA_CACHE_FILE = "data/ultramsg_media_cache.log"
+LEGACY_MEDIA_CACHE_FILE = "data/ultramsg_media_cache.json"  # الصيغة القديمة (قاموس JSON كامل)
+MEDIA_CACHE_COMPACT_MIN_LINES = 200  # أقل عدد من الأسطر قبل إعادة كتابة السجل
+ULTRAMSG_MEDIA_TTL_HOURS = float(os.environ.get("ULTRAMSG_MEDIA_TTL_HOURS", "720"))  # عمر رابط الوسائط المرفوعة
+ULTRAMSG_MEDIA_CACHE_SIZE = int(os.environ.get("ULTRAMSG_MEDIA_CACHE_SIZE", "500"))  # الحد الأقصى لعدد الروابط المخزنة
+MEDIA_UPLOAD_RETRY_DELAY = 300  # الثواني قبل إعادة محاولة الرفع بعد فشله
+
 class UltraMsgService:
     """
     فئة لإدارة إرسال رسائل WhatsApp بواسطة خدمة UltraMsg.com
@@ -75,16 +92,9 @@ class UltraMsgService:
         else:
             return self.send_message(to_phone_number, message)
 
-def send_whatsapp_message(to_phone_number, message):
+def _normalize_phone(to_phone_number):
     """
-    إرسال رسالة واتساب نصية إلى رقم هاتف.
-    
-    Args:
-        to_phone_number (str): رقم الهاتف المستلم (بصيغة دولية مثل 963933000227)
-        message (str): نص الرسالة
-        
-    Returns:
-        tuple: (نجاح, نتيجة)
+    تحويل رقم الهاتف إلى الصيغة التي يقبلها UltraMsg (بدون + ومع رمز البلد 963).
     """
     # التأكد من أن رقم الهاتف يبدأ بكود البلد (963)
     if to_phone_number.startswith('0'):
@@ -95,74 +105,483 @@ def send_whatsapp_message(to_phone_number, message):
     if to_phone_number.startswith('+'):
         to_phone_number = to_phone_number[1:]  # إزالة علامة + إذا كانت موجودة
     
-    url = f"{ULTRAMSG_API_URL}/messages/chat"
-    
+    return to_phone_number
+
+def _build_message_request(to_phone_number, message):
+    """بناء عنوان وبيانات طلب رسالة نصية."""
     payload = {
         'token': ULTRAMSG_TOKEN,
-        'to': to_phone_number,
+        'to': _normalize_phone(to_phone_number),
         'body': message
     }
+    return f"{ULTRAMSG_API_URL}/messages/chat", payload
+
+def _build_image_request(to_phone_number, image_data, caption="", media_url=None):
+    """بناء عنوان وبيانات طلب رسالة صورة (برابط وسائط مرفوعة مسبقاً إن توفر)."""
+    if media_url:
+        image = media_url
+    else:
+        # تحويل بيانات الصورة إلى Base64
+        image = base64.b64encode(image_data).decode('utf-8')
+    
+    payload = {
+        'token': ULTRAMSG_TOKEN,
+        'to': _normalize_phone(to_phone_number),
+        'image': image,
+        'caption': caption
+    }
+    return f"{ULTRAMSG_API_URL}/messages/image", payload
+
+def _build_upload_request(image_data):
+    """بناء عنوان وبيانات طلب رفع ملف وسائط إلى UltraMsg."""
+    payload = {
+        'token': ULTRAMSG_TOKEN,
+        'file': base64.b64encode(image_data).decode('utf-8')
+    }
+    return f"{ULTRAMSG_API_URL}/media/upload", payload
+
+def _parse_upload_response(response):
+    """استخراج رابط الوسائط من استجابة الرفع، أو None."""
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = None
+    
+    if response.status_code == 200 and isinstance(response_data, dict):
+        for field in ('success', 'url', 'link'):
+            url = response_data.get(field)
+            if isinstance(url, str) and url.startswith('http'):
+                return url
+    
+    logging.warning(f"فشل رفع الوسائط إلى UltraMsg: {response.text}")
+    return None
+
+def _parse_response(response, error_label):
+    """تحويل استجابة UltraMsg إلى (نجاح, نتيجة)."""
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = response.text
+    
+    if response.status_code == 200 and isinstance(response_data, dict) and response_data.get('sent') == 'true':
+        return True, response_data
     
+    logging.error(f"{error_label}: {response.text}")
+    return False, response_data
+
+def _media_url_rejected(response):
+    """
+    هل رفض UltraMsg رابط الوسائط صراحةً؟ (رد برسالة خطأ عن حقل الصورة)
+    
+    أخطاء الشبكة والمهلة وأخطاء الخادم (5xx) وتجاوز الحد (429) لا تُعد رفضاً،
+    فقد تكون الرسالة الأولى قد أُرسلت فعلاً وإعادة الإرسال تكررها.
+    """
+    if response is None or response.status_code >= 500 or response.status_code == 429:
+        return False
     try:
-        response = requests.post(url, data=payload)
         response_data = response.json()
+    except ValueError:
+        return False
+    if not isinstance(response_data, dict) or not response_data.get('error'):
+        return False
+    error = json.dumps(response_data['error'], ensure_ascii=False).lower()
+    return any(field in error for field in ('image', 'url', 'media'))
+
+def _timeout():
+    return httpx.Timeout(ULTRAMSG_TIMEOUT, connect=ULTRAMSG_CONNECT_TIMEOUT)
+
+def _limits():
+    return httpx.Limits(
+        max_connections=ULTRAMSG_MAX_CONCURRENCY,
+        max_keepalive_connections=ULTRAMSG_MAX_CONCURRENCY
+    )
+
+
+class MediaCache:
+    """
+    ذاكرة روابط الوسائط المرفوعة إلى UltraMsg مفتاحها بصمة المحتوى (sha256).
+    
+    تُرفع كل صورة مرة واحدة ثم يُرسل رابطها في الرسائل التالية بدلاً من
+    ترميزها وإرسالها كاملة في كل طلب. تُحذف الروابط التي تجاوزت عمرها
+    (ttl)، وعند تجاوز الحد الأقصى تُحذف الروابط الأقل استخداماً مؤخراً.
+    
+    يُسجل كل تغيير كسطر مُلحق بملف السجل، ويُعاد كتابة السجل بالروابط الحالية
+    فقط عندما تكثر فيه الأسطر القديمة.
+    """
+    
+    def __init__(self, path=MEDIA_CACHE_FILE, ttl_hours=ULTRAMSG_MEDIA_TTL_HOURS,
+                 max_entries=ULTRAMSG_MEDIA_CACHE_SIZE, legacy_path=LEGACY_MEDIA_CACHE_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self._entries = None  # البصمة -> {"url", "uploaded_at"} مرتبة من الأقدم استخداماً
+        self._log_lines = 0
+        self._lock = threading.Lock()
+        self._upload_retry_at = 0  # عدم محاولة الرفع قبل هذا الوقت بعد فشله
+    
+    @staticmethod
+    def key(image_data):
+        return hashlib.sha256(image_data).hexdigest()
+    
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
         
-        if response.status_code == 200 and response_data.get('sent') == 'true':
-            return True, response_data
-        else:
-            logging.error(f"فشل إرسال رسالة الواتساب: {response.text}")
-            return False, response_data
+        self._entries = OrderedDict()
+        self._log_lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # سطر غير مكتمل بسبب توقف مفاجئ أثناء الكتابة
+                        continue
+                    self._log_lines += 1
+                    self._entries.pop(op.get('key'), None)
+                    if op.get('url'):
+                        self._entries[op['key']] = {'url': op['url'], 'uploaded_at': op.get('uploaded_at', 0)}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error loading UltraMsg media cache: {e}")
+        
+        migrated = False
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            try:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    for key, entry in json.load(f).items():
+                        self._entries.setdefault(key, entry)
+                migrated = True
+            except Exception as e:
+                logging.error(f"Error migrating UltraMsg media cache: {e}")
+        
+        if self._evict() or migrated:
+            self._compact()
+        if migrated:
+            os.remove(self.legacy_path)
+        return self._entries
+    
+    def _append(self, op):
+        """إضافة تغيير واحد إلى السجل، مع إعادة كتابته إذا زادت الأسطر القديمة"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            self._log_lines += 1
+            if self._log_lines > max(MEDIA_CACHE_COMPACT_MIN_LINES, 2 * len(self._entries)):
+                self._compact()
+        except Exception as e:
+            logging.error(f"Error saving UltraMsg media cache: {e}")
+    
+    def _compact(self):
+        """إعادة كتابة السجل بالروابط الحالية فقط"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, entry in self._entries.items():
+                f.write(json.dumps({'key': key, **entry}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._entries)
+    
+    def _evict(self):
+        """حذف الروابط المنتهية ثم الأقل استخداماً فوق الحد الأقصى"""
+        now = time.time()
+        evicted = [k for k, entry in self._entries.items() if now - entry.get('uploaded_at', 0) > self.ttl]
+        for key in evicted:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+    
+    def get(self, key):
+        """الحصول على رابط الوسائط المخزن لبصمة، أو None إذا لم يوجد أو انتهى عمره"""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.get('uploaded_at', 0) > self.ttl:
+                del entries[key]
+                self._append({'key': key})
+                return None
+            entries.move_to_end(key)
+            return entry['url']
+    
+    def put(self, key, url):
+        with self._lock:
+            entries = self._load()
+            entries[key] = {'url': url, 'uploaded_at': time.time()}
+            entries.move_to_end(key)
+            self._append({'key': key, **entries[key]})
+            for evicted in self._evict():
+                self._append({'key': evicted})
+    
+    def forget(self, key):
+        """حذف رابط لم يعد صالحاً (مثلاً عند رفض UltraMsg له)"""
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._append({'key': key})
+    
+    def can_upload(self):
+        return time.time() >= self._upload_retry_at
+    
+    def upload_failed(self):
+        """إيقاف محاولات الرفع مؤقتاً حتى لا يضاعف فشل الرفع عدد الطلبات"""
+        self._upload_retry_at = time.time() + MEDIA_UPLOAD_RETRY_DELAY
+
+
+# ذاكرة الوسائط المشتركة بين الإرسال المتزامن وغير المتزامن
+media_cache = MediaCache()
+
+
+class AsyncWhatsAppSender:
+    """
+    محرك إرسال غير متزامن لرسائل UltraMsg.
     
+    يستخدم عميل httpx واحداً بجلسات keep-alive مشتركة، مع حد أقصى للطلبات
+    المتزامنة ومهلة لكل طلب. يرتبط العميل بحلقة الأحداث التي أُنشئ فيها،
+    ويُعاد إنشاؤه تلقائياً إذا تغيرت الحلقة.
+    """
+    
+    def __init__(self, max_concurrency=ULTRAMSG_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._semaphore = None
+        self._uploads = {}  # عمليات الرفع الجارية: البصمة -> Future
+        self._loop = None
+    
+    def _ensure_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._uploads = {}
+            self._loop = loop
+        return self._client
+    
+    async def post(self, url, payload, error_label):
+        """
+        إرسال طلب POST إلى UltraMsg ضمن حد التزامن.
+        
+        Returns:
+            tuple: (نجاح, نتيجة)
+        """
+        return (await self._post(url, payload, error_label))[0]
+    
+    async def _post(self, url, payload, error_label):
+        """مثل post مع استجابة HTTP (أو None عند خطأ الشبكة أو المهلة)"""
+        client = self._ensure_client()
+        async with self._semaphore:
+            try:
+                response = await client.post(url, data=payload)
+            except httpx.TimeoutException as e:
+                logging.error(f"انتهت مهلة الاتصال بـ UltraMsg: {e}")
+                return (False, f"timeout: {e}"), None
+            except Exception as e:
+                logging.error(f"{error_label}: {str(e)}")
+                return (False, str(e)), None
+        return _parse_response(response, error_label), response
+    
+    async def send_message(self, to_phone_number, message):
+        url, payload = _build_message_request(to_phone_number, message)
+        return await self.post(url, payload, "فشل إرسال رسالة الواتساب")
+    
+    async def media_url(self, image_data):
+        """
+        الحصول على رابط الصورة على UltraMsg، مع رفعها مرة واحدة فقط عند الحاجة.
+        
+        الطلبات المتزامنة لنفس الصورة (مثل عمال الحملة) تنتظر عملية رفع واحدة.
+        
+        Returns:
+            tuple: (البصمة، الرابط أو None)
+        """
+        key = media_cache.key(image_data)
+        url = media_cache.get(key)
+        if url or not media_cache.can_upload():
+            return key, url
+        
+        client = self._ensure_client()
+        pending = self._uploads.get(key)
+        if pending is not None:
+            return key, await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._uploads[key] = future
+        url = None
+        try:
+            upload_url, payload = _build_upload_request(image_data)
+            async with self._semaphore:
+                response = await client.post(upload_url, data=payload)
+            url = _parse_upload_response(response)
+        except Exception as e:
+            logging.warning(f"فشل رفع الوسائط إلى UltraMsg: {e}")
+        finally:
+            if url:
+                media_cache.put(key, url)
+            else:
+                media_cache.upload_failed()
+            future.set_result(url)
+            self._uploads.pop(key, None)
+        return key, url
+    
+    async def send_image(self, to_phone_number, image_data, caption="", before_retry=None):
+        """
+        إرسال صورة برابط الوسائط المرفوع، أو بالطريقة المضمنة إذا لم يتوفر الرابط
+        أو رفضه UltraMsg صراحةً.
+        
+        Args:
+            before_retry (callable): دالة غير متزامنة تُنتظر قبل إعادة الإرسال
+                بالطريقة المضمنة (مثل محدد معدل الحملة حتى يُحتسب الطلب الإضافي)
+        """
+        key, media_url = await self.media_url(image_data)
+        if media_url:
+            url, payload = _build_image_request(to_phone_number, image_data, caption, media_url)
+            result, response = await self._post(url, payload, "فشل إرسال صورة واتساب")
+            if result[0] or not _media_url_rejected(response):
+                return result
+            
+            # رُفض الرابط: حذفه ثم الإرسال بالطريقة المضمنة
+            media_cache.forget(key)
+            if before_retry is not None:
+                await before_retry()
+        
+        url, payload = _build_image_request(to_phone_number, image_data, caption)
+        return await self.post(url, payload, "فشل إرسال صورة واتساب")
+    
+    async def aclose(self):
+        """إغلاق العميل وتحرير الاتصالات المفتوحة."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# محرك الإرسال المشترك لجميع المعالجات غير المتزامنة
+async_sender = AsyncWhatsAppSender()
+
+# عميل متزامن مشترك للدوال المتزامنة (سكريبتات المراقبة والخيوط الخلفية)
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+def _get_sync_client():
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(timeout=_timeout(), limits=_limits())
+        return _sync_client
+
+def _post_sync(url, payload, error_label):
+    return _post_sync_response(url, payload, error_label)[0]
+
+def _post_sync_response(url, payload, error_label):
+    """مثل _post_sync مع استجابة HTTP (أو None عند خطأ الشبكة أو المهلة)"""
+    try:
+        response = _get_sync_client().post(url, data=payload)
+    except httpx.TimeoutException as e:
+        logging.error(f"انتهت مهلة الاتصال بـ UltraMsg: {e}")
+        return (False, f"timeout: {e}"), None
     except Exception as e:
-        logging.error(f"حدث خطأ أثناء إرسال رسالة الواتساب: {str(e)}")
-        return False, str(e)
+        logging.error(f"{error_label}: {str(e)}")
+        return (False, str(e)), None
+    return _parse_response(response, error_label), response
 
-def send_whatsapp_image(to_phone_number, image_data, caption=""):
+def _media_url_sync(image_data):
+    """النسخة المتزامنة من AsyncWhatsAppSender.media_url."""
+    key = media_cache.key(image_data)
+    url = media_cache.get(key)
+    if url or not media_cache.can_upload():
+        return key, url
+    
+    try:
+        upload_url, payload = _build_upload_request(image_data)
+        url = _parse_upload_response(_get_sync_client().post(upload_url, data=payload))
+    except Exception as e:
+        logging.warning(f"فشل رفع الوسائط إلى UltraMsg: {e}")
+        url = None
+    if url:
+        media_cache.put(key, url)
+    else:
+        media_cache.upload_failed()
+    return key, url
+
+def _count_sent(result):
+    """تسجيل الرسالة في الإحصائيات إذا نجح إرسالها"""
+    if result[0]:
+        record_event('messages_sent')
+    return result
+
+async def send_whatsapp_message_async(to_phone_number, message):
     """
-    إرسال صورة مع نص عبر واتساب.
+    إرسال رسالة واتساب نصية دون حجز حلقة الأحداث.
+    
+    Args:
+        to_phone_number (str): رقم الهاتف المستلم
+        message (str): نص الرسالة
+        
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    return _count_sent(await async_sender.send_message(to_phone_number, message))
+
+async def send_whatsapp_image_async(to_phone_number, image_data, caption="", before_retry=None):
+    """
+    إرسال صورة مع نص عبر واتساب دون حجز حلقة الأحداث.
     
     Args:
         to_phone_number (str): رقم الهاتف المستلم
         image_data (bytes): بيانات الصورة
         caption (str): النص المرفق مع الصورة (اختياري)
+        before_retry (callable): دالة غير متزامنة تُنتظر قبل إعادة الإرسال بالطريقة
+            المضمنة إذا رُفض رابط الوسائط (انظر AsyncWhatsAppSender.send_image)
         
     Returns:
         tuple: (نجاح, نتيجة)
     """
-    # التأكد من أن رقم الهاتف يبدأ بكود البلد (963)
-    if to_phone_number.startswith('0'):
-        to_phone_number = '963' + to_phone_number[1:]
-    elif not to_phone_number.startswith('+') and not to_phone_number.startswith('963'):
-        to_phone_number = '963' + to_phone_number
-    
-    if to_phone_number.startswith('+'):
-        to_phone_number = to_phone_number[1:]  # إزالة علامة + إذا كانت موجودة
-    
-    url = f"{ULTRAMSG_API_URL}/messages/image"
+    return _count_sent(await async_sender.send_image(to_phone_number, image_data, caption, before_retry))
+
+def send_whatsapp_message(to_phone_number, message):
+    """
+    إرسال رسالة واتساب نصية إلى رقم هاتف.
     
-    # تحويل بيانات الصورة إلى Base64
-    image_base64 = base64.b64encode(image_data).decode('utf-8')
+    Args:
+        to_phone_number (str): رقم الهاتف المستلم (بصيغة دولية مثل 963933000227)
+        message (str): نص الرسالة
+        
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    url, payload = _build_message_request(to_phone_number, message)
+    return _count_sent(_post_sync(url, payload, "فشل إرسال رسالة الواتساب"))
+
+def send_whatsapp_image(to_phone_number, image_data, caption=""):
+    """
+    إرسال صورة مع نص عبر واتساب.
     
-    payload = {
-        'token': ULTRAMSG_TOKEN,
-        'to': to_phone_number,
-        'image': image_base64,
-        'caption': caption
-    }
+    تُرفع الصورة إلى UltraMsg مرة واحدة ويُعاد استخدام رابطها في الإرسالات
+    التالية لنفس المحتوى (انظر MediaCache).
     
-    try:
-        response = requests.post(url, data=payload)
-        response_data = response.json()
+    Args:
+        to_phone_number (str): رقم الهاتف المستلم
+        image_data (bytes): بيانات الصورة
+        caption (str): النص المرفق مع الصورة (اختياري)
         
-        if response.status_code == 200 and response_data.get('sent') == 'true':
-            return True, response_data
-        else:
-            logging.error(f"فشل إرسال صورة واتساب: {response.text}")
-            return False, response_data
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    key, media_url = _media_url_sync(image_data)
+    if media_url:
+        url, payload = _build_image_request(to_phone_number, image_data, caption, media_url)
+        result, response = _post_sync_response(url, payload, "فشل إرسال صورة واتساب")
+        if result[0] or not _media_url_rejected(response):
+            return _count_sent(result)
+        
+        # رُفض الرابط صراحةً: حذفه ثم الإرسال بالطريقة المضمنة
+        media_cache.forget(key)
     
-    except Exception as e:
-        logging.error(f"حدث خطأ أثناء إرسال صورة عبر واتساب: {str(e)}")
-        return False, str(e)
+    url, payload = _build_image_request(to_phone_number, image_data, caption)
+    return _count_sent(_post_sync(url, payload, "فشل إرسال صورة واتساب"))
 
 def send_welcome_message(customer_name, phone_number, notification_id):
     """
@@ -259,6 +678,52 @@ def send_verification_message(customer_name, phone_number, notification_id):
         return send_whatsapp_message(phone_number, message)
 
 
+async def _send_with_notification_image_async(phone_number, notification_id, message):
+    """
+    إرسال رسالة مع صورة الإشعار إن وجدت، وإلا نص فقط، بدون حجز حلقة الأحداث.
+    """
+    # قراءة الصورة من القرص في خيط منفصل
+    image_data = await asyncio.to_thread(get_image, notification_id)
+    
+    if image_data:
+        return await send_whatsapp_image_async(phone_number, image_data, caption=message)
+    return await send_whatsapp_message_async(phone_number, message)
+
+async def send_welcome_message_async(customer_name, phone_number, notification_id):
+    """
+    النسخة غير المتزامنة من send_welcome_message للاستخدام داخل معالجات البوت.
+    
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    from database import get_welcome_message_template
+    
+    message = get_welcome_message_template().replace("{{customer_name}}", customer_name)
+    logging.info(f"Sending welcome message to {customer_name} ({phone_number})")
+    return await _send_with_notification_image_async(phone_number, notification_id, message)
+
+async def send_reminder_async(customer_name, phone_number, notification_id):
+    """
+    النسخة غير المتزامنة من send_reminder.
+    
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    message = get_message_template().replace("{{customer_name}}", customer_name)
+    return await _send_with_notification_image_async(phone_number, notification_id, message)
+
+async def send_verification_message_async(customer_name, phone_number, notification_id):
+    """
+    النسخة غير المتزامنة من send_verification_message للاستخدام داخل معالجات البوت.
+    
+    Returns:
+        tuple: (نجاح, نتيجة)
+    """
+    message = get_verification_message_template().replace("{{customer_name}}", customer_name)
+    logging.info(f"Sending verification message to {customer_name} ({phone_number})")
+    return await _send_with_notification_image_async(phone_number, notification_id, message)
+
+
 def send_admin_alert(message):
     """
     إرسال إشعار للمسؤول الرئيسي عبر WhatsApp.
@@ -71,6 +71,147 @@ def add_columns_to_notifications_table():
         logger.error(f"حدث خطأ أثناء إضافة أعمدة جديدة لجدول الإشعارات: {e}")
         return False
 
+def add_phone_index_columns():
+    """إضافة أعمدة الرقم الموحد وفهارسها إلى جدول الإشعارات وتعبئتها للإشعارات الحالية"""
+    from phone_index import canonical_phone
+    try:
+        result = session.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='notifications' AND column_name='phone_canonical'"))
+        if not result.fetchone():
+            logger.info("إضافة أعمدة الرقم الموحد لجدول الإشعارات...")
+            
+            session.execute(text("""
+                ALTER TABLE notifications 
+                ADD COLUMN phone_canonical VARCHAR(20),
+                ADD COLUMN phone_reversed VARCHAR(20)
+            """))
+            session.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_phone_canonical ON notifications (phone_canonical)"))
+            session.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_phone_reversed ON notifications (phone_reversed)"))
+            session.commit()
+            logger.info("تمت إضافة أعمدة الرقم الموحد بنجاح")
+        else:
+            logger.info("أعمدة الرقم الموحد موجودة بالفعل في جدول الإشعارات")
+        
+        # تعبئة الأعمدة للإشعارات التي لم تُحسب لها بعد
+        rows = session.execute(text("SELECT id, phone_number FROM notifications WHERE phone_canonical IS NULL")).fetchall()
+        for notification_id, phone_number in rows:
+            canonical = canonical_phone(phone_number or "")
+            session.execute(
+                text("UPDATE notifications SET phone_canonical = :canonical, phone_reversed = :reversed WHERE id = :id"),
+                {"canonical": canonical, "reversed": canonical[::-1], "id": notification_id}
+            )
+        session.commit()
+        logger.info(f"تم حساب الرقم الموحد لـ {len(rows)} إشعار")
+        
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"حدث خطأ أثناء إضافة أعمدة الرقم الموحد: {e}")
+        return False
+
+def add_name_search_column():
+    """إضافة عمود الاسم الموحد مع فهرس مقاطع ثلاثية (pg_trgm) وتعبئته للإشعارات الحالية"""
+    from name_index import normalize_name
+    try:
+        result = session.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name='notifications' AND column_name='customer_name_normalized'"))
+        if not result.fetchone():
+            logger.info("إضافة عمود الاسم الموحد لجدول الإشعارات...")
+            
+            session.execute(text("ALTER TABLE notifications ADD COLUMN customer_name_normalized VARCHAR(100)"))
+            session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_notifications_customer_name_trgm "
+                "ON notifications USING gin (customer_name_normalized gin_trgm_ops)"
+            ))
+            session.commit()
+            logger.info("تمت إضافة عمود الاسم الموحد بنجاح")
+        else:
+            logger.info("عمود الاسم الموحد موجود بالفعل في جدول الإشعارات")
+        
+        rows = session.execute(text("SELECT id, customer_name FROM notifications WHERE customer_name_normalized IS NULL")).fetchall()
+        for notification_id, customer_name in rows:
+            session.execute(
+                text("UPDATE notifications SET customer_name_normalized = :normalized WHERE id = :id"),
+                {"normalized": normalize_name(customer_name or ""), "id": notification_id}
+            )
+        session.commit()
+        logger.info(f"تم توحيد أسماء {len(rows)} إشعار")
+        
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"حدث خطأ أثناء إضافة عمود الاسم الموحد: {e}")
+        return False
+
+def create_hourly_statistics_table():
+    """إنشاء جدول الإحصائيات الساعية وتعبئته من أوقات إنشاء الإشعارات الحالية"""
+    from models import HourlyStatistic
+    try:
+        HourlyStatistic.__table__.create(bind=engine, checkfirst=True)
+        
+        result = session.execute(text("SELECT 1 FROM hourly_statistics LIMIT 1"))
+        if result.fetchone():
+            logger.info("جدول الإحصائيات الساعية موجود ويحتوي على بيانات بالفعل")
+            return True
+        
+        logger.info("تعبئة جدول الإحصائيات الساعية من الإشعارات الحالية...")
+        result = session.execute(text("""
+            INSERT INTO hourly_statistics (date, hour, weekday, notifications_created,
+                                           notifications_reminded, messages_sent, search_queries)
+            SELECT CAST(created_at AS DATE), EXTRACT(HOUR FROM created_at), EXTRACT(DOW FROM created_at),
+                   COUNT(*), 0, 0, 0
+            FROM notifications
+            WHERE created_at IS NOT NULL
+            GROUP BY 1, 2, 3
+        """))
+        session.commit()
+        logger.info(f"تمت إضافة {result.rowcount} صف إلى جدول الإحصائيات الساعية")
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"حدث خطأ أثناء إنشاء جدول الإحصائيات الساعية: {e}")
+        return False
+
+def add_notifications_order_index():
+    """إنشاء فهرس (created_at, id) المستخدم في تقسيم قوائم الإشعارات إلى صفحات"""
+    try:
+        session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_notifications_created_at_id ON notifications (created_at, id)"
+        ))
+        session.commit()
+        logger.info("تم إنشاء فهرس ترتيب الإشعارات")
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"حدث خطأ أثناء إنشاء فهرس ترتيب الإشعارات: {e}")
+        return False
+
+def add_statistics_date_unique_index():
+    """
+    دمج صفوف الإحصائيات المكررة لنفس اليوم ثم إنشاء فهرس فريد على التاريخ
+    (يعتمد عليه تحديث العدادات بعبارة upsert في db_manager.py)
+    """
+    from models import Statistic
+    try:
+        columns = [column.name for column in Statistic.__table__.columns if column.name not in ("id", "date")]
+        duplicates = session.execute(text(
+            "SELECT date, MIN(id) FROM statistics WHERE date IS NOT NULL GROUP BY date HAVING COUNT(*) > 1"
+        )).fetchall()
+        for day, keep_id in duplicates:
+            totals = ", ".join(f"{column} = (SELECT SUM(COALESCE({column}, 0)) FROM statistics WHERE date = :day)" for column in columns)
+            session.execute(text(f"UPDATE statistics SET {totals} WHERE id = :keep_id"), {"day": day, "keep_id": keep_id})
+            session.execute(text("DELETE FROM statistics WHERE date = :day AND id <> :keep_id"), {"day": day, "keep_id": keep_id})
+        if duplicates:
+            logger.info(f"تم دمج الإحصائيات المكررة لـ {len(duplicates)} يوم")
+        
+        session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_statistics_date ON statistics (date)"))
+        session.commit()
+        logger.info("تم إنشاء الفهرس الفريد على تاريخ الإحصائيات")
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.error(f"حدث خطأ أثناء إنشاء الفهرس الفريد على تاريخ الإحصائيات: {e}")
+        return False
+
 def add_column_to_statistics_table():
     """إضافة عمود deliveries_confirmed إلى جدول الإحصائيات"""
     try:
@@ -102,10 +243,26 @@ def main():
     # إضافة الأعمدة الجديدة إلى جدول الإشعارات
     notifications_success = add_columns_to_notifications_table()
     
+    # إضافة أعمدة الرقم الموحد المستخدمة في البحث برقم الهاتف
+    phone_index_success = add_phone_index_columns()
+    
+    # إضافة عمود الاسم الموحد المستخدم في البحث بالاسم
+    name_search_success = add_name_search_column()
+    
+    # إنشاء فهرس الترتيب المستخدم في قوائم الإشعارات المقسمة إلى صفحات
+    order_index_success = add_notifications_order_index()
+    
     # إضافة العمود الجديد إلى جدول الإحصائيات
     statistics_success = add_column_to_statistics_table()
     
-    if notifications_success and statistics_success:
+    # دمج الإحصائيات اليومية المكررة وإنشاء الفهرس الفريد على التاريخ
+    statistics_unique_success = add_statistics_date_unique_index()
+    
+    # إنشاء جدول الإحصائيات الساعية المستخدم في تحليل أوقات الذروة
+    hourly_statistics_success = create_hourly_statistics_table()
+    
+    if notifications_success and phone_index_success and name_search_success and order_index_success \
+            and statistics_success and statistics_unique_success and hourly_statistics_success:
         logger.info("تمت ترقية قاعدة البيانات بنجاح!")
     else:
         logger.error("فشلت عملية ترقية قاعدة البيانات!")
@@ -5,6 +5,8 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import database as db
+import telegram_file_cache
+from phone_index import canonical_phone
 
 async def check_user_is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -107,6 +109,82 @@ def create_paginated_keyboard(items, page, prefix, items_per_page=5, extra_butto
     
     return InlineKeyboardMarkup(keyboard)
 
+def create_keyset_keyboard(items, page, prefix, has_prev, has_next, total, items_per_page=5, extra_buttons=None):
+    """
+    إنشاء لوحة مفاتيح لصفحة واحدة محملة بمؤشر (انظر database.list_notifications).
+
+    تحمل أزرار التنقل رقم الصفحة ومعرف الإشعار الذي يبدأ منه التحميل:
+    {prefix}_page_{n}_after_{id} للصفحة التالية و {prefix}_page_{n}_before_{id} للسابقة.
+
+    Args:
+        items: إشعارات الصفحة الحالية فقط
+        page: رقم الصفحة الحالية (يبدأ من 1)
+        prefix: بادئة بيانات الأزرار
+        has_prev: وجود صفحة سابقة
+        has_next: وجود صفحة تالية
+        total: العدد الإجمالي للعناصر
+        items_per_page: عدد العناصر في الصفحة
+        extra_buttons: أزرار إضافية في أسفل لوحة المفاتيح
+
+    Returns:
+        InlineKeyboardMarkup: لوحة مفاتيح الصفحة
+    """
+    keyboard = []
+
+    start_idx = (page - 1) * items_per_page
+    for idx, item in enumerate(items, start=start_idx + 1):
+        item_name = item["customer_name"]
+        if len(item_name) > 25:
+            item_name = item_name[:22] + "..."
+
+        keyboard.append([
+            InlineKeyboardButton(
+                f"{idx}. {item_name}",
+                callback_data=f"{prefix}_view_{item['id']}"
+            )
+        ])
+
+    nav_buttons = []
+    if has_prev and items:
+        nav_buttons.append(
+            InlineKeyboardButton("◀️ السابق", callback_data=f"{prefix}_page_{page-1}_before_{items[0]['id']}")
+        )
+
+    total_pages = max(1, (total + items_per_page - 1) // items_per_page)
+    nav_buttons.append(
+        InlineKeyboardButton(f"{page}/{total_pages}", callback_data="noop")
+    )
+
+    if has_next and items:
+        nav_buttons.append(
+            InlineKeyboardButton("التالي ▶️", callback_data=f"{prefix}_page_{page+1}_after_{items[-1]['id']}")
+        )
+
+    keyboard.append(nav_buttons)
+
+    if extra_buttons:
+        keyboard.extend(extra_buttons)
+
+    return InlineKeyboardMarkup(keyboard)
+
+def parse_keyset_page(callback_data, prefix):
+    """
+    استخراج رقم الصفحة والمؤشر من بيانات زر أنشأته create_keyset_keyboard.
+
+    Returns:
+        tuple: (رقم الصفحة، after، before)؛ الأزرار القديمة بدون مؤشر تعود إلى الصفحة الأولى
+    """
+    parts = callback_data[len(f"{prefix}_page_"):].split("_", 2)
+    try:
+        page = int(parts[0])
+    except ValueError:
+        return 1, None, None
+    if len(parts) == 3 and parts[1] == "after":
+        return page, parts[2], None
+    if len(parts) == 3 and parts[1] == "before":
+        return page, None, parts[2]
+    return 1, None, None
+
 def format_notification_details(notification):
     """Format notification details for display."""
     from datetime import datetime
@@ -182,141 +260,18 @@ def format_phone_number(phone: str) -> str:
     """
     if not phone:
         return ""
-        
-    # تسجيل المعلومات الأصلية للمساعدة في التشخيص
-    original_phone = phone
-    logging.info(f"تنسيق رقم الهاتف الأصلي: '{original_phone}'")
-    
-    # التعامل مع علامة + في بداية الرقم (حذفها مؤقتًا للمعالجة ثم إعادتها لاحقًا)
-    has_plus = False
-    if phone.startswith('+'):
-        has_plus = True
-        phone = phone[1:]  # حذف علامة + مؤقتًا
-    
-    # التعامل مع الحالة الخاصة للأرقام التي تحتوي على فواصل (,)
-    # مثل "0947,312,248" أو "0947, 312, 248"
-    if ',' in phone:
-        logging.info(f"معالجة رقم هاتف يحتوي على فواصل: {phone}")
-        # استبدال الفواصل بمسافات للمعالجة اللاحقة
-        phone = phone.replace(',', ' ')
-    
-    # التعامل مع الحالة الخاصة للأرقام التي تحتوي على شرطات (-)
-    # مثل "0947-312-248" أو "0535-123-45-67"
-    if '-' in phone:
-        logging.info(f"معالجة رقم هاتف يحتوي على شرطات: {phone}")
-        # استبدال الشرطات بمسافات للمعالجة اللاحقة
-        phone = phone.replace('-', ' ')
-    
-    # التعامل مع الحالة الخاصة للأرقام التي تحتوي على شرطات مائلة (/)
-    # مثل "0947/312/248"
-    if '/' in phone:
-        logging.info(f"معالجة رقم هاتف يحتوي على شرطات مائلة: {phone}")
-        # استبدال الشرطات المائلة بمسافات للمعالجة اللاحقة
-        phone = phone.replace('/', ' ')
-    
-    # إزالة جميع المسافات والرموز غير المرغوب بها وإبقاء الأرقام فقط
-    cleaned_phone = ''.join(c for c in phone if c.isdigit() or '\u0660' <= c <= '\u0669')
-    logging.info(f"الرقم بعد التنظيف: '{cleaned_phone}'")
-    
-    # تحويل الأرقام العربية إلى أرقام لاتينية إذا وجدت
-    arabic_to_latin = {
-        '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
-        '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9'
-    }
-    
-    for ar, lat in arabic_to_latin.items():
-        cleaned_phone = cleaned_phone.replace(ar, lat)
-    
-    # معالجة الحالات الخاصة - التحقق إذا كان الرقم تركي أو سوري
-    is_turkish = False
-    
-    # فحص وجود رمز الدولة التركي
-    if cleaned_phone.startswith('90') or cleaned_phone.startswith('0090'):
-        is_turkish = True
-        logging.info(f"تم اكتشاف رقم تركي بناءً على رمز البلد 90: {cleaned_phone}")
-    # فحص رقم تركي يبدأ بـ 05 (للهواتف المحمولة التركية)
-    elif cleaned_phone.startswith('05') and 10 <= len(cleaned_phone) <= 11:
-        is_turkish = True
-        logging.info(f"تم اكتشاف رقم تركي يبدأ بـ 05: {cleaned_phone}")
-    # فحص رقم تركي يبدأ بـ 5 مباشرة (بدون صفر في البداية)
-    elif cleaned_phone.startswith('5') and 9 <= len(cleaned_phone) <= 10:
-        is_turkish = True
-        logging.info(f"تم اكتشاف رقم تركي يبدأ بـ 5: {cleaned_phone}")
-    
-    # معالجة الرقم بناءً على البلد (تركي أو سوري)
-    
-    # حالة الرقم التركي
-    if is_turkish:
-        # حالة: إذا كان الرقم يبدأ بـ 0090
-        if cleaned_phone.startswith('0090'):
-            formatted_number = '90' + cleaned_phone[4:]  # إزالة 0090 وإضافة 90
-            logging.info(f"تنسيق رقم تركي يبدأ بـ 0090: {formatted_number}")
-        # حالة: إذا كان الرقم يبدأ بـ 90
-        elif cleaned_phone.startswith('90'):
-            formatted_number = cleaned_phone
-            logging.info(f"الاحتفاظ بالرقم التركي كما هو مع رمز البلد 90: {formatted_number}")
-        # حالة: إذا كان الرقم يبدأ بـ 05 (رقم محلي تركي)
-        elif cleaned_phone.startswith('05'):
-            formatted_number = '90' + cleaned_phone[1:]  # إزالة الصفر وإضافة 90
-            logging.info(f"تنسيق رقم تركي محلي يبدأ بـ 05: {formatted_number}")
-        # حالة: إذا كان الرقم يبدأ بـ 5 (بدون صفر)
-        elif cleaned_phone.startswith('5'):
-            formatted_number = '90' + cleaned_phone
-            logging.info(f"تنسيق رقم تركي يبدأ بـ 5: {formatted_number}")
-        # حالة أخرى للرقم التركي
-        else:
-            formatted_number = '90' + cleaned_phone
-            logging.info(f"تنسيق رقم تركي (حالة أخرى): {formatted_number}")
-            
-        # التحقق من طول الرقم التركي (90 + 10 أرقام عادة)
-        expected_turkish_length = 12  # 2 أرقام لرمز البلد + 10 أرقام للرقم المحلي
-        if len(formatted_number) < expected_turkish_length:
-            logging.warning(f"رقم هاتف تركي قصير: {formatted_number}, الأصلي: {original_phone}")
     
-    # حالة الرقم السوري (أو غيره)
-    else:
-        # حالة: إذا كان الرقم يبدأ بصفر (مثل 0947312248) - رقم سوري محلي
-        if cleaned_phone.startswith('0'):
-            formatted_number = '963' + cleaned_phone[1:]  # إزالة الصفر وإضافة 963
-            logging.info(f"تنسيق رقم سوري محلي يبدأ بـ 0: {formatted_number}")
-        
-        # حالة: إذا كان الرقم يبدأ ب 963 (رمز البلد موجود بالفعل)
-        elif cleaned_phone.startswith('963'):
-            # معالجة خاصة للأرقام التي تحتوي على خطأ شائع مثل 9639xxxxxxx
-            if len(cleaned_phone) > 4 and cleaned_phone[3] == '9':
-                # فحص إضافي للتأكد من أن هذا ليس جزءًا من رقم طبيعي (مثل 963987654321)
-                if len(cleaned_phone) >= 12:
-                    # هذا رقم صحيح فيه 9 (رقم محافظة مثلاً)، نتركه كما هو
-                    formatted_number = cleaned_phone
-                    logging.info(f"الاحتفاظ بالرقم السوري كما هو: {formatted_number}")
-                else:
-                    # هذا خطأ في الإدخال، نصححه
-                    formatted_number = '963' + cleaned_phone[4:]
-                    logging.info(f"تصحيح رقم سوري مع خطأ مشترك: {formatted_number}")
-            else:
-                # الرقم به رمز البلد بالفعل، نتركه كما هو
-                formatted_number = cleaned_phone
-                logging.info(f"الاحتفاظ بالرقم السوري مع رمز البلد 963: {formatted_number}")
-        
-        # حالة: إذا كان الرقم يبدأ بـ 9 (ربما رقم سوري بدون رمز البلد الكامل)
-        elif cleaned_phone.startswith('9'):
-            # نضيف رمز البلد 963
-            formatted_number = '963' + cleaned_phone
-            logging.info(f"تنسيق رقم سوري يبدأ بـ 9: {formatted_number}")
-        
-        # حالة: الحالات الأخرى - نفترض أنه رقم محلي ونضيف رمز البلد
-        else:
-            formatted_number = '963' + cleaned_phone
-            logging.info(f"تنسيق رقم سوري (حالة أخرى): {formatted_number}")
-        
-        # التحقق من طول الرقم السوري
-        expected_syrian_length = 12  # 3 أرقام لرمز البلد + 9 أرقام للرقم المحلي
-        if len(formatted_number) < expected_syrian_length:
-            logging.warning(f"رقم هاتف سوري قصير: {formatted_number}, الأصلي: {original_phone}")
+    # قواعد التوحيد (السورية والتركية) في phone_index.canonical_phone
+    # حتى يستخدم فهرس البحث نفس الصيغة تماماً
+    formatted_number = canonical_phone(phone)
+    
+    # التحقق من طول الرقم (رمز البلد + الرقم المحلي = 12 رقماً للسوري والتركي)
+    if len(formatted_number) < 12:
+        logging.warning(f"رقم هاتف قصير: {formatted_number}, الأصلي: {phone}")
     
     # إرجاع الرقم النهائي مع إضافة علامة +
     final_phone = '+' + formatted_number
-    logging.info(f"الرقم النهائي بعد التنسيق: {final_phone}")
+    logging.info(f"تنسيق رقم الهاتف '{phone}' إلى: {final_phone}")
     return final_phone
 
 async def send_image_with_caption(update: Update, context: ContextTypes.DEFAULT_TYPE, 
@@ -364,6 +319,92 @@ async def send_image_with_caption(update: Update, context: ContextTypes.DEFAULT_
         
         return None
         
+async def send_cached_image(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            cache_key, image_path, caption=None, reply_markup=None):
+    """
+    إرسال صورة من القرص مع إعادة استخدام file_id الخاص بتيليجرام إن وجد.
+    
+    عند أول إرسال يتم رفع بيانات الصورة وتخزين file_id الناتج، وفي المرات
+    التالية يُرسل المعرف فقط ما لم يتغير الملف على القرص.
+    
+    Args:
+        cache_key (str): مفتاح الصورة في ذاكرة المعرفات
+        image_path (str): مسار الصورة على القرص
+        
+    Returns:
+        Message: الرسالة المرسلة، أو None في حالة الفشل
+    """
+    file_id = telegram_file_cache.get_file_id(cache_key, image_path)
+    if file_id:
+        try:
+            return await context.bot.send_photo(
+                chat_id=update.effective_chat.id,
+                photo=file_id,
+                caption=caption,
+                reply_markup=reply_markup
+            )
+        except Exception as e:
+            logging.warning(f"Cached file_id rejected for {cache_key}, uploading again: {e}")
+            telegram_file_cache.forget(cache_key)
+    
+    try:
+        with open(image_path, 'rb') as f:
+            photo = f.read()
+    except OSError as e:
+        logging.error(f"Error reading image {image_path}: {e}")
+        photo = None
+    
+    message = await send_image_with_caption(update, context, photo=photo, caption=caption, reply_markup=reply_markup)
+    if message and message.photo:
+        telegram_file_cache.remember_file_id(cache_key, image_path, message.photo[-1].file_id)
+    return message
+
+async def send_notification_image(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                  notification_id, image_path, caption=None, reply_markup=None):
+    """إرسال صورة إشعار مع إعادة استخدام file_id المخزن."""
+    return await send_cached_image(
+        update, context,
+        telegram_file_cache.notification_key(notification_id), image_path,
+        caption=caption, reply_markup=reply_markup
+    )
+
+async def send_notification_preview(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                    notification_id, image_path, caption=None, reply_markup=None):
+    """
+    إرسال الصورة المصغرة للإشعار في واجهات العرض مع زر لعرض الصورة كاملة.
+    
+    إذا لم تكن للإشعار صورة مصغرة (إشعارات محفوظة قبل إنشائها) تُرسل الصورة كاملة.
+    """
+    thumbnail_path = db.get_thumbnail_path(notification_id)
+    if not thumbnail_path:
+        return await send_notification_image(
+            update, context, notification_id, image_path,
+            caption=caption, reply_markup=reply_markup
+        )
+    
+    import strings as st
+    keyboard = list(reply_markup.inline_keyboard) if reply_markup else []
+    keyboard.append([InlineKeyboardButton(st.FULL_IMAGE_BUTTON, callback_data=f"full_image_{notification_id}")])
+    return await send_cached_image(
+        update, context,
+        telegram_file_cache.thumbnail_key(notification_id), thumbnail_path,
+        caption=caption, reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def handle_full_image_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """معالجة زر عرض الصورة كاملة أسفل الصورة المصغرة للإشعار."""
+    import strings as st
+    query = update.callback_query
+    await query.answer()
+    
+    notification_id = query.data[len("full_image_"):]
+    image_path = db.get_image_path(notification_id)
+    if not image_path:
+        await query.message.reply_text(st.IMAGE_NOT_FOUND)
+        return
+    
+    await send_notification_image(update, context, notification_id, image_path)
+
 def url_encode(text: str) -> str:
     """
     تشفير النص للاستخدام في روابط URL
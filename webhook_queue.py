@@ -0,0 +1,255 @@
+"""
+استقبال تحديثات webhook عبر حلقة أحداث دائمة.
+
+كان مسار /webhook في app.py ينشئ حلقة أحداث جديدة لكل تحديث (asyncio.run)
+ويعالج التحديث قبل الرد على تيليجرام، بينما هُيئ تطبيق البوت على حلقة أخرى.
+يشغّل هذا الكائن تطبيق البوت على حلقة أحداث واحدة في خيط مستقل طوال عمر
+العملية، ويضع كل تحديث في طابور التحديثات (update_queue) ثم يرد فوراً. يعالج
+التطبيق عدة تحديثات في نفس الوقت (مع الحفاظ على ترتيب تحديثات المحادثة
+الواحدة)، ويُرفض التحديث عند امتلاء الطابور حتى يعيد تيليجرام إرساله لاحقاً.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from telegram.ext import SimpleUpdateProcessor
+
+# عدد أحدث التحديثات المستخدمة في حساب مقاييس زمن المعالجة
+LATENCY_WINDOW = 500
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class WebhookMetrics:
+    """
+    مقاييس طابور التحديثات: عدد التحديثات المنتظرة وقيد المعالجة وزمن كل تحديث
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._received = {}  # معرف التحديث -> وقت الاستلام
+        self._in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self._wait_ms = deque(maxlen=LATENCY_WINDOW)
+        self._total_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def pending(self):
+        """عدد التحديثات المقبولة التي لم تنته معالجتها"""
+        with self._lock:
+            return len(self._received)
+
+    def try_accept(self, update_id, capacity):
+        """
+        قبول تحديث إذا كان عدد التحديثات المنتظرة أقل من السعة (فحص وقبول في خطوة
+        واحدة حتى لا تتجاوز خيوط الخادم المتزامنة السعة)
+
+        Returns:
+            bool: False إذا كان الطابور ممتلئاً
+        """
+        with self._lock:
+            if len(self._received) >= capacity:
+                self.rejected += 1
+                return False
+            self._received[update_id] = time.monotonic()
+            self.accepted += 1
+            return True
+
+    def forget(self, update_id):
+        """إزالة تحديث لم يصل إلى الطابور"""
+        with self._lock:
+            if self._received.pop(update_id, None) is not None:
+                self.accepted -= 1
+
+    def started(self, update_id):
+        """بداية معالجة تحديث، وإرجاع وقت استلامه"""
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+            received = self._received.get(update_id, now)
+            self._wait_ms.append((now - received) * 1000)
+            return received
+
+    def finished(self, update_id, received, ok=True):
+        with self._lock:
+            self._in_flight -= 1
+            self._received.pop(update_id, None)
+            self._total_ms.append((time.monotonic() - received) * 1000)
+            self.processed += 1
+            if not ok:
+                self.failed += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: عدد التحديثات المنتظرة وقيد المعالجة والعدادات، وزمن الانتظار
+                والزمن الكلي (بالملي ثانية) لأحدث التحديثات
+        """
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            total_ms = list(self._total_ms)
+            return {
+                "queued": len(self._received) - self._in_flight,
+                "in_flight": self._in_flight,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+                "wait_ms_p50": round(_percentile(wait_ms, 0.5), 1),
+                "wait_ms_p95": round(_percentile(wait_ms, 0.95), 1),
+                "latency_ms_p50": round(_percentile(total_ms, 0.5), 1),
+                "latency_ms_p95": round(_percentile(total_ms, 0.95), 1),
+                "latency_ms_max": round(max(total_ms, default=0.0), 1)
+            }
+
+
+class WebhookUpdateProcessor(SimpleUpdateProcessor):
+    """
+    معالج تحديثات متزامن يسجل زمن كل تحديث ويعالج تحديثات المحادثة الواحدة بالترتيب
+    """
+
+    def __init__(self, metrics, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self.metrics = metrics
+        self._chat_locks = {}
+
+    async def process_update(self, update, coroutine):
+        """
+        انتظار دور المحادثة أولاً ثم أخذ مكان من حد التحديثات المتزامنة. في
+        BaseUpdateProcessor يؤخذ المكان قبل استدعاء do_process_update، فكانت
+        تحديثات محادثة مشغولة تحجز الأماكن وهي تنتظر قفل المحادثة وتؤخر المحادثات الأخرى.
+        """
+        update_id = getattr(update, "update_id", None)
+        chat = getattr(update, "effective_chat", None)
+        chat_id = chat.id if chat else None
+
+        lock = self._chat_locks.setdefault(chat_id, [asyncio.Lock(), 0]) if chat_id is not None else None
+        if lock:
+            lock[1] += 1
+        try:
+            if lock:
+                await lock[0].acquire()
+            try:
+                async with self._semaphore:
+                    received = self.metrics.started(update_id)
+                    ok = False
+                    try:
+                        await self.do_process_update(update, coroutine)
+                        ok = True
+                    finally:
+                        self.metrics.finished(update_id, received, ok)
+            finally:
+                if lock:
+                    lock[0].release()
+        finally:
+            if lock:
+                lock[1] -= 1
+                if not lock[1]:
+                    del self._chat_locks[chat_id]
+
+
+class WebhookRunner:
+    """
+    تشغيل تطبيق البوت على حلقة أحداث دائمة واستقبال تحديثات webhook في طابوره
+    """
+
+    def __init__(self, queue_size=100, concurrent_updates=8):
+        """
+        Args:
+            queue_size (int): الحد الأقصى للتحديثات المقبولة التي لم تنته معالجتها
+            concurrent_updates (int): عدد التحديثات التي تُعالج في نفس الوقت
+        """
+        self.queue_size = queue_size
+        self.metrics = WebhookMetrics()
+        self.update_processor = WebhookUpdateProcessor(self.metrics, concurrent_updates)
+        self.application = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self, build_application):
+        """
+        تشغيل حلقة الأحداث في خيط مستقل وتهيئة التطبيق وبدء معالجة الطابور.
+
+        Args:
+            build_application (callable): دالة غير متزامنة تعيد تطبيق البوت
+                (مبني باستخدام update_processor)
+        """
+        self._thread = threading.Thread(
+            target=self._run, args=(build_application,), name="webhook-loop", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, build_application):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self.application = self._loop.run_until_complete(build_application())
+            self._loop.run_until_complete(self.application.initialize())
+            self._loop.run_until_complete(self.application.start())
+        except Exception as e:
+            logging.error(f"Error starting webhook application: {e}")
+            return
+        self._ready.set()
+        logging.info("Webhook application running on a persistent event loop")
+        self._loop.run_forever()
+
+    async def _enqueue(self, update):
+        await self.application.update_queue.put(update)
+
+    def submit(self, update, timeout=5):
+        """
+        وضع تحديث في الطابور دون انتظار معالجته.
+
+        Returns:
+            bool: False إذا لم يكن التطبيق جاهزاً أو كان الطابور ممتلئاً
+        """
+        if not self.ready:
+            return False
+        if not self.metrics.try_accept(update.update_id, self.queue_size):
+            logging.warning(f"Webhook queue full ({self.queue_size}), rejecting update {update.update_id}")
+            return False
+        try:
+            asyncio.run_coroutine_threadsafe(self._enqueue(update), self._loop).result(timeout)
+        except Exception as e:
+            self.metrics.forget(update.update_id)
+            logging.error(f"Error queueing update {update.update_id}: {e}")
+            return False
+        return True
+
+    def stats(self):
+        """مقاييس الطابور مع سعته"""
+        stats = self.metrics.snapshot()
+        stats["capacity"] = self.queue_size
+        stats["concurrency"] = self.update_processor.max_concurrent_updates
+        return stats
+
+    def stop(self, timeout=10):
+        """إيقاف التطبيق بعد معالجة التحديثات المقبولة ثم إيقاف حلقة الأحداث"""
+        if not self.ready:
+            return
+        self._ready.clear()
+
+        async def shutdown():
+            await self.application.stop()
+            await self.application.shutdown()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout)
+        except Exception as e:
+            logging.error(f"Error stopping webhook application: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -202,6 +202,11 @@ def check_and_send_scheduled_reminders(notifications, reminder_interval_hours=24
                 # تحديث الإشعار لتسجيل أنه تم إرسال تذكير
                 notification["reminder_sent"] = True
                 notification["reminder_sent_at"] = datetime.now().isoformat()
+                
+                # حفظ الحالة في المخزن حتى يُزال الإشعار من طابور التذكيرات
+                import database as db
+                if not db.mark_reminder_sent(notification["id"]):
+                    logging.warning(f"WhatsApp reminder sent but failed to update database for {notification['id']}")
                 sent_count += 1
                 logging.info(f"WhatsApp reminder sent for notification ID: {notification['id']}")
             else: